@@ -15,16 +15,33 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_recycle: int = 1800  # Seconds before a pooled connection is replaced
+    database_statement_cache_size: int = 0  # Keep 0 behind pgbouncer transaction mode
+    database_listen_url: str = ""  # Direct connection for LISTEN; empty = database_url
 
     # Redis
     redis_url: str = "redis://localhost:6379"
 
+    # Worker jobs over this many images run in the scheduler's long lane
+    short_job_max_images: int = 20000
+
+    # RBAC: project roles cached per process and in Redis
+    role_cache_size: int = 10000
+    role_cache_ttl: int = 300  # Seconds; safety net for changes made outside the API
+
     # S3/R2
     s3_endpoint_url: str
     s3_access_key_id: str
     s3_secret_access_key: str
     s3_bucket_name: str
     s3_region: str = "auto"
+    s3_max_pool_connections: int = 64
+    s3_verify_concurrency: int = 32  # Concurrent HEAD/List requests per batch check
+    s3_list_threshold: int = 1000  # Batch size from which prefixes are listed instead of HEADs
+    presign_cache_seconds: int = 300  # Download URLs are reused within buckets of this length
+    presign_cache_size: int = 100000  # Download URLs kept per process
 
     # CORS
     cors_origins: list[str] = ["http://localhost:3000"]
@@ -32,6 +49,8 @@ class Settings(BaseSettings):
     # Security
     jwt_algorithm: str = "HS256"
     jwt_audience: str = "authenticated"
+    jwt_cache_size: int = 10000  # Verified tokens kept per process
+    jwt_cache_max_ttl: int = 300  # Seconds, capped by each token's exp
 
     class Config:
         env_file = ".env"
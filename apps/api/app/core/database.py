@@ -1,15 +1,22 @@
-from sqlalchemy import create_engine
+import json
+import uuid
+from typing import Any, AsyncIterator, Dict
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import get_settings
 
 settings = get_settings()
 
+# Sync engine for code that runs outside the event loop (scripts, benchmarks)
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -17,9 +24,80 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def async_database_url(database_url: str) -> str:
+    """
+    Convert a libpq-style DATABASE_URL to its asyncpg equivalent.
+
+    asyncpg takes ssl instead of sslmode and does not understand the
+    other libpq-only query options.
+    """
+    url = make_url(database_url)
+    query = dict(url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query).render_as_string(
+        hide_password=False
+    )
+
+
+# Pgbouncer in transaction mode hands each transaction a different server
+# connection, so prepared statements must not be cached across transactions
+# there (DATABASE_STATEMENT_CACHE_SIZE=0), and the ones SQLAlchemy prepares
+# get unique names so they cannot collide on a shared server connection.
+# Direct connections can enable the cache.
+async_engine = create_async_engine(
+    async_database_url(settings.database_url),
+    pool_pre_ping=True,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_recycle=settings.database_pool_recycle,
+    connect_args={
+        "statement_cache_size": settings.database_statement_cache_size,
+        "prepared_statement_cache_size": settings.database_statement_cache_size,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    },
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _rls_statements(claims: Dict[str, Any]):
+    return [
+        (
+            text("SELECT set_config('request.jwt.claims', :claims, true)"),
+            {"claims": json.dumps(claims)},
+        ),
+        (text("SET LOCAL ROLE authenticated"), {}),
+    ]
+
+
+def set_rls_context(db: Session, claims: Dict[str, Any]) -> None:
+    """
+    Run the current transaction as the authenticated Supabase user.
+
+    Sets the JWT claims read by auth.jwt() and switches to the
+    authenticated role, so RLS policies apply to every following query.
+    Both settings are transaction-local, which keeps them safe behind
+    pgbouncer in transaction mode; call this after each BEGIN.
+    """
+    for statement, params in _rls_statements(claims):
+        db.execute(statement, params)
+
+
+async def set_async_rls_context(db: AsyncSession, claims: Dict[str, Any]) -> None:
+    """Async variant of set_rls_context."""
+    for statement, params in _rls_statements(claims):
+        await db.execute(statement, params)
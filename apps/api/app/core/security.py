@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+HMAC_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+T = TypeVar("T")
+
+
+class TokenError(Exception):
+    """A JWT failed verification."""
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class HMACJWTDecoder:
+    """
+    JWT verifier for HMAC-signed tokens (Supabase HS256).
+
+    The secret, digest and expected header are prepared once, and each
+    distinct header segment is parsed only once, so a decode is one HMAC,
+    one base64 + JSON parse of the payload and the claim checks. Validation
+    follows jose.jwt.decode: signature, exp, nbf and aud; unlike jose, a
+    token without an aud claim is rejected when an audience is configured.
+    """
+
+    def __init__(
+        self,
+        secret: str,
+        algorithm: str,
+        audience: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if algorithm not in HMAC_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.audience = audience
+        self._key = secret.encode()
+        self._digest = HMAC_ALGORITHMS[algorithm]
+        self._clock = clock
+        self._valid_headers: Dict[str, bool] = {}
+
+    def _check_header(self, segment: str) -> None:
+        valid = self._valid_headers.get(segment)
+        if valid is None:
+            try:
+                header = json.loads(_b64decode(segment))
+                valid = isinstance(header, dict) and header.get("alg") == self.algorithm
+            except ValueError:
+                valid = False
+            if len(self._valid_headers) < 64:
+                self._valid_headers[segment] = valid
+        if not valid:
+            raise TokenError("Invalid token header")
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token and return its claims.
+
+        Raises:
+            TokenError: On a malformed token, bad signature or failed claim check
+        """
+        try:
+            signing_input, signature = token.rsplit(".", 1)
+            header_segment, payload_segment = signing_input.split(".")
+        except ValueError:
+            raise TokenError("Not enough segments")
+
+        self._check_header(header_segment)
+        expected = hmac.new(self._key, signing_input.encode(), self._digest).digest()
+        try:
+            valid_signature = hmac.compare_digest(expected, _b64decode(signature))
+        except ValueError:
+            valid_signature = False
+        if not valid_signature:
+            raise TokenError("Signature verification failed")
+
+        try:
+            claims = json.loads(_b64decode(payload_segment))
+        except ValueError:
+            raise TokenError("Invalid payload")
+        if not isinstance(claims, dict):
+            raise TokenError("Invalid payload")
+
+        now = self._clock()
+        if "exp" in claims:
+            if not isinstance(claims["exp"], (int, float)) or claims["exp"] < now:
+                raise TokenError("Signature has expired")
+        if "nbf" in claims:
+            if not isinstance(claims["nbf"], (int, float)) or claims["nbf"] > now:
+                raise TokenError("The token is not yet valid (nbf)")
+        if self.audience is not None:
+            audience = claims.get("aud")
+            audiences = audience if isinstance(audience, list) else [audience]
+            if self.audience not in audiences:
+                raise TokenError("Invalid audience")
+        return claims
+
+
+class TokenCache(Generic[T]):
+    """
+    Bounded LRU cache of verified tokens.
+
+    Entries are keyed by the SHA-256 of the complete token, signature
+    included, so only a byte-identical token that already passed
+    verification can hit; any other token misses and is verified in full.
+    Each entry expires at the token's exp (or after max_ttl, whichever is
+    sooner) and is never returned at or after that time.
+    """
+
+    def __init__(self, max_entries: int, max_ttl: float, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[T]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, token: str, value: T, exp: Optional[float]) -> None:
+        """Cache a verified token's value until its exp (None = max_ttl only)."""
+        expires_at = self._clock() + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,8 +2,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from pydantic import BaseModel
+from typing import Any
 from uuid import UUID
 from ..core.config import get_settings
+from ..core.metrics import Histogram
+from ..core.security import HMAC_ALGORITHMS, HMACJWTDecoder, TokenCache, TokenError
+from ..services.membership_cache import ROLE_RANK, get_membership_cache
 
 security = HTTPBearer()
 settings = get_settings()
@@ -13,6 +17,38 @@ class AuthenticatedUser(BaseModel):
     id: UUID
     email: str
     tenant_id: UUID | None = None
+    claims: dict[str, Any] = {}  # Verified JWT payload, used for the RLS context
+
+
+auth_latency = Histogram(
+    "visionflow_auth_seconds",
+    "Time spent authenticating a request in get_current_user",
+    ("result",),  # hit, miss (verified) or rejected
+)
+
+token_cache: TokenCache[AuthenticatedUser] = TokenCache(
+    settings.jwt_cache_size, settings.jwt_cache_max_ttl
+)
+
+_decoder = (
+    HMACJWTDecoder(settings.supabase_jwt_secret, settings.jwt_algorithm, settings.jwt_audience)
+    if settings.jwt_algorithm in HMAC_ALGORITHMS
+    else None
+)
+
+
+def _decode_token(token: str) -> dict[str, Any]:
+    if _decoder is not None:
+        try:
+            return _decoder.decode(token)
+        except TokenError as e:
+            raise JWTError(str(e))
+    return jwt.decode(
+        token,
+        settings.supabase_jwt_secret,
+        algorithms=[settings.jwt_algorithm],
+        audience=settings.jwt_audience,
+    )
 
 
 async def get_current_user(
@@ -21,60 +57,86 @@ async def get_current_user(
     """
     Validates Supabase JWT token and returns authenticated user.
     This is a dependency that should be injected into all protected endpoints.
+
+    Verified tokens are cached until they expire, so repeated requests with
+    the same token skip decoding; any token not verified before is checked
+    in full.
     """
     token = credentials.credentials
 
-    try:
-        payload = jwt.decode(
-            token,
-            settings.supabase_jwt_secret,
-            algorithms=[settings.jwt_algorithm],
-            audience=settings.jwt_audience,
-        )
+    with auth_latency.time(result="hit") as labels:
+        user = token_cache.get(token)
+        if user is not None:
+            return user
+        labels["result"] = "rejected"
+
+        try:
+            payload = _decode_token(token)
+
+            user_id: str = payload.get("sub")
+            email: str = payload.get("email")
+
+            if user_id is None or email is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Could not validate credentials",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
 
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
+            # Extract tenant_id from custom claims if it exists
+            tenant_id = payload.get("tenant_id")
 
-        if user_id is None or email is None:
+            user = AuthenticatedUser(
+                id=UUID(user_id),
+                email=email,
+                tenant_id=UUID(tenant_id) if tenant_id else None,
+                claims=payload,
+            )
+
+        except JWTError as e:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"Could not validate credentials: {str(e)}",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
+                detail=f"Invalid token format: {str(e)}",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        # Extract tenant_id from custom claims if it exists
-        tenant_id = payload.get("tenant_id")
-
-        return AuthenticatedUser(
-            id=UUID(user_id),
-            email=email,
-            tenant_id=UUID(tenant_id) if tenant_id else None,
-        )
-
-    except JWTError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Could not validate credentials: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Invalid token format: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        token_cache.put(token, user, payload.get("exp"))
+        labels["result"] = "miss"
+        return user
 
 
 class RoleRequired:
     """
     Dependency for checking user roles at project level.
     Usage: @Depends(RoleRequired("admin"))
+
+    Roles are ranked labeler < reviewer < admin, so a higher role satisfies a
+    lower requirement; workspace admins are admins of every project in the
+    workspace. The project comes from the route's project_id parameter.
+    Roles are served from the membership cache, so the common case needs no
+    database query.
     """
 
     def __init__(self, required_role: str):
+        if required_role not in ROLE_RANK:
+            raise ValueError(f"Unknown project role: {required_role}")
         self.required_role = required_role
 
-    async def __call__(self, user: AuthenticatedUser = Depends(get_current_user)):
-        # This will be implemented when we add project_members table
-        # For now, just return the user
+    async def __call__(
+        self,
+        project_id: UUID,
+        user: AuthenticatedUser = Depends(get_current_user),
+    ) -> AuthenticatedUser:
+        membership = await get_membership_cache().get(user.id, project_id)
+        if membership.role is None or ROLE_RANK[membership.role] < ROLE_RANK[self.required_role]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Requires the {self.required_role} role on this project",
+            )
         return user
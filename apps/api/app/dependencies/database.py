@@ -0,0 +1,22 @@
+from typing import AsyncIterator
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import AsyncSessionLocal, set_async_rls_context
+from .auth import AuthenticatedUser, get_current_user
+
+
+async def get_rls_db(
+    user: AuthenticatedUser = Depends(get_current_user),
+) -> AsyncIterator[AsyncSession]:
+    """
+    Async session inside a transaction scoped to the authenticated user.
+
+    The transaction commits when the handler returns and rolls back if it
+    raises. Every query runs under the user's RLS policies.
+    """
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await set_async_rls_context(db, user.claims)
+            yield db
@@ -1,14 +1,42 @@
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .core.config import get_settings
-from .routers import projects, images, annotations
+from .core.metrics import render_metrics
+from .routers import projects, images, annotations, tasks, analytics, active_learning
+from .services.jobs import close_job_pool
+from .services.membership_cache import connect_membership_listener, get_membership_cache
+from .services.storage import storage_service
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the role cache coherent with membership changes and other processes
+    cache = get_membership_cache()
+    listeners = [
+        asyncio.create_task(cache.listen()),
+        asyncio.create_task(cache.listen_database(connect_membership_listener)),
+    ]
+    yield
+    for listener in listeners:
+        listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await listener
+    await storage_service.close()
+    await close_job_pool()
+
+
 app = FastAPI(
     title=settings.app_name,
     debug=settings.debug,
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -24,6 +52,9 @@ app.add_middleware(
 app.include_router(projects.router, prefix=settings.api_v1_prefix)
 app.include_router(images.router, prefix=settings.api_v1_prefix)
 app.include_router(annotations.router, prefix=settings.api_v1_prefix)
+app.include_router(tasks.router, prefix=settings.api_v1_prefix)
+app.include_router(analytics.router, prefix=settings.api_v1_prefix)
+app.include_router(active_learning.router, prefix=settings.api_v1_prefix)
 
 
 @app.get("/")
@@ -36,6 +67,12 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of this process."""
+    return render_metrics()
+
+
 @app.get(f"{settings.api_v1_prefix}/openapi.json")
 async def get_openapi():
     """
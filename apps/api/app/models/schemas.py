@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any
 
 
@@ -53,6 +53,8 @@ class Image(ImageBase):
     id: UUID
     project_id: UUID
     storage_path: str
+    orientation: int = 1  # EXIF orientation; width/height are the displayed size
+    pyramid_levels: list[str] | None = None  # Thumbnail levels, once generated
     created_at: datetime
 
 
@@ -78,6 +80,25 @@ class Annotation(AnnotationBase):
     updated_at: datetime
 
 
+class AnnotationBulkItem(AnnotationCreate):
+    id: UUID | None = None  # Existing annotation to update; None creates one
+
+
+class AnnotationBulkRequest(BaseModel):
+    items: list[dict[str, Any]]  # Validated per item so one bad item does not reject the batch
+
+
+class AnnotationBulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class AnnotationBulkResponse(BaseModel):
+    inserted: int
+    updated: int
+    errors: list[AnnotationBulkError]
+
+
 class PresignedUploadRequest(BaseModel):
     filename: str
     content_type: str
@@ -89,12 +110,53 @@ class PresignedUploadResponse(BaseModel):
     expires_in: int
 
 
+class PresignedUploadBatchRequest(BaseModel):
+    items: list[PresignedUploadRequest]
+
+
+class PresignedUploadBatchResponse(BaseModel):
+    items: list[PresignedUploadResponse]
+
+
+class PresignedDownloadBatchRequest(BaseModel):
+    storage_paths: list[str]
+
+
+class PresignedDownloadURL(BaseModel):
+    storage_path: str
+    presigned_url: str
+
+
+class PresignedDownloadBatchResponse(BaseModel):
+    urls: list[PresignedDownloadURL]
+    expires_in: int  # Minimum remaining lifetime of every URL
+
+
 class CompleteUploadRequest(BaseModel):
     storage_path: str
     width: int
     height: int
 
 
+class CompleteUploadBatchRequest(BaseModel):
+    items: list[CompleteUploadRequest]
+
+
+class UploadBatchError(BaseModel):
+    storage_path: str
+    detail: str
+
+
+class CompleteUploadBatchResponse(BaseModel):
+    images: list[Image]
+    errors: list[UploadBatchError]
+
+
+class NearDuplicate(BaseModel):
+    image_id: UUID
+    distance: int  # Hamming distance between the perceptual hashes, in bits
+
+
 class DatasetVersionBase(BaseModel):
     name: str
     config: dict[str, Any]
@@ -109,6 +171,113 @@ class DatasetVersion(DatasetVersionBase):
 
     id: UUID
     project_id: UUID
-    status: str  # QUEUED, PROCESSING, COMPLETED, FAILED
+    status: str  # QUEUED, PROCESSING, COMPLETED, FAILED, CANCELLED
+    total_images: int | None = None
+    processed_images: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobProgress(BaseModel):
+    job: str
+    status: str  # running, retrying, completed, failed, cancelled
+    stage: str
+    processed: int
+    total: int
+    attempt: int
+    updated_at: float  # Unix time
+
+
+class AnnotationTask(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    project_id: UUID
+    image_id: UUID
+    assignee_id: UUID | None = None
+    reviewer_id: UUID | None = None
+    status: str  # PENDING, IN_PROGRESS, SUBMITTED, APPROVED, REJECTED
     created_at: datetime
     updated_at: datetime
+
+
+class TaskClaimRequest(BaseModel):
+    limit: int = 10
+
+
+class TaskAssignRequest(BaseModel):
+    image_ids: list[UUID]
+    assignee_ids: list[UUID]  # Images are dealt to these labelers round-robin
+
+
+class TaskAssignResponse(BaseModel):
+    created: int
+    reassigned: int
+    skipped: list[UUID]  # Not in the project, or already being labeled or reviewed
+
+
+class ClassCount(BaseModel):
+    class_name: str
+    annotations: int
+
+
+class DatasetHealth(BaseModel):
+    total_annotations: int
+    classes: list[ClassCount]  # Largest first
+
+
+class DailyCount(BaseModel):
+    day: date  # UTC
+    annotations: int
+
+
+class AnnotatorPerformance(BaseModel):
+    user_id: UUID
+    annotations: int  # Live annotations created by the user
+    daily: list[DailyCount]  # Within the requested window, oldest first
+    tasks: dict[str, int]  # Assigned tasks by status
+    approval_rate: float | None = None  # APPROVED / (APPROVED + REJECTED); None before any review
+
+
+class TeamPerformance(BaseModel):
+    tasks: dict[str, int]  # All of the project's tasks by status
+    unassigned_tasks: int
+    annotators: list[AnnotatorPerformance]
+
+
+class ClassBoxStats(BaseModel):
+    class_name: str
+    boxes: int
+    images: int  # Images with at least one box of the class
+    share: float  # Of all boxes
+    # Relative to the image size; area as a fraction of the image
+    mean_width: float
+    mean_height: float
+    mean_area: float
+    std_width: float
+    std_height: float
+    std_area: float
+
+
+class VersionBoxStats(BaseModel):
+    version_id: UUID
+    images: int
+    empty_images: int
+    boxes: int
+    invalid_boxes: int  # Without area or on images without a size
+    skipped_images: int = 0  # Annotated again before the statistics were computed
+    heatmap: list[list[float]]  # Box centers on a 64x64 grid, summing to 1
+    size_histogram: dict[str, list[float]]  # edges, density (sqrt of relative area)
+    aspect_histogram: dict[str, list[float]]  # log2_edges, density
+    classes: list[ClassBoxStats]  # Most boxes first
+
+
+class ActiveLearningRequest(BaseModel):
+    strategy: str = "kmeans"  # kmeans (under-represented clusters first) or kcenter
+    count: int = 1000  # Images to rank
+
+
+class ActiveLearningImage(BaseModel):
+    image_id: UUID
+    rank: int  # 1 = label first
+    cluster: int | None = None  # k-means cluster, for the kmeans strategy
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import List
+
+from ..dependencies.database import get_rls_db
+from ..dependencies.auth import AuthenticatedUser, RoleRequired
+from ..models.schemas import ActiveLearningImage, ActiveLearningRequest
+from ..services.active_learning import MAX_NEXT, MAX_QUEUE, STRATEGIES, next_images_to_label
+from ..services.jobs import enqueue_job
+
+router = APIRouter(prefix="/projects", tags=["active-learning"])
+
+
+@router.get("/{project_id}/active-learning/next", response_model=List[ActiveLearningImage])
+async def next_images(
+    project_id: UUID,
+    count: int = Query(20, ge=1, le=MAX_NEXT),
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Get the next unlabeled images to label, most informative first, from
+    the queue built by the last sampling run.
+    """
+    return await next_images_to_label(db, project_id, count)
+
+
+@router.post("/{project_id}/active-learning/refresh", status_code=status.HTTP_202_ACCEPTED)
+async def refresh_queue(
+    project_id: UUID,
+    request: ActiveLearningRequest,
+    user: AuthenticatedUser = Depends(RoleRequired("reviewer")),
+):
+    """
+    Queue a sampling run that extracts features of new images and replaces
+    the project's active-learning queue with count diverse unlabeled images.
+    """
+    if request.strategy not in STRATEGIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"strategy must be one of {', '.join(STRATEGIES)}",
+        )
+    if not 1 <= request.count <= MAX_QUEUE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"count must be between 1 and {MAX_QUEUE}",
+        )
+    if not user.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User must be associated with a workspace",
+        )
+    job_id = await enqueue_job(
+        "active_learning_task",
+        str(project_id),
+        request.strategy,
+        request.count,
+        workspace_id=user.tenant_id,
+    )
+    return {"job_id": job_id}
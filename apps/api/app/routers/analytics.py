@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from ..dependencies.database import get_rls_db
+from ..dependencies.auth import AuthenticatedUser, RoleRequired
+from ..models.schemas import DatasetHealth, TeamPerformance
+from ..services.jobs import enqueue_job
+from ..services.project_stats import get_dataset_health, get_team_performance
+
+router = APIRouter(prefix="/projects", tags=["analytics"])
+
+MAX_DAYS = 366
+
+
+@router.get("/{project_id}/stats/dataset", response_model=DatasetHealth)
+async def dataset_health(
+    project_id: UUID,
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Class balance of the project's annotations.
+    """
+    return await get_dataset_health(db, project_id)
+
+
+@router.get("/{project_id}/stats/team", response_model=TeamPerformance)
+async def team_performance(
+    project_id: UUID,
+    days: int = Query(30, ge=1, le=MAX_DAYS),
+    user: AuthenticatedUser = Depends(RoleRequired("reviewer")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Per-user throughput (annotations per day over the last days) and task
+    outcomes, including approval rate.
+    """
+    return await get_team_performance(db, project_id, days)
+
+
+@router.post("/{project_id}/stats/reconcile", status_code=status.HTTP_202_ACCEPTED)
+async def reconcile_stats(
+    project_id: UUID,
+    user: AuthenticatedUser = Depends(RoleRequired("admin")),
+):
+    """
+    Queue a check of the project's counters against a full recompute.
+
+    The worker rebuilds any counter that drifted; the job result is the
+    number of drifted counters.
+    """
+    if not user.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User must be associated with a workspace",
+        )
+    job_id = await enqueue_job(
+        "reconcile_project_stats_task", str(project_id), workspace_id=user.tenant_id
+    )
+    return {"job_id": job_id}
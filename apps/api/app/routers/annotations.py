@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from typing import List
 
-from ..core.database import get_db
-from ..dependencies.auth import get_current_user, AuthenticatedUser
-from ..models.schemas import Annotation, AnnotationCreate
+from ..dependencies.database import get_rls_db
+from ..dependencies.auth import get_current_user, AuthenticatedUser, RoleRequired
+from ..models.schemas import (
+    Annotation,
+    AnnotationBulkRequest,
+    AnnotationBulkResponse,
+    AnnotationCreate,
+)
+from ..services.annotation_bulk import MAX_BULK_ITEMS, bulk_upsert_annotations
+from ..services.annotation_stream import PAGE_SIZE, stream_project_annotations
 
 router = APIRouter(prefix="/annotations", tags=["annotations"])
 
@@ -14,7 +22,7 @@ router = APIRouter(prefix="/annotations", tags=["annotations"])
 async def create_annotation(
     annotation: AnnotationCreate,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Create a new annotation.
@@ -26,11 +34,32 @@ async def create_annotation(
     )
 
 
+@router.post("/bulk", response_model=AnnotationBulkResponse)
+async def bulk_upsert(
+    request: AnnotationBulkRequest,
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Create or update many annotations in one request.
+
+    Items with an id update that annotation, others are created. Invalid
+    items are reported by index in errors and do not block the rest.
+    Used for dataset imports and model-assisted pre-labeling.
+    """
+    if len(request.items) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_ITEMS} items per request",
+        )
+    return await bulk_upsert_annotations(db, user, request.items)
+
+
 @router.get("/image/{image_id}", response_model=List[Annotation])
 async def get_image_annotations(
     image_id: UUID,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Get all annotations for an image.
@@ -41,12 +70,32 @@ async def get_image_annotations(
     )
 
 
+@router.get("/project/{project_id}/stream")
+async def stream_project_annotations_ndjson(
+    project_id: UUID,
+    after: UUID | None = Query(None, description="Resume after this annotation id"),
+    page_size: int = Query(PAGE_SIZE, ge=100, le=50000),
+    user: AuthenticatedUser = Depends(RoleRequired("reviewer")),
+):
+    """
+    Stream every annotation in a project as NDJSON, ordered by id.
+
+    One Annotation object per line. The response is produced page by page
+    with keyset pagination, so it never buffers the full result set; an
+    interrupted download resumes by passing the last received id as after.
+    """
+    return StreamingResponse(
+        stream_project_annotations(project_id, user.claims, after, page_size),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.put("/{annotation_id}", response_model=Annotation)
 async def update_annotation(
     annotation_id: UUID,
     annotation: AnnotationCreate,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Update an existing annotation.
@@ -61,7 +110,7 @@ async def update_annotation(
 async def delete_annotation(
     annotation_id: UUID,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Delete an annotation.
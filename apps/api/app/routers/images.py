@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from ..core.database import get_db
+from ..dependencies.database import get_rls_db
 from ..dependencies.auth import get_current_user, AuthenticatedUser
 from ..models.schemas import Image, ImageCreate, CompleteUploadRequest
 from ..services.storage import storage_service
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/images", tags=["images"])
 async def complete_upload(
     request: CompleteUploadRequest,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Complete the upload process after client uploads to S3.
@@ -22,7 +22,7 @@ async def complete_upload(
     Verifies the file exists in S3 and creates the database record.
     """
     # Verify file exists in S3
-    if not storage_service.verify_file_exists(request.storage_path):
+    if not await storage_service.verify_file_exists(request.storage_path):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File not found in storage. Upload may have failed.",
@@ -40,7 +40,7 @@ async def complete_upload(
 async def get_image(
     image_id: UUID,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Get an image by ID.
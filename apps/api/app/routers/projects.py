@@ -1,15 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from ..core.database import get_db
-from ..dependencies.auth import get_current_user, AuthenticatedUser
+from ..dependencies.database import get_rls_db
+from ..dependencies.auth import get_current_user, AuthenticatedUser, RoleRequired
 from ..models.schemas import (
+    CompleteUploadBatchRequest,
+    CompleteUploadBatchResponse,
+    JobProgress,
+    NearDuplicate,
     Project,
     ProjectCreate,
+    PresignedDownloadBatchRequest,
+    PresignedDownloadBatchResponse,
+    PresignedDownloadURL,
+    PresignedUploadBatchRequest,
+    PresignedUploadBatchResponse,
     PresignedUploadRequest,
     PresignedUploadResponse,
+    UploadBatchError,
+    VersionBoxStats,
+)
+from ..services.image_duplicates import MAX_DISTANCE, find_near_duplicates, get_image_phash
+from ..services.image_records import insert_images
+from ..services.dataset_versions import box_stats_path, get_version, version_in_project
+from ..services.jobs import (
+    enqueue_image_pyramids,
+    enqueue_job,
+    get_job_progress,
+    request_job_cancel,
+    version_job_key,
 )
 from ..services.storage import storage_service
 
@@ -20,7 +41,7 @@ router = APIRouter(prefix="/projects", tags=["projects"])
 async def create_project(
     project: ProjectCreate,
     user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Create a new project.
@@ -37,8 +58,8 @@ async def create_project(
 @router.get("/{project_id}", response_model=Project)
 async def get_project(
     project_id: UUID,
-    user: AuthenticatedUser = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
 ):
     """
     Get a project by ID.
@@ -54,11 +75,12 @@ async def get_project(
 async def get_upload_url(
     project_id: UUID,
     request: PresignedUploadRequest,
-    user: AuthenticatedUser = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(RoleRequired("admin")),
 ):
     """
     Generate a presigned URL for direct client-to-S3 upload.
     This is step 1 of the secure upload flow.
+    Adding images is project management, so it requires the admin role.
     """
     if not user.tenant_id:
         raise HTTPException(
@@ -86,3 +108,319 @@ async def get_upload_url(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate upload URL: {str(e)}",
         )
+
+
+# Largest number of URLs signed by one batch presign request
+MAX_PRESIGN_BATCH = 1000
+
+
+@router.post("/{project_id}/upload_urls", response_model=PresignedUploadBatchResponse)
+async def get_upload_urls(
+    project_id: UUID,
+    request: PresignedUploadBatchRequest,
+    user: AuthenticatedUser = Depends(RoleRequired("admin")),
+):
+    """
+    Generate presigned upload URLs for many files at once.
+    Same flow and storage paths as upload_url; files are signed together so
+    the SigV4 signing key is derived once per batch.
+    """
+    if not user.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User must be associated with a workspace",
+        )
+    if len(request.items) > MAX_PRESIGN_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_PRESIGN_BATCH} files per request",
+        )
+
+    by_content_type: dict[str, list[str]] = {}
+    storage_paths = [f"{user.tenant_id}/{project_id}/{item.filename}" for item in request.items]
+    for item, storage_path in zip(request.items, storage_paths):
+        by_content_type.setdefault(item.content_type, []).append(storage_path)
+
+    try:
+        urls = {}
+        for content_type, paths in by_content_type.items():
+            signed = storage_service.generate_presigned_upload_urls(
+                paths, content_type, expires_in=300
+            )
+            urls.update(((content_type, path), url) for path, url in zip(paths, signed))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate upload URLs: {str(e)}",
+        )
+
+    return PresignedUploadBatchResponse(items=[
+        PresignedUploadResponse(
+            presigned_url=urls[(item.content_type, storage_path)],
+            storage_path=storage_path,
+            expires_in=300,
+        )
+        for item, storage_path in zip(request.items, storage_paths)
+    ])
+
+
+@router.post("/{project_id}/download_urls", response_model=PresignedDownloadBatchResponse)
+async def get_download_urls(
+    project_id: UUID,
+    request: PresignedDownloadBatchRequest,
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+):
+    """
+    Generate presigned download URLs for many files, e.g. a gallery page.
+    URLs are cached for a short time, so reloading a page returns the same
+    URLs and the browser cache can serve the images.
+    """
+    if not user.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User must be associated with a workspace",
+        )
+    if len(request.storage_paths) > MAX_PRESIGN_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_PRESIGN_BATCH} files per request",
+        )
+
+    prefix = f"{user.tenant_id}/{project_id}/"
+    outside = [path for path in request.storage_paths if not path.startswith(prefix)]
+    if outside:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not in this project's storage path: {outside[0]}",
+        )
+
+    try:
+        urls = storage_service.generate_presigned_download_urls(
+            request.storage_paths, expires_in=3600
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate download URLs: {str(e)}",
+        )
+
+    return PresignedDownloadBatchResponse(
+        urls=[
+            PresignedDownloadURL(storage_path=path, presigned_url=url)
+            for path, url in zip(request.storage_paths, urls)
+        ],
+        expires_in=3600,
+    )
+
+
+# Largest number of files accepted by one batch completion
+MAX_UPLOAD_BATCH = 10000
+
+
+@router.post("/{project_id}/complete_upload_batch", response_model=CompleteUploadBatchResponse)
+async def complete_upload_batch(
+    project_id: UUID,
+    request: CompleteUploadBatchRequest,
+    background_tasks: BackgroundTasks,
+    user: AuthenticatedUser = Depends(RoleRequired("admin")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Complete many direct-to-S3 uploads at once.
+    Existence of every file is checked concurrently in S3, and records for
+    the files found are created with a single insert. Files outside the
+    project's upload prefix or missing from storage are returned in errors.
+    Thumbnail pyramids of the new images are generated by a worker job,
+    queued once the insert has committed.
+    """
+    if not user.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User must be associated with a workspace",
+        )
+    if len(request.items) > MAX_UPLOAD_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_UPLOAD_BATCH} files per request",
+        )
+
+    prefix = f"{user.tenant_id}/{project_id}/"
+    errors = []
+    candidates = []
+    seen = set()
+    for item in request.items:
+        if not item.storage_path.startswith(prefix):
+            errors.append(
+                UploadBatchError(
+                    storage_path=item.storage_path, detail="Not in this project's upload path"
+                )
+            )
+        elif item.storage_path in seen:
+            errors.append(
+                UploadBatchError(storage_path=item.storage_path, detail="Duplicate file in batch")
+            )
+        else:
+            seen.add(item.storage_path)
+            candidates.append(item)
+
+    try:
+        exists = await storage_service.verify_files_exist(
+            [item.storage_path for item in candidates]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to verify uploads: {str(e)}",
+        )
+    errors.extend(
+        UploadBatchError(storage_path=item.storage_path, detail="File not found in storage")
+        for item in candidates
+        if not exists[item.storage_path]
+    )
+
+    images = await insert_images(
+        db, project_id, [item for item in candidates if exists[item.storage_path]]
+    )
+    # Background tasks run after get_rls_db has committed
+    background_tasks.add_task(
+        enqueue_image_pyramids, user.tenant_id, [image.id for image in images]
+    )
+    return CompleteUploadBatchResponse(images=images, errors=errors)
+
+
+@router.get("/{project_id}/images/{image_id}/duplicates", response_model=List[NearDuplicate])
+async def get_near_duplicates(
+    project_id: UUID,
+    image_id: UUID,
+    max_distance: int = Query(3, ge=0, le=MAX_DISTANCE),
+    limit: int = Query(100, ge=1, le=1000),
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Find images of the project that are near-duplicates of an image, by
+    Hamming distance between perceptual hashes (0 = visually identical).
+    """
+    image = await get_image_phash(db, project_id, image_id)
+    if image is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found in this project",
+        )
+    if image["phash"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Image has not been processed yet",
+        )
+    return await find_near_duplicates(db, project_id, image_id, image["phash"], max_distance, limit)
+
+
+async def _require_version(db: AsyncSession, project_id: UUID, version_id: UUID) -> None:
+    if not await version_in_project(db, project_id, version_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset version not found in this project",
+        )
+
+
+@router.get("/{project_id}/versions/{version_id}/progress", response_model=JobProgress)
+async def get_version_progress(
+    project_id: UUID,
+    version_id: UUID,
+    export_format: Optional[str] = None,
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Get the latest progress of a version's generation job, or of an export
+    when export_format is given. Workers publish every update on a Redis
+    channel as well, for server-side subscribers.
+    """
+    await _require_version(db, project_id, version_id)
+    progress = await get_job_progress(version_job_key(version_id, export_format))
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No progress reported for this job",
+        )
+    return JobProgress(**progress)
+
+
+@router.post("/{project_id}/versions/{version_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_version_job(
+    project_id: UUID,
+    version_id: UUID,
+    export_format: Optional[str] = None,
+    user: AuthenticatedUser = Depends(RoleRequired("admin")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Request cancellation of a version's generation job, or of an export when
+    export_format is given. The worker stops after the work in flight.
+    """
+    await _require_version(db, project_id, version_id)
+    if not await request_job_cancel(version_job_key(version_id, export_format)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job is not running",
+        )
+    return {"status": "cancelling"}
+
+
+@router.get("/{project_id}/versions/{version_id}/stats", response_model=VersionBoxStats)
+async def get_version_box_stats(
+    project_id: UUID,
+    version_id: UUID,
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Box geometry statistics of a completed version: box center heatmap,
+    size and aspect-ratio histograms and per-class counts. They are
+    computed when the version is generated; versions generated before
+    that need a POST to this route first.
+    """
+    version = await get_version(db, project_id, version_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset version not found in this project",
+        )
+    data = await storage_service.find_object_bytes(
+        box_stats_path(version["workspace_id"], project_id, version_id)
+    )
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Statistics have not been computed for this version",
+        )
+    return VersionBoxStats.model_validate_json(data)
+
+
+@router.post("/{project_id}/versions/{version_id}/stats", status_code=status.HTTP_202_ACCEPTED)
+async def compute_version_box_stats(
+    project_id: UUID,
+    version_id: UUID,
+    user: AuthenticatedUser = Depends(RoleRequired("reviewer")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Queue the computation of a completed version's box statistics. The
+    worker returns the cached statistics without recomputing them if they
+    exist.
+    """
+    version = await get_version(db, project_id, version_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset version not found in this project",
+        )
+    if version["status"] != "COMPLETED":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset version is {version['status']}, not COMPLETED",
+        )
+    job_id = await enqueue_job(
+        "box_stats_task", str(version_id), workspace_id=version["workspace_id"]
+    )
+    return {"job_id": job_id}
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import List
+
+from ..dependencies.database import get_rls_db
+from ..dependencies.auth import AuthenticatedUser, RoleRequired
+from ..models.schemas import (
+    AnnotationTask,
+    TaskAssignRequest,
+    TaskAssignResponse,
+    TaskClaimRequest,
+)
+from ..services.annotation_tasks import (
+    MAX_ASSIGN_IMAGES,
+    MAX_CLAIM,
+    bulk_assign_tasks,
+    claim_label_tasks,
+    claim_review_tasks,
+    non_members,
+)
+
+router = APIRouter(prefix="/projects", tags=["tasks"])
+
+
+def _check_limit(request: TaskClaimRequest) -> None:
+    if not 1 <= request.limit <= MAX_CLAIM:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"limit must be between 1 and {MAX_CLAIM}",
+        )
+
+
+@router.post("/{project_id}/tasks/claim", response_model=List[AnnotationTask])
+async def claim_tasks(
+    project_id: UUID,
+    request: TaskClaimRequest,
+    user: AuthenticatedUser = Depends(RoleRequired("labeler")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Claim the next pending tasks of the labeler queue.
+
+    Tasks assigned to the caller come first, then the project's unassigned
+    pool. Concurrent callers never receive the same task and never wait on
+    each other's claims. Returns an empty list when the queue is empty.
+    """
+    _check_limit(request)
+    return await claim_label_tasks(db, project_id, user.id, request.limit)
+
+
+@router.post("/{project_id}/tasks/claim-review", response_model=List[AnnotationTask])
+async def claim_review(
+    project_id: UUID,
+    request: TaskClaimRequest,
+    user: AuthenticatedUser = Depends(RoleRequired("reviewer")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Claim the next submitted tasks of the review queue for the caller.
+    """
+    _check_limit(request)
+    return await claim_review_tasks(db, project_id, user.id, request.limit)
+
+
+@router.post("/{project_id}/tasks/assign", response_model=TaskAssignResponse)
+async def assign_tasks(
+    project_id: UUID,
+    request: TaskAssignRequest,
+    user: AuthenticatedUser = Depends(RoleRequired("reviewer")),
+    db: AsyncSession = Depends(get_rls_db),
+):
+    """
+    Assign images to labelers, dealing them round-robin in request order.
+
+    Images with a pending task are reassigned; images being labeled or
+    reviewed are reported in skipped.
+    """
+    image_ids = list(dict.fromkeys(request.image_ids))
+    assignee_ids = list(dict.fromkeys(request.assignee_ids))
+    if len(image_ids) > MAX_ASSIGN_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_ASSIGN_IMAGES} images per request",
+        )
+    if not image_ids or not assignee_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="image_ids and assignee_ids must not be empty",
+        )
+    outsiders = await non_members(db, project_id, assignee_ids)
+    if outsiders:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Not members of this project: {', '.join(sorted(map(str, outsiders)))}",
+        )
+    created, reassigned, skipped = await bulk_assign_tasks(db, project_id, image_ids, assignee_ids)
+    return TaskAssignResponse(created=created, reassigned=reassigned, skipped=skipped)
@@ -0,0 +1,50 @@
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import ActiveLearningImage
+
+# Strategies implemented by the workers' services/sampler.py
+STRATEGIES = ("kmeans", "kcenter")
+MAX_QUEUE = 100000
+MAX_NEXT = 1000
+
+
+async def next_images_to_label(
+    db: AsyncSession, project_id: UUID, count: int
+) -> List[ActiveLearningImage]:
+    """
+    Next images of a project's active-learning queue.
+
+    Images annotated or put in an open task since the queue was built are
+    skipped, so the result stays useful between sampler runs.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project to read
+        count: Maximum number of images
+
+    Returns:
+        Images in rank order
+    """
+    rows = await db.execute(
+        text(
+            """
+            SELECT q.image_id, q.rank, q.cluster
+            FROM public.active_learning_queue q
+            WHERE q.project_id = :project_id
+            AND NOT EXISTS (SELECT 1 FROM public.annotations a WHERE a.image_id = q.image_id)
+            AND NOT EXISTS (
+                SELECT 1 FROM public.annotation_tasks t
+                WHERE t.image_id = q.image_id
+                  AND t.status IN ('PENDING', 'IN_PROGRESS', 'SUBMITTED')
+            )
+            ORDER BY q.rank
+            LIMIT :count
+            """
+        ),
+        {"project_id": project_id, "count": count},
+    )
+    return [ActiveLearningImage(**row) for row in rows.mappings()]
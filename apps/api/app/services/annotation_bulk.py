@@ -0,0 +1,238 @@
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..dependencies.auth import AuthenticatedUser
+from ..models.schemas import AnnotationBulkError, AnnotationBulkItem, AnnotationBulkResponse
+
+# Largest batch accepted by one bulk request
+MAX_BULK_ITEMS = 50000
+
+ANNOTATION_STATUSES = {"draft", "submitted", "approved"}
+ANNOTATION_TYPES = {"bounding_box", "polygon", "keypoint", "classification", "3d_cuboid"}
+
+COPY_COLUMNS = ("id", "image_id", "project_id", "annotator_id", "class_name", "data", "status")
+
+
+def check_annotation_data(data: Dict[str, Any]) -> str | None:
+    """
+    Validate the geometry payload of an annotation.
+
+    Returns:
+        An error message, or None if the data is valid
+    """
+    annotation_type = data.get("type")
+    if annotation_type not in ANNOTATION_TYPES:
+        return f"Unknown annotation type: {annotation_type}"
+    if annotation_type == "bounding_box":
+        values = [data.get(key) for key in ("x", "y", "width", "height")]
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            return "Bounding box needs numeric x, y, width and height"
+        if values[2] <= 0 or values[3] <= 0:
+            return "Bounding box width and height must be positive"
+    return None
+
+
+def validate_items(
+    raw_items: Sequence[Dict[str, Any]],
+) -> Tuple[List[Tuple[int, AnnotationBulkItem]], List[AnnotationBulkError]]:
+    """
+    Validate a batch item by item.
+
+    Returns:
+        Tuple of (valid (index, item) pairs, per-item errors)
+    """
+    valid: List[Tuple[int, AnnotationBulkItem]] = []
+    errors: List[AnnotationBulkError] = []
+    seen_ids = set()
+    for index, raw in enumerate(raw_items):
+        try:
+            item = AnnotationBulkItem.model_validate(raw)
+        except ValidationError as e:
+            errors.append(AnnotationBulkError(index=index, detail=str(e.errors()[0]["msg"])))
+            continue
+
+        detail = check_annotation_data(item.data)
+        if detail is None and item.status not in ANNOTATION_STATUSES:
+            detail = f"Invalid status: {item.status}"
+        if detail is None and item.id is not None:
+            if item.id in seen_ids:
+                detail = f"Annotation {item.id} appears more than once"
+            seen_ids.add(item.id)
+        if detail is not None:
+            errors.append(AnnotationBulkError(index=index, detail=detail))
+        else:
+            valid.append((index, item))
+    return valid, errors
+
+
+def resolve_items(
+    valid: Sequence[Tuple[int, AnnotationBulkItem]],
+    image_projects: Dict[uuid.UUID, uuid.UUID],
+    existing: Dict[uuid.UUID, Tuple[bool, Optional[uuid.UUID]]],
+    annotator_id: uuid.UUID,
+) -> Tuple[List[Tuple[Any, ...]], List[AnnotationBulkError]]:
+    """
+    Check validated items against the database state and build COPY rows.
+
+    Items that would update an annotation the user may not update (the
+    UPDATE policy would abort the whole upsert) or move one to another image
+    are reported as errors.
+
+    Args:
+        valid: (index, item) pairs from validate_items()
+        image_projects: Project of each referenced image visible to the user
+        existing: (owned, image_id) of each referenced annotation id that
+            exists, whether or not the user can see it; image_id is None
+            unless owned
+        annotator_id: The authenticated user
+
+    Returns:
+        Tuple of (rows in COPY_COLUMNS order, per-item errors)
+    """
+    rows: List[Tuple[Any, ...]] = []
+    errors: List[AnnotationBulkError] = []
+    for index, item in valid:
+        owned, image_id = existing.get(item.id, (True, None))
+        if image_projects.get(item.image_id) != item.project_id:
+            detail = f"Image {item.image_id} not found in project {item.project_id}"
+        elif not owned:
+            detail = f"Annotation {item.id} belongs to another annotator"
+        elif image_id is not None and image_id != item.image_id:
+            detail = (
+                f"Annotation {item.id} belongs to image {image_id}; annotations cannot be moved"
+            )
+        else:
+            rows.append((
+                item.id or uuid.uuid4(),
+                item.image_id,
+                item.project_id,
+                annotator_id,
+                item.class_name,
+                json.dumps(item.data),
+                item.status,
+            ))
+            continue
+        errors.append(AnnotationBulkError(index=index, detail=detail))
+    return rows, errors
+
+
+async def copy_upsert_rows(db: AsyncSession, rows: Sequence[Tuple[Any, ...]]) -> Tuple[int, int]:
+    """
+    Upsert annotation rows through COPY into a staging table.
+
+    Must run inside a transaction; the staging table is dropped on commit.
+    Rows are sent with asyncpg's binary COPY protocol.
+
+    Args:
+        db: Session with an open transaction
+        rows: Tuples in COPY_COLUMNS order, data already JSON-encoded
+
+    Returns:
+        Tuple of (inserted, updated) row counts
+    """
+    await db.execute(
+        text(
+            """
+            CREATE TEMP TABLE annotation_staging (
+                id UUID, image_id UUID, project_id UUID, annotator_id UUID,
+                class_name TEXT, data JSONB, status TEXT
+            ) ON COMMIT DROP
+            """
+        )
+    )
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "annotation_staging", records=rows, columns=COPY_COLUMNS
+    )
+
+    result = await db.execute(
+        text(
+            """
+            INSERT INTO public.annotations
+                (id, image_id, project_id, annotator_id, class_name, data, status)
+            SELECT id, image_id, project_id, annotator_id, class_name, data, status
+            FROM annotation_staging
+            ON CONFLICT (id) DO UPDATE SET
+                class_name = EXCLUDED.class_name,
+                data = EXCLUDED.data,
+                status = EXCLUDED.status
+            RETURNING (xmax = 0) AS inserted
+            """
+        )
+    )
+    flags = result.scalars().all()
+    inserted = sum(flags)
+    return inserted, len(flags) - inserted
+
+
+async def _uuid_pairs(
+    db: AsyncSession, query: str, ids: List[uuid.UUID]
+) -> Dict[uuid.UUID, uuid.UUID]:
+    """Run a two-column uuid lookup for a list of ids."""
+    if not ids:
+        return {}
+    rows = (await db.execute(text(query), {"ids": ids})).tuples().all()
+    return {uuid.UUID(str(key)): uuid.UUID(str(value)) for key, value in rows}
+
+
+async def _annotation_owners(
+    db: AsyncSession, ids: List[uuid.UUID]
+) -> Dict[uuid.UUID, Tuple[bool, Optional[uuid.UUID]]]:
+    """
+    Ownership of existing annotations, including ones RLS hides from the user.
+
+    Uses the SECURITY DEFINER function annotation_owners, which only tells
+    whether the user owns each id (and its image if so).
+    """
+    if not ids:
+        return {}
+    rows = (
+        await db.execute(
+            text("SELECT id, owned, image_id FROM public.annotation_owners(CAST(:ids AS uuid[]))"),
+            {"ids": ids},
+        )
+    ).tuples().all()
+    return {
+        uuid.UUID(str(id_)): (owned, uuid.UUID(str(image_id)) if image_id is not None else None)
+        for id_, owned, image_id in rows
+    }
+
+
+async def bulk_upsert_annotations(
+    db: AsyncSession, user: AuthenticatedUser, raw_items: Sequence[Dict[str, Any]]
+) -> AnnotationBulkResponse:
+    """
+    Validate and upsert a batch of annotations in one transaction.
+
+    Items are checked in bulk (schema, geometry, image/project match, and
+    ownership and image of annotations being updated); failing items are
+    reported by index and the rest are written with a single COPY and
+    INSERT ... ON CONFLICT. An id inserted by another user between the
+    check and the write still aborts the batch.
+
+    Args:
+        db: Session inside the request's RLS transaction (get_rls_db)
+        user: Authenticated user, recorded as annotator
+        raw_items: Unvalidated items of the request
+    """
+    valid, errors = validate_items(raw_items)
+
+    image_projects = await _uuid_pairs(
+        db,
+        "SELECT id, project_id FROM public.images WHERE id = ANY(CAST(:ids AS uuid[]))",
+        list({item.image_id for _, item in valid}),
+    )
+    existing = await _annotation_owners(db, [item.id for _, item in valid if item.id is not None])
+    rows, conflicts = resolve_items(valid, image_projects, existing, user.id)
+    errors.extend(conflicts)
+
+    inserted, updated = await copy_upsert_rows(db, rows) if rows else (0, 0)
+
+    errors.sort(key=lambda error: error.index)
+    return AnnotationBulkResponse(inserted=inserted, updated=updated, errors=errors)
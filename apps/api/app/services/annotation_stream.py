@@ -0,0 +1,115 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+
+from ..core.database import AsyncSessionLocal, set_async_rls_context
+
+# Rows per keyset page; each page is one short transaction
+PAGE_SIZE = 5000
+
+# Rows fetched per round trip from the server-side cursor within a page
+FETCH_SIZE = 1000
+
+# Postgres serializes each row straight to its NDJSON line, so the API never
+# decodes the JSONB data or builds Python objects per annotation
+PAGE_QUERY = text(
+    """
+    SELECT id, json_build_object(
+        'id', id,
+        'image_id', image_id,
+        'project_id', project_id,
+        'annotator_id', annotator_id,
+        'class_name', class_name,
+        'data', data,
+        'status', status,
+        'created_at', created_at,
+        'updated_at', updated_at
+    )::text
+    FROM public.annotations
+    WHERE project_id = :project_id
+    AND id > CAST(:after AS uuid)
+    ORDER BY id
+    LIMIT :limit
+    """
+)
+
+# Smallest uuid: the keyset start, so every page uses the same index range scan
+FIRST_ID = UUID(int=0)
+
+# fetch_page(after, limit) -> async iterator of (id, ndjson line) rows
+PageFetcher = Callable[[Optional[UUID], int], AsyncIterator[Tuple[UUID, str]]]
+
+
+async def iter_keyset_pages(
+    fetch_page: PageFetcher,
+    after: Optional[UUID] = None,
+    page_size: int = PAGE_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Drive keyset pagination and encode rows as NDJSON chunks.
+
+    Each page resumes strictly after the last id of the previous one, so the
+    database answers every page from the (project_id, id) index without an
+    OFFSET scan. One chunk is yielded per server-side cursor batch.
+
+    Args:
+        fetch_page: Runs one page query
+        after: Resume after this annotation id (None = from the start)
+        page_size: Rows per page
+
+    Yields:
+        Newline-delimited JSON bytes
+    """
+    while True:
+        rows = 0
+        lines: List[str] = []
+        async for annotation_id, line in fetch_page(after, page_size):
+            lines.append(line)
+            after = annotation_id
+            rows += 1
+            if len(lines) >= FETCH_SIZE:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+        if rows < page_size:
+            return
+
+
+async def stream_project_annotations(
+    project_id: UUID,
+    claims: Dict[str, Any],
+    after: Optional[UUID] = None,
+    page_size: int = PAGE_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Stream every annotation of a project visible to the user as NDJSON.
+
+    The session is opened inside the generator, so it lives exactly as long
+    as the response body is being sent. Each page runs in its own
+    transaction with the caller's RLS context and reads through a
+    server-side cursor.
+
+    Args:
+        project_id: Project whose annotations are streamed
+        claims: Verified JWT claims of the requesting user
+        after: Resume after this annotation id
+        page_size: Rows per keyset page
+    """
+    async with AsyncSessionLocal() as db:
+
+        async def fetch_page(
+            page_after: Optional[UUID], limit: int
+        ) -> AsyncIterator[Tuple[UUID, str]]:
+            async with db.begin():
+                await set_async_rls_context(db, claims)
+                result = await db.stream(
+                    PAGE_QUERY.execution_options(yield_per=FETCH_SIZE),
+                    {"project_id": project_id, "after": page_after or FIRST_ID, "limit": limit},
+                )
+                async for row in result.tuples():
+                    yield row
+
+        async for chunk in iter_keyset_pages(fetch_page, after, page_size):
+            yield chunk
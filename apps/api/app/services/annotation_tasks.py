@@ -0,0 +1,193 @@
+from typing import List, Sequence, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import AnnotationTask
+
+MAX_CLAIM = 100
+MAX_ASSIGN_IMAGES = 10000
+
+TASK_COLUMNS = (
+    "t.id, t.project_id, t.image_id, t.assignee_id, t.reviewer_id, t.status, "
+    "t.created_at, t.updated_at"
+)
+
+# Own tasks first, then the shared pool; rows locked by a concurrent claim are
+# skipped rather than waited on, and rows it already claimed fail the recheck
+# of status, so no task is handed out twice.
+CLAIM_LABEL_SQL = text(
+    f"""
+    WITH mine AS (
+        SELECT id FROM public.annotation_tasks
+        WHERE project_id = :project_id AND status = 'PENDING' AND assignee_id = :user_id
+        ORDER BY created_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    ), pool AS (
+        SELECT id FROM public.annotation_tasks
+        WHERE project_id = :project_id AND status = 'PENDING' AND assignee_id IS NULL
+        ORDER BY created_at
+        LIMIT :limit - (SELECT count(*) FROM mine)
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE public.annotation_tasks AS t
+    SET status = 'IN_PROGRESS', assignee_id = :user_id
+    FROM (SELECT id FROM mine UNION ALL SELECT id FROM pool) AS claimed
+    WHERE t.id = claimed.id
+    RETURNING {TASK_COLUMNS}
+    """
+)
+
+CLAIM_REVIEW_SQL = text(
+    f"""
+    WITH claimed AS (
+        SELECT id FROM public.annotation_tasks
+        WHERE project_id = :project_id AND status = 'SUBMITTED' AND reviewer_id IS NULL
+        ORDER BY updated_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE public.annotation_tasks AS t
+    SET reviewer_id = :user_id
+    FROM claimed
+    WHERE t.id = claimed.id
+    RETURNING {TASK_COLUMNS}
+    """
+)
+
+# Images are dealt to the assignees round-robin in request order. Pending
+# tasks are reassigned, images without an open task get a new one, and
+# images being labeled or reviewed are left alone. The unique open-task
+# index makes a concurrent request that creates the same image's task first
+# win; this one then skips the image.
+ASSIGN_SQL = text(
+    """
+    WITH wanted AS (
+        SELECT img.id AS image_id,
+               (CAST(:assignee_ids AS uuid[]))[
+                   1 + (img.ord - 1) % cardinality(CAST(:assignee_ids AS uuid[]))
+               ] AS assignee_id
+        FROM unnest(CAST(:image_ids AS uuid[])) WITH ORDINALITY AS img(id, ord)
+        JOIN public.images ON images.id = img.id AND images.project_id = :project_id
+    ), reassigned AS (
+        UPDATE public.annotation_tasks AS t
+        SET assignee_id = wanted.assignee_id
+        FROM wanted
+        WHERE t.image_id = wanted.image_id AND t.project_id = :project_id AND t.status = 'PENDING'
+        RETURNING t.image_id
+    ), created AS (
+        INSERT INTO public.annotation_tasks (project_id, image_id, assignee_id)
+        SELECT :project_id, wanted.image_id, wanted.assignee_id
+        FROM wanted
+        ORDER BY wanted.image_id  -- Overlapping concurrent inserts wait on each other in one order
+        ON CONFLICT (image_id) WHERE status IN ('PENDING', 'IN_PROGRESS', 'SUBMITTED') DO NOTHING
+        RETURNING image_id
+    )
+    SELECT image_id, false AS created FROM reassigned
+    UNION ALL
+    SELECT image_id, true AS created FROM created
+    """
+)
+
+
+async def claim_label_tasks(
+    db: AsyncSession, project_id: UUID, user_id: UUID, limit: int
+) -> List[AnnotationTask]:
+    """
+    Claim up to limit pending tasks for a labeler.
+
+    Tasks assigned to the labeler come first, then unassigned ones from the
+    project's pool. Claimed tasks move to IN_PROGRESS and are assigned to
+    the labeler.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project whose queue to claim from
+        user_id: Claiming labeler
+        limit: Most tasks to claim
+
+    Returns:
+        The claimed tasks (fewer than limit once the queue runs dry)
+    """
+    rows = await db.execute(
+        CLAIM_LABEL_SQL, {"project_id": project_id, "user_id": user_id, "limit": limit}
+    )
+    return [AnnotationTask.model_validate(dict(row)) for row in rows.mappings()]
+
+
+async def claim_review_tasks(
+    db: AsyncSession, project_id: UUID, user_id: UUID, limit: int
+) -> List[AnnotationTask]:
+    """
+    Claim up to limit submitted tasks no reviewer has taken yet.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project whose review queue to claim from
+        user_id: Claiming reviewer, recorded as the tasks' reviewer
+        limit: Most tasks to claim
+
+    Returns:
+        The claimed tasks, oldest submission first
+    """
+    rows = await db.execute(
+        CLAIM_REVIEW_SQL, {"project_id": project_id, "user_id": user_id, "limit": limit}
+    )
+    return [AnnotationTask.model_validate(dict(row)) for row in rows.mappings()]
+
+
+async def non_members(db: AsyncSession, project_id: UUID, user_ids: Sequence[UUID]) -> Set[UUID]:
+    """Users among user_ids with no role on the project (see membership_cache)."""
+    rows = await db.execute(
+        text(
+            """
+            SELECT u.id
+            FROM unnest(CAST(:user_ids AS uuid[])) AS u(id)
+            JOIN public.projects p ON p.id = :project_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM public.project_members pm
+                WHERE pm.project_id = p.id AND pm.user_id = u.id
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM public.workspace_members wm
+                WHERE wm.workspace_id = p.workspace_id AND wm.user_id = u.id AND wm.role = 'admin'
+            )
+            """
+        ),
+        {"project_id": project_id, "user_ids": list(user_ids)},
+    )
+    return {UUID(str(user_id)) for user_id in rows.scalars()}
+
+
+async def bulk_assign_tasks(
+    db: AsyncSession, project_id: UUID, image_ids: Sequence[UUID], assignee_ids: Sequence[UUID]
+) -> Tuple[int, int, List[UUID]]:
+    """
+    Assign images to labelers round-robin in one statement.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project the images belong to
+        image_ids: Images to assign, deduplicated, in the order to deal them
+        assignee_ids: Labelers to deal the images to
+
+    Returns:
+        (created, reassigned, skipped image ids). Images are skipped when
+        they are not in the project or already being labeled or reviewed.
+    """
+    rows = (
+        await db.execute(
+            ASSIGN_SQL,
+            {
+                "project_id": project_id,
+                "image_ids": list(image_ids),
+                "assignee_ids": list(assignee_ids),
+            },
+        )
+    ).all()
+    done = {UUID(str(image_id)) for image_id, _ in rows}
+    created = sum(1 for _, is_new in rows if is_new)
+    skipped = [image_id for image_id in image_ids if image_id not in done]
+    return created, len(rows) - created, skipped
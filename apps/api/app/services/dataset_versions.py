@@ -0,0 +1,64 @@
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def version_in_project(db: AsyncSession, project_id: UUID, version_id: UUID) -> bool:
+    """
+    Check that a dataset version exists and belongs to a project.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project from the route
+        version_id: Dataset version from the route
+
+    Returns:
+        True if the version is visible to the user and in the project
+    """
+    row = await db.execute(
+        text(
+            """
+            SELECT 1 FROM public.dataset_versions
+            WHERE id = :version_id AND project_id = :project_id
+            """
+        ),
+        {"version_id": version_id, "project_id": project_id},
+    )
+    return row.first() is not None
+
+
+async def get_version(
+    db: AsyncSession, project_id: UUID, version_id: UUID
+) -> Optional[Dict[str, Any]]:
+    """
+    Load a dataset version of a project with its project's workspace.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project from the route
+        version_id: Dataset version from the route
+
+    Returns:
+        Dict with workspace_id and status, or None if the version is not
+        visible to the user or not in the project
+    """
+    row = await db.execute(
+        text(
+            """
+            SELECT p.workspace_id, dv.status
+            FROM public.dataset_versions dv
+            JOIN public.projects p ON p.id = dv.project_id
+            WHERE dv.id = :version_id AND dv.project_id = :project_id
+            """
+        ),
+        {"version_id": version_id, "project_id": project_id},
+    )
+    version = row.mappings().first()
+    return dict(version) if version else None
+
+
+def box_stats_path(workspace_id: UUID, project_id: UUID, version_id: UUID) -> str:
+    """Storage path of a version's box statistics summary (see the workers' box_stats_task)."""
+    return f"{workspace_id}/{project_id}/versions/{version_id}/stats/box_stats.json"
@@ -0,0 +1,113 @@
+from itertools import combinations
+from typing import List, Mapping, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import NearDuplicate
+
+# Layout of the multi-index on images.phash; keep in sync with the
+# 20240109000000_image_phash migration and the workers' services/phash.py
+CHUNKS = 4
+CHUNK_BITS = 16
+# Probes per chunk grow as C(16, max_distance // 4): 1, 17, 137
+MAX_DISTANCE = 11
+
+NEAR_DUPLICATES_SQL = text(
+    """
+    SELECT id AS image_id,
+           bit_count((phash # CAST(:phash AS bigint))::bit(64))::int AS distance
+    FROM public.images
+    WHERE project_id = :project_id
+    AND phash IS NOT NULL
+    AND id <> :image_id
+    AND (
+        ((phash >> 48) & 65535) = ANY(CAST(:chunk0 AS bigint[]))
+        OR ((phash >> 32) & 65535) = ANY(CAST(:chunk1 AS bigint[]))
+        OR ((phash >> 16) & 65535) = ANY(CAST(:chunk2 AS bigint[]))
+        OR (phash & 65535) = ANY(CAST(:chunk3 AS bigint[]))
+    )
+    AND bit_count((phash # CAST(:phash AS bigint))::bit(64)) <= :max_distance
+    ORDER BY distance, id
+    LIMIT :limit
+    """
+)
+
+
+def chunk_probes(phash: int, max_distance: int) -> List[List[int]]:
+    """
+    Chunk values to look up for hashes within max_distance of phash.
+
+    A hash within max_distance differs in at most max_distance // CHUNKS
+    bits on at least one chunk, so probing every chunk with all values that
+    close finds it.
+
+    Args:
+        phash: Signed 64-bit hash, as stored
+        max_distance: Hamming distance in bits
+
+    Returns:
+        Per chunk (most significant first), the values to probe
+    """
+    flips = [0]
+    for count in range(1, max_distance // CHUNKS + 1):
+        flips.extend(
+            sum(1 << bit for bit in bits) for bits in combinations(range(CHUNK_BITS), count)
+        )
+    unsigned = phash & (2**64 - 1)
+    probes = []
+    for k in range(CHUNKS):
+        chunk = (unsigned >> (CHUNK_BITS * (CHUNKS - 1 - k))) & (2**CHUNK_BITS - 1)
+        probes.append([chunk ^ flip for flip in flips])
+    return probes
+
+
+async def get_image_phash(db: AsyncSession, project_id: UUID, image_id: UUID) -> Optional[Mapping]:
+    """
+    Look up an image's perceptual hash.
+
+    Returns:
+        Row with phash (NULL until the pyramid task has run), or None if the
+        image is not in the project
+    """
+    row = await db.execute(
+        text("SELECT phash FROM public.images WHERE id = :image_id AND project_id = :project_id"),
+        {"image_id": image_id, "project_id": project_id},
+    )
+    return row.mappings().first()
+
+
+async def find_near_duplicates(
+    db: AsyncSession, project_id: UUID, image_id: UUID, phash: int, max_distance: int, limit: int
+) -> List[NearDuplicate]:
+    """
+    Images of a project whose perceptual hash is within max_distance of phash.
+
+    Each chunk probe is an index lookup, so cost depends on the number of
+    candidates sharing a chunk, not on the size of the project.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project to search
+        image_id: Image the hash belongs to (excluded)
+        phash: Its perceptual hash
+        max_distance: At most MAX_DISTANCE bits
+        limit: Maximum number of results
+
+    Returns:
+        Near-duplicates, nearest first
+    """
+    chunks = chunk_probes(phash, max_distance)
+    rows = await db.execute(
+        NEAR_DUPLICATES_SQL,
+        {
+            "project_id": project_id,
+            "image_id": image_id,
+            "phash": phash,
+            "max_distance": max_distance,
+            "limit": limit,
+            **{f"chunk{k}": values for k, values in enumerate(chunks)},
+        },
+    )
+    return [NearDuplicate(**row) for row in rows.mappings()]
@@ -0,0 +1,54 @@
+import posixpath
+from typing import List, Sequence
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import CompleteUploadRequest, Image
+
+
+async def insert_images(
+    db: AsyncSession, project_id: UUID, items: Sequence[CompleteUploadRequest]
+) -> List[Image]:
+    """
+    Create image records for uploaded files in one statement.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project the images belong to
+        items: Uploaded files, already verified to exist in storage
+
+    Returns:
+        The created images, in the order of items
+    """
+    if not items:
+        return []
+    rows = (
+        await db.execute(
+            text(
+                """
+                INSERT INTO public.images (project_id, storage_path, filename, width, height)
+                SELECT :project_id, item.storage_path, item.filename, item.width, item.height
+                FROM unnest(
+                    CAST(:storage_paths AS text[]),
+                    CAST(:filenames AS text[]),
+                    CAST(:widths AS integer[]),
+                    CAST(:heights AS integer[])
+                ) WITH ORDINALITY AS item(storage_path, filename, width, height, ord)
+                ORDER BY item.ord
+                RETURNING id, project_id, storage_path, filename, width, height,
+                          orientation, pyramid_levels, created_at
+                """
+            ),
+            {
+                "project_id": project_id,
+                "storage_paths": [item.storage_path for item in items],
+                "filenames": [posixpath.basename(item.storage_path) for item in items],
+                "widths": [item.width for item in items],
+                "heights": [item.height for item in items],
+            },
+        )
+    ).mappings().all()
+    by_path = {row["storage_path"]: Image.model_validate(dict(row)) for row in rows}
+    return [by_path[item.storage_path] for item in items]
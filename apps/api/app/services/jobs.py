@@ -0,0 +1,162 @@
+import json
+from typing import Any, Dict, Optional, Sequence
+from uuid import UUID, uuid4
+
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+from arq.jobs import serialize_job
+from arq.utils import timestamp_ms
+from redis.exceptions import WatchError
+
+from ..core.config import get_settings
+
+_pool: Optional[ArqRedis] = None
+
+
+async def get_job_pool() -> ArqRedis:
+    """Return the ARQ connection used to enqueue worker jobs, opening it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = await create_pool(RedisSettings.from_dsn(get_settings().redis_url))
+    return _pool
+
+
+async def close_job_pool() -> None:
+    """Close the ARQ connection if it was opened."""
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
+
+
+# Fair scheduler lanes, shared with the workers' services/scheduler.py; keep the layout in sync
+SHORT_LANE = "short"
+LONG_LANE = "long"
+LONG_JOBS = {
+    "export_dataset_task",
+    "reconcile_project_stats_task",
+    "active_learning_task",
+    "box_stats_task",
+}
+
+
+def sched_key(lane: str, name: str) -> str:
+    """Redis key of one piece of scheduler state, e.g. sched_key("short", "active")."""
+    return f"visionflow:sched:{lane}:{name}"
+
+
+def job_lane(function: str, cost: int) -> str:
+    """Lane of a job: exports and jobs over short_job_max_images images run in the long lane."""
+    if function in LONG_JOBS or cost > get_settings().short_job_max_images:
+        return LONG_LANE
+    return SHORT_LANE
+
+
+async def enqueue_job(function: str, *args: Any, workspace_id: UUID, cost: int = 1) -> str:
+    """
+    Submit a worker job to the fair scheduler.
+
+    The job waits in the workspace's queue of its lane until a worker
+    dispatches it, so one workspace's backlog does not hold up the others.
+
+    Args:
+        function: Name of the worker task
+        *args: Task arguments
+        workspace_id: Workspace the job is charged to
+        cost: Work in the job, in images; picks the lane and the fair share
+
+    Returns:
+        ARQ job id
+    """
+    lane = job_lane(function, cost)
+    job_id = uuid4().hex
+    payload = serialize_job(function, args, {}, None, timestamp_ms())
+    pool = await get_job_pool()
+    async with pool.pipeline(transaction=True) as pipe:
+        pipe.hset(sched_key(lane, "jobs"), job_id, payload)
+        pipe.hset(sched_key(lane, "cost"), job_id, cost)
+        pipe.rpush(sched_key(lane, f"pending:{workspace_id}"), job_id)
+        pipe.sadd(sched_key(lane, "active"), str(workspace_id))
+        await pipe.execute()
+    return job_id
+
+
+async def enqueue_image_pyramids(workspace_id: UUID, image_ids: Sequence[UUID]) -> None:
+    """
+    Queue thumbnail pyramid generation for newly created images.
+
+    Must run after the transaction that created the rows has committed,
+    since the worker reads them through its own connection.
+    """
+    if image_ids:
+        await enqueue_job(
+            "generate_pyramids_task",
+            [str(image_id) for image_id in image_ids],
+            workspace_id=workspace_id,
+            cost=len(image_ids),
+        )
+
+
+# Job state shared with the workers' JobRuntime; keep the layout in sync
+JOB_STATE_TTL = 7 * 24 * 3600
+
+
+def job_state_key(job_key: str, name: str) -> str:
+    """Redis key of one piece of job state, e.g. job_state_key("version:<id>", "progress")."""
+    return f"visionflow:job:{job_key}:{name}"
+
+
+def version_job_key(version_id: UUID, export_format: Optional[str] = None) -> str:
+    """Job key of a version's generation job, or of one of its exports."""
+    if export_format:
+        return f"export:{version_id}:{export_format}"
+    return f"version:{version_id}"
+
+
+async def get_job_progress(job_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Latest progress of a worker job.
+
+    Live updates are also published on the job_state_key(job_key, "events")
+    channel, for clients that subscribe instead of polling.
+
+    Returns:
+        The progress state, or None if the job has not reported yet
+    """
+    pool = await get_job_pool()
+    state = await pool.get(job_state_key(job_key, "progress"))
+    return json.loads(state) if state else None
+
+
+# Only a job in one of these states can be asked to stop
+CANCELLABLE_STATUSES = {"running", "retrying"}
+
+
+async def request_job_cancel(job_key: str) -> bool:
+    """
+    Ask a running worker job to stop.
+
+    The job checks the flag after each unit of work, so it stops within
+    one shard (versions) or one manifest part (exports). The flag is only
+    set while the job reports itself running or retrying; the progress key
+    is watched so a job that finishes meanwhile cannot leave a stale flag
+    behind to cancel the next run under the same key.
+
+    Returns:
+        False if the job is not running, so there is nothing to cancel
+    """
+    pool = await get_job_pool()
+    progress_key = job_state_key(job_key, "progress")
+    async with pool.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(progress_key)
+                state = await pipe.get(progress_key)
+                if not state or json.loads(state).get("status") not in CANCELLABLE_STATUSES:
+                    return False
+                pipe.multi()
+                pipe.set(job_state_key(job_key, "cancel"), b"1", ex=JOB_STATE_TTL)
+                await pipe.execute()
+                return True
+            except WatchError:
+                continue
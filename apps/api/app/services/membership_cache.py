@@ -0,0 +1,318 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+import asyncpg
+import redis.asyncio as aioredis
+from redis.exceptions import WatchError
+from sqlalchemy import text
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..core.metrics import Counter
+
+INVALIDATION_CHANNEL = "rbac:invalidate"
+
+# Postgres channel notified by the membership table triggers
+MEMBERSHIP_CHANNEL = "membership_changed"
+
+# Project roles from least to most privileged
+ROLE_RANK = {"labeler": 1, "reviewer": 2, "admin": 3}
+
+role_lookups = Counter(
+    "visionflow_role_lookups_total",
+    "Project role lookups by the tier that answered them",
+    ("tier",),  # local, redis or database
+)
+
+
+@dataclass(frozen=True)
+class Membership:
+    role: Optional[str]  # Effective project role; None = no access
+    workspace_id: Optional[UUID]
+
+
+MembershipLoader = Callable[[UUID, UUID], Awaitable[Membership]]
+
+
+async def load_membership(user_id: UUID, project_id: UUID) -> Membership:
+    """
+    Resolve a user's effective role on a project from the database.
+
+    The project_members role applies; workspace admins are admins of
+    every project in their workspace.
+    """
+    async with AsyncSessionLocal() as db:
+        row = (
+            await db.execute(
+                text(
+                    """
+                    SELECT p.workspace_id, pm.role AS project_role, wm.role AS workspace_role
+                    FROM public.projects p
+                    LEFT JOIN public.project_members pm
+                        ON pm.project_id = p.id AND pm.user_id = :user_id
+                    LEFT JOIN public.workspace_members wm
+                        ON wm.workspace_id = p.workspace_id AND wm.user_id = :user_id
+                    WHERE p.id = :project_id
+                    """
+                ),
+                {"user_id": user_id, "project_id": project_id},
+            )
+        ).mappings().first()
+
+    if row is None:
+        return Membership(role=None, workspace_id=None)
+    role = "admin" if row["workspace_role"] == "admin" else row["project_role"]
+    return Membership(role=role, workspace_id=UUID(str(row["workspace_id"])))
+
+
+class MembershipCache:
+    """
+    Two-tier cache of project roles: an in-process LRU over a shared Redis tier.
+
+    Redis keeps one hash per user (project id -> role) so a user's entries
+    can be dropped together. Triggers on the membership tables NOTIFY
+    MEMBERSHIP_CHANNEL, which every API process LISTENs on (listen_database);
+    invalidate() also publishes on INVALIDATION_CHANNEL so every API process
+    drops matching local entries.
+    Writes after a database read are guarded by a per-user generation
+    counter (and a local epoch), so a read that raced an invalidation is
+    never cached. Entries also expire after ttl seconds as a safety net
+    for changes made outside the API.
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        loader: MembershipLoader = load_membership,
+        ttl: float = 300,
+        max_entries: int = 10000,
+    ):
+        self.redis = redis
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local: "OrderedDict[Tuple[UUID, UUID], Tuple[float, Membership]]" = OrderedDict()
+        self._epoch = 0
+
+    @staticmethod
+    def _user_key(user_id: UUID) -> str:
+        return f"rbac:user:{user_id}"
+
+    @staticmethod
+    def _generation_key(user_id: UUID) -> str:
+        return f"rbac:gen:{user_id}"
+
+    def _put_local(self, key: Tuple[UUID, UUID], expires_at: float, membership: Membership) -> None:
+        self._local[key] = (expires_at, membership)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, user_id: UUID, project_id: UUID) -> Membership:
+        """Return the user's membership, loading it on a miss in both tiers."""
+        key = (user_id, project_id)
+        now = time.time()
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > now:
+            self._local.move_to_end(key)
+            role_lookups.inc(tier="local")
+            return entry[1]
+
+        epoch = self._epoch
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hget(self._user_key(user_id), str(project_id))
+            pipe.get(self._generation_key(user_id))
+            cached, generation = await pipe.execute()
+
+        if cached is not None:
+            role, workspace_id, expires_at = cached.decode().split("|")
+            if float(expires_at) > now:
+                membership = Membership(
+                    role=role or None, workspace_id=UUID(workspace_id) if workspace_id else None
+                )
+                if epoch == self._epoch:
+                    self._put_local(key, float(expires_at), membership)
+                role_lookups.inc(tier="redis")
+                return membership
+
+        membership = await self.loader(user_id, project_id)
+        role_lookups.inc(tier="database")
+        expires_at = now + self.ttl
+        if await self._store_shared(user_id, project_id, membership, expires_at, generation):
+            if epoch == self._epoch:
+                self._put_local(key, expires_at, membership)
+        return membership
+
+    async def _store_shared(
+        self,
+        user_id: UUID,
+        project_id: UUID,
+        membership: Membership,
+        expires_at: float,
+        generation: Optional[bytes],
+    ) -> bool:
+        """Write to Redis unless the user was invalidated since generation was read."""
+        value = f"{membership.role or ''}|{membership.workspace_id or ''}|{expires_at}"
+        generation_key = self._generation_key(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(generation_key)
+                if await pipe.get(generation_key) != generation:
+                    return False
+                pipe.multi()
+                pipe.hset(self._user_key(user_id), str(project_id), value)
+                pipe.expire(self._user_key(user_id), int(self.ttl))
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def invalidate(
+        self,
+        user_id: UUID,
+        project_id: Optional[UUID] = None,
+        workspace_id: Optional[UUID] = None,
+        publish: bool = True,
+    ) -> None:
+        """
+        Drop cached roles after a membership change, in every API process.
+
+        Called for the database NOTIFYs of committed changes to
+        project_members (with project_id) or workspace_members (with
+        workspace_id). Without either, all of the user's entries are dropped.
+        publish=False only drops this process's local entries (besides
+        Redis), for callers every process runs anyway.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(self._generation_key(user_id))
+            pipe.expire(self._generation_key(user_id), int(self.ttl) * 2)
+            if project_id is not None and workspace_id is None:
+                pipe.hdel(self._user_key(user_id), str(project_id))
+            else:
+                pipe.delete(self._user_key(user_id))
+            message: Dict[str, Optional[str]] = {
+                "user_id": str(user_id),
+                "project_id": str(project_id) if project_id else None,
+                "workspace_id": str(workspace_id) if workspace_id else None,
+            }
+            if publish:
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps(message))
+            await pipe.execute()
+        self.apply_invalidation(message)
+
+    def apply_invalidation(self, message: Dict[str, Optional[str]]) -> None:
+        """Drop the local entries matched by an invalidation message."""
+        self._epoch += 1
+        user_id = UUID(message["user_id"])
+        project_id = message.get("project_id")
+        workspace_id = message.get("workspace_id")
+        for key, (_, membership) in list(self._local.items()):
+            if key[0] != user_id:
+                continue
+            if workspace_id is not None:
+                matches = str(membership.workspace_id) == workspace_id
+            elif project_id is not None:
+                matches = str(key[1]) == project_id
+            else:
+                matches = True
+            if matches:
+                del self._local[key]
+
+    def clear_local(self) -> None:
+        self._epoch += 1
+        self._local.clear()
+
+    async def listen(self) -> None:
+        """
+        Apply invalidations published by other processes until cancelled.
+
+        Messages may be missed while disconnected, so the local tier is
+        cleared whenever the subscription is (re)established.
+        """
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.clear_local()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.apply_invalidation(json.loads(message["data"]))
+            except (ConnectionError, aioredis.ConnectionError, OSError):
+                self.clear_local()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def listen_database(self, connect: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Invalidate entries on MEMBERSHIP_CHANNEL notifications until cancelled.
+
+        Every API process listens, so each one invalidates without
+        publishing. Notifications sent while disconnected are lost: the
+        local tier is cleared whenever the connection is (re)established,
+        and Redis entries written before then expire after ttl.
+
+        Args:
+            connect: Opens a dedicated asyncpg connection (LISTEN needs a
+                session, so not through Pgbouncer in transaction mode)
+        """
+        while True:
+            notifications: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+            connection = None
+            try:
+                connection = await connect()
+                connection.add_termination_listener(lambda _: notifications.put_nowait(None))
+                await connection.add_listener(
+                    MEMBERSHIP_CHANNEL,
+                    lambda _, __, ___, payload: notifications.put_nowait(payload),
+                )
+                self.clear_local()
+                while (payload := await notifications.get()) is not None:
+                    change = json.loads(payload)
+                    project_id, workspace_id = change.get("project_id"), change.get("workspace_id")
+                    await self.invalidate(
+                        UUID(change["user_id"]),
+                        project_id=UUID(project_id) if project_id else None,
+                        workspace_id=UUID(workspace_id) if workspace_id else None,
+                        publish=False,
+                    )
+            except (
+                ConnectionError,
+                aioredis.ConnectionError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+                OSError,
+            ):
+                pass
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            self.clear_local()
+            await asyncio.sleep(1)
+
+
+async def connect_membership_listener() -> asyncpg.Connection:
+    """Open the connection listen_database LISTENs on."""
+    settings = get_settings()
+    return await asyncpg.connect(settings.database_listen_url or settings.database_url)
+
+
+_membership_cache: Optional[MembershipCache] = None
+
+
+def get_membership_cache() -> MembershipCache:
+    """Return the membership cache of this process."""
+    global _membership_cache
+    if _membership_cache is None:
+        settings = get_settings()
+        _membership_cache = MembershipCache(
+            aioredis.from_url(settings.redis_url),
+            ttl=settings.role_cache_ttl,
+            max_entries=settings.role_cache_size,
+        )
+    return _membership_cache
@@ -0,0 +1,172 @@
+import hashlib
+import hmac
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlsplit
+
+# SigV4 allows presigned URLs to live at most 7 days
+MAX_EXPIRES = 7 * 24 * 3600
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class LocalPresigner:
+    """
+    SigV4 query-string presigning for path-style S3 URLs, computed locally.
+
+    Produces the same URLs as botocore's generate_presigned_url for
+    get_object/put_object. The per-day signing key (four chained HMACs) and
+    the credential scope are derived once per date and reused, so signing a
+    URL costs one SHA-256 of the canonical request and one HMAC.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket_name: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str,
+    ):
+        parts = urlsplit(endpoint_url)
+        host = parts.hostname or ""
+        if parts.port and not (
+            (parts.scheme == "https" and parts.port == 443)
+            or (parts.scheme == "http" and parts.port == 80)
+        ):
+            host = f"{host}:{parts.port}"
+        self._base_url = f"{parts.scheme}://{host}"
+        self._host = host
+        self._bucket_path = f"/{quote(bucket_name, safe='')}/"
+        self._access_key_id = access_key_id
+        self._secret = secret_access_key
+        self._region = region
+        self._signing_keys: Dict[str, bytes] = {}
+
+    def _signing_key(self, date: str) -> bytes:
+        key = self._signing_keys.get(date)
+        if key is None:
+            key = _hmac(("AWS4" + self._secret).encode(), date)
+            key = _hmac(key, self._region)
+            key = _hmac(key, "s3")
+            key = _hmac(key, "aws4_request")
+            # Only today's and yesterday's keys are ever needed again
+            if len(self._signing_keys) > 2:
+                self._signing_keys.clear()
+            self._signing_keys[date] = key
+        return key
+
+    def presign_many(
+        self,
+        method: str,
+        storage_paths: Sequence[str],
+        expires_in: int,
+        content_type: Optional[str] = None,
+        signed_at: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Presign one request per path with a shared timestamp and signing key.
+
+        Args:
+            method: "GET" or "PUT"
+            storage_paths: Object keys
+            expires_in: URL lifetime in seconds
+            content_type: Content-Type the upload must send (PUT only)
+            signed_at: Signing time as a Unix timestamp (default: now)
+
+        Returns:
+            Presigned URLs, in the order of storage_paths
+        """
+        if not 1 <= expires_in <= MAX_EXPIRES:
+            raise ValueError(f"expires_in must be between 1 and {MAX_EXPIRES} seconds")
+
+        timestamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(signed_at))
+        date = timestamp[:8]
+        scope = f"{date}/{self._region}/s3/aws4_request"
+        signed_headers = "content-type;host" if content_type else "host"
+        canonical_headers = f"host:{self._host}\n"
+        if content_type:
+            content_type = " ".join(content_type.split())
+            canonical_headers = f"content-type:{content_type}\n{canonical_headers}"
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(f'{self._access_key_id}/{scope}', safe='-_.~')}"
+            f"&X-Amz-Date={timestamp}"
+            f"&X-Amz-Expires={expires_in}"
+            f"&X-Amz-SignedHeaders={quote(signed_headers, safe='-_.~')}"
+        )
+        request_suffix = f"\n{query}\n{canonical_headers}\n{signed_headers}\nUNSIGNED-PAYLOAD"
+        string_prefix = f"AWS4-HMAC-SHA256\n{timestamp}\n{scope}\n"
+        signing_key = self._signing_key(date)
+
+        urls = []
+        for storage_path in storage_paths:
+            path = self._bucket_path + quote(storage_path, safe="/~")
+            canonical_request = f"{method}\n{path}{request_suffix}"
+            string_to_sign = string_prefix + hashlib.sha256(canonical_request.encode()).hexdigest()
+            signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+            urls.append(f"{self._base_url}{path}?{query}&X-Amz-Signature={signature}")
+        return urls
+
+
+class DownloadURLCache:
+    """
+    Short-lived cache of download URLs keyed on (storage_path, expiry bucket).
+
+    URLs are signed at the start of the current time bucket, with the
+    lifetime extended by the bucket length so every URL stays valid for at
+    least the requested time. Within a bucket the same path therefore always
+    gets the same URL, which lets browser and CDN caches hit across gallery
+    loads; the cache itself only saves the signing work.
+    """
+
+    def __init__(self, presigner: LocalPresigner, bucket_seconds: int, max_entries: int):
+        self.presigner = presigner
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self._bucket_start = -1
+        self._urls: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def get_many(
+        self, storage_paths: Sequence[str], expires_in: int, now: Optional[float] = None
+    ) -> List[str]:
+        """
+        Return download URLs valid for at least expires_in seconds.
+
+        Args:
+            storage_paths: Object keys
+            expires_in: Minimum URL lifetime in seconds
+            now: Current Unix time (default: time.time())
+
+        Returns:
+            Presigned URLs, in the order of storage_paths
+        """
+        now = time.time() if now is None else now
+        bucket_start = int(now) - int(now) % self.bucket_seconds
+        with self._lock:
+            if self._bucket_start != bucket_start:
+                self._bucket_start = bucket_start
+                self._urls = {}
+            found = {}
+            for path in storage_paths:
+                url = self._urls.get((path, expires_in))
+                if url is not None:
+                    found[path] = url
+        missing = [path for path in dict.fromkeys(storage_paths) if path not in found]
+
+        if missing:
+            signed = self.presigner.presign_many(
+                "GET", missing, expires_in + self.bucket_seconds, signed_at=bucket_start
+            )
+            found.update(zip(missing, signed))
+            with self._lock:
+                if self._bucket_start == bucket_start:
+                    if len(self._urls) + len(missing) > self.max_entries:
+                        self._urls = {}
+                    fresh = zip(missing[:self.max_entries], signed)
+                    self._urls.update(((path, expires_in), url) for path, url in fresh)
+        return [found[path] for path in storage_paths]
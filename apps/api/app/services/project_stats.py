@@ -0,0 +1,139 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Mapping
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import (
+    AnnotatorPerformance,
+    ClassCount,
+    DailyCount,
+    DatasetHealth,
+    TeamPerformance,
+)
+
+# project_task_stats stores unassigned tasks under the nil UUID
+UNASSIGNED = UUID(int=0)
+
+
+async def get_dataset_health(db: AsyncSession, project_id: UUID) -> DatasetHealth:
+    """
+    Class balance of a project, read from the trigger-maintained counters.
+
+    Cost is proportional to the number of classes, not annotations.
+    """
+    rows = (
+        await db.execute(
+            text(
+                """
+                SELECT class_name, annotations
+                FROM public.project_class_stats
+                WHERE project_id = :project_id AND annotations > 0
+                ORDER BY annotations DESC, class_name
+                """
+            ),
+            {"project_id": project_id},
+        )
+    ).all()
+    return DatasetHealth(
+        total_annotations=sum(count for _, count in rows),
+        classes=[ClassCount(class_name=name, annotations=count) for name, count in rows],
+    )
+
+
+def team_performance(
+    totals: Iterable[Mapping[str, Any]],
+    daily: Iterable[Mapping[str, Any]],
+    tasks: Iterable[Mapping[str, Any]],
+) -> TeamPerformance:
+    """
+    Assemble team performance from counter rows.
+
+    Args:
+        totals: annotator_id, annotations (all time)
+        daily: annotator_id, day, annotations (requested window)
+        tasks: assignee_id, status, tasks
+
+    Returns:
+        Per-user throughput and review outcome, busiest annotator first
+    """
+    annotations = {UUID(str(row["annotator_id"])): row["annotations"] for row in totals}
+    per_day = defaultdict(list)
+    for row in sorted(daily, key=lambda row: row["day"]):
+        per_day[UUID(str(row["annotator_id"]))].append(
+            DailyCount(day=row["day"], annotations=row["annotations"])
+        )
+    by_status = defaultdict(int)
+    by_user = defaultdict(dict)
+    for row in tasks:
+        by_status[row["status"]] += row["tasks"]
+        by_user[UUID(str(row["assignee_id"]))][row["status"]] = row["tasks"]
+
+    unassigned = by_user.pop(UNASSIGNED, {})
+    users = set(annotations) | set(by_user)
+    annotators = []
+    for user_id in users:
+        user_tasks = by_user.get(user_id, {})
+        reviewed = user_tasks.get("APPROVED", 0) + user_tasks.get("REJECTED", 0)
+        annotators.append(
+            AnnotatorPerformance(
+                user_id=user_id,
+                annotations=annotations.get(user_id, 0),
+                daily=per_day.get(user_id, []),
+                tasks=user_tasks,
+                approval_rate=user_tasks.get("APPROVED", 0) / reviewed if reviewed else None,
+            )
+        )
+    annotators.sort(key=lambda a: (-a.annotations, str(a.user_id)))
+    return TeamPerformance(
+        tasks=dict(by_status), unassigned_tasks=sum(unassigned.values()), annotators=annotators
+    )
+
+
+async def get_team_performance(db: AsyncSession, project_id: UUID, days: int) -> TeamPerformance:
+    """
+    Team performance of a project, read from the trigger-maintained counters.
+
+    Args:
+        db: Session inside the request's RLS transaction
+        project_id: Project to report on
+        days: Length of the daily throughput window, ending today (UTC)
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    rows = (
+        await db.execute(
+            text(
+                """
+                SELECT annotator_id, NULL::date AS day, sum(annotations)::bigint AS annotations
+                FROM public.project_annotator_stats
+                WHERE project_id = :project_id
+                GROUP BY annotator_id
+                HAVING sum(annotations) > 0
+                UNION ALL
+                SELECT annotator_id, day, annotations
+                FROM public.project_annotator_stats
+                WHERE project_id = :project_id AND day >= :since AND annotations > 0
+                """
+            ),
+            {"project_id": project_id, "since": since},
+        )
+    ).mappings().all()
+    tasks = (
+        await db.execute(
+            text(
+                """
+                SELECT assignee_id, status, tasks
+                FROM public.project_task_stats
+                WHERE project_id = :project_id AND tasks > 0
+                """
+            ),
+            {"project_id": project_id},
+        )
+    ).mappings().all()
+    return team_performance(
+        [row for row in rows if row["day"] is None],
+        [row for row in rows if row["day"] is not None],
+        tasks,
+    )
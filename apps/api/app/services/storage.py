@@ -1,7 +1,11 @@
-import boto3
-from botocore.config import Config
+import asyncio
+import posixpath
+from typing import Dict, List, Optional, Sequence
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
 from botocore.exceptions import ClientError
 from ..core.config import get_settings
+from .presign import DownloadURLCache, LocalPresigner
 
 settings = get_settings()
 
@@ -10,18 +14,60 @@ class StorageService:
     """
     Service for generating presigned URLs for S3/R2 storage.
     This follows the security pattern mandated in the PRD.
+
+    Presigning is local computation done by LocalPresigner, which reuses
+    the per-day SigV4 signing key across URLs; download URLs are also cached
+    per expiry bucket. Calls that reach S3 use a pooled aiobotocore client so
+    they never block the event loop.
     """
 
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=settings.s3_endpoint_url,
-            aws_access_key_id=settings.s3_access_key_id,
-            aws_secret_access_key=settings.s3_secret_access_key,
-            region_name=settings.s3_region,
-            config=Config(signature_version='s3v4'),
-        )
         self.bucket_name = settings.s3_bucket_name
+        self.presigner = LocalPresigner(
+            settings.s3_endpoint_url,
+            settings.s3_bucket_name,
+            settings.s3_access_key_id,
+            settings.s3_secret_access_key,
+            settings.s3_region,
+        )
+        self.download_urls = DownloadURLCache(
+            self.presigner, settings.presign_cache_seconds, settings.presign_cache_size
+        )
+        self._async_client = None
+        self._async_client_context = None
+        self._async_client_loop = None
+
+    async def _client(self):
+        """
+        Return the async S3 client, creating it on first use.
+
+        aiohttp connection pools belong to one event loop, so a client is
+        created per running loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client_context = get_session().create_client(
+                's3',
+                endpoint_url=settings.s3_endpoint_url,
+                aws_access_key_id=settings.s3_access_key_id,
+                aws_secret_access_key=settings.s3_secret_access_key,
+                region_name=settings.s3_region,
+                config=AioConfig(
+                    signature_version='s3v4',
+                    max_pool_connections=settings.s3_max_pool_connections,
+                ),
+            )
+            self._async_client = await self._async_client_context.__aenter__()
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def close(self) -> None:
+        """Close the async client and its connection pool."""
+        if self._async_client_context is not None:
+            await self._async_client_context.__aexit__(None, None, None)
+        self._async_client = None
+        self._async_client_context = None
+        self._async_client_loop = None
 
     def generate_presigned_upload_url(
         self,
@@ -30,7 +76,7 @@ class StorageService:
         expires_in: int = 300,  # 5 minutes
     ) -> str:
         """
-        Generate a presigned POST URL for direct client-to-S3 upload.
+        Generate a presigned PUT URL for direct client-to-S3 upload.
 
         Args:
             storage_path: The S3 key path (e.g., tenant_id/project_id/filename)
@@ -40,18 +86,28 @@ class StorageService:
         Returns:
             Presigned URL for upload
         """
+        return self.generate_presigned_upload_urls([storage_path], content_type, expires_in)[0]
+
+    def generate_presigned_upload_urls(
+        self,
+        storage_paths: Sequence[str],
+        content_type: str,
+        expires_in: int = 300,
+    ) -> List[str]:
+        """
+        Generate presigned PUT URLs for files sharing one content type.
+
+        Args:
+            storage_paths: The S3 key paths
+            content_type: MIME type the uploads must send
+            expires_in: URL expiration time in seconds
+
+        Returns:
+            Presigned URLs, in the order of storage_paths
+        """
         try:
-            presigned_url = self.s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': self.bucket_name,
-                    'Key': storage_path,
-                    'ContentType': content_type,
-                },
-                ExpiresIn=expires_in,
-            )
-            return presigned_url
-        except ClientError as e:
+            return self.presigner.presign_many("PUT", storage_paths, expires_in, content_type)
+        except ValueError as e:
             raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
     def generate_presigned_download_url(
@@ -64,25 +120,39 @@ class StorageService:
 
         Args:
             storage_path: The S3 key path
-            expires_in: URL expiration time in seconds
+            expires_in: Minimum URL lifetime in seconds
 
         Returns:
             Presigned URL for download
         """
+        return self.generate_presigned_download_urls([storage_path], expires_in)[0]
+
+    def generate_presigned_download_urls(
+        self,
+        storage_paths: Sequence[str],
+        expires_in: int = 3600,
+    ) -> List[str]:
+        """
+        Generate presigned GET URLs, reusing cached URLs where possible.
+
+        Within one presign_cache_seconds bucket the same path always gets
+        the same URL, so browsers can cache the object across page loads.
+        URLs stay valid for between expires_in and expires_in +
+        presign_cache_seconds seconds.
+
+        Args:
+            storage_paths: The S3 key paths
+            expires_in: Minimum URL lifetime in seconds
+
+        Returns:
+            Presigned URLs, in the order of storage_paths
+        """
         try:
-            presigned_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': self.bucket_name,
-                    'Key': storage_path,
-                },
-                ExpiresIn=expires_in,
-            )
-            return presigned_url
-        except ClientError as e:
+            return self.download_urls.get_many(storage_paths, expires_in)
+        except ValueError as e:
             raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
-    def verify_file_exists(self, storage_path: str) -> bool:
+    async def verify_file_exists(self, storage_path: str) -> bool:
         """
         Verify that a file exists in S3/R2.
 
@@ -92,11 +162,114 @@ class StorageService:
         Returns:
             True if file exists, False otherwise
         """
+        client = await self._client()
         try:
-            self.s3_client.head_object(Bucket=self.bucket_name, Key=storage_path)
+            await client.head_object(Bucket=self.bucket_name, Key=storage_path)
             return True
-        except ClientError:
-            return False
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise Exception(f"Failed to check {storage_path}: {str(e)}")
+
+    async def find_object_bytes(self, storage_path: str) -> Optional[bytes]:
+        """
+        Download a small object, such as a JSON document written by a worker.
+
+        Args:
+            storage_path: The S3 key path
+
+        Returns:
+            The object's content, or None if it does not exist
+        """
+        client = await self._client()
+        try:
+            response = await client.get_object(Bucket=self.bucket_name, Key=storage_path)
+            async with response['Body'] as body:
+                return await body.read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise Exception(f"Failed to download {storage_path}: {str(e)}")
+
+    async def verify_files_exist(self, storage_paths: Sequence[str]) -> Dict[str, bool]:
+        """
+        Verify that many files exist in S3/R2.
+
+        Small batches run concurrent HEAD requests (at most
+        s3_verify_concurrency in flight). Batches of s3_list_threshold
+        paths or more list their parent prefixes with ListObjectsV2
+        instead, which checks up to 1,000 keys per request.
+
+        Args:
+            storage_paths: The S3 key paths
+
+        Returns:
+            Mapping of each path to whether it exists
+        """
+        unique_paths = list(dict.fromkeys(storage_paths))
+        if len(unique_paths) >= settings.s3_list_threshold:
+            return await self._verify_by_listing(unique_paths)
+        return await self._verify_by_head(unique_paths)
+
+    async def _verify_by_head(self, storage_paths: List[str]) -> Dict[str, bool]:
+        limit = asyncio.Semaphore(settings.s3_verify_concurrency)
+
+        async def head(path: str) -> bool:
+            async with limit:
+                return await self.verify_file_exists(path)
+
+        results = await asyncio.gather(*(head(path) for path in storage_paths))
+        return dict(zip(storage_paths, results))
+
+    async def _verify_by_listing(self, storage_paths: List[str]) -> Dict[str, bool]:
+        """
+        Check paths by listing the key range they span under each prefix.
+
+        Listing starts just before the smallest requested key and stops past
+        the largest. If a prefix holds many unrelated keys in that range, the
+        scan gives up after a page budget proportional to the number of
+        paths and HEADs whatever is still unresolved.
+        """
+        by_prefix: Dict[str, List[str]] = {}
+        for path in sorted(storage_paths):
+            by_prefix.setdefault(posixpath.dirname(path) + '/', []).append(path)
+        client = await self._client()
+        limit = asyncio.Semaphore(settings.s3_verify_concurrency)
+
+        async def scan(prefix: str, paths: List[str]) -> Dict[str, bool]:
+            wanted = set(paths)
+            found = set()
+            budget = 4 * len(paths) // 1000 + 2
+            async with limit:
+                paginator = client.get_paginator('list_objects_v2')
+                pages = paginator.paginate(
+                    Bucket=self.bucket_name, Prefix=prefix, StartAfter=paths[0][:-1]
+                )
+                try:
+                    async for page in pages:
+                        keys = [item['Key'] for item in page.get('Contents', [])]
+                        found.update(wanted.intersection(keys))
+                        budget -= 1
+                        if not keys or keys[-1] >= paths[-1]:
+                            return {path: path in found for path in paths}
+                        if budget == 0:
+                            break
+                    else:
+                        return {path: path in found for path in paths}
+                except ClientError as e:
+                    raise Exception(f"Failed to list {prefix}: {str(e)}")
+
+            unresolved = [path for path in paths if path not in found]
+            results = {path: True for path in found}
+            results.update(await self._verify_by_head(unresolved))
+            return results
+
+        results: Dict[str, bool] = {}
+        for partial in await asyncio.gather(
+            *(scan(prefix, paths) for prefix, paths in by_prefix.items())
+        ):
+            results.update(partial)
+        return results
 
 
 # Singleton instance
@@ -0,0 +1,72 @@
+"""
+Per-request cost of get_current_user: jose decode vs HMAC decoder vs cache hit.
+
+Usage (from apps/api, with .env configured):
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from app.core.config import get_settings
+from app.core.security import HMACJWTDecoder
+from app.dependencies.auth import AuthenticatedUser, get_current_user, token_cache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    claims = {
+        "sub": "00000000-0000-0000-0000-000000000001",
+        "email": "bench@example.com",
+        "aud": settings.jwt_audience,
+        "exp": int(time.time()) + 3600,
+        "app_metadata": {"tenant_id": "00000000-0000-0000-0000-000000000002"},
+    }
+    token = jwt.encode(claims, settings.supabase_jwt_secret, algorithm=settings.jwt_algorithm)
+    decoder = HMACJWTDecoder(
+        settings.supabase_jwt_secret, settings.jwt_algorithm, settings.jwt_audience
+    )
+
+    def user_from(payload):
+        return AuthenticatedUser(id=payload["sub"], email=payload["email"], claims=payload)
+
+    def jose_path():
+        user_from(jwt.decode(
+            token, settings.supabase_jwt_secret,
+            algorithms=[settings.jwt_algorithm], audience=settings.jwt_audience,
+        ))
+
+    def decoder_path():
+        user_from(decoder.decode(token))
+
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def cached_path():
+        for _ in range(args.iterations):
+            await get_current_user(credentials)
+
+    results = {}
+    for name, run in (("jose.decode", jose_path), ("HMAC decoder", decoder_path)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            run()
+        results[name] = time.perf_counter() - start
+
+    token_cache.put(token, user_from(decoder.decode(token)), claims["exp"])
+    start = time.perf_counter()
+    asyncio.run(cached_path())
+    results["cache hit"] = time.perf_counter() - start
+
+    for name, elapsed in results.items():
+        print(f"{name:13s} {elapsed / args.iterations * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Single-row INSERT vs COPY-based bulk upsert of bounding-box annotations.
+
+Needs a database with the VisionFlow schema and an existing image. Rows are
+written as the connecting role (no RLS) and rolled back afterwards.
+
+Usage (from apps/api, with .env configured):
+    python -m benchmarks.bench_bulk_annotations --image-id ... --project-id ... --annotator-id ...
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.services.annotation_bulk import copy_upsert_rows
+
+COLUMNS = ("id", "image_id", "project_id", "annotator_id", "class_name", "data", "status")
+
+
+def make_rows(count, image_id, project_id, annotator_id):
+    image_id, project_id, annotator_id = map(uuid.UUID, (image_id, project_id, annotator_id))
+    return [
+        (
+            uuid.uuid4(), image_id, project_id, annotator_id, f"class-{i % 20}",
+            json.dumps(
+                {"type": "bounding_box", "x": i % 600, "y": i % 400, "width": 30, "height": 20}
+            ),
+            "draft",
+        )
+        for i in range(count)
+    ]
+
+
+async def single_row(rows):
+    """Baseline: one INSERT round trip per annotation (create_annotation, minus its commit)."""
+    async with AsyncSessionLocal() as db:
+        try:
+            for row in rows:
+                await db.execute(
+                    text(
+                        "INSERT INTO public.annotations "
+                        "(id, image_id, project_id, annotator_id, class_name, data, status) "
+                        "VALUES (:id, :image_id, :project_id, :annotator_id, :class_name, "
+                        "CAST(:data AS jsonb), :status)"
+                    ),
+                    dict(zip(COLUMNS, row)),
+                )
+        finally:
+            await db.rollback()
+
+
+async def bulk(rows):
+    async with AsyncSessionLocal() as db:
+        await db.begin()
+        try:
+            await copy_upsert_rows(db, rows)
+        finally:
+            await db.rollback()
+
+
+async def timed(rows):
+    """Time both paths on one event loop, which owns the async pool."""
+    start = time.perf_counter()
+    await single_row(rows)
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await bulk(rows)
+    return baseline, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--image-id", required=True)
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("--annotator-id", required=True)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.image_id, args.project_id, args.annotator_id)
+
+    baseline, copied = asyncio.run(timed(rows))
+
+    print(f"{args.rows} annotations")
+    print(f"single-row: {baseline:6.2f}s {args.rows / baseline:10.0f} rows/s")
+    print(f"COPY bulk:  {copied:6.2f}s {args.rows / copied:10.0f} rows/s")
+    print(f"speed-up: {baseline / copied:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
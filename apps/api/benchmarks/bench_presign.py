@@ -0,0 +1,66 @@
+"""
+Per-URL signing cost: boto3 generate_presigned_url vs local batch signer vs cache hit.
+
+Usage (from apps/api, with .env configured):
+    python -m benchmarks.bench_presign --urls 500 --rounds 20
+"""
+import argparse
+import time
+
+import boto3
+from botocore.config import Config
+
+from app.core.config import get_settings
+from app.services.storage import StorageService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--urls", type=int, default=500, help="URLs per gallery page")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    client = boto3.client(
+        "s3",
+        endpoint_url=settings.s3_endpoint_url,
+        aws_access_key_id=settings.s3_access_key_id,
+        aws_secret_access_key=settings.s3_secret_access_key,
+        region_name=settings.s3_region,
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+    )
+    storage = StorageService()
+    paths = [f"tenant/project/thumbnails/img-{i:06d}.jpg" for i in range(args.urls)]
+
+    def boto3_page():
+        for path in paths:
+            client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": settings.s3_bucket_name, "Key": path},
+                ExpiresIn=3600,
+            )
+
+    def local_page():
+        storage.presigner.presign_many("GET", paths, 3600)
+
+    def cached_page():
+        storage.generate_presigned_download_urls(paths, 3600)
+
+    results = {}
+    for name, run in (
+        ("boto3", boto3_page),
+        ("local signer", local_page),
+        ("cache hit", cached_page),
+    ):
+        run()  # Warm up: endpoint resolution, signing key, cache fill
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            run()
+        results[name] = time.perf_counter() - start
+
+    for name, elapsed in results.items():
+        print(f"{name:13s} {elapsed / (args.rounds * args.urls) * 1e6:8.2f} us/URL")
+
+
+if __name__ == "__main__":
+    main()
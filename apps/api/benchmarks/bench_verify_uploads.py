@@ -0,0 +1,84 @@
+"""
+Upload verification for a 5,000-file batch: sequential boto3 HEADs vs
+concurrent async HEADs vs prefix listing, against a local moto S3 server.
+
+Usage (from apps/api, with .env configured):
+    python -m benchmarks.bench_verify_uploads --files 5000
+"""
+import argparse
+import asyncio
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from moto.server import ThreadedMotoServer
+
+from app.services import storage as storage_module
+from app.services.storage import StorageService
+
+BUCKET = "bench-bucket"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=5000)
+    args = parser.parse_args()
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    settings = storage_module.settings
+    settings.s3_endpoint_url = endpoint
+    settings.s3_region = "us-east-1"
+    settings.s3_bucket_name = BUCKET
+
+    client = boto3.client(
+        "s3", endpoint_url=endpoint, aws_access_key_id="test",
+        aws_secret_access_key="test", region_name="us-east-1",
+    )
+    client.create_bucket(Bucket=BUCKET)
+    paths = [f"tenant/project/upload-{i:06d}.jpg" for i in range(args.files)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda key: client.put_object(Bucket=BUCKET, Key=key, Body=b"x"), paths))
+
+    storage = StorageService()
+    storage.s3_client = client
+
+    start = time.perf_counter()
+    for path in paths:
+        client.head_object(Bucket=BUCKET, Key=path)
+    sequential = time.perf_counter() - start
+
+    async def timed(threshold):
+        settings.s3_list_threshold = threshold
+        start = time.perf_counter()
+        result = await storage.verify_files_exist(paths)
+        assert all(result.values())
+        return time.perf_counter() - start
+
+    async def run():
+        try:
+            return await timed(10**9), await timed(1)
+        finally:
+            await storage.close()
+
+    concurrent, listed = asyncio.run(run())
+    server.stop()
+
+    print(f"{args.files} files")
+    for name, elapsed in (
+        ("sequential HEAD", sequential),
+        ("concurrent HEAD", concurrent),
+        ("prefix listing", listed),
+    ):
+        print(f"{name:16s} {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
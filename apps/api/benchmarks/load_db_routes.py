@@ -0,0 +1,68 @@
+"""
+Concurrent request throughput of a blocking Session vs the async session layer.
+
+Two throwaway routes run the same query (SELECT pg_sleep) from async
+handlers: one through the sync SessionLocal, which blocks the event loop,
+and one through AsyncSessionLocal. Requests go through the ASGI app in
+process, so only the database layer differs.
+
+Usage (from apps/api, with .env configured and Postgres reachable):
+    python -m benchmarks.load_db_routes --requests 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal, SessionLocal
+
+app = FastAPI()
+QUERY = text("SELECT pg_sleep(:seconds)")
+
+
+@app.get("/sync")
+async def sync_route(seconds: float):
+    with SessionLocal() as db:
+        db.execute(QUERY, {"seconds": seconds})
+    return {}
+
+
+@app.get("/async")
+async def async_route(seconds: float):
+    async with AsyncSessionLocal() as db:
+        await db.execute(QUERY, {"seconds": seconds})
+    return {}
+
+
+async def load(path: str, requests: int, concurrency: int, seconds: float) -> float:
+    limit = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one():
+            async with limit:
+                response = await client.get(path, params={"seconds": seconds})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-seconds", type=float, default=0.02)
+    args = parser.parse_args()
+
+    for path in ("/sync", "/async"):
+        elapsed = asyncio.run(load(path, args.requests, args.concurrency, args.query_seconds))
+        print(f"{path:7s} {elapsed:6.2f}s {args.requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
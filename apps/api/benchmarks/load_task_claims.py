@@ -0,0 +1,233 @@
+"""
+Concurrent labeler claim throughput, and whether any task is handed out twice.
+
+Creates --tasks unassigned pending tasks over the project's images, then
+--workers concurrent labelers claim --batch tasks at a time until the pool
+is empty, once per strategy:
+
+    naive        SELECT the next pending ids, then UPDATE them (races)
+    for-update   Same claim as the API but FOR UPDATE without SKIP LOCKED (waits)
+    skip-locked  claim_label_tasks, as served by POST /tasks/claim
+
+Each claim is its own transaction. Tasks are reset between strategies and
+deleted at the end. Then --workers concurrent bulk assignments of the same
+images (bulk_assign_tasks, as served by POST /tasks/assign) check that no
+image ends up with two open tasks. Runs as the connecting role (no RLS).
+
+Usage (from apps/api, with .env configured and Postgres reachable):
+    python -m benchmarks.load_task_claims --project-id ... --user-id ... --tasks 20000 --workers 50
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.services.annotation_tasks import CLAIM_LABEL_SQL, bulk_assign_tasks, claim_label_tasks
+
+NAIVE_SELECT = text(
+    "SELECT id FROM public.annotation_tasks "
+    "WHERE project_id = :project_id AND status = 'PENDING' AND assignee_id IS NULL "
+    "ORDER BY created_at LIMIT :limit"
+)
+NAIVE_UPDATE = text(
+    "UPDATE public.annotation_tasks SET status = 'IN_PROGRESS', assignee_id = :user_id "
+    "WHERE id = ANY(CAST(:ids AS uuid[])) RETURNING id"
+)
+BLOCKING_CLAIM = text(CLAIM_LABEL_SQL.text.replace("SKIP LOCKED", ""))
+
+
+async def claim_naive(db, project_id, user_id, limit):
+    rows = await db.execute(NAIVE_SELECT, {"project_id": project_id, "limit": limit})
+    ids = list(rows.scalars())
+    if not ids:
+        return []
+    return list((await db.execute(NAIVE_UPDATE, {"user_id": user_id, "ids": ids})).scalars())
+
+
+async def claim_blocking(db, project_id, user_id, limit):
+    rows = await db.execute(
+        BLOCKING_CLAIM, {"project_id": project_id, "user_id": user_id, "limit": limit}
+    )
+    return [row["id"] for row in rows.mappings()]
+
+
+async def claim_skip_locked(db, project_id, user_id, limit):
+    return [task.id for task in await claim_label_tasks(db, project_id, user_id, limit)]
+
+
+STRATEGIES = {"naive": claim_naive, "for-update": claim_blocking, "skip-locked": claim_skip_locked}
+
+
+OPEN_STATUSES = "('PENDING', 'IN_PROGRESS', 'SUBMITTED')"
+
+
+async def free_images(project_id, count):
+    """Images of the project without an open task (an image has at most one)."""
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            text(
+                f"""
+                SELECT id FROM public.images
+                WHERE project_id = :project_id
+                AND NOT EXISTS (
+                    SELECT 1 FROM public.annotation_tasks AS t
+                    WHERE t.image_id = images.id AND t.status IN {OPEN_STATUSES}
+                )
+                ORDER BY id
+                LIMIT :count
+                """
+            ),
+            {"project_id": project_id, "count": count},
+        )
+        return list(rows.scalars())
+
+
+async def create_tasks(project_id, count):
+    image_ids = await free_images(project_id, count)
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            rows = await db.execute(
+                text(
+                    """
+                    INSERT INTO public.annotation_tasks (project_id, image_id)
+                    SELECT :project_id, id FROM unnest(CAST(:image_ids AS uuid[])) AS img(id)
+                    RETURNING id
+                    """
+                ),
+                {"project_id": project_id, "image_ids": image_ids},
+            )
+            return list(rows.scalars())
+
+
+async def reset_tasks(ids):
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await db.execute(
+                text(
+                    "UPDATE public.annotation_tasks SET status = 'PENDING', assignee_id = NULL "
+                    "WHERE id = ANY(CAST(:ids AS uuid[]))"
+                ),
+                {"ids": ids},
+            )
+
+
+async def delete_tasks(ids):
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await db.execute(
+                text("DELETE FROM public.annotation_tasks WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                {"ids": ids},
+            )
+
+
+async def run(claim, project_id, user_id, workers, batch):
+    handed_out = Counter()
+
+    async def labeler():
+        while True:
+            async with AsyncSessionLocal() as db:
+                async with db.begin():
+                    claimed = await claim(db, project_id, user_id, batch)
+            if not claimed:
+                return
+            handed_out.update(claimed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(labeler() for _ in range(workers)))
+    return time.perf_counter() - start, handed_out
+
+
+async def assign_race(project_id, user_id, workers, count):
+    """Assign the same images from concurrent requests; report images with several open tasks."""
+    image_ids = await free_images(project_id, count)
+
+    async def assigner():
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                return await bulk_assign_tasks(db, project_id, image_ids, [user_id])
+
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(assigner() for _ in range(workers)))
+        elapsed = time.perf_counter() - start
+        async with AsyncSessionLocal() as db:
+            duplicated = (
+                await db.execute(
+                    text(
+                        f"""
+                        SELECT count(*) FROM (
+                            SELECT image_id FROM public.annotation_tasks
+                            WHERE image_id = ANY(CAST(:image_ids AS uuid[]))
+                              AND status IN {OPEN_STATUSES}
+                            GROUP BY image_id HAVING count(*) > 1
+                        ) AS images
+                        """
+                    ),
+                    {"image_ids": image_ids},
+                )
+            ).scalar_one()
+        created = sum(result[0] for result in results)
+        print(
+            f"{'assign':12s} {elapsed:6.2f}s  {workers} requests x {len(image_ids)} images  "
+            f"created {created:6d}  images with several open tasks {duplicated:6d}"
+        )
+    finally:
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                await db.execute(
+                    text(
+                        "DELETE FROM public.annotation_tasks "
+                        "WHERE image_id = ANY(CAST(:image_ids AS uuid[])) "
+                        f"AND status IN {OPEN_STATUSES}"
+                    ),
+                    {"image_ids": image_ids},
+                )
+
+
+async def main_async(args) -> None:
+    project_id, user_id = uuid.UUID(args.project_id), uuid.UUID(args.user_id)
+    ids = await create_tasks(project_id, args.tasks)
+    try:
+        print(f"{len(ids)} tasks, {args.workers} labelers claiming {args.batch} at a time")
+        for name in args.strategies:
+            await reset_tasks(ids)
+            elapsed, handed_out = await run(
+                STRATEGIES[name], project_id, user_id, args.workers, args.batch
+            )
+            total = sum(handed_out.values())
+            duplicates = total - len(handed_out)
+            print(
+                f"{name:12s} {elapsed:6.2f}s {len(handed_out) / elapsed:9.0f} tasks/s  "
+                f"handed out twice {duplicates:6d}  unclaimed {len(set(ids) - set(handed_out)):6d}"
+            )
+    finally:
+        await delete_tasks(ids)
+    await assign_race(project_id, user_id, args.workers, args.tasks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--project-id", required=True, help="Project with images without open tasks"
+    )
+    parser.add_argument(
+        "--user-id", required=True, help="Existing user recorded as the assignee"
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=20000, help="One per image, at most the free images"
+    )
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument(
+        "--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES)
+    )
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
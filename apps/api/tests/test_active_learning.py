@@ -0,0 +1,27 @@
+"""
+Tests for the active-learning queue endpoints
+"""
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+PROJECT_ID = str(UUID(int=2))
+
+
+def test_next_images_requires_auth():
+    """Test that reading the queue rejects anonymous requests"""
+    response = client.get(f"/api/v1/projects/{PROJECT_ID}/active-learning/next")
+    assert response.status_code == 403
+
+
+def test_refresh_requires_auth():
+    """Test that starting a sampling run rejects anonymous requests"""
+    response = client.post(
+        f"/api/v1/projects/{PROJECT_ID}/active-learning/refresh",
+        json={"strategy": "kcenter", "count": 100},
+    )
+    assert response.status_code == 403
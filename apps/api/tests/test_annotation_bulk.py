@@ -0,0 +1,81 @@
+"""
+Tests for bulk annotation validation
+"""
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.annotation_bulk import COPY_COLUMNS, resolve_items, validate_items
+
+client = TestClient(app)
+
+IMAGE_ID = str(UUID(int=1))
+PROJECT_ID = str(UUID(int=2))
+
+
+def item(**overrides):
+    base = {
+        "image_id": IMAGE_ID,
+        "project_id": PROJECT_ID,
+        "class_name": "car",
+        "data": {"type": "bounding_box", "x": 1, "y": 2, "width": 3, "height": 4},
+    }
+    base.update(overrides)
+    return base
+
+
+def test_validate_items_reports_errors_by_index():
+    """Test that bad items are reported without rejecting the rest"""
+    duplicate = str(UUID(int=9))
+    valid, errors = validate_items([
+        item(),
+        item(image_id="not-a-uuid"),
+        item(data={"type": "bounding_box", "x": 1, "y": 2, "width": 0, "height": 4}),
+        item(data={"type": "ellipse"}),
+        item(status="final"),
+        item(id=duplicate),
+        item(id=duplicate),
+        item(data={"type": "polygon", "points": [{"x": 0, "y": 0}]}),
+    ])
+
+    assert [index for index, _ in valid] == [0, 5, 7]
+    assert [error.index for error in errors] == [1, 2, 3, 4, 6]
+    assert "positive" in errors[1].detail
+    assert "more than once" in errors[4].detail
+
+
+def test_resolve_items_reports_conflicts_the_upsert_would_hit():
+    """Test that updates of others' or hidden annotations and image moves are item errors"""
+    user = UUID(int=7)
+    other_image = UUID(int=3)
+    mine, moved, hidden, new = (str(UUID(int=n)) for n in (10, 11, 12, 13))
+    valid, _ = validate_items([
+        item(id=mine),
+        item(id=moved),
+        item(id=hidden),
+        item(id=new),
+        item(),
+        item(project_id=str(UUID(int=4))),
+    ])
+    existing = {
+        UUID(mine): (True, UUID(IMAGE_ID)),
+        UUID(moved): (True, other_image),
+        UUID(hidden): (False, None),  # Another annotator's, possibly invisible under RLS
+    }
+
+    rows, errors = resolve_items(valid, {UUID(IMAGE_ID): UUID(PROJECT_ID)}, existing, user)
+
+    assert [error.index for error in errors] == [1, 2, 5]
+    assert "cannot be moved" in errors[0].detail
+    assert "another annotator" in errors[1].detail
+    assert "not found in project" in errors[2].detail
+    ids = [row[COPY_COLUMNS.index("id")] for row in rows]
+    assert ids[:2] == [UUID(mine), UUID(new)] and len(ids) == 3
+    assert {row[COPY_COLUMNS.index("annotator_id")] for row in rows} == {user}
+
+
+def test_bulk_requires_auth():
+    """Test that the bulk endpoint rejects anonymous requests"""
+    response = client.post("/api/v1/annotations/bulk", json={"items": [item()]})
+    assert response.status_code == 403
@@ -0,0 +1,58 @@
+"""
+Tests for keyset-paginated annotation streaming
+"""
+import asyncio
+import json
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.annotation_stream import iter_keyset_pages
+
+client = TestClient(app)
+
+ROWS = [(UUID(int=i), json.dumps({"id": str(UUID(int=i))})) for i in range(1, 2501)]
+
+
+def make_fetcher(calls):
+    """Page query over an id-ordered list, recording each (after, limit)"""
+
+    async def fetch_page(after, limit):
+        calls.append((after, limit))
+        start = 0
+        if after is not None:
+            start = next(i for i, (row_id, _) in enumerate(ROWS) if row_id == after) + 1
+        for row in ROWS[start:start + limit]:
+            yield row
+
+    return fetch_page
+
+
+def collect(pages):
+    async def join():
+        return b"".join([chunk async for chunk in pages])
+
+    return asyncio.run(join())
+
+
+def test_keyset_pages_cover_all_rows():
+    """Test that pages resume after the last id and stream every row once"""
+    calls = []
+    body = collect(iter_keyset_pages(make_fetcher(calls), page_size=1000))
+    ids = [json.loads(line)["id"] for line in body.splitlines()]
+
+    assert ids == [str(row_id) for row_id, _ in ROWS]
+    assert calls == [(None, 1000), (UUID(int=1000), 1000), (UUID(int=2000), 1000)]
+
+
+def test_keyset_pages_resume_after_cursor():
+    """Test that streaming resumes strictly after the given id"""
+    body = collect(iter_keyset_pages(make_fetcher([]), after=UUID(int=2400), page_size=1000))
+    assert len(body.splitlines()) == 100
+
+
+def test_stream_requires_auth():
+    """Test that the project stream endpoint rejects anonymous requests"""
+    response = client.get(f"/api/v1/annotations/project/{UUID(int=1)}/stream")
+    assert response.status_code == 403
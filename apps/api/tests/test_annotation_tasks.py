@@ -0,0 +1,28 @@
+"""
+Tests for the labeler and reviewer task queue endpoints
+"""
+from uuid import UUID
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+PROJECT_ID = str(UUID(int=2))
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("tasks/claim", {"limit": 10}),
+        ("tasks/claim-review", {"limit": 10}),
+        ("tasks/assign", {"image_ids": [str(UUID(int=1))], "assignee_ids": [str(UUID(int=3))]}),
+    ],
+)
+def test_task_endpoints_require_auth(path, body):
+    """Test that queue endpoints reject anonymous requests"""
+    response = client.post(f"/api/v1/projects/{PROJECT_ID}/{path}", json=body)
+    assert response.status_code == 403
+
@@ -0,0 +1,106 @@
+"""
+Tests for JWT verification, the token cache and auth metrics
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.core.security import HMACJWTDecoder, TokenCache, TokenError
+from app.dependencies.auth import auth_latency, get_current_user, token_cache
+from app.main import app
+
+SECRET = "test-secret"
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def make_token(**overrides):
+    claims = {
+        "sub": USER_ID,
+        "email": "a@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+
+def tamper(token):
+    """Change one signature character (not the last, whose low bits are padding)"""
+    flipped = "A" if token[-5] != "A" else "B"
+    return token[:-5] + flipped + token[-4:]
+
+
+def authenticate(token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(get_current_user(credentials))
+
+
+def test_decoder_matches_jose():
+    """Test that the HMAC decoder returns the same claims as jose"""
+    token = make_token(tenant_id="t1")
+    decoder = HMACJWTDecoder(SECRET, "HS256", "authenticated")
+    expected = jwt.decode(token, SECRET, algorithms=["HS256"], audience="authenticated")
+    assert decoder.decode(token) == expected
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        tamper(make_token()),
+        make_token(exp=int(time.time()) - 1),
+        make_token(aud="anon"),
+        make_token(nbf=int(time.time()) + 60),
+        jwt.encode({"sub": USER_ID, "aud": "authenticated"}, "other-secret", algorithm="HS256"),
+        jwt.encode({"sub": USER_ID, "aud": "authenticated"}, SECRET, algorithm="HS512"),
+        "not-a-token",
+    ],
+)
+def test_decoder_rejects(token):
+    """Test that tampered, expired, foreign and malformed tokens are rejected"""
+    with pytest.raises(TokenError):
+        HMACJWTDecoder(SECRET, "HS256", "authenticated").decode(token)
+
+
+def test_token_cache_expires_at_exp():
+    """Test that entries are never served at or after the token's exp"""
+    now = [1000.0]
+    cache = TokenCache(max_entries=2, max_ttl=300, clock=lambda: now[0])
+    cache.put("a", "user-a", exp=1010)
+
+    assert cache.get("a") == "user-a"
+    assert cache.get("a.tampered") is None
+    now[0] = 1010.0
+    assert cache.get("a") is None
+
+
+def test_token_cache_is_bounded():
+    """Test that the least recently used entry is evicted"""
+    cache = TokenCache(max_entries=2, max_ttl=300)
+    cache.put("a", 1, None)
+    cache.put("b", 2, None)
+    cache.get("a")
+    cache.put("c", 3, None)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_get_current_user_caches_verified_tokens():
+    """Test that a repeated token hits the cache and is counted in metrics"""
+    token = make_token()
+    hits = auth_latency.count(result="hit")
+
+    first = authenticate(token)
+    second = authenticate(token)
+
+    assert second is first
+    assert auth_latency.count(result="hit") == hits + 1
+    with pytest.raises(HTTPException):
+        authenticate(tamper(token))
+    assert token_cache.get(tamper(token)) is None
+
+    body = TestClient(app).get("/metrics").text
+    assert 'visionflow_auth_seconds_count{result="hit"}' in body
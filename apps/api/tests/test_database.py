@@ -0,0 +1,17 @@
+"""
+Tests for the async database configuration
+"""
+from app.core.database import async_database_url, async_engine
+
+
+def test_async_database_url():
+    """Test that libpq URLs are converted for asyncpg"""
+    assert async_database_url("postgresql://u:p@db:6543/postgres?sslmode=require") == (
+        "postgresql+asyncpg://u:p@db:6543/postgres?ssl=require"
+    )
+
+
+def test_async_engine_pool():
+    """Test that the async engine uses asyncpg with the configured pool"""
+    assert async_engine.dialect.driver == "asyncpg"
+    assert async_engine.pool.size() == 10
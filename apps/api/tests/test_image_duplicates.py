@@ -0,0 +1,35 @@
+"""
+Tests for near-duplicate image search
+"""
+import random
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.image_duplicates import CHUNK_BITS, CHUNKS, MAX_DISTANCE, chunk_probes
+
+client = TestClient(app)
+
+
+def chunks(value):
+    unsigned = value & (2**64 - 1)
+    mask = 2**CHUNK_BITS - 1
+    return [(unsigned >> (CHUNK_BITS * (CHUNKS - 1 - k))) & mask for k in range(CHUNKS)]
+
+
+def test_chunk_probes_find_every_hash_within_distance():
+    """Test that some chunk of any hash within the distance is probed"""
+    rng = random.Random(0)
+    for max_distance in range(MAX_DISTANCE + 1):
+        phash = rng.getrandbits(64) - 2**63
+        probes = chunk_probes(phash, max_distance)
+        for _ in range(200):
+            flipped = phash ^ sum(1 << bit for bit in rng.sample(range(64), max_distance))
+            assert any(value in probe for value, probe in zip(chunks(flipped), probes))
+
+
+def test_near_duplicates_require_auth():
+    """Test that near-duplicate search rejects anonymous requests"""
+    response = client.get(f"/api/v1/projects/{UUID(int=2)}/images/{UUID(int=1)}/duplicates")
+    assert response.status_code == 403
@@ -0,0 +1,35 @@
+"""
+Tests for job cancellation requests
+"""
+import asyncio
+import json
+
+import fakeredis
+
+from app.services import jobs
+from app.services.jobs import job_state_key, request_job_cancel
+
+JOB_KEY = "export:v1:coco"
+
+
+def test_cancel_is_only_flagged_while_the_job_runs(monkeypatch):
+    """Test that finished or unknown jobs get no cancel flag to trip the next run"""
+
+    async def run():
+        redis = fakeredis.aioredis.FakeRedis()
+
+        async def get_job_pool():
+            return redis
+
+        monkeypatch.setattr(jobs, "get_job_pool", get_job_pool)
+        flags = []
+        for progress in (None, "completed", "failed", "cancelled", "retrying", "running"):
+            await redis.delete(job_state_key(JOB_KEY, "cancel"))
+            if progress:
+                state = json.dumps({"status": progress})
+                await redis.set(job_state_key(JOB_KEY, "progress"), state)
+            accepted = await request_job_cancel(JOB_KEY)
+            flags.append((accepted, bool(await redis.exists(job_state_key(JOB_KEY, "cancel")))))
+        return flags
+
+    assert asyncio.run(run()) == [(False, False)] * 4 + [(True, True)] * 2
@@ -0,0 +1,186 @@
+"""
+Tests for the two-tier project role cache and RoleRequired
+"""
+import asyncio
+import json
+from uuid import UUID
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from app.dependencies.auth import AuthenticatedUser, RoleRequired
+from app.services import membership_cache as module
+from app.services.membership_cache import Membership, MembershipCache
+
+USER = UUID(int=1)
+PROJECT = UUID(int=2)
+WORKSPACE = UUID(int=3)
+
+
+class Roles:
+    """Membership table stand-in that counts database reads"""
+
+    def __init__(self, role):
+        self.role = role
+        self.reads = 0
+
+    async def __call__(self, user_id, project_id):
+        self.reads += 1
+        return Membership(role=self.role, workspace_id=WORKSPACE)
+
+
+def make_cache(server, roles):
+    return MembershipCache(fakeredis.aioredis.FakeRedis(server=server), roles, ttl=60)
+
+
+def test_tiers_answer_in_order():
+    """Test that repeated lookups hit the local tier, other processes hit Redis"""
+
+    async def run():
+        server = fakeredis.FakeServer()
+        roles = Roles("reviewer")
+        first, second = make_cache(server, roles), make_cache(server, roles)
+
+        assert (await first.get(USER, PROJECT)).role == "reviewer"
+        assert (await first.get(USER, PROJECT)).role == "reviewer"
+        assert (await second.get(USER, PROJECT)).workspace_id == WORKSPACE
+        return roles.reads
+
+    assert asyncio.run(run()) == 1
+
+
+def test_invalidation_reaches_other_processes():
+    """Test that a published invalidation drops another process's local entry"""
+
+    async def run():
+        server = fakeredis.FakeServer()
+        roles = Roles("reviewer")
+        writer, reader = make_cache(server, roles), make_cache(server, roles)
+        listener = asyncio.create_task(reader.listen())
+        await asyncio.sleep(0.05)
+
+        await reader.get(USER, PROJECT)
+        roles.role = "labeler"
+        await writer.invalidate(USER, workspace_id=WORKSPACE)
+        await asyncio.sleep(0.05)
+        role = (await reader.get(USER, PROJECT)).role
+
+        listener.cancel()
+        return role, roles.reads
+
+    assert asyncio.run(run()) == ("labeler", 2)
+
+
+def test_racing_read_is_not_cached():
+    """Test that a database read overlapping an invalidation is not stored"""
+
+    async def run():
+        server = fakeredis.FakeServer()
+        cache = make_cache(server, None)
+        reads = []
+
+        async def slow_loader(user_id, project_id):
+            reads.append(1)
+            if len(reads) == 1:
+                await cache.invalidate(USER, project_id=PROJECT)
+                return Membership(role="admin", workspace_id=WORKSPACE)
+            return Membership(role="labeler", workspace_id=WORKSPACE)
+
+        cache.loader = slow_loader
+        assert (await cache.get(USER, PROJECT)).role == "admin"
+        return (await cache.get(USER, PROJECT)).role
+
+    assert asyncio.run(run()) == "labeler"
+
+
+class MembershipConnection:
+    """asyncpg connection stand-in that delivers membership trigger notifications"""
+
+    def __init__(self):
+        self.listeners = {}
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def add_termination_listener(self, callback):
+        self.terminate = callback
+
+    def notify(self, **change):
+        payload = {key: str(value) for key, value in change.items()}
+        channel = module.MEMBERSHIP_CHANNEL
+        self.listeners[channel](self, 1, channel, json.dumps(payload))
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize(
+    "change",
+    # project_members / workspace_members row
+    [{"project_id": PROJECT}, {"workspace_id": WORKSPACE}],
+)
+def test_membership_notification_evicts_both_tiers(change):
+    """Test that a membership UPDATE or DELETE notification drops the local and Redis entries"""
+
+    async def run():
+        server = fakeredis.FakeServer()
+        roles = Roles("admin")
+        cache = make_cache(server, roles)
+        other_project = UUID(int=4)
+        connection = MembershipConnection()
+
+        async def connect():
+            return connection
+
+        listener = asyncio.create_task(cache.listen_database(connect))
+        await asyncio.sleep(0.05)
+        await cache.get(USER, PROJECT)
+        await cache.get(USER, other_project)
+        await cache.get(UUID(int=5), PROJECT)  # another user stays cached
+        roles.role = "labeler"
+        connection.notify(user_id=USER, **change)
+        await asyncio.sleep(0.05)
+
+        local = set(cache._local)
+        shared = await cache.redis.hkeys(cache._user_key(USER))
+        role = (await cache.get(USER, PROJECT)).role
+        listener.cancel()
+        return local, shared, role
+
+    local, shared, role = asyncio.run(run())
+    assert role == "labeler"
+    assert (USER, PROJECT) not in local and str(PROJECT).encode() not in shared
+    assert (UUID(int=5), PROJECT) in local
+    # A project change keeps the user's other projects; the workspace holds both
+    assert ((USER, UUID(int=4)) in local) == ("project_id" in change)
+
+
+@pytest.mark.parametrize(
+    "role,required,allowed",
+    [
+        ("admin", "reviewer", True),
+        ("reviewer", "reviewer", True),
+        ("labeler", "reviewer", False),
+        (None, "labeler", False),
+    ],
+)
+def test_role_required_ranks_roles(monkeypatch, role, required, allowed):
+    """Test that higher roles satisfy lower requirements and non-members are refused"""
+    user = AuthenticatedUser(id=USER, email="a@example.com")
+
+    async def run():
+        cache = make_cache(fakeredis.FakeServer(), Roles(role))
+        monkeypatch.setattr(module, "_membership_cache", cache)
+        return await RoleRequired(required)(PROJECT, user)
+
+    if allowed:
+        assert asyncio.run(run()) is user
+    else:
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(run())
+        assert error.value.status_code == 403
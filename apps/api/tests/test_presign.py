@@ -0,0 +1,84 @@
+"""
+Local SigV4 presigning tests, checked against botocore's own signer
+"""
+import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from app.services.presign import DownloadURLCache, LocalPresigner
+
+SIGNED_AT = datetime.datetime(2026, 10, 18, 23, 59, 30)
+PATHS = ["t/p/img.jpg", "t/p/a b+c(1)~.jpg", "t/p/ünï/çødé.png"]
+
+
+def botocore_urls(endpoint, operation, paths, expires_in, **params):
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",
+        region_name="auto",
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+    )
+    frozen = SimpleNamespace(datetime=SimpleNamespace(utcnow=lambda: SIGNED_AT))
+    with mock.patch("botocore.auth.datetime", frozen):
+        return [
+            client.generate_presigned_url(
+                operation, Params={"Bucket": "bucket", "Key": path, **params}, ExpiresIn=expires_in
+            )
+            for path in paths
+        ]
+
+
+@pytest.mark.parametrize(
+    "endpoint", ["http://127.0.0.1:9000", "https://account.r2.cloudflarestorage.com"]
+)
+def test_urls_match_botocore(endpoint):
+    """Test that GET and PUT URLs are byte-identical to botocore's"""
+    presigner = LocalPresigner(endpoint, "bucket", "key", "secret", "auto")
+    signed_at = SIGNED_AT.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    assert presigner.presign_many("GET", PATHS, 3600, signed_at=signed_at) == botocore_urls(
+        endpoint, "get_object", PATHS, 3600
+    )
+    assert presigner.presign_many(
+        "PUT", PATHS, 300, content_type="image/jpeg", signed_at=signed_at
+    ) == botocore_urls(endpoint, "put_object", PATHS, 300, ContentType="image/jpeg")
+
+
+def test_rejects_out_of_range_expiry():
+    """Test that SigV4's seven-day limit is enforced"""
+    presigner = LocalPresigner("http://127.0.0.1:9000", "bucket", "key", "secret", "auto")
+
+    with pytest.raises(ValueError):
+        presigner.presign_many("GET", PATHS, 7 * 24 * 3600 + 1)
+
+
+def test_download_cache_is_stable_within_bucket():
+    """Test that a path keeps its URL until the expiry bucket rolls over"""
+    presigner = LocalPresigner("http://127.0.0.1:9000", "bucket", "key", "secret", "auto")
+    cache = DownloadURLCache(presigner, bucket_seconds=300, max_entries=100)
+
+    first = cache.get_many(PATHS, 3600, now=1_800_000_000)
+    again = cache.get_many(PATHS[::-1], 3600, now=1_800_000_299)
+    rolled = cache.get_many(PATHS, 3600, now=1_800_000_300)
+
+    assert again == first[::-1]
+    assert rolled != first
+    assert first == presigner.presign_many("GET", PATHS, 3900, signed_at=1_800_000_000)
+    assert all("X-Amz-Expires=3900" in url for url in first)
+
+
+def test_download_cache_is_bounded():
+    """Test that the cache never holds more than max_entries URLs"""
+    presigner = LocalPresigner("http://127.0.0.1:9000", "bucket", "key", "secret", "auto")
+    cache = DownloadURLCache(presigner, bucket_seconds=300, max_entries=2)
+
+    urls = cache.get_many(PATHS, 3600, now=1_800_000_000)
+
+    assert len(cache._urls) <= 2
+    assert urls == presigner.presign_many("GET", PATHS, 3900, signed_at=1_800_000_000)
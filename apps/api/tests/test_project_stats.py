@@ -0,0 +1,53 @@
+"""
+Tests for the analytics dashboards read from incremental counters
+"""
+from datetime import date
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.project_stats import UNASSIGNED, team_performance
+
+client = TestClient(app)
+
+ALICE = UUID(int=1)
+BOB = UUID(int=2)
+
+
+def test_team_performance_from_counters():
+    """Test throughput, approval rate and unassigned tasks from counter rows"""
+    report = team_performance(
+        totals=[
+            {"annotator_id": ALICE, "annotations": 40},
+            {"annotator_id": str(BOB), "annotations": 90},
+        ],
+        daily=[
+            {"annotator_id": BOB, "day": date(2024, 1, 3), "annotations": 50},
+            {"annotator_id": BOB, "day": date(2024, 1, 2), "annotations": 40},
+        ],
+        tasks=[
+            {"assignee_id": ALICE, "status": "APPROVED", "tasks": 3},
+            {"assignee_id": ALICE, "status": "REJECTED", "tasks": 1},
+            {"assignee_id": BOB, "status": "IN_PROGRESS", "tasks": 5},
+            {"assignee_id": UNASSIGNED, "status": "PENDING", "tasks": 7},
+        ],
+    )
+
+    bob, alice = report.annotators
+    assert (bob.user_id, alice.user_id) == (BOB, ALICE)
+    assert [d.day.day for d in bob.daily] == [2, 3]
+    assert alice.approval_rate == 0.75 and bob.approval_rate is None
+    assert report.unassigned_tasks == 7
+    assert report.tasks == {"APPROVED": 3, "REJECTED": 1, "IN_PROGRESS": 5, "PENDING": 7}
+
+
+def test_stats_endpoints_require_auth():
+    """Test that dashboards and reconciliation reject anonymous requests"""
+    project = UUID(int=9)
+    assert client.get(f"/api/v1/projects/{project}/stats/dataset").status_code == 403
+    assert client.get(f"/api/v1/projects/{project}/stats/team").status_code == 403
+    assert client.post(f"/api/v1/projects/{project}/stats/reconcile").status_code == 403
+    assert client.get(f"/api/v1/projects/{project}/versions/{UUID(int=8)}/stats").status_code == 403
+    response = client.post(f"/api/v1/projects/{project}/versions/{UUID(int=8)}/stats")
+    assert response.status_code == 403
@@ -0,0 +1,104 @@
+"""
+Async storage tests against a local moto S3 server
+"""
+import asyncio
+import socket
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+
+from app.services import storage as storage_module
+from app.services.storage import StorageService
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+    )
+    client.create_bucket(Bucket=BUCKET)
+    for i in range(0, 3000, 2):
+        client.put_object(Bucket=BUCKET, Key=f"t/p/img-{i:05d}.jpg", Body=b"x")
+    client.put_object(Bucket=BUCKET, Key="t/other/img-00001.jpg", Body=b"x")
+    yield endpoint
+    server.stop()
+
+
+@pytest.fixture
+def storage(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "s3_endpoint_url", s3_endpoint)
+    monkeypatch.setattr(storage_module.settings, "s3_region", "us-east-1")
+    return StorageService()
+
+
+def run(storage, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await storage.close()
+
+    return asyncio.run(main())
+
+
+def test_verify_file_exists(storage):
+    """Test single-object HEAD checks"""
+
+    async def check():
+        return [
+            await storage.verify_file_exists("t/p/img-00000.jpg"),
+            await storage.verify_file_exists("t/p/img-00001.jpg"),
+        ]
+
+    assert run(storage, check()) == [True, False]
+
+
+def test_find_object_bytes(storage):
+    """Test downloading an object, and None for a missing one"""
+
+    async def fetch():
+        return [
+            await storage.find_object_bytes("t/p/img-00000.jpg"),
+            await storage.find_object_bytes("t/p/img-00001.jpg"),
+        ]
+
+    assert run(storage, fetch()) == [b"x", None]
+
+
+@pytest.mark.parametrize("threshold", [10**9, 100])
+def test_verify_files_exist_head_and_list_agree(storage, monkeypatch, threshold):
+    """Test that concurrent HEADs and prefix listing give the same answers"""
+    monkeypatch.setattr(storage_module.settings, "s3_list_threshold", threshold)
+    paths = [f"t/p/img-{i:05d}.jpg" for i in range(1000, 1400)]
+    paths += ["t/other/img-00001.jpg", "t/q/a.jpg"]
+
+    result = run(storage, storage.verify_files_exist(paths))
+
+    expected = {path: path.endswith("0.jpg") or path[-5] in "2468" for path in paths[:400]}
+    expected.update({"t/other/img-00001.jpg": True, "t/q/a.jpg": False})
+    assert result == expected
+
+
+def test_listing_falls_back_to_head_for_sparse_batches(storage, monkeypatch):
+    """Test that a few keys spread over a large prefix are still resolved"""
+    monkeypatch.setattr(storage_module.settings, "s3_list_threshold", 2)
+    paths = ["t/p/img-00000.jpg", "t/p/img-02998.jpg", "t/p/img-02999.jpg"]
+
+    assert run(storage, storage.verify_files_exist(paths)) == {
+        "t/p/img-00000.jpg": True,
+        "t/p/img-02998.jpg": True,
+        "t/p/img-02999.jpg": False,
+    }
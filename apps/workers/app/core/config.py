@@ -16,6 +16,40 @@ class Settings(BaseSettings):
     s3_bucket_name: str
     s3_region: str = "auto"
 
+    # Long-running jobs
+    job_timeout: int = 3600  # Seconds per ARQ try
+    job_checkpoint_margin: int = 300  # Stop taking work this long before the timeout
+    job_max_tries: int = 24  # Tries per job; each try resumes from the checkpoint
+
+    # Fair scheduling across workspaces (services/scheduler.py)
+    worker_job_slots: int = 0  # Concurrent jobs per worker; 0 = derive from the process pool and lane
+    tenant_max_short_jobs: int = 4  # Jobs one workspace may run at once in the short lane
+    tenant_max_long_jobs: int = 1  # Same for the long lane (exports, big versions)
+
+    # Version generation engine
+    worker_processes: int = 0  # 0 = one process per CPU core
+    shard_size: int = 256  # Images per shard submitted to the process pool
+
+    # Preprocessed image cache
+    preprocess_cache_dir: str = "/tmp/visionflow/preprocess-cache"
+    preprocess_cache_max_bytes: int = 10 * 1024**3
+    preprocess_cache_shared: bool = True  # Also share entries through S3
+
+    # Rendered outputs of seeded (replayed) dataset versions, per process
+    replay_cache_max_bytes: int = 512 * 1024**2
+
+    # Thumbnail pyramids of uploaded images
+    pyramid_sizes: list[int] = [256, 1024]  # Longest side of each scaled level
+    pyramid_format: str = "webp"  # webp or jpg; the full level is always jpg
+    pyramid_quality: int = 80
+    pyramid_shard_size: int = 16  # Images per shard submitted to the process pool
+
+    # Active-learning sampling (tasks/active_learning.py)
+    features_dir: str = "/tmp/visionflow/features"  # Memory-mapped feature matrices; keep on a persistent volume
+    feature_extractor: str = "color_hog"  # Registered extractor (services/features.py)
+    sampler_clusters: int = 100  # k-means clusters for the kmeans strategy
+    sampler_chunk_rows: int = 16384  # Feature rows read at once
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,4 @@
+# Annotation export formats. Importing the built-in format modules registers them.
+from .base import FORMATS, AnnotationFormat, ArchiveFile, get_format, register_format
+from .columnar import AnnotationTable
+from . import coco, visionflow, voc, yolo  # noqa: F401
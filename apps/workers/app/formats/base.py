@@ -0,0 +1,87 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Type
+
+import numpy as np
+
+from .columnar import AnnotationTable
+
+# (path inside the archive, data chunks)
+ArchiveFile = Tuple[str, Iterable[bytes]]
+
+FORMATS: Dict[str, Type["AnnotationFormat"]] = {}
+
+
+def register_format(format_class: Type["AnnotationFormat"]) -> Type["AnnotationFormat"]:
+    """Class decorator that makes an export format available by name."""
+    FORMATS[format_class.name] = format_class
+    return format_class
+
+
+def get_format(name: str) -> "AnnotationFormat":
+    """
+    Instantiate a registered export format.
+
+    Raises:
+        Exception: If no format is registered under that name
+    """
+    if name not in FORMATS:
+        raise Exception(f"Unsupported export format: {name}")
+    return FORMATS[name]()
+
+
+def format_rows(template: str, values: np.ndarray) -> List[str]:
+    """
+    Format every row of a 2-D array with one %-formatting call.
+
+    Args:
+        template: Per-row format string ending in a newline
+        values: (M, K) array matching the template's K placeholders
+
+    Returns:
+        M formatted lines
+    """
+    if not len(values):
+        return []
+    text = (template * len(values)) % tuple(values.ravel().tolist())
+    return text.splitlines(keepends=True)
+
+
+class AnnotationFormat:
+    """
+    Base class of export formats.
+
+    Formats receive AnnotationTable chunks and produce archive files. The
+    exporter calls image_files once per chunk while images are streamed, then
+    split_files for every split, then dataset_files once.
+    """
+
+    name = ""
+    image_dir = "images"  # Directory of images inside each split
+
+    def image_path(self, split: str, file_name: str) -> str:
+        """Archive path of an image."""
+        return "/".join(part for part in (split, self.image_dir, file_name) if part)
+
+    def image_files(self, table: AnnotationTable, class_names: List[str]) -> Iterator[ArchiveFile]:
+        """Per-image label files for one chunk."""
+        return iter(())
+
+    def split_files(
+        self,
+        split: str,
+        tables: Callable[[], Iterator[AnnotationTable]],
+        class_names: List[str],
+    ) -> Iterator[ArchiveFile]:
+        """
+        Files aggregating a whole split.
+
+        Args:
+            split: Split name
+            tables: Returns a fresh iterator over the split's chunks; may be
+                called more than once for multi-pass output
+            class_names: Class names indexed by class id
+        """
+        return iter(())
+
+    def dataset_files(self, splits: List[str], class_names: List[str]) -> Iterator[ArchiveFile]:
+        """Files describing the whole dataset."""
+        return iter(())
@@ -0,0 +1,69 @@
+import json
+from typing import Callable, Iterator, List
+
+import numpy as np
+
+from .base import AnnotationFormat, ArchiveFile, format_rows, register_format
+from .columnar import AnnotationTable
+
+_ANNOTATION = (
+    '{"id":%d,"image_id":%d,"category_id":%d,'
+    '"bbox":[%.3f,%.3f,%.3f,%.3f],"area":%.3f,"iscrowd":0}\n'
+)
+
+
+@register_format
+class CocoFormat(AnnotationFormat):
+    """COCO JSON: one _annotations.coco.json per split, images beside it."""
+
+    name = "coco"
+    image_dir = ""
+
+    def split_files(
+        self,
+        split: str,
+        tables: Callable[[], Iterator[AnnotationTable]],
+        class_names: List[str],
+    ) -> Iterator[ArchiveFile]:
+        yield f"{split}/_annotations.coco.json", self._document(tables, class_names)
+
+    def _document(
+        self, tables: Callable[[], Iterator[AnnotationTable]], class_names: List[str]
+    ) -> Iterator[bytes]:
+        """Stream the JSON document in two passes over the split's chunks."""
+        yield b'{"info":{"description":"Exported from VisionFlow"},"images":['
+        separator = b""
+        for table in tables():
+            for index, image_id in enumerate(table.image_ids):
+                image = {
+                    "id": int(image_id),
+                    "file_name": table.file_names[index],
+                    "width": int(table.widths[index]),
+                    "height": int(table.heights[index]),
+                }
+                yield separator + json.dumps(image, separators=(",", ":")).encode()
+                separator = b","
+
+        yield b'],"annotations":['
+        next_id = 1
+        separator = b""
+        for table in tables():
+            table = table.clipped()
+            count = len(table.class_ids)
+            if not count:
+                continue
+            rows = np.empty((count, 8), dtype=np.float64)
+            rows[:, 0] = np.arange(next_id, next_id + count)
+            rows[:, 1] = table.image_ids[table.box_image]
+            rows[:, 2] = table.class_ids + 1
+            rows[:, 3:7] = table.bboxes
+            rows[:, 7] = table.bboxes[:, 2] * table.bboxes[:, 3]
+            next_id += count
+            yield separator + ",".join(format_rows(_ANNOTATION, rows)).replace("\n", "").encode()
+            separator = b","
+
+        categories = [
+            {"id": class_id + 1, "name": name, "supercategory": "none"}
+            for class_id, name in enumerate(class_names)
+        ]
+        yield b'],"categories":' + json.dumps(categories).encode() + b"}"
@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    """Convert (M, 4) COCO [x, y, w, h] boxes to corner [x0, y0, x1, y1] boxes."""
+    corners = boxes.copy()
+    corners[:, 2:] += boxes[:, :2]
+    return corners
+
+
+def xyxy_to_xywh(corners: np.ndarray) -> np.ndarray:
+    """Convert (M, 4) corner boxes back to COCO [x, y, w, h] boxes."""
+    boxes = corners.copy()
+    boxes[:, 2:] -= corners[:, :2]
+    return boxes
+
+
+def clip_xyxy(corners: np.ndarray, widths: np.ndarray, heights: np.ndarray) -> np.ndarray:
+    """Clip (M, 4) corner boxes to per-box image sizes."""
+    limits = np.stack([widths, heights, widths, heights], axis=1)
+    return np.clip(corners, 0, limits)
+
+
+def transform_xyxy(corners: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Map (M, 4) corner boxes through a 2x3 or 3x3 affine matrix.
+
+    All four corners of each box are transformed and the result is their
+    axis-aligned bounding box, so rotations and flips stay exact.
+    """
+    # One 2-D product over all corners; a stacked (M, 4, 2) matmul is far slower
+    points = corners[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 2)
+    mapped = (points @ matrix[:2, :2].T + matrix[:2, 2]).reshape(-1, 4, 2)
+    return np.concatenate([mapped.min(axis=1), mapped.max(axis=1)], axis=1)
+
+
+def normalize_cxcywh(boxes: np.ndarray, widths: np.ndarray, heights: np.ndarray) -> np.ndarray:
+    """Convert (M, 4) COCO boxes to YOLO [cx, cy, w, h] normalized by image size."""
+    sizes = np.stack([widths, heights], axis=1)
+    normalized = np.empty_like(boxes)
+    normalized[:, :2] = (boxes[:, :2] + boxes[:, 2:] / 2) / sizes
+    normalized[:, 2:] = boxes[:, 2:] / sizes
+    return normalized
+
+
+@dataclass
+class AnnotationTable:
+    """
+    Columnar intermediate for annotation format conversion.
+
+    Per-image columns hold one value per image; per-box columns hold one
+    value per bounding box and are ordered by box_image, so geometric
+    conversions run as single array operations over every box at once.
+    """
+
+    # Per image
+    image_ids: np.ndarray  # (N,) int64 ids, unique within an export
+    source_ids: List[str]
+    file_names: List[str]
+    splits: List[str]
+    widths: np.ndarray  # (N,) float64
+    heights: np.ndarray  # (N,) float64
+
+    # Per box
+    box_image: np.ndarray  # (M,) int64 local index into the per-image columns
+    class_ids: np.ndarray  # (M,) int64
+    bboxes: np.ndarray  # (M, 4) float64 COCO [x, y, w, h] in pixels
+
+    @classmethod
+    def from_manifest_entries(
+        cls,
+        entries: List[Dict[str, Any]],
+        class_index: Dict[str, int],
+        first_image_id: int = 0,
+    ) -> "AnnotationTable":
+        """
+        Build a table from version manifest entries.
+
+        Args:
+            entries: Manifest entries (storage_path, split, width, height, annotations)
+            class_index: Class name to id mapping; unseen names are appended
+            first_image_id: Id given to the first image of this table
+
+        Returns:
+            The columnar table
+        """
+        counts = [len(entry["annotations"]) for entry in entries]
+        total = sum(counts)
+        bboxes = np.zeros((total, 4), dtype=np.float64)
+        class_ids = np.zeros(total, dtype=np.int64)
+        if total:
+            bboxes[:] = [a["bbox"] for entry in entries for a in entry["annotations"]]
+            class_ids[:] = [
+                class_index.setdefault(a["class_name"], len(class_index))
+                for entry in entries
+                for a in entry["annotations"]
+            ]
+
+        return cls(
+            image_ids=np.arange(first_image_id, first_image_id + len(entries), dtype=np.int64),
+            source_ids=[entry["source_image_id"] for entry in entries],
+            file_names=[entry["storage_path"].rsplit("/", 1)[-1] for entry in entries],
+            splits=[entry["split"] for entry in entries],
+            widths=np.array([entry["width"] for entry in entries], dtype=np.float64),
+            heights=np.array([entry["height"] for entry in entries], dtype=np.float64),
+            box_image=np.repeat(np.arange(len(entries), dtype=np.int64), counts),
+            class_ids=class_ids,
+            bboxes=bboxes,
+        )
+
+    @property
+    def box_widths(self) -> np.ndarray:
+        """Width of the image each box belongs to."""
+        return self.widths[self.box_image]
+
+    @property
+    def box_heights(self) -> np.ndarray:
+        """Height of the image each box belongs to."""
+        return self.heights[self.box_image]
+
+    def box_offsets(self) -> np.ndarray:
+        """(N + 1,) offsets so boxes of image i are [offsets[i], offsets[i + 1])."""
+        counts = np.bincount(self.box_image, minlength=len(self.image_ids))
+        return np.concatenate([[0], np.cumsum(counts)])
+
+    def clipped(self) -> "AnnotationTable":
+        """Return a copy with boxes clipped to their images and empty boxes dropped."""
+        corners = clip_xyxy(xywh_to_xyxy(self.bboxes), self.box_widths, self.box_heights)
+        boxes = xyxy_to_xywh(corners)
+        keep = (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+        return self._with_boxes(keep, boxes[keep])
+
+    def subset(self, image_mask: np.ndarray) -> "AnnotationTable":
+        """Return the images selected by a boolean mask, with their boxes."""
+        keep = image_mask[self.box_image]
+        new_index = np.cumsum(image_mask) - 1
+        selected = np.flatnonzero(image_mask)
+        return AnnotationTable(
+            image_ids=self.image_ids[image_mask],
+            source_ids=[self.source_ids[i] for i in selected],
+            file_names=[self.file_names[i] for i in selected],
+            splits=[self.splits[i] for i in selected],
+            widths=self.widths[image_mask],
+            heights=self.heights[image_mask],
+            box_image=new_index[self.box_image[keep]],
+            class_ids=self.class_ids[keep],
+            bboxes=self.bboxes[keep],
+        )
+
+    def _with_boxes(self, keep: np.ndarray, bboxes: np.ndarray) -> "AnnotationTable":
+        return AnnotationTable(
+            image_ids=self.image_ids,
+            source_ids=self.source_ids,
+            file_names=self.file_names,
+            splits=self.splits,
+            widths=self.widths,
+            heights=self.heights,
+            box_image=self.box_image[keep],
+            class_ids=self.class_ids[keep],
+            bboxes=bboxes,
+        )
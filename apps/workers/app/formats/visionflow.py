@@ -0,0 +1,42 @@
+import json
+from typing import Callable, Iterator, List
+
+from .base import AnnotationFormat, ArchiveFile, register_format
+from .columnar import AnnotationTable
+
+
+@register_format
+class VisionflowFormat(AnnotationFormat):
+    """Native format: images plus a manifest.jsonl per split."""
+
+    name = "visionflow"
+
+    def split_files(
+        self,
+        split: str,
+        tables: Callable[[], Iterator[AnnotationTable]],
+        class_names: List[str],
+    ) -> Iterator[ArchiveFile]:
+        yield f"{split}/manifest.jsonl", self._manifest_lines(tables, class_names)
+
+    def _manifest_lines(
+        self, tables: Callable[[], Iterator[AnnotationTable]], class_names: List[str]
+    ) -> Iterator[bytes]:
+        for table in tables():
+            offsets = table.box_offsets()
+            boxes = table.bboxes.tolist()
+            labels = [class_names[class_id] for class_id in table.class_ids.tolist()]
+            for index, file_name in enumerate(table.file_names):
+                start, end = offsets[index], offsets[index + 1]
+                record = {
+                    "source_image_id": table.source_ids[index],
+                    "split": table.splits[index],
+                    "width": int(table.widths[index]),
+                    "height": int(table.heights[index]),
+                    "annotations": [
+                        {"class_name": label, "bbox": bbox}
+                        for label, bbox in zip(labels[start:end], boxes[start:end])
+                    ],
+                    "file_name": f"{self.image_dir}/{file_name}",
+                }
+                yield (json.dumps(record) + "\n").encode()
@@ -0,0 +1,52 @@
+import posixpath
+from typing import Iterator, List
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .base import AnnotationFormat, ArchiveFile, format_rows, register_format
+from .columnar import AnnotationTable, clip_xyxy, xywh_to_xyxy
+
+_OBJECT = (
+    "  <object><name>%s</name><pose>Unspecified</pose><truncated>0</truncated>"
+    "<difficult>0</difficult><bndbox><xmin>%d</xmin><ymin>%d</ymin>"
+    "<xmax>%d</xmax><ymax>%d</ymax></bndbox></object>\n"
+)
+
+
+@register_format
+class VocFormat(AnnotationFormat):
+    """Pascal VOC XML: one annotation file next to each image."""
+
+    name = "voc"
+    image_dir = ""
+
+    def image_files(self, table: AnnotationTable, class_names: List[str]) -> Iterator[ArchiveFile]:
+        corners = np.rint(
+            clip_xyxy(xywh_to_xyxy(table.bboxes), table.box_widths, table.box_heights)
+        )
+        keep = (corners[:, 2] > corners[:, 0]) & (corners[:, 3] > corners[:, 1])
+
+        rows = np.empty((int(keep.sum()), 5), dtype=object)
+        rows[:, 0] = np.array([escape(name) for name in class_names], dtype=object)[
+            table.class_ids[keep]
+        ]
+        rows[:, 1:] = corners[keep].astype(np.int64)
+        lines = format_rows(_OBJECT, rows)
+        offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(table.box_image[keep], minlength=len(table.image_ids)))]
+        )
+
+        for index, (split, file_name) in enumerate(zip(table.splits, table.file_names)):
+            stem = posixpath.splitext(file_name)[0]
+            xml = (
+                "<annotation>\n"
+                f"  <folder>{escape(split)}</folder>\n"
+                f"  <filename>{escape(file_name)}</filename>\n"
+                f"  <size><width>{int(table.widths[index])}</width>"
+                f"<height>{int(table.heights[index])}</height><depth>3</depth></size>\n"
+                "  <segmented>0</segmented>\n"
+                + "".join(lines[offsets[index]:offsets[index + 1]])
+                + "</annotation>\n"
+            )
+            yield f"{split}/{stem}.xml", [xml.encode()]
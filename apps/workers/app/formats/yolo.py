@@ -0,0 +1,84 @@
+import json
+import posixpath
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from .base import AnnotationFormat, ArchiveFile, register_format
+from .columnar import AnnotationTable, normalize_cxcywh
+
+_ZERO = ord("0")
+
+# data.yaml keys of splits whose directory name differs
+SPLIT_KEYS = {"valid": "val"}
+
+
+def _digits(values: np.ndarray, width: int) -> np.ndarray:
+    """Non-negative ints as zero-padded ASCII digits along a new last axis."""
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=values.dtype)
+    return (values[..., None] // powers % 10 + _ZERO).astype(np.uint8)
+
+
+def encode_label_rows(class_ids: np.ndarray, normalized: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """
+    Encode YOLO label rows as ASCII with array operations only.
+
+    Equivalent to "%d %.6f %.6f %.6f %.6f" per row for coordinates in [0, 1]:
+    every row is laid out in a fixed-width byte matrix, and the unused
+    leading bytes of narrow class ids are dropped with one boolean mask.
+
+    Args:
+        class_ids: (M,) class ids
+        normalized: (M, 4) normalized [cx, cy, w, h] in [0, 1]
+
+    Returns:
+        Tuple of (encoded rows, (M + 1,) byte offsets of each row)
+    """
+    count = len(class_ids)
+    if not count:
+        return b"", np.zeros(1, dtype=np.int64)
+
+    class_width = len(str(int(class_ids.max())))
+    fixed = np.rint(normalized * 1_000_000).astype(np.int32)
+    rows = np.empty((count, class_width + 4 * 9 + 1), dtype=np.uint8)
+    rows[:, :class_width] = _digits(class_ids, class_width)
+    fields = rows[:, class_width:class_width + 4 * 9].reshape(count, 4, 9)
+    fields[:, :, 0] = ord(" ")
+    fields[:, :, 1] = fixed // 1_000_000 + _ZERO
+    fields[:, :, 2] = ord(".")
+    fields[:, :, 3:] = _digits(fixed % 1_000_000, 6)
+    rows[:, -1] = ord("\n")
+
+    # Leading zeros of the class id are padding, except the last digit
+    powers = 10 ** np.arange(class_width - 1, 0, -1, dtype=np.int64)
+    padding = class_ids[:, None] < powers
+    keep = np.ones(rows.shape, dtype=bool)
+    keep[:, :class_width - 1] = ~padding
+    lengths = rows.shape[1] - padding.sum(axis=1)
+    return rows[keep].tobytes(), np.concatenate([[0], np.cumsum(lengths)])
+
+
+@register_format
+class YoloFormat(AnnotationFormat):
+    """YOLOv5/v8 TXT: one label file per image plus data.yaml."""
+
+    name = "yolo"
+
+    def image_files(self, table: AnnotationTable, class_names: List[str]) -> Iterator[ArchiveFile]:
+        table = table.clipped()
+        normalized = normalize_cxcywh(table.bboxes, table.box_widths, table.box_heights)
+        encoded, row_offsets = encode_label_rows(table.class_ids, normalized)
+        offsets = row_offsets[table.box_offsets()].tolist()
+
+        for index, (split, file_name) in enumerate(zip(table.splits, table.file_names)):
+            stem = posixpath.splitext(file_name)[0]
+            yield f"{split}/labels/{stem}.txt", [encoded[offsets[index]:offsets[index + 1]]]
+
+    def dataset_files(self, splits: List[str], class_names: List[str]) -> Iterator[ArchiveFile]:
+        # Ultralytics reads the validation split from val:, whatever its directory
+        lines = [f"{SPLIT_KEYS.get(split, split)}: {split}/images\n" for split in splits]
+        lines.append(f"nc: {len(class_names)}\n")
+        lines.append("names:\n")
+        # A JSON string is a valid YAML double-quoted scalar, whatever the name holds
+        lines.extend(f"  {class_id}: {json.dumps(name)}\n" for class_id, name in enumerate(class_names))
+        yield "data.yaml", ["".join(lines).encode()]
@@ -1,35 +1,100 @@
+import asyncio
+
 from arq import create_pool
 from arq.connections import RedisSettings
 from .core.config import get_settings
-from .tasks.augmentation import generate_version_task, export_dataset_task
+from .services import scheduler
+from .services.executor import ShardedExecutor
+from .services.scheduler import LONG_LANE, SHORT_LANE, job_slots, lane_queue
+from .tasks.active_learning import active_learning_task
+from .tasks.analytics import box_stats_task, reconcile_project_stats_task
+from .tasks.augmentation import (
+    export_dataset_task,
+    generate_version_task,
+    render_version_outputs_task,
+)
+from .tasks.thumbnails import generate_pyramids_task
 
 settings = get_settings()
 
+FUNCTIONS = [
+    generate_version_task,
+    export_dataset_task,
+    render_version_outputs_task,
+    generate_pyramids_task,
+    reconcile_project_stats_task,
+    box_stats_task,
+    active_learning_task,
+]
+
 
 async def startup(ctx):
     """Startup hook for ARQ worker."""
-    print("ARQ Worker starting...")
+    print(f"ARQ Worker starting ({ctx['lane']} lane)...")
+    # One process pool per worker, shared by all jobs, so start-up cost is paid once
+    ctx["executor"] = ShardedExecutor(max_workers=settings.worker_processes)
+    ctx["executor"].start()
+    ctx["worker_id"] = scheduler.worker_id()
+    ctx["dispatcher"] = asyncio.create_task(
+        scheduler.run_dispatcher(ctx["redis"], ctx["lane"], ctx["worker_id"], job_slots(ctx["lane"]))
+    )
 
 
 async def shutdown(ctx):
     """Shutdown hook for ARQ worker."""
     print("ARQ Worker shutting down...")
+    ctx["dispatcher"].cancel()
+    await scheduler.unregister_worker(ctx["redis"], ctx["lane"], ctx["worker_id"])
+    ctx["executor"].shutdown()
+
+
+async def after_job_end(ctx):
+    """Hand the freed slot to the next job without waiting for the dispatcher tick."""
+    await scheduler.dispatch(ctx["redis"], ctx["lane"], scheduler.tenant_cap(ctx["lane"]))
 
 
 class WorkerSettings:
     """
-    ARQ worker settings.
+    ARQ worker settings for the short lane (thumbnails, small versions).
     This configures the async task queue for long-running jobs.
+
+    Jobs reach the lane's queue through the fair scheduler, never directly.
+    ARQ reads settings from the class __dict__, so LongWorkerSettings
+    repeats them rather than inheriting.
     """
 
-    functions = [generate_version_task, export_dataset_task]
+    functions = FUNCTIONS
+    queue_name = lane_queue(SHORT_LANE)
+    ctx = {"lane": SHORT_LANE}
 
     redis_settings = RedisSettings.from_dsn(settings.redis_url)
 
     on_startup = startup
     on_shutdown = shutdown
+    after_job_end = after_job_end
 
     # Worker configuration
-    max_jobs = 10
-    job_timeout = 3600  # 1 hour
+    max_jobs = job_slots(SHORT_LANE)
+    # Long jobs checkpoint and re-queue themselves before the timeout (JobRuntime)
+    job_timeout = settings.job_timeout
+    max_tries = settings.job_max_tries
     keep_result = 3600  # Keep results for 1 hour
+
+
+class LongWorkerSettings:
+    """ARQ worker settings for the long lane (exports, big versions)."""
+
+    functions = FUNCTIONS
+    queue_name = lane_queue(LONG_LANE)
+    ctx = {"lane": LONG_LANE}
+
+    redis_settings = RedisSettings.from_dsn(settings.redis_url)
+
+    on_startup = startup
+    on_shutdown = shutdown
+    after_job_end = after_job_end
+
+    max_jobs = job_slots(LONG_LANE)
+    job_timeout = settings.job_timeout
+    max_tries = settings.job_max_tries
+    keep_result = 3600
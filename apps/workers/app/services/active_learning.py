@@ -0,0 +1,58 @@
+from typing import List
+
+import numpy as np
+from sqlalchemy import text
+
+from ..core.database import SessionLocal
+
+
+def load_annotated_image_ids(project_id: str) -> np.ndarray:
+    """
+    Ids of a project's images that have at least one annotation.
+
+    Returns:
+        Sorted S16 UUID bytes
+    """
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT i.id
+                FROM public.images i
+                WHERE i.project_id = :project_id
+                AND EXISTS (SELECT 1 FROM public.annotations a WHERE a.image_id = i.id)
+                ORDER BY i.id
+                """
+            ),
+            {"project_id": project_id},
+        ).scalars().all()
+    return np.array([image_id.bytes for image_id in rows], dtype="S16")
+
+
+def save_queue(project_id: str, strategy: str, image_ids: List[str], clusters: List[int]) -> None:
+    """
+    Replace a project's active-learning queue.
+
+    Args:
+        project_id: Project the images belong to
+        strategy: Sampling strategy that ranked them
+        image_ids: Images in priority order
+        clusters: k-means cluster of each image (-1 = none)
+    """
+    with SessionLocal() as db:
+        db.execute(
+            text("DELETE FROM public.active_learning_queue WHERE project_id = :project_id"),
+            {"project_id": project_id},
+        )
+        db.execute(
+            text(
+                """
+                INSERT INTO public.active_learning_queue (project_id, image_id, rank, cluster, strategy)
+                SELECT :project_id, q.image_id, q.rank, NULLIF(q.cluster, -1), :strategy
+                FROM unnest(CAST(:image_ids AS uuid[]), CAST(:clusters AS integer[]))
+                    WITH ORDINALITY AS q(image_id, cluster, rank)
+                """
+            ),
+            {"project_id": project_id, "strategy": strategy, "image_ids": image_ids, "clusters": clusters},
+        )
+        db.commit()
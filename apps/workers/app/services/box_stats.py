@@ -0,0 +1,260 @@
+"""
+Bounding-box geometry statistics: center heatmaps, size and aspect-ratio
+histograms and per-class summaries.
+
+Every statistic is a count or a sum, so partial results over disjoint sets
+of images merge by addition. A version's images are partitioned into
+STATS_BUCKETS fixed id ranges; each bucket's partial is stored under a
+fingerprint of its images' input keys (which change with every annotation
+write), so later versions recompute only the buckets whose annotations
+changed and reuse the stored partials for the rest.
+"""
+import hashlib
+import io
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Cells per axis of the box-center heatmap (centers relative to the image)
+GRID = 64
+# Bins of relative box size sqrt(box area / image area), over [0, 1]
+SIZE_BINS = 50
+# Bins of log2(width / height) in pixels, over [-ASPECT_RANGE, ASPECT_RANGE]
+ASPECT_BINS = 48
+ASPECT_RANGE = 4.0
+# Image id ranges (first id byte) that partials are computed and cached for
+STATS_BUCKETS = 256
+
+# Part of every bucket fingerprint, so changing the binning invalidates partials
+_LAYOUT = f"{GRID}:{SIZE_BINS}:{ASPECT_BINS}:{ASPECT_RANGE}".encode()
+
+# Per-class arrays, first axis indexed like class_names
+_PER_CLASS = ("boxes", "images_with", "centers", "sizes", "aspects", "sums", "squares")
+# Per-box values accumulated in sums and squares, relative to the image
+MOMENTS = ("width", "height", "area")
+
+
+@dataclass
+class BoxStats:
+    """Mergeable box statistics of a set of images."""
+
+    class_names: List[str]
+    images: int
+    empty_images: int  # Images without a valid box
+    invalid_boxes: int  # Boxes with no area, or on images without a size
+    boxes: np.ndarray  # (C,) box count
+    images_with: np.ndarray  # (C,) images with at least one box of the class
+    centers: np.ndarray  # (C, GRID, GRID) box centers, rows are y
+    sizes: np.ndarray  # (C, SIZE_BINS)
+    aspects: np.ndarray  # (C, ASPECT_BINS)
+    sums: np.ndarray  # (C, len(MOMENTS)) sum of each moment
+    squares: np.ndarray  # (C, len(MOMENTS)) sum of its squares
+
+    @classmethod
+    def empty(cls, class_names: List[str]) -> "BoxStats":
+        n = len(class_names)
+        return cls(
+            class_names=list(class_names),
+            images=0,
+            empty_images=0,
+            invalid_boxes=0,
+            boxes=np.zeros(n, np.int64),
+            images_with=np.zeros(n, np.int64),
+            centers=np.zeros((n, GRID, GRID), np.int64),
+            sizes=np.zeros((n, SIZE_BINS), np.int64),
+            aspects=np.zeros((n, ASPECT_BINS), np.int64),
+            sums=np.zeros((n, len(MOMENTS)), np.float64),
+            squares=np.zeros((n, len(MOMENTS)), np.float64),
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        image_sizes: np.ndarray,
+        box_image: np.ndarray,
+        class_ids: np.ndarray,
+        bboxes: np.ndarray,
+        class_names: List[str],
+    ) -> "BoxStats":
+        """
+        Compute the statistics of a set of images in one vectorized pass.
+
+        Args:
+            image_sizes: (N, 2) width and height of each image, in the
+                coordinate space of its boxes
+            box_image: (M,) index of each box's image into image_sizes
+            class_ids: (M,) index of each box's class into class_names
+            bboxes: (M, 4) COCO boxes [x, y, width, height]
+            class_names: Class names, as built by load_bbox_columns()
+
+        Returns:
+            Statistics of the N images
+        """
+        n = len(class_names)
+        image_sizes = np.asarray(image_sizes, dtype=np.float64).reshape(-1, 2)
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        box_image = np.asarray(box_image, dtype=np.int64)
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            image_w = image_sizes[box_image, 0]
+            image_h = image_sizes[box_image, 1]
+            width = bboxes[:, 2] / image_w
+            height = bboxes[:, 3] / image_h
+            center_x = (bboxes[:, 0] + bboxes[:, 2] / 2) / image_w
+            center_y = (bboxes[:, 1] + bboxes[:, 3] / 2) / image_h
+            aspect = np.log2(bboxes[:, 2] / bboxes[:, 3])
+            valid = (width > 0) & (height > 0) & np.isfinite(width + height + center_x + center_y)
+
+        classes, image = class_ids[valid], box_image[valid]
+        width, height, area = width[valid], height[valid], width[valid] * height[valid]
+
+        def bins(values: np.ndarray, low: float, high: float, count: int) -> np.ndarray:
+            scaled = (np.clip(values, low, high) - low) / (high - low) * count
+            return np.minimum(scaled.astype(np.int64), count - 1)
+
+        cell = bins(center_y[valid], 0.0, 1.0, GRID) * GRID + bins(center_x[valid], 0.0, 1.0, GRID)
+        size = bins(np.sqrt(area), 0.0, 1.0, SIZE_BINS)
+        ratio = bins(aspect[valid], -ASPECT_RANGE, ASPECT_RANGE, ASPECT_BINS)
+        moments = np.column_stack([width, height, area])
+
+        # Distinct (image, class) pairs give the images containing each class
+        pairs = np.unique(image * max(n, 1) + classes)
+        return cls(
+            class_names=list(class_names),
+            images=len(image_sizes),
+            empty_images=int(np.count_nonzero(np.bincount(image, minlength=len(image_sizes)) == 0)),
+            invalid_boxes=int(np.count_nonzero(~valid)),
+            boxes=np.bincount(classes, minlength=n),
+            images_with=np.bincount(pairs % max(n, 1), minlength=n),
+            centers=np.bincount(classes * GRID * GRID + cell, minlength=n * GRID * GRID).reshape(n, GRID, GRID),
+            sizes=np.bincount(classes * SIZE_BINS + size, minlength=n * SIZE_BINS).reshape(n, SIZE_BINS),
+            aspects=np.bincount(classes * ASPECT_BINS + ratio, minlength=n * ASPECT_BINS).reshape(n, ASPECT_BINS),
+            sums=np.stack([np.bincount(classes, moments[:, k], minlength=n) for k in range(len(MOMENTS))], axis=1),
+            squares=np.stack([np.bincount(classes, moments[:, k] ** 2, minlength=n) for k in range(len(MOMENTS))], axis=1),
+        )
+
+    @classmethod
+    def merge_all(cls, parts: Iterable["BoxStats"]) -> "BoxStats":
+        """
+        Combine the statistics of disjoint sets of images.
+
+        Classes are matched by name; the merged class order is the order of
+        first appearance.
+        """
+        parts = list(parts)
+        index: Dict[str, int] = {}
+        for part in parts:
+            for name in part.class_names:
+                index.setdefault(name, len(index))
+
+        merged = cls.empty(list(index))
+        for part in parts:
+            rows = np.array([index[name] for name in part.class_names], dtype=np.int64)
+            # rows are distinct, so fancy-indexed += adds every row once
+            for name in _PER_CLASS:
+                getattr(merged, name)[rows] += getattr(part, name)
+            merged.images += part.images
+            merged.empty_images += part.empty_images
+            merged.invalid_boxes += part.invalid_boxes
+        return merged
+
+    def merge(self, other: "BoxStats") -> "BoxStats":
+        return BoxStats.merge_all([self, other])
+
+    def to_bytes(self) -> bytes:
+        """Serialize as .npz (no pickles)."""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            class_names=np.array(self.class_names, dtype=str),
+            counts=np.array([self.images, self.empty_images, self.invalid_boxes], dtype=np.int64),
+            **{name: getattr(self, name) for name in _PER_CLASS},
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BoxStats":
+        """Load statistics serialized by to_bytes()."""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            if arrays["centers"].shape[1:] != (GRID, GRID) or arrays["sizes"].shape[1:] != (SIZE_BINS,):
+                raise Exception("Box statistics were computed with a different binning")
+            images, empty_images, invalid_boxes = (int(value) for value in arrays["counts"])
+            return cls(
+                class_names=arrays["class_names"].tolist(),
+                images=images,
+                empty_images=empty_images,
+                invalid_boxes=invalid_boxes,
+                **{name: arrays[name] for name in _PER_CLASS},
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        JSON-ready view for the heatmap and class-balance pages.
+
+        Histograms are normalized to sum to 1 over all boxes; per-class
+        heatmaps stay in the .npz.
+        """
+        total = int(self.boxes.sum())
+        scale = 1.0 / total if total else 0.0
+        classes = []
+        for c in np.argsort(-self.boxes, kind="stable"):
+            count = int(self.boxes[c])
+            if not count:
+                continue
+            mean = self.sums[c] / count
+            std = np.sqrt(np.maximum(self.squares[c] / count - mean**2, 0.0))
+            classes.append({
+                "class_name": self.class_names[c],
+                "boxes": count,
+                "images": int(self.images_with[c]),
+                "share": count * scale,
+                **{f"mean_{name}": float(value) for name, value in zip(MOMENTS, mean)},
+                **{f"std_{name}": float(value) for name, value in zip(MOMENTS, std)},
+            })
+        return {
+            "images": self.images,
+            "empty_images": self.empty_images,
+            "boxes": total,
+            "invalid_boxes": self.invalid_boxes,
+            "heatmap": (self.centers.sum(axis=0) * scale).tolist(),
+            "size_histogram": {
+                "edges": np.linspace(0.0, 1.0, SIZE_BINS + 1).tolist(),
+                "density": (self.sizes.sum(axis=0) * scale).tolist(),
+            },
+            "aspect_histogram": {
+                "log2_edges": np.linspace(-ASPECT_RANGE, ASPECT_RANGE, ASPECT_BINS + 1).tolist(),
+                "density": (self.aspects.sum(axis=0) * scale).tolist(),
+            },
+            "classes": classes,
+        }
+
+
+def stats_partitions(index: np.ndarray) -> List[Tuple[int, str, np.ndarray]]:
+    """
+    Split a version index into its stats buckets.
+
+    Args:
+        index: Version index (see version_index.INDEX_DTYPE)
+
+    Returns:
+        (bucket, fingerprint, index rows) for every non-empty bucket; the
+        fingerprint covers the bucket's image ids, their input keys and the
+        binning
+    """
+    index = np.sort(index, order="image_id")
+    ids = np.ascontiguousarray(index["image_id"])
+    keys = np.ascontiguousarray(index["input_key"])
+    first_byte = ids.view(np.uint8).reshape(-1, 16)[:, 0]
+    bucket_of = first_byte // (256 // STATS_BUCKETS)
+    buckets, starts = np.unique(bucket_of, return_index=True)
+    ends = np.append(starts[1:], len(index))
+
+    partitions = []
+    for bucket, start, end in zip(buckets, starts, ends):
+        digest = hashlib.sha1(_LAYOUT)
+        digest.update(ids[start:end].tobytes())
+        digest.update(keys[start:end].tobytes())
+        partitions.append((int(bucket), digest.hexdigest(), index[start:end]))
+    return partitions
@@ -0,0 +1,273 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from ..core.database import SessionLocal
+
+
+def load_version(version_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a dataset_versions row together with its project's workspace.
+
+    Returns:
+        Dict with id, project_id, workspace_id, config and status, or None
+    """
+    with SessionLocal() as db:
+        row = db.execute(
+            text(
+                """
+                SELECT dv.id, dv.project_id, p.workspace_id, dv.config, dv.status
+                FROM public.dataset_versions dv
+                JOIN public.projects p ON p.id = dv.project_id
+                WHERE dv.id = :version_id
+                """
+            ),
+            {"version_id": version_id},
+        ).mappings().first()
+        return dict(row) if row else None
+
+
+def find_parent_version(project_id: str, version_id: str, config: Dict[str, Any]) -> Optional[str]:
+    """
+    Find the most recent completed version of a project with the same config.
+
+    JSONB equality ignores key order, so only semantically identical
+    configs match.
+
+    Returns:
+        The parent version id, or None
+    """
+    with SessionLocal() as db:
+        parent_id = db.execute(
+            text(
+                """
+                SELECT id
+                FROM public.dataset_versions
+                WHERE project_id = :project_id
+                AND id != :version_id
+                AND status = 'COMPLETED'
+                AND config = CAST(:config AS jsonb)
+                ORDER BY created_at DESC
+                LIMIT 1
+                """
+            ),
+            {"project_id": project_id, "version_id": version_id, "config": json.dumps(config)},
+        ).scalar()
+        return str(parent_id) if parent_id else None
+
+
+def count_project_images(project_id: str) -> int:
+    """Count the source images of a project."""
+    with SessionLocal() as db:
+        return db.execute(
+            text("SELECT count(*) FROM public.images WHERE project_id = :project_id"),
+            {"project_id": project_id},
+        ).scalar_one()
+
+
+def load_image_hashes(project_id: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load the perceptual hashes of a project's images, in id order.
+
+    Images whose pyramid task has not run yet have no hash and are left out.
+
+    Returns:
+        Tuple of (image ids as S16 UUID bytes, int64 dHashes)
+    """
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT id, phash
+                FROM public.images
+                WHERE project_id = :project_id AND phash IS NOT NULL
+                ORDER BY id
+                """
+            ),
+            {"project_id": project_id},
+        ).all()
+    return (
+        np.array([row[0].bytes for row in rows], dtype="S16"),
+        np.array([row[1] for row in rows], dtype=np.int64),
+    )
+
+
+def iter_project_images(project_id: str, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a project's images in id order using keyset pagination.
+
+    Yields:
+        Dicts with id, storage_path, width, height (displayed), orientation
+        and annotation_revision
+    """
+    last_id = None
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(
+                text(
+                    """
+                    SELECT id, storage_path, width, height, orientation, annotation_revision
+                    FROM public.images
+                    WHERE project_id = :project_id
+                    AND (CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid))
+                    ORDER BY id
+                    LIMIT :page_size
+                    """
+                ),
+                {"project_id": project_id, "last_id": last_id, "page_size": page_size},
+            ).mappings().all()
+
+        if not rows:
+            return
+        for row in rows:
+            yield {**row, "id": str(row["id"])}
+        last_id = str(rows[-1]["id"])
+
+
+def load_image_records(image_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load specific images, with the same fields as iter_project_images().
+
+    Returns:
+        Mapping of image id to record; deleted images are missing
+    """
+    if not image_ids:
+        return {}
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT id, storage_path, width, height, orientation, annotation_revision
+                FROM public.images
+                WHERE id = ANY(CAST(:image_ids AS uuid[]))
+                """
+            ),
+            {"image_ids": image_ids},
+        ).mappings().all()
+    return {str(row["id"]): {**row, "id": str(row["id"])} for row in rows}
+
+
+def load_bbox_annotations(image_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load the bounding-box annotations for a set of images.
+
+    Returns:
+        Mapping of image id to a list of {"class_name", "bbox"} dicts,
+        with bbox in COCO format [x, y, width, height]
+    """
+    annotations: Dict[str, List[Dict[str, Any]]] = {image_id: [] for image_id in image_ids}
+    if not image_ids:
+        return annotations
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT image_id, class_name, data
+                FROM public.annotations
+                WHERE image_id = ANY(CAST(:image_ids AS uuid[]))
+                AND data->>'type' = 'bounding_box'
+                """
+            ),
+            {"image_ids": image_ids},
+        ).mappings().all()
+
+    for row in rows:
+        data = row["data"]
+        annotations[str(row["image_id"])].append({
+            "class_name": row["class_name"],
+            "bbox": [data["x"], data["y"], data["width"], data["height"]],
+        })
+    return annotations
+
+
+def load_bbox_columns(
+    image_ids: List[str], class_index: Dict[str, int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Load the bounding-box annotations of a set of images as columns.
+
+    Box coordinates are extracted from the JSONB data in SQL, so no per-row
+    JSON decoding happens in Python.
+
+    Args:
+        image_ids: Images to load, defining the box_image index
+        class_index: Class name to id mapping; unseen names are appended
+
+    Returns:
+        Tuple of (box_image (M,) int64 index into image_ids, class_ids (M,)
+        int64, bboxes (M, 4) float64 COCO boxes), ordered by image
+    """
+    if not image_ids:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros((0, 4), np.float64)
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT ids.ord - 1, a.class_name,
+                       (a.data->>'x')::float8, (a.data->>'y')::float8,
+                       (a.data->>'width')::float8, (a.data->>'height')::float8
+                FROM unnest(CAST(:image_ids AS uuid[])) WITH ORDINALITY AS ids(id, ord)
+                JOIN public.annotations a ON a.image_id = ids.id
+                WHERE a.data->>'type' = 'bounding_box'
+                ORDER BY ids.ord
+                """
+            ),
+            {"image_ids": image_ids},
+        ).all()
+
+    if not rows:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros((0, 4), np.float64)
+    box_image, class_names, *coordinates = zip(*rows)
+    class_ids = [class_index.setdefault(name, len(class_index)) for name in class_names]
+    return (
+        np.array(box_image, dtype=np.int64),
+        np.array(class_ids, dtype=np.int64),
+        np.column_stack([np.array(column, dtype=np.float64) for column in coordinates]),
+    )
+
+
+def mark_version_processing(version_id: str, total_images: int) -> None:
+    """Move a version to PROCESSING and reset its progress counters."""
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                """
+                UPDATE public.dataset_versions
+                SET status = 'PROCESSING', processed_images = 0, total_images = :total
+                WHERE id = :version_id
+                """
+            ),
+            {"version_id": version_id, "total": total_images},
+        )
+        db.commit()
+
+
+def add_version_progress(version_id: str, processed: int) -> None:
+    """Atomically add processed images to a version's progress counter."""
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                """
+                UPDATE public.dataset_versions
+                SET processed_images = processed_images + :processed
+                WHERE id = :version_id
+                """
+            ),
+            {"version_id": version_id, "processed": processed},
+        )
+        db.commit()
+
+
+def mark_version_status(version_id: str, status: str) -> None:
+    """Set the final status of a version (COMPLETED or FAILED)."""
+    with SessionLocal() as db:
+        db.execute(
+            text("UPDATE public.dataset_versions SET status = :status WHERE id = :version_id"),
+            {"version_id": version_id, "status": status},
+        )
+        db.commit()
@@ -0,0 +1,137 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_EXHAUSTED = object()
+
+
+def shard_items(items: Iterable[T], shard_size: int) -> Iterator[List[T]]:
+    """
+    Split an iterable into consecutive shards without materializing it.
+
+    Args:
+        items: Items to shard (may be a lazy iterator)
+        shard_size: Maximum number of items per shard
+
+    Yields:
+        Lists of at most shard_size items
+    """
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+
+    shard: List[T] = []
+    for item in items:
+        shard.append(item)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def _init_worker_process() -> None:
+    """
+    Process pool initializer.
+    Pays the import cost of OpenCV/albumentations once per process and pins
+    OpenCV to a single thread so N processes do not oversubscribe N cores.
+    """
+    import cv2
+
+    import albumentations  # noqa: F401
+
+    cv2.setNumThreads(1)
+
+
+class ShardedExecutor:
+    """
+    Runs CPU-bound shard functions in a process pool from async code.
+
+    The pool is long-lived (one per ARQ worker) so process start-up and
+    library imports are paid once, not per job. Shards are submitted lazily
+    with a bounded number in flight, and results are yielded as soon as each
+    shard finishes so callers can stream progress.
+    """
+
+    def __init__(self, max_workers: int = 0):
+        """
+        Args:
+            max_workers: Number of worker processes (0 = one per CPU core)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """Create the process pool if it is not already running."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker_process,
+            )
+
+    def shutdown(self) -> None:
+        """Stop the process pool, cancelling shards that have not started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def map_shards(
+        self,
+        fn: Callable[[Any], R],
+        shards: Iterable[Any],
+        max_inflight: int = 0,
+        stop: Optional[Callable[[], bool]] = None,
+    ) -> AsyncIterator[R]:
+        """
+        Apply fn to every shard in the pool, yielding results in completion order.
+
+        Args:
+            fn: Module-level (picklable) function run in a worker process
+            shards: Shard payloads; consumed lazily as capacity frees up
+            max_inflight: Maximum shards submitted at once (0 = 2x processes)
+            stop: Checked before each submission; once it returns True no
+                more shards are submitted and the in-flight ones are drained
+
+        Yields:
+            The return value of fn for each shard
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        limit = max_inflight or self.max_workers * 2
+        shard_iter = iter(shards)
+        pending: set = set()
+        exhausted = False
+
+        async def submit_next() -> None:
+            nonlocal exhausted
+            if stop is not None and stop():
+                exhausted = True
+                return
+            # Building a shard may hit the database, so pull it off the event loop
+            shard = await loop.run_in_executor(None, next, shard_iter, _EXHAUSTED)
+            if shard is _EXHAUSTED:
+                exhausted = True
+                return
+            pending.add(loop.run_in_executor(self._pool, fn, shard))
+
+        try:
+            while not exhausted and len(pending) < limit:
+                await submit_next()
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    # Submit after the caller has handled the result, so a
+                    # stop it requested takes effect immediately
+                    yield future.result()
+                    if not exhausted:
+                        await submit_next()
+        finally:
+            for future in pending:
+                future.cancel()
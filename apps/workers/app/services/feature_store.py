@@ -0,0 +1,80 @@
+"""
+Per-project feature matrices stored as memory-mapped float32 files.
+
+Each project and extractor has a directory under FEATURES_DIR with two
+append-only files:
+
+    vectors.f32   Row-major (N, dim) float32 features
+    ids.bin       (N,) image ids as 16 UUID bytes, row-aligned with vectors
+
+Rows are only ever appended, and vectors are written before their ids, so
+the id file's length is the number of complete rows even after a crash.
+One job writes a project's store at a time (the active-learning task).
+"""
+from pathlib import Path
+
+import numpy as np
+
+from ..core.config import get_settings
+
+ID_DTYPE = np.dtype("S16")
+
+
+class FeatureStore:
+    """Append-only feature matrix of one project and extractor."""
+
+    def __init__(self, root: str, project_id: str, extractor: str, dim: int):
+        """
+        Args:
+            root: Directory holding every project's stores
+            project_id: Project the features belong to
+            extractor: Name of the extractor that produced them
+            dim: Feature length
+        """
+        self.path = Path(root) / project_id / extractor
+        self.dim = dim
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._ids = self.path / "ids.bin"
+        self._vectors = self.path / "vectors.f32"
+
+    def __len__(self) -> int:
+        return self._ids.stat().st_size // ID_DTYPE.itemsize if self._ids.exists() else 0
+
+    def ids(self) -> np.ndarray:
+        """(N,) S16 image ids of the stored rows."""
+        if not len(self):
+            return np.zeros(0, ID_DTYPE)
+        return np.fromfile(self._ids, dtype=ID_DTYPE, count=len(self))
+
+    def vectors(self) -> np.ndarray:
+        """(N, dim) read-only memory map of the stored rows."""
+        rows = len(self)
+        if not rows:
+            return np.zeros((0, self.dim), np.float32)
+        return np.memmap(self._vectors, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Add rows.
+
+        Args:
+            ids: (M,) S16 image ids
+            vectors: (M, dim) features
+        """
+        if len(ids) != len(vectors):
+            raise Exception(f"Got {len(ids)} ids for {len(vectors)} feature rows")
+        if not len(ids):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        rows = len(self)
+        # Drop a partial row a crash may have left after the last complete one
+        with open(self._vectors, "ab") as file:
+            file.truncate(rows * self.dim * 4)
+            file.write(vectors.tobytes())
+        with open(self._ids, "ab") as file:
+            file.write(np.ascontiguousarray(ids, dtype=ID_DTYPE).tobytes())
+
+
+def get_feature_store(project_id: str, extractor: str, dim: int) -> FeatureStore:
+    """Feature store of a project under the configured FEATURES_DIR."""
+    return FeatureStore(get_settings().features_dir, project_id, extractor, dim)
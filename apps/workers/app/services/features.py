@@ -0,0 +1,85 @@
+"""
+Image feature extractors for active-learning sampling.
+
+Extractors turn a decoded image into a fixed-length float32 vector. The
+built-in color_hog extractor needs nothing beyond OpenCV; learned
+embeddings plug in by registering another extractor under a new name and
+setting FEATURE_EXTRACTOR (each extractor has its own feature store).
+"""
+from typing import Dict, List, Type
+
+import cv2
+import numpy as np
+
+EXTRACTORS: Dict[str, Type["FeatureExtractor"]] = {}
+
+
+def register_extractor(extractor_class: Type["FeatureExtractor"]) -> Type["FeatureExtractor"]:
+    """Class decorator that makes a feature extractor available by name."""
+    EXTRACTORS[extractor_class.name] = extractor_class
+    return extractor_class
+
+
+def get_extractor(name: str) -> "FeatureExtractor":
+    """
+    Instantiate a registered feature extractor.
+
+    Raises:
+        Exception: If no extractor is registered under that name
+    """
+    if name not in EXTRACTORS:
+        raise Exception(f"Unsupported feature extractor: {name}")
+    return EXTRACTORS[name]()
+
+
+class FeatureExtractor:
+    """Base class of feature extractors."""
+
+    name = ""
+    dim = 0
+
+    def extract(self, image: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            image: Upright BGR image
+
+        Returns:
+            (dim,) float32 feature vector
+        """
+        raise NotImplementedError
+
+    def extract_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """(len(images), dim) float32 features; override for batched models."""
+        if not images:
+            return np.zeros((0, self.dim), np.float32)
+        return np.stack([self.extract(image) for image in images]).astype(np.float32, copy=False)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+@register_extractor
+class ColorHogExtractor(FeatureExtractor):
+    """
+    HSV color histogram (8x4x4 bins) and a HOG descriptor of the image
+    scaled to 64x64, each L2-normalized so color and shape weigh the same.
+    """
+
+    name = "color_hog"
+    HIST_BINS = (8, 4, 4)
+    HOG_SIZE = 64
+    dim = 8 * 4 * 4 + 576  # 4x4 blocks of 2x2 cells with 9 orientations
+
+    def __init__(self):
+        self._hog = cv2.HOGDescriptor(
+            (self.HOG_SIZE, self.HOG_SIZE), (16, 16), (16, 16), (8, 8), 9
+        )
+
+    def extract(self, image: np.ndarray) -> np.ndarray:
+        small = cv2.resize(image, (self.HOG_SIZE, self.HOG_SIZE), interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        histogram = cv2.calcHist([hsv], [0, 1, 2], None, list(self.HIST_BINS), [0, 180, 0, 256, 0, 256])
+        hog = self._hog.compute(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+        return np.concatenate([_unit(histogram.ravel()), _unit(hog.ravel())]).astype(np.float32)
@@ -0,0 +1,115 @@
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .storage import StorageService
+
+# Decode flags per downscale factor. For JPEG, libjpeg(-turbo) scales in the
+# DCT domain, so a reduced decode does a fraction of the full decode's work.
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def reduction_factor(source_size: Tuple[int, int], resize_config: Optional[Dict[str, Any]]) -> int:
+    """
+    Largest decode downscale that keeps at least the resized resolution.
+
+    Args:
+        source_size: (width, height) of the image as the resize step sees it
+        resize_config: PreprocessingPipeline resize config, or None
+
+    Returns:
+        1, 2, 4 or 8
+    """
+    if not resize_config:
+        return 1
+    width, height = source_size
+    target_w, target_h = resize_config["width"], resize_config["height"]
+    if resize_config.get("mode", "fit") == "stretch":
+        headroom = min(width / target_w, height / target_h)
+    else:
+        headroom = 1 / min(target_w / width, target_h / height)
+    for factor in (8, 4, 2):
+        if headroom >= factor:
+            return factor
+    return 1
+
+
+def decode_image(data, factor: int = 1) -> Optional[np.ndarray]:
+    """
+    Decode an encoded image without applying its EXIF orientation.
+
+    Args:
+        data: Encoded bytes, bytearray or memoryview (not copied)
+        factor: Downscale factor from reduction_factor()
+
+    Returns:
+        BGR image of about 1/factor the stored size, or None if the data
+        cannot be decoded
+    """
+    flags = REDUCED_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+
+
+class ObjectBuffer:
+    """
+    Reusable receive buffer for object downloads.
+
+    Objects are read in chunks straight into one bytearray that is kept
+    between calls and only replaced when a larger object arrives, so the
+    steady state allocates no per-image buffer. botocore does not expose the
+    socket for recv_into, so each chunk is copied once into the buffer; the
+    full-size bytes object and join of StreamingBody.read() are avoided.
+    """
+
+    def __init__(self, initial_size: int = 8 * 1024 * 1024):
+        self._buffer = bytearray(initial_size)
+
+    def read(self, storage: StorageService, storage_path: str) -> memoryview:
+        """
+        Download an object into the buffer.
+
+        The returned view is only valid until the next read.
+
+        Args:
+            storage: Storage service to read from
+            storage_path: The S3 key path
+
+        Returns:
+            Memoryview of the object's bytes
+        """
+        body, length = storage.open_object_stream(storage_path)
+        if length > len(self._buffer):
+            self._buffer = bytearray(int(length * 1.25))
+        view = memoryview(self._buffer)
+        offset = 0
+        try:
+            while offset < length:
+                chunk = body.read(min(READ_CHUNK_SIZE, length - offset))
+                if not chunk:
+                    break
+                view[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+        finally:
+            body.close()
+        if offset != length:
+            raise Exception(f"Short read of {storage_path}: {offset} of {length} bytes")
+        return view[:length]
+
+
+_object_buffer: Optional[ObjectBuffer] = None
+
+
+def get_object_buffer() -> ObjectBuffer:
+    """Return the download buffer of the current process."""
+    global _object_buffer
+    if _object_buffer is None:
+        _object_buffer = ObjectBuffer()
+    return _object_buffer
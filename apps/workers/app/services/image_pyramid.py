@@ -0,0 +1,81 @@
+import posixpath
+from typing import Dict, List, Sequence
+
+import cv2
+import numpy as np
+
+# Level holding the whole image; always JPEG since WebP caps sides at 16383 px
+FULL_LEVEL = "full"
+
+_ENCODE_PARAMS = {
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+}
+
+
+def pyramid_levels(sizes: Sequence[int]) -> List[str]:
+    """Level names for the given longest-side sizes, smallest first."""
+    return [str(size) for size in sorted(set(sizes))] + [FULL_LEVEL]
+
+
+def pyramid_path(storage_path: str, level: str, image_format: str = "webp") -> str:
+    """
+    Deterministic key of one pyramid level, next to the original.
+
+    e.g. tenant/project/cat.jpg -> tenant/project/_pyramid/cat.jpg/256.webp
+
+    Args:
+        storage_path: Key of the original upload
+        level: Level name from pyramid_levels()
+        image_format: Encoding of the sized levels (webp or jpg)
+
+    Returns:
+        The level's S3 key
+    """
+    directory, filename = posixpath.split(storage_path)
+    extension = "jpg" if level == FULL_LEVEL else image_format
+    return posixpath.join(directory, "_pyramid", filename, f"{level}.{extension}")
+
+
+def build_pyramid(
+    image: np.ndarray, sizes: Sequence[int], image_format: str, quality: int
+) -> Dict[str, bytes]:
+    """
+    Encode an image at several resolutions.
+
+    Levels are downscaled with INTER_AREA from the next larger level rather
+    than from the original, so each resize reads at most 1024-px input after
+    the first one. Images smaller than a level are encoded at their own size.
+
+    Args:
+        image: Decoded, displayed-orientation image
+        sizes: Longest-side sizes of the scaled levels
+        image_format: Encoding of the scaled levels (webp or jpg)
+        quality: Encoder quality 1-100
+
+    Returns:
+        Mapping of level name to encoded bytes
+    """
+    if image_format not in _ENCODE_PARAMS:
+        raise Exception(f"Unsupported pyramid format: {image_format}")
+
+    encoded = {}
+    ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise Exception("Could not encode full-resolution level")
+    encoded[FULL_LEVEL] = data.tobytes()
+
+    level_image = image
+    for size in sorted(set(sizes), reverse=True):
+        height, width = level_image.shape[:2]
+        scale = size / max(height, width)
+        if scale < 1:
+            target = (max(1, round(width * scale)), max(1, round(height * scale)))
+            level_image = cv2.resize(level_image, target, interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode(
+            f".{image_format}", level_image, [_ENCODE_PARAMS[image_format], quality]
+        )
+        if not ok:
+            raise Exception(f"Could not encode pyramid level {size}")
+        encoded[str(size)] = data.tobytes()
+    return encoded
@@ -0,0 +1,70 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+
+from ..core.database import SessionLocal
+
+
+def load_images(image_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load the storage paths of a set of images.
+
+    Returns:
+        Dicts with id and storage_path, for the images that still exist
+    """
+    if not image_ids:
+        return []
+    with SessionLocal() as db:
+        rows = db.execute(
+            text(
+                """
+                SELECT id, storage_path
+                FROM public.images
+                WHERE id = ANY(CAST(:image_ids AS uuid[]))
+                ORDER BY id
+                """
+            ),
+            {"image_ids": image_ids},
+        ).mappings().all()
+    return [{**row, "id": str(row["id"])} for row in rows]
+
+
+def record_image_pyramids(results: List[Dict[str, Any]], levels: List[str]) -> None:
+    """
+    Store decoded size, EXIF orientation, perceptual hash and pyramid levels of images.
+
+    Args:
+        results: Dicts with id, width, height (displayed), orientation and
+            phash (signed 64-bit dHash)
+        levels: Pyramid level names written for every image
+    """
+    if not results:
+        return
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                """
+                UPDATE public.images AS i
+                SET width = r.width, height = r.height,
+                    orientation = r.orientation, phash = r.phash,
+                    pyramid_levels = CAST(:levels AS text[])
+                FROM unnest(
+                    CAST(:ids AS uuid[]),
+                    CAST(:widths AS integer[]),
+                    CAST(:heights AS integer[]),
+                    CAST(:orientations AS smallint[]),
+                    CAST(:phashes AS bigint[])
+                ) AS r(id, width, height, orientation, phash)
+                WHERE i.id = r.id
+                """
+            ),
+            {
+                "ids": [r["id"] for r in results],
+                "widths": [r["width"] for r in results],
+                "heights": [r["height"] for r in results],
+                "orientations": [r["orientation"] for r in results],
+                "phashes": [r["phash"] for r in results],
+                "levels": levels,
+            },
+        )
+        db.commit()
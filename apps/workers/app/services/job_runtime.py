@@ -0,0 +1,170 @@
+"""
+Runtime support for long ARQ jobs: progress, cancellation and checkpoints.
+
+State lives in Redis under visionflow:job:<job_key>:
+    progress    Latest progress as JSON, for polling (expires with JOB_STATE_TTL)
+    events      Pub/sub channel carrying every progress update
+    cancel      Set (by the API) to ask the job to stop
+    checkpoint  Hash of completed work, kept across retries of the job
+
+A job that approaches the ARQ job_timeout stops taking new work, drains
+what is in flight and re-queues itself with arq.Retry; the retry resumes
+from the checkpoint instead of starting over. On the last allowed try it
+fails instead, since ARQ would drop a re-queued job without running it.
+"""
+import json
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from arq import Retry
+
+from ..core.config import get_settings
+
+# Progress, cancel flags and checkpoints outlive the job by a week at most
+JOB_STATE_TTL = 7 * 24 * 3600
+
+
+class JobCancelled(Exception):
+    """Raised inside a job whose cancellation was requested."""
+
+
+class JobOutOfTries(Exception):
+    """Raised inside a job that ran out of time on its last allowed try."""
+
+
+def job_state_key(job_key: str, name: str) -> str:
+    """Redis key of one piece of job state, e.g. job_state_key("version:<id>", "progress")."""
+    return f"visionflow:job:{job_key}:{name}"
+
+
+class JobRuntime:
+    """
+    Progress, cancellation and checkpoint handling for one running job.
+
+    Cancellation and the time budget are only observed in report(), so jobs
+    call it after each unit of work (e.g. each finished shard).
+    """
+
+    def __init__(
+        self,
+        redis,
+        job_key: str,
+        time_budget: Optional[float] = None,
+        job_try: int = 1,
+        max_tries: Optional[int] = None,
+    ):
+        """
+        Args:
+            redis: Async Redis client (ctx["redis"] inside ARQ jobs)
+            job_key: Identity of the job's work, stable across retries
+            time_budget: Seconds this try may run before it re-queues itself
+                (None = unlimited)
+            job_try: ARQ attempt number, reported with progress
+            max_tries: Tries ARQ allows the job (None = unlimited)
+        """
+        self.redis = redis
+        self.job_key = job_key
+        self.job_try = job_try
+        self.max_tries = max_tries
+        self.cancelled = False
+        self._deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    @classmethod
+    def for_job(cls, ctx: Dict[str, Any], job_key: str) -> "JobRuntime":
+        """Runtime of the current ARQ job, budgeted to stop before job_timeout."""
+        settings = get_settings()
+        return cls(
+            ctx["redis"],
+            job_key,
+            time_budget=settings.job_timeout - settings.job_checkpoint_margin,
+            job_try=ctx.get("job_try", 1),
+            max_tries=settings.job_max_tries,
+        )
+
+    @property
+    def out_of_time(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    @property
+    def last_try(self) -> bool:
+        return self.max_tries is not None and self.job_try >= self.max_tries
+
+    @property
+    def stopping(self) -> bool:
+        """True once the job should stop taking new work."""
+        return self.cancelled or self.out_of_time
+
+    async def report(self, stage: str, processed: int, total: int, status: str = "running") -> None:
+        """
+        Publish progress and check for a cancellation request.
+
+        Args:
+            stage: What the job is doing, e.g. "processing" or "writing"
+            processed: Units of work done so far
+            total: Total units of work
+            status: running, retrying, completed, failed or cancelled
+        """
+        state = json.dumps({
+            "job": self.job_key,
+            "status": status,
+            "stage": stage,
+            "processed": processed,
+            "total": total,
+            "attempt": self.job_try,
+            "updated_at": time.time(),
+        })
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(job_state_key(self.job_key, "progress"), state, ex=JOB_STATE_TTL)
+            pipe.publish(job_state_key(self.job_key, "events"), state)
+            pipe.exists(job_state_key(self.job_key, "cancel"))
+            *_, cancel_requested = await pipe.execute()
+        self.cancelled = self.cancelled or bool(cancel_requested)
+
+    def raise_if_stopping(self) -> None:
+        """
+        Leave the job if it should stop.
+
+        Raises:
+            JobCancelled: Cancellation was requested
+            Retry: The time budget is used up; ARQ re-queues the job
+            JobOutOfTries: The time budget is used up on the last try, so
+                the job fails (its checkpoint is kept for a manual re-run)
+        """
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job_key} was cancelled")
+        if self.out_of_time and self.last_try:
+            raise JobOutOfTries(f"Job {self.job_key} ran out of time after {self.job_try} tries")
+        if self.out_of_time:
+            raise Retry(defer=1)
+
+    async def load_checkpoint(self) -> Dict[str, bytes]:
+        """Return the checkpoint fields saved by earlier tries (empty if none)."""
+        fields = await self.redis.hgetall(job_state_key(self.job_key, "checkpoint"))
+        return {key.decode() if isinstance(key, bytes) else key: value for key, value in fields.items()}
+
+    async def save_checkpoint(self, fields: Mapping[str, Any]) -> None:
+        """Add fields to the checkpoint."""
+        key = job_state_key(self.job_key, "checkpoint")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=dict(fields))
+            pipe.expire(key, JOB_STATE_TTL)
+            await pipe.execute()
+
+    async def clear_checkpoint(self) -> None:
+        await self.redis.delete(job_state_key(self.job_key, "checkpoint"))
+
+    async def finish(self, status: str, processed: int, total: int) -> None:
+        """
+        Publish the final state and drop the cancel flag.
+
+        The checkpoint is dropped too, except after a failure: re-running
+        the same job then resumes where the failed one stopped.
+
+        Args:
+            status: completed, failed or cancelled
+        """
+        await self.report(status, processed, total, status=status)
+        keys = [job_state_key(self.job_key, "cancel")]
+        if status != "failed":
+            keys.append(job_state_key(self.job_key, "checkpoint"))
+        await self.redis.delete(*keys)
@@ -0,0 +1,89 @@
+import io
+from typing import Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+# EXIF tag 0x0112; values 1-8 name the dihedral transforms of the stored pixels
+ORIENTATION_TAG = 0x0112
+
+
+def read_orientation(data: bytes) -> int:
+    """
+    Read the EXIF orientation of an encoded image.
+
+    Only the file header is parsed; pixels are not decoded.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        Orientation 1-8 (1 = stored as displayed, also used when absent)
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            orientation = image.getexif().get(ORIENTATION_TAG, 1)
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return 1
+    return orientation if orientation in range(1, 9) else 1
+
+
+def orient_image(image: np.ndarray, orientation: int) -> np.ndarray:
+    """
+    Rotate/flip stored pixels into their displayed orientation.
+
+    Args:
+        image: Image decoded with cv2.IMREAD_IGNORE_ORIENTATION
+        orientation: EXIF orientation 1-8
+
+    Returns:
+        The displayed image (the input itself for orientation 1)
+    """
+    if orientation == 2:
+        return cv2.flip(image, 1)
+    if orientation == 3:
+        return cv2.rotate(image, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(image, 0)
+    if orientation == 5:
+        return cv2.transpose(image)
+    if orientation == 6:
+        return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(image), -1)
+    if orientation == 8:
+        return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return image
+
+
+def oriented_shape(shape: Tuple[int, ...], orientation: int) -> Tuple[int, int]:
+    """Displayed (height, width) of an image stored with the given shape."""
+    height, width = shape[:2]
+    return (width, height) if orientation >= 5 else (height, width)
+
+
+def orientation_matrix(orientation: int, width: int, height: int) -> np.ndarray:
+    """
+    3x3 affine matrix mapping stored pixel coordinates to displayed ones.
+
+    Args:
+        orientation: EXIF orientation 1-8
+        width: Stored image width
+        height: Stored image height
+
+    Returns:
+        Matrix matching orient_image for continuous (edge) coordinates
+    """
+    w, h = float(width), float(height)
+    rows = {
+        1: [[1, 0, 0], [0, 1, 0]],
+        2: [[-1, 0, w], [0, 1, 0]],
+        3: [[-1, 0, w], [0, -1, h]],
+        4: [[1, 0, 0], [0, -1, h]],
+        5: [[0, 1, 0], [1, 0, 0]],
+        6: [[0, -1, h], [1, 0, 0]],
+        7: [[0, -1, h], [-1, 0, w]],
+        8: [[0, 1, 0], [-1, 0, w]],
+    }[orientation if orientation in range(1, 9) else 1]
+    return np.array([*rows, [0, 0, 1]], dtype=np.float64)
@@ -0,0 +1,176 @@
+"""
+Perceptual hashes and a Hamming-distance index for near-duplicate images.
+
+Images are hashed with a 64-bit dHash (sign of horizontal gradients on a
+9x8 grayscale thumbnail), which survives re-encoding, resizing and small
+color changes. Hashes are stored as signed BIGINTs on public.images.
+
+Near-duplicates are found by multi-index hashing: the hash is split into
+CHUNKS chunks of CHUNK_BITS bits, and two hashes within Hamming distance d
+differ in at most d // CHUNKS bits on at least one chunk. Probing each
+chunk's sorted values with the few values that close to the query's chunk
+yields a small candidate set, which is then checked exactly. No pair of
+images is ever compared unless they share a (nearly) equal chunk.
+"""
+from functools import lru_cache
+from itertools import combinations
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+CHUNKS = 4
+CHUNK_BITS = 16
+# Re-encoded or resized copies of a frame are usually within a few bits.
+# Below CHUNKS, one chunk must match exactly, so each probe is a single
+# binary search per chunk; every CHUNKS bits more multiply the probes by
+# about CHUNK_BITS.
+DEFAULT_MAX_DISTANCE = 3
+
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def dhash(image: np.ndarray) -> int:
+    """
+    64-bit difference hash of a decoded image.
+
+    Args:
+        image: BGR or grayscale image, as decoded by OpenCV (upright)
+
+    Returns:
+        The hash as a signed 64-bit integer (the BIGINT stored in Postgres)
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">i8")[0])
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Element-wise Hamming distance of two arrays of 64-bit hashes."""
+    xor = np.ascontiguousarray(np.bitwise_xor(np.asarray(a).view(np.uint64), np.asarray(b).view(np.uint64)))
+    return _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+
+
+@lru_cache(maxsize=None)
+def chunk_masks(bits: int) -> np.ndarray:
+    """All CHUNK_BITS-bit masks with at most bits bits set."""
+    masks = [0]
+    for count in range(1, bits + 1):
+        masks.extend(sum(1 << bit for bit in flipped) for flipped in combinations(range(CHUNK_BITS), count))
+    return np.array(masks, dtype=np.uint64)
+
+
+def _chunk(hashes: np.ndarray, k: int) -> np.ndarray:
+    shift = np.uint64(CHUNK_BITS * (CHUNKS - 1 - k))
+    return (hashes >> shift) & np.uint64((1 << CHUNK_BITS) - 1)
+
+
+class HammingIndex:
+    """
+    Multi-index hashing over a fixed set of 64-bit hashes.
+
+    Each chunk is kept as a sorted array, so a probe is a binary search.
+    Positions returned refer to the hashes the index was built from.
+    """
+
+    def __init__(self, hashes: np.ndarray):
+        """
+        Args:
+            hashes: (N,) int64 or uint64 hashes
+        """
+        self.hashes = np.ascontiguousarray(hashes).view(np.uint64)
+        self._order = []
+        self._keys = []
+        for k in range(CHUNKS):
+            chunk = _chunk(self.hashes, k)
+            order = np.argsort(chunk, kind="stable")
+            self._order.append(order)
+            self._keys.append(chunk[order])
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _candidates(self, queries: np.ndarray, max_distance: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(query position, indexed position) pairs sharing a close chunk, with repeats."""
+        masks = chunk_masks(max_distance // CHUNKS)
+        sources, targets = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)]
+        for k in range(CHUNKS):
+            probes = (_chunk(queries, k)[:, None] ^ masks[None, :]).ravel()
+            lo = np.searchsorted(self._keys[k], probes, side="left")
+            counts = np.searchsorted(self._keys[k], probes, side="right") - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expand each [lo, lo + count) range without a Python loop
+            starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            sources.append(np.repeat(np.arange(len(probes)) // len(masks), counts))
+            targets.append(self._order[k][starts + np.arange(total)])
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def query(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hashes within max_distance of value.
+
+        Returns:
+            Tuple of (positions, distances), nearest first
+        """
+        queries = np.array([value], dtype=np.int64).view(np.uint64)
+        _, targets = self._candidates(queries, max_distance)
+        targets = np.unique(targets)
+        distances = hamming(self.hashes[targets], np.repeat(queries, len(targets)))
+        keep = distances <= max_distance
+        order = np.argsort(distances[keep], kind="stable")
+        return targets[keep][order], distances[keep][order]
+
+    def pairs(self, max_distance: int = DEFAULT_MAX_DISTANCE, batch: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        All pairs of indexed hashes within max_distance of each other.
+
+        Candidates grow with the square of the number of equal hashes, so
+        collapse identical hashes first (as duplicate_clusters() does).
+
+        Returns:
+            Tuple of (i, j) position arrays with i < j, each pair once
+        """
+        found = [np.zeros(0, np.int64)]
+        n = len(self.hashes)
+        for first in range(0, n, batch):
+            sources, targets = self._candidates(self.hashes[first:first + batch], max_distance)
+            sources += first
+            forward = sources < targets
+            sources, targets = sources[forward], targets[forward]
+            close = hamming(self.hashes[sources], self.hashes[targets]) <= max_distance
+            found.append(np.unique(sources[close] * n + targets[close]))
+        pairs = np.concatenate(found)
+        return pairs // max(n, 1), pairs % max(n, 1)
+
+
+def duplicate_clusters(hashes: np.ndarray, max_distance: int = DEFAULT_MAX_DISTANCE) -> np.ndarray:
+    """
+    Group hashes into clusters of near-duplicates (connected components of
+    the within-max_distance relation).
+
+    Args:
+        hashes: (N,) int64 or uint64 hashes
+
+    Returns:
+        (N,) position of the first member of each hash's cluster
+    """
+    hashes = np.ascontiguousarray(hashes).view(np.uint64)
+    unique, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    i, j = HammingIndex(unique).pairs(max_distance)
+
+    # Min-label propagation with pointer jumping; labels only decrease and
+    # every component ends at its smallest member
+    labels = np.arange(len(unique))
+    while len(i) and not np.array_equal(labels[i], labels[j]):
+        low = np.minimum(labels[i], labels[j])
+        np.minimum.at(labels, i, low)
+        np.minimum.at(labels, j, low)
+        labels = labels[labels]
+
+    # Report clusters by their first position in the input
+    first_of_label = np.full(len(unique), len(hashes), dtype=np.int64)
+    np.minimum.at(first_of_label, labels, first)
+    return first_of_label[labels][inverse]
@@ -0,0 +1,201 @@
+import fcntl
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import cv2
+import numpy as np
+
+from ..core.config import get_settings
+from .storage import StorageService, get_storage_service
+
+
+def cache_key(source_etag: str, config_fingerprint: str) -> str:
+    """
+    Content address of a preprocessed image.
+
+    Args:
+        source_etag: ETag (content hash) of the source object
+        config_fingerprint: Canonical hash of the preprocessing config
+
+    Returns:
+        Hex digest identifying the preprocessed output
+    """
+    return hashlib.sha256(f"{source_etag}:{config_fingerprint}".encode()).hexdigest()
+
+
+class PreprocessCache:
+    """
+    Two-tier content-addressed cache of preprocessed images.
+
+    The local tier stores raw .npy arrays on disk and is trimmed to a size cap
+    by least-recent use (file mtime, refreshed on every hit). Several pool
+    processes may share the directory: writes are atomic renames, and the
+    tier's total size is kept in a size file that every process updates
+    under an exclusive flock, so the cap holds for all of them together.
+    Eviction runs under the same lock and rescans the directory, which also
+    corrects any drift of the counter. The optional shared tier stores
+    lossless PNGs in S3 so entries survive pod restarts and are shared
+    across workers.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int,
+        storage: Optional[StorageService] = None,
+    ):
+        """
+        Args:
+            cache_dir: Directory of the local tier
+            max_bytes: Size cap of the local tier
+            storage: Storage service for the shared tier (None = local only)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.storage = storage
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._size_path = self.cache_dir / "size"
+        with self._locked_size() as fd:
+            self._write_size(fd, sum(size for _, size, _ in self._scan()))
+        self.stats: Dict[str, int] = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.npy"
+
+    def _scan(self):
+        for entry_dir in self.cache_dir.iterdir():
+            if not entry_dir.is_dir():
+                continue
+            for entry in os.scandir(entry_dir):
+                if entry.name.endswith(".npy"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Replaced or removed since listed
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    @contextmanager
+    def _locked_size(self) -> Iterator[int]:
+        """Hold the exclusive lock of the size file, yielding its descriptor."""
+        fd = os.open(self._size_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)  # Releases the lock
+
+    @staticmethod
+    def _read_size(fd: int) -> int:
+        data = os.pread(fd, 8, 0)
+        return int.from_bytes(data, "little") if len(data) == 8 else 0
+
+    @staticmethod
+    def _write_size(fd: int, size: int) -> None:
+        os.pwrite(fd, max(size, 0).to_bytes(8, "little"), 0)
+
+    def get(self, key: str, namespace: str) -> Optional[np.ndarray]:
+        """
+        Look up a preprocessed image, local tier first.
+
+        Args:
+            key: Cache key from cache_key()
+            namespace: Storage prefix of the shared tier (e.g. the workspace id)
+
+        Returns:
+            The cached image, or None on a miss in both tiers
+        """
+        path = self._path(key)
+        try:
+            image = np.load(path, allow_pickle=False)
+            os.utime(path)
+            self.stats["local_hits"] += 1
+            return image
+        except (FileNotFoundError, ValueError, EOFError):
+            pass
+
+        if self.storage is not None:
+            data = self.storage.find_object_bytes(self._shared_path(key, namespace))
+            if data is not None:
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+                if image is not None:
+                    self._put_local(key, image)
+                    self.stats["shared_hits"] += 1
+                    return image
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, namespace: str, image: np.ndarray) -> None:
+        """Store a preprocessed image in both tiers."""
+        self._put_local(key, image)
+        if self.storage is not None:
+            ok, encoded = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if not ok:
+                raise Exception(f"Could not encode cache entry {key}")
+            self.storage.put_object_bytes(
+                self._shared_path(key, namespace), encoded.tobytes(), "image/png"
+            )
+
+    def _shared_path(self, key: str, namespace: str) -> str:
+        return f"{namespace}/cache/preprocessed/{key}.png"
+
+    def _put_local(self, key: str, image: np.ndarray) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        buffer = io.BytesIO()
+        np.save(buffer, image, allow_pickle=False)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(buffer.getbuffer())
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._locked_size() as fd:
+            size = self._read_size(fd) + buffer.tell() - replaced
+            if size > self.max_bytes:
+                size = self._evict()
+            self._write_size(fd, size)
+
+    def _evict(self) -> int:
+        """
+        Delete least recently used entries until the tier is at 90% of its cap.
+
+        Call with the size lock held.
+
+        Returns:
+            Size of the remaining entries
+        """
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+
+_preprocess_cache: Optional[PreprocessCache] = None
+
+
+def get_preprocess_cache() -> PreprocessCache:
+    """Return the preprocess cache for the current process."""
+    global _preprocess_cache
+    if _preprocess_cache is None:
+        settings = get_settings()
+        _preprocess_cache = PreprocessCache(
+            settings.preprocess_cache_dir,
+            settings.preprocess_cache_max_bytes,
+            get_storage_service() if settings.preprocess_cache_shared else None,
+        )
+    return _preprocess_cache
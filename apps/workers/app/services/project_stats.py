@@ -0,0 +1,28 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+
+from ..core.database import SessionLocal
+
+
+def stats_drift(project_id: str) -> List[Dict[str, Any]]:
+    """
+    Compare a project's analytics counters with a full recompute.
+
+    Returns:
+        Dicts with stat (class, annotator or task), key, stored and actual,
+        one per counter that differs; empty when the counters are exact
+    """
+    with SessionLocal() as db:
+        rows = db.execute(
+            text("SELECT stat, key, stored, actual FROM project_stats_drift(:project_id)"),
+            {"project_id": project_id},
+        ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def rebuild_stats(project_id: str) -> None:
+    """Replace a project's analytics counters with a full recompute."""
+    with SessionLocal() as db:
+        db.execute(text("SELECT rebuild_project_stats(:project_id)"), {"project_id": project_id})
+        db.commit()
@@ -0,0 +1,242 @@
+"""
+Diversity-based selection of images to label, over a feature matrix.
+
+Both strategies read the (possibly memory-mapped) matrix in chunks of
+chunk_rows rows, so memory stays bounded by the chunk plus a few values
+per image, whatever the number of images:
+
+    kmeans   Mini-batch k-means (Sculley, 2010) clusters the images; picks
+             go to the cluster with the fewest labeled-or-picked images
+             first, each time its unlabeled image nearest the centroid.
+    kcenter  Greedy k-center (core-set): each pick is the unlabeled image
+             farthest from every labeled and already picked image.
+"""
+import heapq
+from typing import Optional, Tuple
+
+import numpy as np
+
+STRATEGIES = ("kmeans", "kcenter")
+
+# Labeled images used as initial k-center centers; beyond this a random
+# sample stands in for them, since every center costs a pass over the matrix
+MAX_SEED_CENTERS = 1024
+
+# Centers compared with one chunk at a time, bounding the distance block
+CENTER_BLOCK = 128
+
+
+def _squared_distances(rows: np.ndarray, centers: np.ndarray, center_norms: np.ndarray) -> np.ndarray:
+    """(len(rows), len(centers)) squared Euclidean distances."""
+    rows = np.asarray(rows, dtype=np.float32)
+    distances = np.einsum("ij,ij->i", rows, rows)[:, None] - 2 * rows @ centers.T + center_norms[None, :]
+    return np.maximum(distances, 0, out=distances)
+
+
+def minibatch_kmeans(
+    vectors: np.ndarray,
+    clusters: int,
+    rows: Optional[np.ndarray] = None,
+    batch_size: int = 4096,
+    iterations: int = 100,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Fit centroids with mini-batch k-means.
+
+    Each iteration reads one random batch of rows; every centroid moves to
+    the running mean of the rows ever assigned to it.
+
+    Args:
+        vectors: (N, D) features
+        clusters: Number of centroids (capped at the number of rows)
+        rows: Rows to fit on (None = all)
+        batch_size: Rows per iteration
+        iterations: Number of batches
+        seed: Random seed
+
+    Returns:
+        (clusters, D) float32 centroids
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    clusters = min(clusters, len(rows))
+    if not clusters:
+        return np.zeros((0, vectors.shape[1]), np.float32)
+
+    centroids = np.array(vectors[np.sort(rng.choice(rows, size=clusters, replace=False))], dtype=np.float32)
+    counts = np.zeros(clusters, np.int64)
+    for _ in range(iterations):
+        # Sorted reads keep memory-mapped access sequential
+        batch = np.sort(rng.choice(rows, size=min(batch_size, len(rows)), replace=False))
+        points = np.asarray(vectors[batch], dtype=np.float32)
+        labels = _squared_distances(points, centroids, np.einsum("ij,ij->i", centroids, centroids)).argmin(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        added = np.bincount(labels, minlength=clusters)
+        moved = added > 0
+        total = counts[moved] + added[moved]
+        centroids[moved] += (sums[moved] - added[moved, None] * centroids[moved]) / total[:, None]
+        counts[moved] = total
+    return centroids
+
+
+def assign_clusters(
+    vectors: np.ndarray, centroids: np.ndarray, chunk_rows: int = 16384
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest centroid of every row, chunk by chunk.
+
+    Returns:
+        Tuple of ((N,) int32 cluster, (N,) float32 squared distance to it)
+    """
+    labels = np.zeros(len(vectors), np.int32)
+    distances = np.zeros(len(vectors), np.float32)
+    norms = np.einsum("ij,ij->i", centroids, centroids)
+    for first in range(0, len(vectors), chunk_rows):
+        chunk = _squared_distances(vectors[first:first + chunk_rows], centroids, norms)
+        labels[first:first + len(chunk)] = chunk.argmin(axis=1)
+        distances[first:first + len(chunk)] = chunk[np.arange(len(chunk)), labels[first:first + len(chunk)]]
+    return labels, distances
+
+
+def pick_underrepresented(
+    labels: np.ndarray, distances: np.ndarray, labeled: np.ndarray, candidates: np.ndarray, count: int
+) -> np.ndarray:
+    """
+    Pick images cluster by cluster, least represented cluster first.
+
+    A cluster's representation is its labeled plus already picked images;
+    ties go to the larger cluster. Within a cluster, unlabeled images are
+    taken nearest the centroid first.
+
+    Args:
+        labels: (N,) cluster of every row
+        distances: (N,) distance of every row to its centroid
+        labeled: (N,) True for rows that are already labeled
+        candidates: (N,) True for rows that may be picked
+        count: Number of rows to pick
+
+    Returns:
+        Picked rows, in pick order
+    """
+    clusters = int(labels.max()) + 1 if len(labels) else 0
+    sizes = np.bincount(labels[candidates], minlength=clusters)
+    represented = np.bincount(labels[labeled & candidates], minlength=clusters)
+
+    rows = np.flatnonzero(candidates & ~labeled)
+    rows = rows[np.lexsort((distances[rows], labels[rows]))]
+    starts = np.searchsorted(labels[rows], np.arange(clusters + 1))
+    heap = [
+        (int(represented[c]), -int(sizes[c]), c)
+        for c in range(clusters)
+        if starts[c] < starts[c + 1]
+    ]
+    heapq.heapify(heap)
+
+    picked = []
+    taken = starts[:-1].copy()
+    while heap and len(picked) < count:
+        seen, size, c = heapq.heappop(heap)
+        picked.append(rows[taken[c]])
+        taken[c] += 1
+        if taken[c] < starts[c + 1]:
+            heapq.heappush(heap, (seen + 1, size, c))
+    return np.array(picked, dtype=np.int64)
+
+
+def kcenter_greedy(
+    vectors: np.ndarray,
+    labeled: np.ndarray,
+    candidates: np.ndarray,
+    count: int,
+    chunk_rows: int = 16384,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Greedy k-center selection seeded with the labeled images.
+
+    Keeps every row's distance to its nearest center (one float32 per
+    image); each pick adds one center and updates it in a chunked pass.
+
+    Args:
+        vectors: (N, D) features
+        labeled: (N,) True for rows that are already labeled
+        candidates: (N,) True for rows that may be picked
+        count: Number of rows to pick
+        chunk_rows: Rows read per chunk
+        seed: Random seed for the seed-center sample
+
+    Returns:
+        Picked rows, in pick order
+    """
+    rng = np.random.default_rng(seed)
+    nearest = np.full(len(vectors), np.inf, dtype=np.float32)
+
+    def add_centers(centers: np.ndarray) -> None:
+        norms = np.einsum("ij,ij->i", centers, centers)
+        for first in range(0, len(vectors), chunk_rows):
+            rows = np.asarray(vectors[first:first + chunk_rows], dtype=np.float32)
+            closest = nearest[first:first + len(rows)]
+            for block in range(0, len(centers), CENTER_BLOCK):
+                distances = _squared_distances(
+                    rows, centers[block:block + CENTER_BLOCK], norms[block:block + CENTER_BLOCK]
+                )
+                np.minimum(closest, distances.min(axis=1), out=closest)
+
+    seeds = np.flatnonzero(labeled)
+    if len(seeds) > MAX_SEED_CENTERS:
+        seeds = np.sort(rng.choice(seeds, size=MAX_SEED_CENTERS, replace=False))
+    if len(seeds):
+        add_centers(np.asarray(vectors[seeds], dtype=np.float32))
+
+    eligible = candidates & ~labeled
+    picked = []
+    for _ in range(min(count, int(eligible.sum()))):
+        row = int(np.argmax(np.where(eligible, nearest, np.float32(-1))))
+        picked.append(row)
+        eligible[row] = False
+        add_centers(np.asarray(vectors[row:row + 1], dtype=np.float32))
+    return np.array(picked, dtype=np.int64)
+
+
+def select_images(
+    vectors: np.ndarray,
+    labeled: np.ndarray,
+    candidates: np.ndarray,
+    count: int,
+    strategy: str = "kmeans",
+    clusters: int = 100,
+    chunk_rows: int = 16384,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Choose the next images to label.
+
+    Args:
+        vectors: (N, D) features, e.g. FeatureStore.vectors()
+        labeled: (N,) True for rows that are already labeled
+        candidates: (N,) True for rows that still exist and may be picked
+        count: Number of images to pick
+        strategy: kmeans or kcenter
+        clusters: Number of k-means clusters
+        chunk_rows: Rows read per chunk
+        seed: Random seed
+
+    Returns:
+        Tuple of (picked rows in priority order, their cluster or -1 for kcenter)
+
+    Raises:
+        Exception: If the strategy is unknown
+    """
+    if strategy not in STRATEGIES:
+        raise Exception(f"Unsupported sampling strategy: {strategy}")
+    if not candidates.any():
+        return np.zeros(0, np.int64), np.zeros(0, np.int32)
+    if strategy == "kmeans":
+        centroids = minibatch_kmeans(vectors, clusters, rows=np.flatnonzero(candidates), seed=seed)
+        labels, distances = assign_clusters(vectors, centroids, chunk_rows)
+        picked = pick_underrepresented(labels, distances, labeled, candidates, count)
+        return picked, labels[picked]
+    picked = kcenter_greedy(vectors, labeled & candidates, candidates, count, chunk_rows, seed)
+    return picked, np.full(len(picked), -1, dtype=np.int32)
@@ -0,0 +1,297 @@
+"""
+Fair scheduling of ARQ jobs across workspaces.
+
+The API does not push jobs straight onto an ARQ queue. It submits them to
+a per-workspace FIFO in one of two lanes (short: thumbnails and small
+versions; long: exports and big versions), and workers move them onto the
+lane's ARQ queue only while the lane has a free job slot. The ARQ queue
+therefore never holds more than the fleet can start, and which workspace
+goes next is decided at dispatch time:
+
+- Start-time fair queuing: a workspace's next job is tagged with
+  max(lane virtual time, the workspace's finish tag). The lowest tag is
+  dispatched and advances the workspace's finish tag by the job's cost
+  (images), so workspaces share a lane by work rather than job count.
+- Per-workspace caps: a workspace holds at most tenant_max_*_jobs of a
+  lane's slots, so one backlog cannot occupy the whole lane.
+
+Redis layout under visionflow:sched:<lane>: (keep in sync with the API's
+services/jobs.py, which submits jobs)
+    active        Set of workspaces with pending jobs
+    pending:<ws>  List of a workspace's pending job ids, oldest first
+    jobs          Hash job id -> serialized ARQ job
+    cost          Hash job id -> cost
+    running       Hash job id -> workspace, for jobs handed to ARQ
+    finish        Hash workspace -> finish tag
+    vtime         Lane virtual time
+    workers       Sorted set worker id -> heartbeat expiry
+    slots         Hash worker id -> job slots of that worker
+"""
+import asyncio
+import os
+import socket
+import time
+from collections import Counter, deque
+from typing import Dict, List, Mapping, Optional
+
+from arq.constants import job_key_prefix
+from redis.exceptions import WatchError
+
+from ..core.config import get_settings
+
+SHORT_LANE = "short"
+LONG_LANE = "long"
+LANES = (SHORT_LANE, LONG_LANE)
+
+# Workers heartbeat their slots every DISPATCH_INTERVAL; missing ones drop out after WORKER_TTL
+DISPATCH_INTERVAL = 1.0
+WORKER_TTL = 30.0
+# Same lifetime ARQ gives enqueued jobs
+JOB_EXPIRES_MS = 24 * 3600 * 1000
+
+
+def sched_key(lane: str, name: str) -> str:
+    """Redis key of one piece of scheduler state, e.g. sched_key("short", "active")."""
+    return f"visionflow:sched:{lane}:{name}"
+
+
+def lane_queue(lane: str) -> str:
+    """ARQ queue name served by the workers of a lane."""
+    return f"visionflow:queue:{lane}"
+
+
+def job_slots(lane: str) -> int:
+    """
+    Concurrent jobs one worker runs in a lane, derived from its process pool.
+
+    Short jobs alternate between I/O in the event loop and CPU work in the
+    pool, so two per process keep the pool busy. Long jobs each keep the
+    whole pool busy through map_shards; a few per worker only let one
+    overlap another's I/O phases.
+    """
+    settings = get_settings()
+    if settings.worker_job_slots:
+        return settings.worker_job_slots
+    processes = settings.worker_processes or os.cpu_count() or 1
+    if lane == LONG_LANE:
+        return max(1, processes // 4)
+    return 2 * processes
+
+
+def tenant_cap(lane: str) -> int:
+    """Most jobs one workspace may run at once in a lane."""
+    settings = get_settings()
+    return settings.tenant_max_long_jobs if lane == LONG_LANE else settings.tenant_max_short_jobs
+
+
+class FairShare:
+    """
+    Start-time fair queuing over workspaces, with a cap on running jobs each.
+
+    Pure policy state, shared by dispatch() and the scheduling benchmark.
+    """
+
+    def __init__(
+        self,
+        tenant_cap: int,
+        virtual_time: float = 0.0,
+        finish: Optional[Mapping[str, float]] = None,
+        running: Optional[Mapping[str, int]] = None,
+    ):
+        """
+        Args:
+            tenant_cap: Most jobs one workspace may run at once
+            virtual_time: Start tag of the last dispatched job
+            finish: Finish tag per workspace (missing = no credit or debt)
+            running: Jobs each workspace already runs
+        """
+        self.tenant_cap = tenant_cap
+        self.virtual_time = virtual_time
+        self.finish = dict(finish or {})
+        self.running = Counter(running or {})
+
+    def pick(self, tenants) -> Optional[str]:
+        """
+        Choose the workspace whose next job runs first.
+
+        Args:
+            tenants: Workspaces with pending jobs
+
+        Returns:
+            The workspace, or None if all are at their cap
+        """
+        best = None
+        for tenant in sorted(tenants):
+            if self.running[tenant] >= self.tenant_cap:
+                continue
+            tag = max(self.virtual_time, self.finish.get(tenant, 0.0))
+            if best is None or tag < best[0]:
+                best = (tag, tenant)
+        return None if best is None else best[1]
+
+    def start(self, tenant: str, cost: float) -> None:
+        """Account for dispatching a job of the given cost."""
+        tag = max(self.virtual_time, self.finish.get(tenant, 0.0))
+        self.virtual_time = tag
+        self.finish[tenant] = tag + cost
+        self.running[tenant] += 1
+
+    def stop(self, tenant: str) -> None:
+        """Account for a finished job."""
+        self.running[tenant] -= 1
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def register_worker(redis, lane: str, worker: str, slots: int) -> None:
+    """Announce (or refresh) a worker's job slots in a lane."""
+    now = time.time()
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zadd(sched_key(lane, "workers"), {worker: now + WORKER_TTL})
+        pipe.hset(sched_key(lane, "slots"), worker, slots)
+        await pipe.execute()
+
+
+async def unregister_worker(redis, lane: str, *workers: str) -> None:
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zrem(sched_key(lane, "workers"), *workers)
+        pipe.hdel(sched_key(lane, "slots"), *workers)
+        await pipe.execute()
+
+
+async def _lane_capacity(redis, lane: str) -> int:
+    """Job slots of the lane's live workers, dropping workers that stopped heartbeating."""
+    now = time.time()
+    workers = await redis.zrangebyscore(sched_key(lane, "workers"), now, "+inf")
+    expired = await redis.zrangebyscore(sched_key(lane, "workers"), "-inf", now)
+    if expired:
+        await unregister_worker(redis, lane, *expired)
+    if not workers:
+        return 0
+    slots = await redis.hmget(sched_key(lane, "slots"), workers)
+    return sum(int(s) for s in slots if s is not None)
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def dispatch(redis, lane: str, cap: int) -> List[str]:
+    """
+    Move pending jobs onto the lane's ARQ queue while it has free slots.
+
+    Safe to run from every worker at once: the state is read under WATCH
+    and written in one transaction, which is retried if another dispatcher
+    or a submission changed it in between.
+
+    Args:
+        redis: Async Redis client
+        lane: SHORT_LANE or LONG_LANE
+        cap: Most jobs one workspace may run at once
+
+    Returns:
+        Ids of the dispatched jobs
+    """
+    running_key = sched_key(lane, "running")
+    active_key = sched_key(lane, "active")
+    capacity = await _lane_capacity(redis, lane)
+
+    async with redis.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(running_key, active_key)
+                running = {_text(k): _text(v) for k, v in (await pipe.hgetall(running_key)).items()}
+                tenants = sorted(_text(t) for t in await pipe.smembers(active_key))
+                pending_keys = [sched_key(lane, f"pending:{t}") for t in tenants]
+                if pending_keys:
+                    await pipe.watch(*pending_keys)
+
+                # Jobs ARQ has finished (or given up on) no longer have a job key
+                job_ids = list(running)
+                async with redis.pipeline(transaction=False) as reads:
+                    for job_id in job_ids:
+                        reads.exists(job_key_prefix + job_id)
+                    reads.get(sched_key(lane, "vtime"))
+                    reads.hgetall(sched_key(lane, "finish"))
+                    *alive, vtime, finish = await reads.execute()
+                finished = [job_id for job_id, live in zip(job_ids, alive) if not live]
+                for job_id in finished:
+                    del running[job_id]
+                free = capacity - len(running)
+
+                queues: Dict[str, deque] = {}
+                lengths: Dict[str, int] = {}
+                if free > 0 and tenants:
+                    async with redis.pipeline(transaction=False) as reads:
+                        for key in pending_keys:
+                            reads.lrange(key, 0, free - 1)
+                            reads.llen(key)
+                        listed = await reads.execute()
+                    for tenant, ids, length in zip(tenants, listed[::2], listed[1::2]):
+                        queues[tenant] = deque(_text(i) for i in ids)
+                        lengths[tenant] = length
+                    head_ids = [i for q in queues.values() for i in q]
+                    costs = dict(zip(head_ids, await redis.hmget(sched_key(lane, "cost"), head_ids))) if head_ids else {}
+
+                share = FairShare(
+                    cap,
+                    float(vtime or 0.0),
+                    {_text(k): float(v) for k, v in finish.items()},
+                    Counter(running.values()),
+                )
+                picked = []
+                while len(picked) < free:
+                    tenant = share.pick([t for t, q in queues.items() if q])
+                    if tenant is None:
+                        break
+                    job_id = queues[tenant].popleft()
+                    share.start(tenant, float(costs.get(job_id) or 1))
+                    picked.append((tenant, job_id))
+                payloads = await redis.hmget(sched_key(lane, "jobs"), [j for _, j in picked]) if picked else []
+
+                taken = Counter(tenant for tenant, _ in picked)
+                pipe.multi()
+                if finished:
+                    pipe.hdel(running_key, *finished)
+                for tenant, length in lengths.items():
+                    if taken[tenant]:
+                        pipe.ltrim(sched_key(lane, f"pending:{tenant}"), taken[tenant], -1)
+                    if taken[tenant] == length:
+                        pipe.srem(active_key, tenant)
+                now_ms = int(time.time() * 1000)
+                for n, ((tenant, job_id), payload) in enumerate(zip(picked, payloads)):
+                    if payload is None:
+                        continue
+                    pipe.set(job_key_prefix + job_id, payload, px=JOB_EXPIRES_MS)
+                    # Distinct scores keep ARQ's start order equal to the dispatch order
+                    pipe.zadd(lane_queue(lane), {job_id: now_ms + n})
+                    pipe.hset(running_key, job_id, tenant)
+                if picked:
+                    pipe.hdel(sched_key(lane, "jobs"), *[j for _, j in picked])
+                    pipe.hdel(sched_key(lane, "cost"), *[j for _, j in picked])
+                    pipe.set(sched_key(lane, "vtime"), share.virtual_time)
+                    pipe.hset(sched_key(lane, "finish"), mapping={t: share.finish[t] for t in taken})
+                await pipe.execute()
+                return [job_id for (_, job_id), payload in zip(picked, payloads) if payload is not None]
+            except WatchError:
+                continue
+
+
+async def run_dispatcher(redis, lane: str, worker: str, slots: int) -> None:
+    """
+    Heartbeat this worker's slots and dispatch the lane until cancelled.
+
+    Jobs are also dispatched as soon as one ends (see main.after_job_end);
+    this loop picks up new submissions and slots freed by other workers.
+    """
+    cap = tenant_cap(lane)
+    while True:
+        try:
+            await register_worker(redis, lane, worker, slots)
+            await dispatch(redis, lane, cap)
+        except Exception as e:
+            # Other workers keep dispatching; retry on the next tick
+            print(f"Scheduler dispatch failed: {e}")
+        await asyncio.sleep(DISPATCH_INTERVAL)
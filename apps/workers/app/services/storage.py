@@ -0,0 +1,124 @@
+import boto3
+from typing import Any, Tuple
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from ..core.config import get_settings
+
+settings = get_settings()
+
+
+class StorageService:
+    """
+    Worker-side access to S3/R2 objects.
+    Workers read source images and write generated artifacts directly,
+    so unlike the API service this wraps object reads and writes.
+    """
+
+    def __init__(self):
+        self.s3_client = boto3.client(
+            's3',
+            endpoint_url=settings.s3_endpoint_url,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+            region_name=settings.s3_region,
+            config=Config(signature_version='s3v4'),
+        )
+        self.bucket_name = settings.s3_bucket_name
+
+    def get_object_bytes(self, storage_path: str) -> bytes:
+        """
+        Download an object into memory.
+
+        Args:
+            storage_path: The S3 key path
+
+        Returns:
+            Object body as bytes
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=storage_path)
+            return response['Body'].read()
+        except ClientError as e:
+            raise Exception(f"Failed to download {storage_path}: {str(e)}")
+
+    def open_object_stream(self, storage_path: str) -> Tuple[Any, int]:
+        """
+        Open an object for streaming reads.
+
+        Args:
+            storage_path: The S3 key path
+
+        Returns:
+            Tuple of (botocore StreamingBody, content length in bytes)
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=storage_path)
+            return response['Body'], response['ContentLength']
+        except ClientError as e:
+            raise Exception(f"Failed to download {storage_path}: {str(e)}")
+
+    def find_object_bytes(self, storage_path: str) -> bytes | None:
+        """
+        Download an object that may not exist.
+
+        Returns:
+            Object body, or None if there is no object at storage_path
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=storage_path)
+            return response['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise Exception(f"Failed to download {storage_path}: {str(e)}")
+
+    def get_object_etag(self, storage_path: str) -> str:
+        """
+        Return an object's ETag without downloading it.
+
+        Args:
+            storage_path: The S3 key path
+
+        Returns:
+            The ETag with surrounding quotes stripped
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=storage_path)
+            return response['ETag'].strip('"')
+        except ClientError as e:
+            raise Exception(f"Failed to read metadata of {storage_path}: {str(e)}")
+
+    def put_object_bytes(self, storage_path: str, body: bytes, content_type: str) -> None:
+        """
+        Upload an in-memory object.
+
+        Args:
+            storage_path: The S3 key path
+            body: Object body
+            content_type: MIME type of the object
+        """
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=storage_path,
+                Body=body,
+                ContentType=content_type,
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to upload {storage_path}: {str(e)}")
+
+
+_storage_service: StorageService | None = None
+
+
+def get_storage_service() -> StorageService:
+    """
+    Return the storage service for the current process.
+
+    boto3 clients must not be shared across forked processes, so each
+    pool worker lazily builds its own client on first use.
+    """
+    global _storage_service
+    if _storage_service is None:
+        _storage_service = StorageService()
+    return _storage_service
@@ -0,0 +1,190 @@
+"""
+Input index of a dataset version, for incremental generation.
+
+Every version stores, next to its manifest, one row per source image it
+covers: the image id, a key of everything its outputs were generated from,
+the manifest part holding its entries and how many entries it has. A new
+version with the same config diffs the project's current images against
+its parent's index, regenerates only added or changed images and inherits
+the parent's manifest parts for everything else.
+"""
+import hashlib
+import io
+import uuid
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .storage import StorageService
+
+INDEX_DTYPE = np.dtype([
+    ("image_id", "S16"),
+    ("input_key", "S8"),
+    ("part", "<i4"),
+    ("outputs", "<i4"),
+])
+
+
+def input_key(record: Dict[str, Any]) -> bytes:
+    """
+    Key of the inputs that determine a source image's outputs.
+
+    Uploaded objects are never overwritten, so the storage path identifies
+    the pixels; annotation_revision changes with every annotation write.
+    duplicate_of (set by deduplicating versions) decides the split.
+    """
+    fields = (
+        record["storage_path"],
+        record["width"],
+        record["height"],
+        record.get("orientation") or 1,
+        record.get("annotation_revision") or 0,
+    )
+    if record.get("duplicate_of"):
+        fields += (record["duplicate_of"],)
+    return hashlib.sha1(repr(fields).encode()).digest()[:8]
+
+
+def image_id_bytes(image_ids: Iterable[str]) -> np.ndarray:
+    """UUID strings as an S16 array that sorts like the UUIDs."""
+    return np.array([uuid.UUID(image_id).bytes for image_id in image_ids], dtype="S16")
+
+
+def image_id_strings(image_ids: np.ndarray) -> List[str]:
+    # S16 drops trailing zero bytes on access
+    return [str(uuid.UUID(bytes=value.ljust(16, b"\0"))) for value in image_ids]
+
+
+def shard_fingerprint(records: List[Dict[str, Any]]) -> str:
+    """Identity of a shard's images and their inputs, for checkpoint matching."""
+    digest = hashlib.sha1()
+    for record in records:
+        digest.update(uuid.UUID(record["id"]).bytes)
+        digest.update(input_key(record))
+    return digest.hexdigest()
+
+
+def build_index(
+    records: List[Dict[str, Any]], part: int, outputs: List[int]
+) -> np.ndarray:
+    """Index rows of source images whose entries were written to one part."""
+    index = np.zeros(len(records), dtype=INDEX_DTYPE)
+    index["image_id"] = image_id_bytes(r["id"] for r in records)
+    index["input_key"] = [input_key(r) for r in records]
+    index["part"] = part
+    index["outputs"] = outputs
+    return index
+
+
+def save_index(storage: StorageService, storage_path: str, index: np.ndarray) -> None:
+    """Sort an index by image id and store it as .npy."""
+    buffer = io.BytesIO()
+    np.save(buffer, np.sort(index, order="image_id"), allow_pickle=False)
+    storage.put_object_bytes(storage_path, buffer.getvalue(), "application/octet-stream")
+
+
+def load_index(storage: StorageService, storage_path: str) -> np.ndarray:
+    """Load an index stored by save_index()."""
+    index = np.load(io.BytesIO(storage.get_object_bytes(storage_path)), allow_pickle=False)
+    if index.dtype != INDEX_DTYPE:
+        raise Exception(f"Version index {storage_path} has an unknown layout")
+    return index
+
+
+class IndexDiff:
+    """
+    Diff of a project's current images against a parent version's index.
+
+    Current images are fed through changed() in id order, page by page, so
+    only the changed ones are held in memory.
+    """
+
+    def __init__(self, parent_index: np.ndarray):
+        self.parent = parent_index
+        self._reused = np.zeros(len(parent_index), dtype=bool)
+
+    def changed(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Match a page of current images against the parent.
+
+        Returns:
+            The records that are new or whose inputs changed
+        """
+        if not records or not len(self.parent):
+            return list(records)
+        ids = image_id_bytes(r["id"] for r in records)
+        keys = np.array([input_key(r) for r in records], dtype="S8")
+        positions = np.minimum(np.searchsorted(self.parent["image_id"], ids), len(self.parent) - 1)
+        same = (self.parent["image_id"][positions] == ids) & (self.parent["input_key"][positions] == keys)
+        self._reused[positions[same]] = True
+        return [record for record, unchanged in zip(records, same) if not unchanged]
+
+    @property
+    def reused_images(self) -> int:
+        return int(self._reused.sum())
+
+    def inherited(
+        self, parent_manifest: Dict[str, Any]
+    ) -> Tuple[List[str], Dict[str, List[str]], np.ndarray]:
+        """
+        Parent manifest parts still needed by the new version.
+
+        Args:
+            parent_manifest: The parent's manifest.json
+
+        Returns:
+            Tuple of (inherited part paths, per part the source image ids
+            whose entries must be skipped, index rows of the reused images
+            renumbered to the inherited parts)
+        """
+        parts = parent_manifest["parts"]
+        reused = self.parent[self._reused]
+        live = np.bincount(reused["part"], minlength=len(parts))
+        kept = np.flatnonzero(live)
+        renumber = np.full(len(parts), -1, dtype=np.int32)
+        renumber[kept] = np.arange(len(kept), dtype=np.int32)
+
+        previous = parent_manifest.get("excluded", {})
+        dropped = self.parent[~self._reused]
+        excluded: Dict[str, List[str]] = {}
+        for part in kept:
+            path = parts[part]
+            ids = previous.get(path, []) + image_id_strings(dropped["image_id"][dropped["part"] == part])
+            if ids:
+                excluded[path] = ids
+
+        reused = reused.copy()
+        reused["part"] = renumber[reused["part"]]
+        return [parts[part] for part in kept], excluded, reused
+
+
+def merge_parts(
+    diff: IndexDiff,
+    parent_manifest: Dict[str, Any] | None,
+    new_parts: Dict[str, np.ndarray],
+) -> Tuple[List[str], Dict[str, List[str]], np.ndarray]:
+    """
+    Combine inherited and newly written manifest parts.
+
+    Args:
+        diff: Diff of the current images against the parent's index
+        parent_manifest: The parent's manifest.json (None = no parent)
+        new_parts: Index rows of each newly written part, keyed by part path
+
+    Returns:
+        Tuple of (part paths, excluded source image ids per inherited part,
+        index of the new version with part numbers into the part paths)
+    """
+    parts: List[str] = []
+    excluded: Dict[str, List[str]] = {}
+    indexes = [np.zeros(0, dtype=INDEX_DTYPE)]
+    if parent_manifest is not None:
+        parts, excluded, reused = diff.inherited(parent_manifest)
+        indexes.append(reused)
+
+    for path in sorted(new_parts):
+        rows = new_parts[path].copy()
+        rows["part"] = len(parts)
+        parts.append(path)
+        indexes.append(rows)
+    return parts, excluded, np.concatenate(indexes)
@@ -0,0 +1,437 @@
+import io
+import json
+import posixpath
+import struct
+import tempfile
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from ..formats import AnnotationTable, ArchiveFile, get_format
+from .storage import StorageService
+
+# S3 rejects non-final multipart parts smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Extensions that are already compressed and are stored rather than deflated
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Zip64-capable "version needed to extract", and general purpose flags:
+# bit 3 (sizes in data descriptor) and bit 11 (UTF-8 names)
+ZIP64_VERSION = 45
+ENTRY_FLAGS = 0x0808
+
+
+class MultipartUploadWriter(io.RawIOBase):
+    """
+    Write-only, unseekable file object backed by an S3 multipart upload.
+
+    Bytes are collected into a part buffer and uploaded as soon as it is
+    full, with at most max_inflight_parts uploads running concurrently, so
+    memory stays bounded by (max_inflight_parts + 1) * part_size regardless
+    of the total object size.
+    """
+
+    def __init__(
+        self,
+        storage: StorageService,
+        storage_path: str,
+        content_type: str,
+        part_size: int = 8 * 1024 * 1024,
+        max_inflight_parts: int = 2,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+
+        self.storage = storage
+        self.storage_path = storage_path
+        self.part_size = part_size
+        self.max_inflight_parts = max_inflight_parts
+        self._buffer = bytearray()
+        self._position = 0
+        self._parts: List[Dict[str, Any]] = []
+        self._inflight: List[Future] = []
+        self._uploader = ThreadPoolExecutor(max_workers=max_inflight_parts)
+
+        try:
+            response = storage.s3_client.create_multipart_upload(
+                Bucket=storage.bucket_name, Key=storage_path, ContentType=content_type
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to start upload of {storage_path}: {str(e)}")
+        self._upload_id = response["UploadId"]
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        self._buffer += view
+        self._position += len(view)
+        while len(self._buffer) >= self.part_size:
+            with memoryview(self._buffer) as buffer:
+                part = bytes(buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+        return len(view)
+
+    def _submit_part(self, body: bytes) -> None:
+        # Wait for the oldest upload when the in-flight limit is reached
+        while len(self._inflight) >= self.max_inflight_parts:
+            self._parts.append(self._inflight.pop(0).result())
+        part_number = len(self._parts) + len(self._inflight) + 1
+        self._inflight.append(self._uploader.submit(self._upload_part, part_number, body))
+
+    def _upload_part(self, part_number: int, body: bytes) -> Dict[str, Any]:
+        response = self.storage.s3_client.upload_part(
+            Bucket=self.storage.bucket_name,
+            Key=self.storage_path,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def close(self) -> None:
+        """Upload the final part and complete the multipart upload."""
+        if self.closed:
+            return
+        try:
+            if self._buffer or not (self._parts or self._inflight):
+                self._submit_part(bytes(self._buffer))
+                self._buffer = bytearray()
+            self._parts.extend(future.result() for future in self._inflight)
+            self._inflight = []
+            self.storage.s3_client.complete_multipart_upload(
+                Bucket=self.storage.bucket_name,
+                Key=self.storage_path,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._uploader.shutdown(wait=True)
+            super().close()
+
+    def abort(self) -> None:
+        """Abandon the upload so S3 discards the parts already sent."""
+        for future in self._inflight:
+            future.cancel()
+        self._uploader.shutdown(wait=True, cancel_futures=True)
+        self.storage.s3_client.abort_multipart_upload(
+            Bucket=self.storage.bucket_name, Key=self.storage_path, UploadId=self._upload_id
+        )
+        super().close()
+
+
+class StreamingZipWriter:
+    """
+    Minimal zip writer for unseekable outputs with constant memory.
+
+    Every entry uses a data descriptor and Zip64 size fields, so nothing has
+    to be known before its data is streamed and archives may exceed 4 GiB.
+    Central directory records are packed to bytes as entries finish and
+    spooled to a temporary file once they outgrow a small in-memory buffer,
+    so memory does not grow with the number of entries (unlike
+    zipfile.ZipFile, which keeps a ZipInfo object per entry).
+    """
+
+    def __init__(self, output: io.RawIOBase):
+        self.output = output
+        self._offset = 0
+        self._entries = 0
+        self._central_directory = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+        now = time.localtime()
+        self._dos_time = (now.tm_hour << 11) | (now.tm_min << 5) | (now.tm_sec // 2)
+        self._dos_date = ((now.tm_year - 1980) << 9) | (now.tm_mon << 5) | now.tm_mday
+
+    def _emit(self, data: bytes) -> None:
+        self.output.write(data)
+        self._offset += len(data)
+
+    def write_entry(self, arcname: str, chunks: Iterable[bytes], compress: bool) -> None:
+        """
+        Stream one entry into the archive.
+
+        Args:
+            arcname: Path of the entry inside the archive
+            chunks: Entry data, in order
+            compress: Deflate the data (False = store as-is)
+        """
+        name = arcname.encode()
+        method = 8 if compress else 0
+        header_offset = self._offset
+
+        self._emit(
+            struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                ZIP64_VERSION,
+                ENTRY_FLAGS,
+                method,
+                self._dos_time,
+                self._dos_date,
+                0,
+                0xFFFFFFFF,
+                0xFFFFFFFF,
+                len(name),
+                20,
+            )
+            + name
+            + struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+        )
+
+        crc = 0
+        size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15) if compress else None
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk) if compressor else chunk
+            compressed_size += len(data)
+            self._emit(data)
+        if compressor:
+            data = compressor.flush()
+            compressed_size += len(data)
+            self._emit(data)
+
+        self._emit(struct.pack("<IIQQ", 0x08074B50, crc, compressed_size, size))
+
+        self._central_directory.write(
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                ZIP64_VERSION | (3 << 8),
+                ZIP64_VERSION,
+                ENTRY_FLAGS,
+                method,
+                self._dos_time,
+                self._dos_date,
+                crc,
+                0xFFFFFFFF,
+                0xFFFFFFFF,
+                len(name),
+                28,
+                0,
+                0,
+                0,
+                0o100644 << 16,
+                0xFFFFFFFF,
+            )
+            + name
+            + struct.pack("<HHQQQ", 0x0001, 24, size, compressed_size, header_offset)
+        )
+        self._entries += 1
+
+    def close(self) -> None:
+        """Write the central directory and the Zip64 end records."""
+        directory_offset = self._offset
+        self._central_directory.seek(0)
+        while chunk := self._central_directory.read(READ_CHUNK_SIZE):
+            self._emit(chunk)
+        self._central_directory.close()
+        directory_size = self._offset - directory_offset
+
+        end_offset = self._offset
+        self._emit(
+            struct.pack(
+                "<IQHHIIQQQQ",
+                0x06064B50,
+                44,
+                ZIP64_VERSION | (3 << 8),
+                ZIP64_VERSION,
+                0,
+                0,
+                self._entries,
+                self._entries,
+                directory_size,
+                directory_offset,
+            )
+        )
+        self._emit(struct.pack("<IIQI", 0x07064B50, 0, end_offset, 1))
+        self._emit(
+            struct.pack(
+                "<IHHHHIIH",
+                0x06054B50,
+                0,
+                0,
+                min(self._entries, 0xFFFF),
+                min(self._entries, 0xFFFF),
+                min(directory_size, 0xFFFFFFFF),
+                min(directory_offset, 0xFFFFFFFF),
+                0,
+            )
+        )
+
+
+def write_object_entry(
+    archive: StreamingZipWriter, arcname: str, storage: StorageService, storage_path: str
+) -> None:
+    """
+    Stream one S3 object into a zip entry without holding it in memory.
+
+    JPEG/PNG/WebP data is stored as-is; other files are deflated.
+    """
+    body, _ = storage.open_object_stream(storage_path)
+    extension = posixpath.splitext(arcname)[1].lower()
+    try:
+        archive.write_entry(
+            arcname,
+            body.iter_chunks(READ_CHUNK_SIZE),
+            compress=extension not in STORED_EXTENSIONS,
+        )
+    finally:
+        body.close()
+
+
+def iter_manifest_parts(
+    storage: StorageService, manifest_path: str
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream the entries of a version manifest, one part at a time.
+
+    Parts inherited from a parent version may hold entries of source images
+    the version regenerated or no longer contains; those are listed under
+    the manifest's "excluded" and skipped.
+    """
+    manifest = json.loads(storage.get_object_bytes(manifest_path))
+    excluded = manifest.get("excluded", {})
+    for part in manifest["parts"]:
+        lines = storage.get_object_bytes(part).decode().splitlines()
+        entries = [json.loads(line) for line in lines if line]
+        if part in excluded:
+            skipped = set(excluded[part])
+            entries = [entry for entry in entries if entry["source_image_id"] not in skipped]
+        if entries:
+            yield entries
+
+
+def iter_manifest_entries(storage: StorageService, manifest_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the entries of a version manifest."""
+    for entries in iter_manifest_parts(storage, manifest_path):
+        yield from entries
+
+
+def iter_manifest_tables(
+    storage: StorageService, manifest_path: str, class_index: Dict[str, int]
+) -> Iterator[AnnotationTable]:
+    """
+    Stream a version manifest as one AnnotationTable per part.
+
+    Image ids run across parts, so repeated passes over the same manifest
+    number images identically.
+    """
+    first_image_id = 1
+    for entries in iter_manifest_parts(storage, manifest_path):
+        table = AnnotationTable.from_manifest_entries(entries, class_index, first_image_id)
+        first_image_id += len(entries)
+        yield table
+
+
+def export_version_archive(
+    storage: StorageService,
+    manifest_path: str,
+    output_path: str,
+    export_format: str = "visionflow",
+    part_size: int = 8 * 1024 * 1024,
+    render: Optional[Callable[[Dict[str, Any]], bytes]] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Stream a dataset version into a zip archive in S3.
+
+    The manifest is read one part at a time into a columnar AnnotationTable.
+    The first pass copies images from S3 into the archive and writes the
+    format's per-image label files; later passes write per-split and
+    dataset-level files. Memory use is bounded by the upload part buffers
+    and one manifest part, independent of the dataset size.
+
+    Args:
+        storage: Storage service used for reads and the multipart upload
+        manifest_path: Storage path of the version manifest.json
+        output_path: Storage path of the zip archive to create
+        export_format: Name of a registered annotation format
+        part_size: Multipart upload part size in bytes
+        render: Renders the image of a manifest entry that has a replay
+            record instead of a stored object (seeded versions)
+        progress: Called with the number of images written after each
+            manifest part; an exception it raises aborts the export
+
+    Returns:
+        Number of images written
+    """
+    annotation_format = get_format(export_format)
+    writer = MultipartUploadWriter(storage, output_path, "application/zip", part_size)
+    archive = StreamingZipWriter(writer)
+    class_index: Dict[str, int] = {}
+    count = 0
+    splits = set()
+    try:
+        first_image_id = 1
+        for entries in iter_manifest_parts(storage, manifest_path):
+            table = AnnotationTable.from_manifest_entries(entries, class_index, first_image_id)
+            first_image_id += len(entries)
+            for entry, file_name in zip(entries, table.file_names):
+                arcname = annotation_format.image_path(entry["split"], file_name)
+                if "replay" in entry:
+                    if render is None:
+                        raise Exception(f"No renderer for replayed output {entry['storage_path']}")
+                    archive.write_entry(arcname, [render(entry)], compress=False)
+                else:
+                    write_object_entry(archive, arcname, storage, entry["storage_path"])
+            _write_files(archive, annotation_format.image_files(table, list(class_index)))
+            splits.update(table.splits)
+            count += len(table.image_ids)
+            if progress is not None:
+                progress(count)
+
+        class_names = list(class_index)
+        for split in sorted(splits):
+            _write_files(
+                archive,
+                annotation_format.split_files(
+                    split, _split_tables(storage, manifest_path, class_index, split), class_names
+                ),
+            )
+        _write_files(archive, annotation_format.dataset_files(sorted(splits), class_names))
+        archive.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    writer.close()
+    return count
+
+
+def _write_files(archive: StreamingZipWriter, files: Iterable[ArchiveFile]) -> None:
+    for arcname, chunks in files:
+        archive.write_entry(arcname, chunks, compress=True)
+
+
+def _split_tables(
+    storage: StorageService, manifest_path: str, class_index: Dict[str, int], split: str
+) -> Callable[[], Iterator[AnnotationTable]]:
+    """Factory of fresh passes over the manifest tables of one split."""
+
+    def tables() -> Iterator[AnnotationTable]:
+        for table in iter_manifest_tables(storage, manifest_path, class_index):
+            mask = np.array([name == split for name in table.splits], dtype=bool)
+            if mask.any():
+                yield table.subset(mask)
+
+    return tables
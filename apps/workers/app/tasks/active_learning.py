@@ -0,0 +1,167 @@
+import asyncio
+from typing import Any, Dict, Iterator, List
+
+import cv2
+import numpy as np
+from arq import Retry
+
+from ..core.config import get_settings
+from ..services import active_learning, dataset_versions
+from ..services.executor import ShardedExecutor, shard_items
+from ..services.feature_store import get_feature_store
+from ..services.features import get_extractor
+from ..services.image_pyramid import pyramid_path
+from ..services.job_runtime import JobCancelled, JobRuntime
+from ..services.sampler import STRATEGIES, select_images
+from ..services.storage import get_storage_service
+from ..services.version_index import image_id_bytes, image_id_strings
+
+
+def extract_feature_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the features of one shard of images (runs in a pool worker).
+
+    Features are computed from the smallest pyramid level, which is already
+    upright and a fraction of the original's size.
+
+    Args:
+        shard: Dict with images (id, storage_path), extractor, level and format
+
+    Returns:
+        Dict with ids (S16), vectors (float32 rows) and unprocessed (ids of
+        images whose pyramid has not been generated yet)
+    """
+    extractor = get_extractor(shard["extractor"])
+    storage = get_storage_service()
+    ids, images, unprocessed = [], [], []
+    for record in shard["images"]:
+        data = storage.find_object_bytes(pyramid_path(record["storage_path"], shard["level"], shard["format"]))
+        if data is None:
+            unprocessed.append(record["id"])
+            continue
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise Exception(f"Could not decode the {shard['level']} level of image {record['id']}")
+        ids.append(record["id"])
+        images.append(image)
+    return {
+        "ids": image_id_bytes(ids),
+        "vectors": extractor.extract_batch(images),
+        "unprocessed": unprocessed,
+    }
+
+
+def _contains(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Membership of ids in a sorted S16 array."""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return sorted_ids[positions] == ids
+
+
+def _feature_shards(
+    project_id: str, stored: np.ndarray, live: List[np.ndarray], shard: Dict[str, Any], shard_size: int
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily build shards of the project's images that have no features yet.
+
+    The ids of every current image are collected into live along the way.
+    """
+    def missing() -> Iterator[Dict[str, Any]]:
+        for page in shard_items(dataset_versions.iter_project_images(project_id), 1000):
+            ids = image_id_bytes(record["id"] for record in page)
+            live.append(ids)
+            for record, known in zip(page, _contains(stored, ids)):
+                if not known:
+                    yield {"id": record["id"], "storage_path": record["storage_path"]}
+
+    for images in shard_items(missing(), shard_size):
+        yield {**shard, "images": images}
+
+
+async def active_learning_task(
+    ctx: Dict[str, Any], project_id: str, strategy: str = "kmeans", count: int = 1000
+) -> int:
+    """
+    ARQ task ranking a project's unlabeled images for labeling.
+
+    Features of images added since the last run are extracted on the
+    worker's process pool and appended to the project's memory-mapped
+    feature store (services/feature_store.py). The store is then read in
+    chunks to select count diverse unlabeled images (services/sampler.py),
+    which replace the project's active_learning_queue. Images whose
+    thumbnail pyramid is not generated yet have no features and are left
+    out until a later run.
+
+    Features are appended after every shard, so a try that times out or is
+    retried resumes extraction where it stopped.
+
+    Args:
+        project_id: Project to sample
+        strategy: kmeans (under-represented clusters first) or kcenter
+        count: Number of images to queue
+
+    Returns:
+        Number of images queued
+    """
+    if strategy not in STRATEGIES:
+        raise Exception(f"Unsupported sampling strategy: {strategy}")
+    settings = get_settings()
+    executor: ShardedExecutor = ctx["executor"]
+    runtime = JobRuntime.for_job(ctx, f"active_learning:{project_id}")
+    extractor = get_extractor(settings.feature_extractor)
+    store = get_feature_store(project_id, extractor.name, extractor.dim)
+
+    stored = np.sort(await asyncio.to_thread(store.ids))
+    total = max(await asyncio.to_thread(dataset_versions.count_project_images, project_id) - len(stored), 0)
+    processed = 0
+    unprocessed = 0
+    live: List[np.ndarray] = []
+    shards = _feature_shards(
+        project_id,
+        stored,
+        live,
+        {"extractor": extractor.name, "level": str(min(settings.pyramid_sizes)), "format": settings.pyramid_format},
+        settings.shard_size,
+    )
+
+    try:
+        async for result in executor.map_shards(extract_feature_shard, shards, stop=lambda: runtime.stopping):
+            await asyncio.to_thread(store.append, result["ids"], result["vectors"])
+            processed += len(result["ids"]) + len(result["unprocessed"])
+            unprocessed += len(result["unprocessed"])
+            await runtime.report("extracting", processed, max(total, processed))
+        runtime.raise_if_stopping()
+
+        await runtime.report("selecting", processed, max(total, processed))
+        ids = await asyncio.to_thread(store.ids)
+        labeled_ids = await asyncio.to_thread(active_learning.load_annotated_image_ids, project_id)
+        picked, clusters = await asyncio.to_thread(
+            select_images,
+            store.vectors(),
+            _contains(labeled_ids, ids),
+            # Features of deleted images stay in the store but are never picked
+            _contains(np.sort(np.concatenate(live)), ids) if live else np.zeros(len(ids), dtype=bool),
+            count,
+            strategy,
+            settings.sampler_clusters,
+            settings.sampler_chunk_rows,
+        )
+        await asyncio.to_thread(
+            active_learning.save_queue, project_id, strategy, image_id_strings(ids[picked]), clusters.tolist()
+        )
+    except JobCancelled:
+        await runtime.finish("cancelled", processed, max(total, processed))
+        raise
+    except Retry:
+        # The last try raises JobOutOfTries instead and fails below
+        await runtime.report("extracting", processed, max(total, processed), status="retrying")
+        raise
+    except Exception:
+        await runtime.finish("failed", processed, max(total, processed))
+        raise
+
+    if unprocessed:
+        print(f"Active learning for project {project_id}: {unprocessed} images have no pyramid yet")
+    await runtime.finish("completed", processed, max(total, processed))
+    return len(picked)
@@ -0,0 +1,224 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..services import dataset_versions, project_stats
+from ..services.box_stats import BoxStats, stats_partitions
+from ..services.executor import ShardedExecutor
+from ..services.job_runtime import JobRuntime
+from ..services.storage import StorageService, get_storage_service
+from ..services.version_index import image_id_strings, input_key, load_index
+
+
+async def reconcile_project_stats_task(ctx: Dict[str, Any], project_id: str) -> int:
+    """
+    ARQ task checking a project's analytics counters against a full recompute.
+
+    The counters are maintained by triggers, so drift means a write path
+    bypassed them (e.g. triggers disabled during a bulk restore). Drifted
+    counters are rebuilt.
+
+    Args:
+        project_id: Project to reconcile
+
+    Returns:
+        Number of counters that had drifted
+    """
+    drift = await asyncio.to_thread(project_stats.stats_drift, project_id)
+    if drift:
+        for row in drift[:20]:
+            print(f"Stats drift in project {project_id}: {row['stat']} {row['key']} stored {row['stored']}, actual {row['actual']}")
+        await asyncio.to_thread(project_stats.rebuild_stats, project_id)
+    return len(drift)
+
+
+@dataclass
+class StatsShard:
+    """The box columns of one stats bucket, binned by one pool worker."""
+
+    bucket: int
+    storage_path: Optional[str]  # Where the bucket's partial is stored; None = not reusable
+    image_sizes: np.ndarray
+    box_image: np.ndarray
+    class_ids: np.ndarray
+    bboxes: np.ndarray
+    class_names: List[str]
+
+
+def compute_stats_shard(shard: StatsShard) -> Tuple[int, BoxStats]:
+    """Compute and store the statistics of one bucket (runs in a pool worker)."""
+    stats = BoxStats.from_columns(
+        shard.image_sizes, shard.box_image, shard.class_ids, shard.bboxes, shard.class_names
+    )
+    if shard.storage_path is not None:
+        get_storage_service().put_object_bytes(shard.storage_path, stats.to_bytes(), "application/octet-stream")
+    return shard.bucket, stats
+
+
+def _partial_path(workspace_id: str, project_id: str, bucket: int, fingerprint: str) -> str:
+    return f"{workspace_id}/{project_id}/box_stats/{bucket:02x}-{fingerprint}.npz"
+
+
+def _stored_partials(
+    storage: StorageService, partitions: List[Tuple[int, str, np.ndarray]]
+) -> Tuple[Dict[int, BoxStats], List[Tuple[int, str, np.ndarray]]]:
+    """Split partitions into those with a stored partial (loaded) and the rest."""
+    stored, missing = {}, []
+    for bucket, path, rows in partitions:
+        data = storage.find_object_bytes(path)
+        if data is None:
+            missing.append((bucket, path, rows))
+        else:
+            stored[bucket] = BoxStats.from_bytes(data)
+    return stored, missing
+
+
+def _build_stats_shards(
+    partitions: List[Tuple[int, str, np.ndarray]], skipped: List[str]
+) -> Iterator[StatsShard]:
+    """
+    Lazily load the box columns of each bucket.
+
+    Images changed or deleted since the version was generated no longer
+    have the version's annotations; they are left out and appended to
+    skipped, and their bucket's partial is not stored for reuse.
+    """
+    for bucket, path, rows in partitions:
+        image_ids = image_id_strings(rows["image_id"])
+        records = dataset_versions.load_image_records(image_ids)
+        changed = {
+            image_id for image_id, key in zip(image_ids, rows["input_key"])
+            if image_id not in records or input_key(records[image_id]) != key
+        }
+        if changed:
+            skipped.extend(sorted(changed))
+            image_ids = [image_id for image_id in image_ids if image_id not in changed]
+
+        class_index: Dict[str, int] = {}
+        box_image, class_ids, bboxes = dataset_versions.load_bbox_columns(image_ids, class_index)
+        yield StatsShard(
+            bucket=bucket,
+            storage_path=None if changed else path,
+            image_sizes=np.array(
+                [[records[i]["width"] or 0, records[i]["height"] or 0] for i in image_ids], dtype=np.float64
+            ),
+            box_image=box_image,
+            class_ids=class_ids,
+            bboxes=bboxes,
+            class_names=list(class_index),
+        )
+
+
+def box_stats_path(prefix: str) -> str:
+    """Storage path of the statistics summary of the version under prefix."""
+    return f"{prefix}/stats/box_stats.json"
+
+
+async def compute_version_box_stats(
+    executor: ShardedExecutor,
+    storage: StorageService,
+    version_id: str,
+    workspace_id: str,
+    project_id: str,
+    index: np.ndarray,
+    runtime: Optional[JobRuntime] = None,
+) -> str:
+    """
+    Compute and cache the box statistics of a version from its index.
+
+    Args:
+        executor: Process pool the buckets are binned on
+        storage: Storage service
+        version_id: Dataset version
+        workspace_id: Workspace of the version's project
+        project_id: Project of the version
+        index: The version index (one row per source image)
+        runtime: Runtime of the calling job; no more buckets are started once
+            it is stopping, and JobCancelled or Retry is raised
+
+    Returns:
+        Storage path of the summary
+    """
+    prefix = f"{workspace_id}/{project_id}/versions/{version_id}"
+    partitions = [
+        (bucket, _partial_path(workspace_id, project_id, bucket, fingerprint), rows)
+        for bucket, fingerprint, rows in stats_partitions(index)
+    ]
+    partials, missing = await asyncio.to_thread(_stored_partials, storage, partitions)
+    reused = len(partials)
+    skipped: List[str] = []
+    async for bucket, stats in executor.map_shards(
+        compute_stats_shard,
+        _build_stats_shards(missing, skipped),
+        stop=(lambda: runtime.stopping) if runtime is not None else None,
+    ):
+        partials[bucket] = stats
+    if runtime is not None:
+        runtime.raise_if_stopping()
+    stats = BoxStats.merge_all(partials[bucket] for bucket in sorted(partials))
+
+    await asyncio.to_thread(
+        storage.put_object_bytes, f"{prefix}/stats/box_stats.npz", stats.to_bytes(), "application/octet-stream"
+    )
+    summary = {
+        "version_id": version_id,
+        **stats.summary(),
+        "skipped_images": len(skipped),
+        "partials": [path for _, path, _ in partitions],
+        "reused_partials": reused,
+    }
+    # Written last: its presence marks the version's statistics as cached
+    summary_path = box_stats_path(prefix)
+    await asyncio.to_thread(
+        storage.put_object_bytes, summary_path, json.dumps(summary).encode(), "application/json"
+    )
+    return summary_path
+
+
+async def box_stats_task(ctx: Dict[str, Any], version_id: str) -> str:
+    """
+    ARQ task computing the box geometry statistics of a completed dataset version.
+
+    Statistics describe the version's source images and annotations: box
+    center heatmap, relative size and aspect-ratio histograms and per-class
+    counts and size moments (see services/box_stats.py). generate_version_task
+    computes them as the last step of generation; this task is for versions
+    generated before that, and recomputes nothing when they are cached.
+    Images annotated again since the version was generated are left out and
+    counted as skipped_images.
+
+    The version's images are processed in id-range buckets on the worker's
+    process pool. Bucket partials are stored per project under a fingerprint
+    of their images' inputs and reused by any version with the same bucket
+    contents, so after new annotations only the buckets they fall in are
+    recomputed. A retried job likewise reuses the buckets it finished.
+
+    Args:
+        version_id: Completed dataset version
+
+    Returns:
+        Storage path of the statistics summary (box_stats.json); the merged
+        per-class arrays are stored next to it as box_stats.npz
+    """
+    executor: ShardedExecutor = ctx["executor"]
+    version = await asyncio.to_thread(dataset_versions.load_version, version_id)
+    if version is None:
+        raise Exception(f"Dataset version {version_id} not found")
+    if version["status"] != "COMPLETED":
+        raise Exception(f"Dataset version {version_id} is {version['status']}, not COMPLETED")
+
+    workspace_id = str(version["workspace_id"])
+    project_id = str(version["project_id"])
+    prefix = f"{workspace_id}/{project_id}/versions/{version_id}"
+    storage = get_storage_service()
+    if await asyncio.to_thread(storage.find_object_bytes, box_stats_path(prefix)) is not None:
+        return box_stats_path(prefix)
+
+    manifest = json.loads(await asyncio.to_thread(storage.get_object_bytes, f"{prefix}/manifest.json"))
+    if "index" not in manifest:
+        raise Exception(f"Dataset version {version_id} has no index; regenerate it to compute statistics")
+    index = await asyncio.to_thread(load_index, storage, manifest["index"])
+    return await compute_version_box_stats(executor, storage, version_id, workspace_id, project_id, index)
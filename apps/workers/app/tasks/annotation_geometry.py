@@ -0,0 +1,98 @@
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def transform_points(points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Map (N, 2) points through a 3x3 affine matrix."""
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def transform_bboxes(
+    bboxes: np.ndarray,
+    matrices: np.ndarray,
+    widths: Union[int, np.ndarray],
+    heights: Union[int, np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map COCO boxes into transformed images and clip them to the images.
+
+    Boxes of many images are transformed together by passing one matrix
+    and output size per box; the work is a fixed number of elementwise
+    array operations regardless of how many images the boxes belong to.
+
+    Args:
+        bboxes: (M, 4) COCO [x, y, w, h] boxes
+        matrices: 3x3 affine shared by all boxes, or (M, 3, 3) per box
+        widths: Output image width, shared or (M,) per box
+        heights: Output image height, shared or (M,) per box
+
+    Returns:
+        Tuple of (kept boxes (K, 4) in COCO format, keep mask (M,)); boxes
+        narrower or shorter than one pixel after clipping are dropped
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    if len(bboxes) == 0:
+        return np.zeros((0, 4), np.float64), np.zeros(0, bool)
+    m = matrices if matrices.ndim == 3 else matrices[None]
+
+    x0, y0 = bboxes[:, 0], bboxes[:, 1]
+    x1, y1 = x0 + bboxes[:, 2], y0 + bboxes[:, 3]
+    corner_x = np.stack([x0, x1, x1, x0], axis=1)
+    corner_y = np.stack([y0, y0, y1, y1], axis=1)
+    mapped_x = m[:, 0, 0, None] * corner_x + m[:, 0, 1, None] * corner_y + m[:, 0, 2, None]
+    mapped_y = m[:, 1, 0, None] * corner_x + m[:, 1, 1, None] * corner_y + m[:, 1, 2, None]
+
+    left = np.maximum(mapped_x.min(axis=1), 0)
+    top = np.maximum(mapped_y.min(axis=1), 0)
+    right = np.minimum(mapped_x.max(axis=1), widths)
+    bottom = np.minimum(mapped_y.max(axis=1), heights)
+    boxes = np.stack([left, top, right - left, bottom - top], axis=1)
+    keep = (boxes[:, 2] >= 1) & (boxes[:, 3] >= 1)
+    return boxes[keep], keep
+
+
+def transform_polygons(
+    polygons: Sequence[np.ndarray], matrix: np.ndarray, width: int, height: int
+) -> List[np.ndarray]:
+    """
+    Map polygons into a transformed image with one matrix product for all.
+
+    Args:
+        polygons: (N_i, 2) vertex arrays
+        matrix: 3x3 affine from vertex coordinates to output pixels
+        width: Output image width
+        height: Output image height
+
+    Returns:
+        Transformed vertex arrays, clamped to the image
+    """
+    if not polygons:
+        return []
+    points = transform_points(np.concatenate(polygons).astype(np.float64), matrix)
+    np.clip(points, 0, [width, height], out=points)
+    return np.split(points, np.cumsum([len(polygon) for polygon in polygons])[:-1])
+
+
+def transform_keypoints(
+    keypoints: np.ndarray, matrix: np.ndarray, width: int, height: int
+) -> np.ndarray:
+    """
+    Map keypoints into a transformed image.
+
+    Args:
+        keypoints: (K, 3) [x, y, visible] rows
+        matrix: 3x3 affine from keypoint coordinates to output pixels
+        width: Output image width
+        height: Output image height
+
+    Returns:
+        (K, 3) keypoints; points that left the image are marked not visible
+    """
+    result = np.array(keypoints, dtype=np.float64).reshape(-1, 3)
+    result[:, :2] = transform_points(result[:, :2], matrix)
+    outside = (
+        (result[:, 0] < 0) | (result[:, 0] > width) | (result[:, 1] < 0) | (result[:, 1] > height)
+    )
+    result[outside, 2] = 0
+    return result
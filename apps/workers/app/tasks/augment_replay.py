@@ -0,0 +1,146 @@
+"""
+Seeded augmentation for replayable dataset versions.
+
+A seeded variant is fully defined by its source image, the version's
+pipeline configuration and a seed, so it can be recorded in the version
+manifest and rendered on demand instead of being stored. Albumentations
+draws its parameters from the global random and numpy.random generators;
+seeded_random pins both for the duration of one transform call.
+"""
+import hashlib
+import random
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..core.config import get_settings
+
+# The generators are process-global, and renders run on several threads of
+# the ARQ process (asyncio.to_thread), so seeded sections run one at a time
+_random_lock = threading.Lock()
+
+
+@contextmanager
+def seeded_random(seed: int) -> Iterator[None]:
+    """
+    Seed the global random generators, restoring their state afterwards.
+
+    Holds a process-wide lock, so seeded sections on other threads cannot
+    draw from (or reseed) the same stream.
+    """
+    with _random_lock:
+        python_state = random.getstate()
+        numpy_state = np.random.get_state()
+        random.seed(seed)
+        np.random.seed(seed)
+        try:
+            yield
+        finally:
+            random.setstate(python_state)
+            np.random.set_state(numpy_state)
+
+
+def variant_seed(source: str, config_hash: str, index: int) -> int:
+    """
+    Seed of one augmented variant.
+
+    Args:
+        source: Identity of the source pixels (ETag, plus orientation)
+        config_hash: Fingerprint of the version's pipeline configuration,
+            which includes the configured base seed
+        index: Variant number within the source image
+
+    Returns:
+        32-bit seed
+    """
+    digest = hashlib.sha256(f"{source}:{config_hash}:{index}".encode()).digest()
+    return int.from_bytes(digest[:4], "big")
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        # Per-pixel draws (e.g. GaussNoise) are reproduced from the seed
+        return None
+    if hasattr(value, "params"):
+        # skimage geometric transforms (Affine)
+        return _jsonable(value.params)
+    return repr(value)
+
+
+def replay_summary(replay: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    JSON form of the parameters an A.ReplayCompose call drew.
+
+    Args:
+        replay: The "replay" output of A.ReplayCompose
+
+    Returns:
+        One {"transform", "applied", "params"} dict per transform, in order;
+        params are only recorded for transforms that fired
+    """
+    summary = []
+    for transform in replay["transforms"]:
+        applied = bool(transform["applied"])
+        summary.append({
+            "transform": transform["__class_fullname__"],
+            "applied": applied,
+            "params": _jsonable(transform["params"]) if applied else None,
+        })
+    return summary
+
+
+class ReplayOutputCache:
+    """
+    In-process LRU cache of rendered replay outputs (encoded bytes).
+
+    Repeated exports and downloads of a version hit the same outputs, so
+    the most recently rendered ones are kept up to a byte budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+_replay_cache: Optional[ReplayOutputCache] = None
+
+
+def get_replay_cache() -> ReplayOutputCache:
+    """Return the replay output cache for the current process."""
+    global _replay_cache
+    if _replay_cache is None:
+        _replay_cache = ReplayOutputCache(get_settings().replay_cache_max_bytes)
+    return _replay_cache
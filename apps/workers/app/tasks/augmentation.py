@@ -1,9 +1,42 @@
+import asyncio
+import hashlib
+import json
+import warnings
 import albumentations as A
 import cv2
 import numpy as np
-from typing import Dict, Any, List
+from arq import Retry
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+from ..core.config import get_settings
+from ..formats import FORMATS
+from ..services import dataset_versions
+from ..services.executor import ShardedExecutor, shard_items
+from ..services.image_decode import decode_image, get_object_buffer, reduction_factor
+from ..services.job_runtime import JobCancelled, JobRuntime
+from ..services.orientation import orient_image, orientation_matrix
+from ..services.phash import DEFAULT_MAX_DISTANCE, duplicate_clusters
+from ..services.preprocess_cache import cache_key, get_preprocess_cache
+from ..services.storage import get_storage_service
+from ..services.version_index import (
+    INDEX_DTYPE,
+    IndexDiff,
+    build_index,
+    image_id_strings,
+    load_index,
+    merge_parts,
+    save_index,
+    shard_fingerprint,
+)
+from ..services.zip_export import export_version_archive, iter_manifest_entries
+from .analytics import compute_version_box_stats
+from .annotation_geometry import transform_bboxes
+from .augment_replay import get_replay_cache, replay_summary, seeded_random, variant_seed
+from .batch_transforms import BoxSet, apply_per_image, apply_vectorized, plan_stages
+from .preprocess_plan import PreprocessPlan
+
 
 class AugmentationPipeline:
     """
@@ -22,15 +55,24 @@ class AugmentationPipeline:
                     "flip_vertical": False,
                     "rotate": {"limit": 15},
                     "brightness_contrast": {"brightness_limit": 0.2, "contrast_limit": 0.2},
-                    "multiplier": 3  # Number of augmented versions per image
+                    "multiplier": 3,  # Number of augmented versions per image
+                    "seed": 42  # Optional: seeded, replayable variants
                 }
         """
         self.config = config
         self.multiplier = config.get("multiplier", 1)
-        self.transform = self._build_transform()
+        self.seed = config.get("seed")
+        self.bbox_params = A.BboxParams(format='coco', label_fields=['class_labels'])
+        self.transforms = self._build_transforms()
+        self.transform = A.Compose(self.transforms, bbox_params=self.bbox_params)
+        self._batch_stages = plan_stages(self.transforms, self.bbox_params)
+        self._rng = np.random.default_rng()
+
+        # ReplayCompose marks its transforms deterministic, so it gets its own instances
+        self.replay_transform = A.ReplayCompose(self._build_transforms(), bbox_params=self.bbox_params)
 
-    def _build_transform(self) -> A.Compose:
-        """Build albumentations transform from config."""
+    def _build_transforms(self) -> List[A.BasicTransform]:
+        """Build the ordered list of albumentations transforms from config."""
         transforms = []
 
         # Flip transformations
@@ -97,10 +139,7 @@ class AugmentationPipeline:
                 )
             )
 
-        return A.Compose(
-            transforms,
-            bbox_params=A.BboxParams(format='coco', label_fields=['class_labels']),
-        )
+        return transforms
 
     def augment_image(
         self,
@@ -143,6 +182,119 @@ class AugmentationPipeline:
 
         return results
 
+    def augment_seeded(
+        self,
+        image: np.ndarray,
+        bboxes: List[List[float]],
+        class_labels: List[str],
+        seeds: List[int],
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply augmentation once per seed, reproducibly.
+
+        The same image and seed always give the same pixels, independent of
+        the boxes passed in (no configured transform draws its parameters
+        from the boxes).
+
+        Args:
+            image: Input image as numpy array
+            bboxes: List of bounding boxes in COCO format [x, y, width, height]
+            class_labels: List of class labels for each bbox
+            seeds: One seed per output, e.g. from variant_seed()
+
+        Returns:
+            One result per seed in the format of augment_image, plus replay:
+            the JSON-serializable parameters drawn (see replay_summary)
+        """
+        results = []
+        for seed in seeds:
+            try:
+                # ReplayCompose warns about params that depend on the image;
+                # replays re-run the seeded draws rather than reapply saved
+                # params, so those are reproduced too
+                with seeded_random(seed), warnings.catch_warnings():
+                    warnings.simplefilter("ignore", UserWarning)
+                    transformed = self.replay_transform(
+                        image=image,
+                        bboxes=bboxes,
+                        class_labels=class_labels,
+                    )
+            except Exception as e:
+                raise Exception(f"Augmentation failed: {str(e)}")
+
+            results.append({
+                'image': transformed['image'],
+                'bboxes': transformed['bboxes'],
+                'class_labels': transformed['class_labels'],
+                'replay': replay_summary(transformed['replay']),
+            })
+        return results
+
+    def augment_batch(
+        self,
+        images: np.ndarray | List[np.ndarray],
+        bboxes: List[List[List[float]]],
+        class_labels: List[List[str]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply augmentation to a batch of same-size images and their annotations.
+
+        Flips and brightness/contrast/HSV shifts run vectorized over the whole
+        (N * multiplier) batch; other transforms run per image through
+        albumentations, in the configured order.
+
+        Args:
+            images: Stacked (N, H, W, C) array or list of N same-shape images
+            bboxes: Per-image lists of COCO bounding boxes
+            class_labels: Per-image lists of class labels
+
+        Returns:
+            N * multiplier results in the same format as augment_image,
+            ordered image by image. Result images are views into one batch
+            array unless a per-image transform changed their shape.
+        """
+        if len(images) == 0:
+            return []
+
+        shape = images[0].shape
+        batch = np.empty((len(images) * self.multiplier, *shape), dtype=images[0].dtype)
+        for index, image in enumerate(images):
+            if image.shape != shape:
+                raise Exception("augment_batch requires images of identical shape")
+            batch[index * self.multiplier:(index + 1) * self.multiplier] = image
+
+        box_set = BoxSet.from_samples(
+            [b for b in bboxes for _ in range(self.multiplier)],
+            [c for c in class_labels for _ in range(self.multiplier)],
+        )
+
+        try:
+            for kind, stage in self._batch_stages:
+                if kind == "batch" and isinstance(batch, np.ndarray):
+                    apply_vectorized(stage, batch, box_set, self._rng)
+                else:
+                    compose = stage
+                    if kind == "batch":
+                        compose = A.Compose([stage], bbox_params=self.bbox_params)
+                    batch, box_set = apply_per_image(compose, batch, box_set)
+        except Exception as e:
+            raise Exception(f"Augmentation failed: {str(e)}")
+
+        results = []
+        for index in range(len(batch)):
+            sample_boxes, sample_labels = box_set.sample(index)
+            results.append({
+                'image': batch[index],
+                'bboxes': [tuple(box) for box in sample_boxes],
+                'class_labels': sample_labels,
+            })
+        return results
+
+
+# Part of the preprocess cache key; bump when the same config starts
+# producing different pixels (2: reduced-resolution decode, gray equalization)
+PREPROCESS_OUTPUT_VERSION = 2
+
 
 class PreprocessingPipeline:
     """
@@ -152,97 +304,896 @@ class PreprocessingPipeline:
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.fingerprint = config_fingerprint({**config, "output_version": PREPROCESS_OUTPUT_VERSION})
+        self.plan = PreprocessPlan(config)
+
+    def input_size(self, source_size: Tuple[int, int], orientation: int = 1) -> Tuple[int, int]:
+        """
+        Full-resolution size of the image as the resize step sees it.
+
+        Args:
+            source_size: Displayed (width, height) of the source
+            orientation: EXIF orientation of the source
+
+        Returns:
+            (width, height), swapped when auto_orient is off and the stored
+            pixels are rotated by 90 degrees
+        """
+        width, height = source_size
+        if not self.config.get("auto_orient") and orientation >= 5:
+            return height, width
+        return width, height
+
+    def annotation_matrix(self, source_size: Tuple[int, int], orientation: int = 1) -> np.ndarray:
+        """
+        Affine parameters of the preprocessing geometry.
+
+        Annotations are drawn on the displayed (upright) image, so without
+        auto_orient they are first mapped back onto the stored pixels.
+
+        Args:
+            source_size: Displayed (width, height) of the source
+            orientation: EXIF orientation of the source
 
-    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+        Returns:
+            3x3 matrix mapping displayed source coordinates to output pixels
+        """
+        matrix = np.eye(3)
+        if not self.config.get("auto_orient") and orientation != 1:
+            stored_w, stored_h = self.input_size(source_size, orientation)
+            matrix = np.linalg.inv(orientation_matrix(orientation, stored_w, stored_h))
+        return self.plan.matrix(*self.input_size(source_size, orientation)) @ matrix
+
+    def preprocess_image(
+        self,
+        image: np.ndarray,
+        orientation: int = 1,
+        source_size: Optional[Tuple[int, int]] = None,
+    ) -> np.ndarray:
         """
         Apply preprocessing transformations to an image.
 
         Args:
-            image: Input image as numpy array
+            image: Input image as numpy array, decoded without applying EXIF
+                orientation (cv2.IMREAD_IGNORE_ORIENTATION), possibly at
+                reduced resolution
+            orientation: EXIF orientation of the source, recorded on the
+                image row by the pyramid task
+            source_size: Displayed (width, height) of the source at full
+                resolution (default: the size of image)
 
         Returns:
-            Preprocessed image
+            Preprocessed image, consistent with annotation_matrix()
         """
-        # Auto-orient (fix EXIF orientation)
+        # Auto-orient: rotate stored pixels upright (EXIF orientation)
         if self.config.get("auto_orient"):
-            # This would require reading EXIF data and rotating accordingly
-            pass
-
-        # Resize
-        if resize_config := self.config.get("resize"):
-            mode = resize_config.get("mode", "fit")  # stretch, fit, pad
-            width = resize_config["width"]
-            height = resize_config["height"]
-
-            if mode == "stretch":
-                image = cv2.resize(image, (width, height))
-            elif mode == "fit":
-                h, w = image.shape[:2]
-                scale = min(width / w, height / h)
-                new_w, new_h = int(w * scale), int(h * scale)
-                image = cv2.resize(image, (new_w, new_h))
-            elif mode == "pad":
-                h, w = image.shape[:2]
-                scale = min(width / w, height / h)
-                new_w, new_h = int(w * scale), int(h * scale)
-                resized = cv2.resize(image, (new_w, new_h))
-
-                # Pad to target size
-                top = (height - new_h) // 2
-                bottom = height - new_h - top
-                left = (width - new_w) // 2
-                right = width - new_w - left
-
-                image = cv2.copyMakeBorder(
-                    resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(0, 0, 0)
+            image = orient_image(image, orientation)
+
+        # Resize, grayscale and auto-contrast run fused, see PreprocessPlan
+        if source_size is not None:
+            source_size = self.input_size(source_size, orientation)
+        return self.plan.run(image, source_size)
+
+    def preprocess(
+        self,
+        image: np.ndarray,
+        bboxes: np.ndarray,
+        orientation: int = 1,
+        source_size: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Preprocess an image together with its bounding boxes.
+
+        Args:
+            image: Decoded image as for preprocess_image
+            bboxes: (M, 4) COCO boxes in displayed source coordinates
+            orientation: EXIF orientation of the source
+            source_size: Displayed (width, height) of the source
+
+        Returns:
+            Tuple of (image, matrix, kept boxes (K, 4), keep mask (M,))
+        """
+        if source_size is None:
+            height, width = image.shape[:2]
+            source_size = (height, width) if orientation >= 5 else (width, height)
+        processed = self.preprocess_image(image, orientation, source_size)
+        matrix = self.annotation_matrix(source_size, orientation)
+        boxes, keep = transform_bboxes(bboxes, matrix, processed.shape[1], processed.shape[0])
+        return processed, matrix, boxes, keep
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    """
+    Canonical hash of a pipeline configuration.
+    Key order and whitespace do not affect the result.
+    """
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# Pipelines built in this process, keyed by config fingerprint. Pool workers are
+# long-lived, so each process builds a given pipeline once rather than per image.
+_pipeline_cache: Dict[str, Tuple["PreprocessingPipeline", "AugmentationPipeline"]] = {}
+
+
+def pipelines_fingerprint(
+    preprocessing_config: Dict[str, Any],
+    augmentation_config: Dict[str, Any],
+) -> str:
+    """Fingerprint of a version's preprocessing and augmentation configs together."""
+    return config_fingerprint({"pre": preprocessing_config, "aug": augmentation_config})
+
+
+def get_pipelines(
+    preprocessing_config: Dict[str, Any],
+    augmentation_config: Dict[str, Any],
+) -> Tuple[PreprocessingPipeline, AugmentationPipeline]:
+    """Return the process-local pipelines for a version config, building them once."""
+    key = pipelines_fingerprint(preprocessing_config, augmentation_config)
+    if key not in _pipeline_cache:
+        _pipeline_cache[key] = (
+            PreprocessingPipeline(preprocessing_config),
+            AugmentationPipeline(augmentation_config),
+        )
+    return _pipeline_cache[key]
+
+
+def assign_split(image_id: str, split_config: Dict[str, float]) -> str:
+    """
+    Deterministically assign an image to a split.
+
+    Args:
+        image_id: Source image id
+        split_config: Relative split weights, e.g. {"train": 70, "valid": 20, "test": 10}
+
+    Returns:
+        The split name
+    """
+    if not split_config:
+        return "train"
+
+    total = sum(split_config.values())
+    digest = hashlib.sha1(image_id.encode()).digest()
+    position = int.from_bytes(digest[:8], "big") / 2**64 * total
+
+    cumulative = 0.0
+    for name in sorted(split_config):
+        cumulative += split_config[name]
+        if position < cumulative:
+            return name
+    return sorted(split_config)[-1]
+
+
+@dataclass
+class VersionShard:
+    """A batch of source images processed by one pool worker."""
+
+    shard_id: int
+    workspace_id: str
+    output_prefix: str
+    config: Dict[str, Any]
+    images: List[Dict[str, Any]] = field(default_factory=list)
+    fingerprint: str = ""  # shard_fingerprint() of images, for checkpoints
+
+
+# Source images decoded and augmented together inside a shard; bounds the
+# batch array at AUGMENT_BATCH_SIZE * multiplier preprocessed images
+AUGMENT_BATCH_SIZE = 16
+
+
+def _source_id(record: Dict[str, Any], storage) -> str:
+    """Identity of a source image's pixels: its ETag, plus a non-default orientation."""
+    source = storage.get_object_etag(record["storage_path"])
+    orientation = record.get("orientation") or 1
+    if orientation != 1:
+        source = f"{source}:{orientation}"
+    return source
+
+
+def _prepare_record(
+    record: Dict[str, Any],
+    source: str,
+    preprocessing: PreprocessingPipeline,
+    namespace: str,
+    storage,
+) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray]:
+    """
+    Preprocess one source image.
+
+    Args:
+        record: Source image record
+        source: Identity of the source pixels, from _source_id()
+        preprocessing: Preprocessing pipeline
+        namespace: Storage prefix of the shared preprocess cache tier
+        storage: Storage service
+
+    Returns:
+        Tuple of (record, preprocessed image, 3x3 matrix mapping the
+        record's annotation coordinates into the preprocessed image)
+
+    Preprocessed outputs are content-addressed by the source ETag and the
+    preprocessing config, so regenerating a version with different
+    augmentation settings skips download, decode and resize for cached images.
+    """
+    cache = get_preprocess_cache()
+    orientation = record.get("orientation") or 1
+    source_size = (record["width"], record["height"])
+
+    key = cache_key(source, preprocessing.fingerprint)
+    processed = cache.get(key, namespace)
+    if processed is None:
+        # Decode at 1/2, 1/4 or 1/8 scale when the resize target allows it
+        stored_w, stored_h = source_size[::-1] if orientation >= 5 else source_size
+        factor = reduction_factor(
+            preprocessing.input_size(source_size, orientation), preprocessing.config.get("resize")
+        )
+        data = get_object_buffer().read(storage, record["storage_path"])
+        image = decode_image(data, factor)
+        if image is None:
+            raise Exception(f"Could not decode image {record['storage_path']}")
+        height, width = image.shape[:2]
+        if abs(width * factor - stored_w) >= factor or abs(height * factor - stored_h) >= factor:
+            raise Exception(
+                f"Image {record['storage_path']} is {width * factor}x{height * factor}, "
+                f"but its record says {stored_w}x{stored_h}"
+            )
+        processed = preprocessing.preprocess_image(image, orientation, source_size)
+        cache.put(key, namespace, processed)
+
+    return record, processed, preprocessing.annotation_matrix(source_size, orientation)
+
+
+def _map_chunk_boxes(
+    prepared: List[Tuple[Dict[str, Any], np.ndarray, np.ndarray]],
+) -> List[Tuple[np.ndarray, List[str]]]:
+    """
+    Map the boxes of a chunk of preprocessed images into their outputs.
+
+    All boxes of the chunk go through one batched affine transform, each
+    with its image's matrix and output size.
+
+    Returns:
+        Per image, the kept (K, 4) COCO boxes and their class names
+    """
+    annotations = [a for record, _, _ in prepared for a in record["annotations"]]
+    counts = [len(record["annotations"]) for record, _, _ in prepared]
+    owner = np.repeat(np.arange(len(prepared)), counts)
+    matrices = np.stack([matrix for _, _, matrix in prepared])
+    widths = np.array([processed.shape[1] for _, processed, _ in prepared])
+    heights = np.array([processed.shape[0] for _, processed, _ in prepared])
+
+    boxes, keep = transform_bboxes(
+        np.array([a["bbox"] for a in annotations], dtype=np.float64),
+        matrices[owner],
+        widths[owner],
+        heights[owner],
+    )
+    labels = [a["class_name"] for a, kept in zip(annotations, keep) if kept]
+    ends = np.cumsum(np.bincount(owner[keep], minlength=len(prepared)))
+    starts = ends - np.bincount(owner[keep], minlength=len(prepared))
+    return [(boxes[start:end], labels[start:end]) for start, end in zip(starts, ends)]
+
+
+def _encode_output(image: np.ndarray, image_id: str) -> bytes:
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    if not ok:
+        raise Exception(f"Could not encode output for image {image_id}")
+    return encoded.tobytes()
+
+
+def _manifest_entry(
+    record: Dict[str, Any], index: int, variant: Dict[str, Any], output_prefix: str
+) -> Dict[str, Any]:
+    height, width = variant["image"].shape[:2]
+    return {
+        "source_image_id": record["id"],
+        "split": record["split"],
+        "storage_path": f"{output_prefix}/{record['split']}/{record['id']}_{index}.jpg",
+        "width": width,
+        "height": height,
+        "annotations": [
+            {"class_name": label, "bbox": [float(v) for v in bbox]}
+            for bbox, label in zip(variant["bboxes"], variant["class_labels"])
+        ],
+    }
+
+
+def _write_variants(
+    record: Dict[str, Any], variants: List[Dict[str, Any]], output_prefix: str, storage
+) -> List[str]:
+    """
+    Encode and upload the outputs of one source image; return manifest lines.
+
+    Every variant is kept, including identical ones where no transform
+    fired, so each source image yields exactly multiplier outputs.
+    """
+    lines = []
+    for index, variant in enumerate(variants):
+        encoded = _encode_output(variant["image"], record["id"])
+        entry = _manifest_entry(record, index, variant, output_prefix)
+        storage.put_object_bytes(entry["storage_path"], encoded, "image/jpeg")
+        lines.append(json.dumps(entry))
+    return lines
+
+
+def _replay_variants(
+    record: Dict[str, Any],
+    source: str,
+    processed: np.ndarray,
+    bboxes: np.ndarray,
+    class_labels: List[str],
+    augmentation: AugmentationPipeline,
+    config_hash: str,
+    output_prefix: str,
+) -> List[str]:
+    """
+    Record seeded variants of one source image without storing their pixels.
+
+    Each manifest entry carries the annotations of its variant and a replay
+    record from which render_replay_entry() regenerates the image. The
+    storage_path is where the output is written if it is ever materialized.
+    As in _write_variants(), every variant is kept, even where no transform
+    fired.
+    """
+    seeds = [variant_seed(source, config_hash, index) for index in range(augmentation.multiplier)]
+    variants = augmentation.augment_seeded(processed, bboxes.tolist(), class_labels, seeds)
+
+    lines = []
+    for index, (seed, variant) in enumerate(zip(seeds, variants)):
+        entry = _manifest_entry(record, index, variant, output_prefix)
+        entry["replay"] = {
+            "source_path": record["storage_path"],
+            "source": source,
+            "orientation": record.get("orientation") or 1,
+            "source_width": record["width"],
+            "source_height": record["height"],
+            "config_hash": config_hash,
+            "seed": seed,
+            "transforms": variant["replay"],
+        }
+        lines.append(json.dumps(entry))
+    return lines
+
+
+def process_version_shard(shard: VersionShard) -> Dict[str, Any]:
+    """
+    Preprocess and augment one shard of source images (runs in a pool worker).
+
+    Images are downloaded, transformed and uploaded inside the worker process,
+    and the shard's manifest entries are written as one JSONL part, so only a
+    small summary travels back to the parent. With a seeded augmentation
+    config, augmented train variants are recorded as replay entries and not
+    uploaded; see render_replay_entry().
+
+    Returns:
+        Dict with shard_id, fingerprint, images (source images processed),
+        outputs (manifest entries written) and index (version index rows of
+        the shard's images)
+    """
+    preprocessing, augmentation = get_pipelines(
+        shard.config.get("preprocessing", {}),
+        shard.config.get("augmentation", {}),
+    )
+    augment_train = bool(shard.config.get("augmentation"))
+    replay_train = augment_train and augmentation.seed is not None
+    config_hash = pipelines_fingerprint(
+        shard.config.get("preprocessing", {}), shard.config.get("augmentation", {})
+    )
+    storage = get_storage_service()
+
+    manifest_lines = []
+    image_outputs = []
+    for chunk in shard_items(shard.images, AUGMENT_BATCH_SIZE):
+        sources = [_source_id(record, storage) for record in chunk]
+        images = [
+            _prepare_record(record, source, preprocessing, shard.workspace_id, storage)
+            for record, source in zip(chunk, sources)
+        ]
+        prepared = [
+            (record, processed, bboxes, class_labels)
+            for (record, processed, _), (bboxes, class_labels) in zip(images, _map_chunk_boxes(images))
+        ]
+
+        # Train images that share a shape (all of them after a fixed-size
+        # resize) are augmented together through the vectorized batch path
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for position, (record, processed, _, _) in enumerate(prepared):
+            if record["split"] == "train" and augment_train and not replay_train:
+                groups.setdefault(processed.shape, []).append(position)
+
+        variants_by_position: Dict[int, List[Dict[str, Any]]] = {}
+        for positions in groups.values():
+            results = augmentation.augment_batch(
+                [prepared[p][1] for p in positions],
+                [prepared[p][2] for p in positions],
+                [prepared[p][3] for p in positions],
+            )
+            m = augmentation.multiplier
+            for offset, position in enumerate(positions):
+                variants_by_position[position] = results[offset * m:(offset + 1) * m]
+
+        for position, (record, processed, bboxes, class_labels) in enumerate(prepared):
+            if record["split"] == "train" and replay_train:
+                lines = _replay_variants(
+                    record, sources[position], processed, bboxes, class_labels,
+                    augmentation, config_hash, shard.output_prefix,
                 )
+                manifest_lines.extend(lines)
+                image_outputs.append(len(lines))
+                continue
+
+            variants = variants_by_position.get(position) or [
+                {"image": processed, "bboxes": bboxes, "class_labels": class_labels}
+            ]
+            lines = _write_variants(record, variants, shard.output_prefix, storage)
+            manifest_lines.extend(lines)
+            image_outputs.append(len(lines))
+
+    storage.put_object_bytes(
+        f"{shard.output_prefix}/manifest/part-{shard.shard_id:06d}.jsonl",
+        ("\n".join(manifest_lines) + "\n").encode(),
+        "application/x-ndjson",
+    )
+    return {
+        "shard_id": shard.shard_id,
+        "fingerprint": shard.fingerprint,
+        "images": len(shard.images),
+        "outputs": sum(image_outputs),
+        "index": build_index(shard.images, shard.shard_id, image_outputs),
+    }
+
+
+def render_replay_entry(
+    entry: Dict[str, Any], config: Dict[str, Any], namespace: str, storage
+) -> bytes:
+    """
+    Regenerate the image of a seeded manifest entry.
+
+    The source is preprocessed (through the preprocess cache) and augmented
+    with the recorded seed. The parameters drawn are checked against the
+    recorded ones, so every render is byte-identical to the first.
+
+    Args:
+        entry: Manifest entry with a replay record
+        config: The version config
+        namespace: Workspace id (prefix of the shared preprocess cache tier)
+        storage: Storage service
+
+    Returns:
+        The JPEG-encoded output
+    """
+    replay = entry["replay"]
+    preprocessing_config = config.get("preprocessing", {})
+    augmentation_config = config.get("augmentation", {})
+    if replay["config_hash"] != pipelines_fingerprint(preprocessing_config, augmentation_config):
+        raise Exception(f"Output {entry['storage_path']} was recorded with a different config")
+
+    cache = get_replay_cache()
+    key = f"{replay['source']}:{replay['config_hash']}:{replay['seed']}"
+    data = cache.get(key)
+    if data is not None:
+        return data
 
-        # Grayscale
-        if self.config.get("grayscale"):
-            if len(image.shape) == 3:
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)  # Convert back to 3 channels
+    record = {
+        "id": entry["source_image_id"],
+        "storage_path": replay["source_path"],
+        "orientation": replay["orientation"],
+        "width": replay["source_width"],
+        "height": replay["source_height"],
+    }
+    source = _source_id(record, storage)
+    if source != replay["source"]:
+        raise Exception(f"Source image {replay['source_path']} changed since the version was generated")
 
-        # Auto-adjust contrast
-        if self.config.get("auto_contrast"):
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            l = cv2.equalizeHist(l)
-            lab = cv2.merge([l, a, b])
-            image = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+    preprocessing, augmentation = get_pipelines(preprocessing_config, augmentation_config)
+    _, processed, _ = _prepare_record(record, source, preprocessing, namespace, storage)
+    variant = augmentation.augment_seeded(processed, [], [], [replay["seed"]])[0]
+    if variant["replay"] != replay["transforms"]:
+        raise Exception(f"Replaying {entry['storage_path']} drew different parameters than recorded")
 
-        return image
+    data = _encode_output(variant["image"], record["id"])
+    cache.put(key, data)
+    return data
+
+
+def materialize_replay_outputs(
+    storage,
+    manifest_path: str,
+    config: Dict[str, Any],
+    namespace: str,
+    storage_paths: List[str],
+) -> int:
+    """
+    Render replayed outputs of a version and write them to their storage paths.
+
+    Args:
+        storage: Storage service
+        manifest_path: Storage path of the version manifest.json
+        config: The version config
+        namespace: Workspace id
+        storage_paths: Output paths from the manifest
+
+    Returns:
+        Number of outputs written; outputs that are already stored are skipped
+    """
+    wanted = set(storage_paths)
+    written = 0
+    for entry in iter_manifest_entries(storage, manifest_path):
+        if entry["storage_path"] not in wanted:
+            continue
+        wanted.discard(entry["storage_path"])
+        if "replay" in entry:
+            data = render_replay_entry(entry, config, namespace, storage)
+            storage.put_object_bytes(entry["storage_path"], data, "image/jpeg")
+            written += 1
+    if wanted:
+        raise Exception(f"{len(wanted)} requested outputs are not in {manifest_path}")
+    return written
+
+
+def find_duplicates(project_id: str, max_distance: int) -> Dict[str, str]:
+    """
+    Map the near-duplicate images of a project to their cluster's first image.
+
+    Clusters are connected components of images whose perceptual hashes are
+    within max_distance bits of each other, found through a HammingIndex
+    rather than by comparing every pair. Each cluster is represented by its
+    member with the smallest id.
+
+    Returns:
+        Mapping of image id to representative id, for every member of a
+        cluster except the representative itself
+    """
+    ids, hashes = dataset_versions.load_image_hashes(project_id)
+    first = duplicate_clusters(hashes, max_distance)
+    members = np.flatnonzero(first != np.arange(len(first)))
+    return dict(zip(image_id_strings(ids[members]), image_id_strings(ids[first[members]])))
+
+
+def _version_images(
+    project_id: str, duplicates: Dict[str, str], drop_duplicates: bool
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the project's images as a version sees them: near-duplicates are
+    left out, or tagged with duplicate_of so they share their cluster's split.
+    """
+    for record in dataset_versions.iter_project_images(project_id):
+        representative = duplicates.get(record["id"])
+        if representative is None:
+            yield record
+        elif not drop_duplicates:
+            yield {**record, "duplicate_of": representative}
+
+
+def _changed_images(images: Iterable[Dict[str, Any]], diff: IndexDiff) -> Iterator[Dict[str, Any]]:
+    """Stream the images that are not covered by the parent version."""
+    for page in shard_items(images, 1000):
+        yield from diff.changed(page)
+
+
+def _build_version_shards(
+    workspace_id: str,
+    images: Iterable[Dict[str, Any]],
+    output_prefix: str,
+    config: Dict[str, Any],
+    shard_size: int,
+    completed: Dict[int, Dict[str, Any]],
+    restored: Dict[int, Dict[str, Any]],
+):
+    """
+    Lazily build shard payloads, loading annotations one shard at a time.
+
+    Shards that an earlier try of the job completed with the same images and
+    inputs (completed, from the checkpoint) are not built again; their
+    checkpointed results are moved to restored instead.
+    """
+    split_config = config.get("split", {})
+    for shard_id, records in enumerate(shard_items(images, shard_size)):
+        fingerprint = shard_fingerprint(records)
+        done = completed.get(shard_id)
+        if done is not None and done["fingerprint"] == fingerprint:
+            restored[shard_id] = done
+            continue
+
+        annotations = dataset_versions.load_bbox_annotations([r["id"] for r in records])
+        yield VersionShard(
+            shard_id=shard_id,
+            workspace_id=workspace_id,
+            output_prefix=output_prefix,
+            config=config,
+            images=[
+                {
+                    **record,
+                    "split": assign_split(record.get("duplicate_of") or record["id"], split_config),
+                    "annotations": annotations[record["id"]],
+                }
+                for record in records
+            ],
+            fingerprint=fingerprint,
+        )
+
+
+def _completed_shards(checkpoint: Dict[str, bytes]) -> Dict[int, Dict[str, Any]]:
+    """Shard results recorded in a generate_version_task checkpoint."""
+    completed = {}
+    for name, value in checkpoint.items():
+        if name.startswith("shard:"):
+            shard_id = int(name[len("shard:"):])
+            completed[shard_id] = {
+                **json.loads(value),
+                "index": np.frombuffer(checkpoint[f"index:{shard_id}"], dtype=INDEX_DTYPE),
+            }
+    return completed
+
+
+def _part_path(output_prefix: str, shard_id: int) -> str:
+    return f"{output_prefix}/manifest/part-{shard_id:06d}.jsonl"
 
 
 async def generate_version_task(ctx: Dict[str, Any], version_id: str) -> str:
     """
     ARQ task for generating a dataset version with preprocessing and augmentation.
 
-    This is a placeholder that will be fully implemented once database models are set up.
+    The version config is expected to look like:
+        {
+            "preprocessing": {...},  # PreprocessingPipeline config
+            "augmentation": {...},   # AugmentationPipeline config (train split only)
+            "split": {"train": 70, "valid": 20, "test": 10},
+            "dedupe": {"max_distance": 3, "drop_duplicates": false}  # optional
+        }
+
+    With dedupe, near-duplicate images (by perceptual hash, see
+    find_duplicates) are put in the split of their cluster's first image, so
+    no duplicate straddles train and valid/test; drop_duplicates keeps only
+    that first image.
+
+    Source images are split into shards that run on the worker's shared process
+    pool. Progress is recorded on the dataset_versions row as shards finish and
+    the output manifest is written under the version's storage prefix.
+
+    Generation is incremental: if the project has a completed version with the
+    same config, only images added or changed since (per the version index)
+    are processed. The new manifest references the parent's parts for the
+    rest and lists the parent entries it supersedes under "excluded".
+
+    Box statistics of the version (see box_stats_task) are computed last,
+    while the version's annotations are still the live ones.
+
+    Progress is published through JobRuntime after every shard, and finished
+    shards are checkpointed in Redis. Shortly before the job timeout, or when
+    cancellation is requested, no more shards are started; a timed-out try
+    re-queues itself and the next try skips the checkpointed shards.
+
+    Returns:
+        Storage path of the version manifest
     """
-    # This task will:
-    # 1. Load the dataset_versions record from the database
-    # 2. Get all images in the source dataset
-    # 3. Apply preprocessing pipeline
-    # 4. Apply augmentation pipeline (training split only)
-    # 5. Save augmented images to S3
-    # 6. Create new image/annotation records
-    # 7. Update dataset_versions status to COMPLETED
+    settings = get_settings()
+    executor: ShardedExecutor = ctx["executor"]
+    runtime = JobRuntime.for_job(ctx, f"version:{version_id}")
+
+    version = await asyncio.to_thread(dataset_versions.load_version, version_id)
+    if version is None:
+        raise Exception(f"Dataset version {version_id} not found")
+
+    workspace_id = str(version["workspace_id"])
+    project_id = str(version["project_id"])
+    output_prefix = f"{workspace_id}/{project_id}/versions/{version_id}"
+    storage = get_storage_service()
+    dedupe = version["config"].get("dedupe")
+    duplicates: Dict[str, str] = {}
+    if dedupe:
+        duplicates = await asyncio.to_thread(
+            find_duplicates, project_id, dedupe.get("max_distance", DEFAULT_MAX_DISTANCE)
+        )
+    drop_duplicates = bool(dedupe and dedupe.get("drop_duplicates"))
+    total_images = await asyncio.to_thread(dataset_versions.count_project_images, project_id)
+    if drop_duplicates:
+        total_images -= len(duplicates)
+    await asyncio.to_thread(dataset_versions.mark_version_processing, version_id, total_images)
+    processed = 0
+
+    try:
+        parent_id = await asyncio.to_thread(
+            dataset_versions.find_parent_version, project_id, version_id, version["config"]
+        )
+        parent_manifest = None
+        diff = IndexDiff(np.zeros(0, dtype=INDEX_DTYPE))
+        if parent_id is not None:
+            parent_path = f"{workspace_id}/{project_id}/versions/{parent_id}/manifest.json"
+            parent_manifest = json.loads(await asyncio.to_thread(storage.get_object_bytes, parent_path))
+            # Versions generated before indexes existed cannot be diffed
+            if "index" in parent_manifest:
+                diff = IndexDiff(
+                    await asyncio.to_thread(load_index, storage, parent_manifest["index"])
+                )
+            else:
+                parent_id, parent_manifest = None, None
+
+        # Shards finished by an earlier try are reused if they were diffed
+        # against the same parent
+        checkpoint = await runtime.load_checkpoint()
+        if checkpoint.get("parent", b"").decode() != (parent_id or ""):
+            await runtime.clear_checkpoint()
+            checkpoint = {}
+        await runtime.save_checkpoint({"parent": parent_id or ""})
+
+        new_parts = {}
+        restored: Dict[int, Dict[str, Any]] = {}
+        shards = _build_version_shards(
+            workspace_id,
+            _changed_images(_version_images(project_id, duplicates, drop_duplicates), diff),
+            output_prefix,
+            version["config"],
+            settings.shard_size,
+            _completed_shards(checkpoint),
+            restored,
+        )
+        async for result in executor.map_shards(
+            process_version_shard, shards, stop=lambda: runtime.stopping
+        ):
+            shard_id = result["shard_id"]
+            new_parts[_part_path(output_prefix, shard_id)] = result["index"]
+            await runtime.save_checkpoint({
+                f"shard:{shard_id}": json.dumps(
+                    {"fingerprint": result["fingerprint"], "images": result["images"]}
+                ),
+                f"index:{shard_id}": result["index"].tobytes(),
+            })
+            await asyncio.to_thread(
+                dataset_versions.add_version_progress, version_id, result["images"]
+            )
+            processed += result["images"]
+            await runtime.report("processing", processed, total_images)
+        runtime.raise_if_stopping()
+
+        for shard_id, done in restored.items():
+            new_parts[_part_path(output_prefix, shard_id)] = done["index"]
+        skipped = diff.reused_images + sum(done["images"] for done in restored.values())
+        await asyncio.to_thread(dataset_versions.add_version_progress, version_id, skipped)
+        processed += skipped
+        await runtime.report("writing", processed, total_images)
 
-    raise NotImplementedError("Database schema not yet initialized")
+        parts, excluded, index = merge_parts(diff, parent_manifest, new_parts)
+        index_path = f"{output_prefix}/manifest/index.npy"
+        await asyncio.to_thread(save_index, storage, index_path, index)
+
+        manifest_path = f"{output_prefix}/manifest.json"
+        manifest = {
+            "version_id": version_id,
+            "parent_version_id": parent_id,
+            "config": version["config"],
+            "total_images": total_images,
+            "duplicate_images": len(duplicates),
+            "total_outputs": int(index["outputs"].sum()),
+            "parts": parts,
+            "excluded": excluded,
+            "index": index_path,
+        }
+        await asyncio.to_thread(
+            storage.put_object_bytes,
+            manifest_path,
+            json.dumps(manifest).encode(),
+            "application/json",
+        )
+
+        await runtime.report("statistics", processed, total_images)
+        await compute_version_box_stats(
+            executor, storage, version_id, workspace_id, project_id, index, runtime
+        )
+    except JobCancelled:
+        await asyncio.to_thread(dataset_versions.mark_version_status, version_id, "CANCELLED")
+        await runtime.finish("cancelled", processed, total_images)
+        raise
+    except Retry:
+        # Re-queued before the job timeout; the next try resumes from the checkpoint.
+        # The last try raises JobOutOfTries instead and fails below.
+        await runtime.report("processing", processed, total_images, status="retrying")
+        raise
+    except Exception:
+        await asyncio.to_thread(dataset_versions.mark_version_status, version_id, "FAILED")
+        await runtime.finish("failed", processed, total_images)
+        raise
+
+    await asyncio.to_thread(dataset_versions.mark_version_status, version_id, "COMPLETED")
+    await runtime.finish("completed", total_images, total_images)
+    return manifest_path
 
 
 async def export_dataset_task(ctx: Dict[str, Any], version_id: str, export_format: str) -> str:
     """
     ARQ task for exporting a dataset version to various formats.
 
-    Supported formats: COCO, YOLO, VOC, etc.
+    The archive is streamed straight from the version's images in S3 into an
+    S3 multipart upload, so worker memory stays constant for any dataset size.
+    Replayed outputs of a seeded version are rendered on the fly. Progress is
+    published after each manifest part, where cancellation is also checked
+    (the partial upload is then aborted). Exports are not checkpointed: a
+    multipart zip stream cannot be resumed, and a retry starts over.
+
+    Args:
+        version_id: Dataset version to export
+        export_format: Name of a registered format (coco, yolo, voc, visionflow)
+
+    Returns:
+        Storage path of the exported zip archive
+    """
+    if export_format not in FORMATS:
+        raise Exception(f"Unsupported export format: {export_format}")
+
+    version = await asyncio.to_thread(dataset_versions.load_version, version_id)
+    if version is None:
+        raise Exception(f"Dataset version {version_id} not found")
+    if version["status"] != "COMPLETED":
+        raise Exception(f"Dataset version {version_id} is {version['status']}, not COMPLETED")
+
+    prefix = f"{version['workspace_id']}/{version['project_id']}/versions/{version_id}"
+    output_path = f"{prefix}/exports/{export_format}.zip"
+    storage = get_storage_service()
+    runtime = JobRuntime.for_job(ctx, f"export:{version_id}:{export_format}")
+    manifest = json.loads(await asyncio.to_thread(storage.get_object_bytes, f"{prefix}/manifest.json"))
+    total = manifest.get("total_outputs", 0)
+    loop = asyncio.get_running_loop()
+    written = 0
+
+    def progress(count: int) -> None:
+        # Runs in the export thread, after each manifest part
+        nonlocal written
+        written = count
+        asyncio.run_coroutine_threadsafe(runtime.report("exporting", count, total), loop).result()
+        if runtime.cancelled:
+            raise JobCancelled(f"Job {runtime.job_key} was cancelled")
+
+    try:
+        await asyncio.to_thread(
+            export_version_archive,
+            storage,
+            f"{prefix}/manifest.json",
+            output_path,
+            export_format,
+            render=lambda entry: render_replay_entry(
+                entry, version["config"], str(version["workspace_id"]), storage
+            ),
+            progress=progress,
+        )
+    except JobCancelled:
+        await runtime.finish("cancelled", written, total)
+        raise
+    except Exception:
+        await runtime.finish("failed", written, total)
+        raise
+
+    await runtime.finish("completed", total, total)
+    return output_path
+
+
+async def render_version_outputs_task(
+    ctx: Dict[str, Any], version_id: str, storage_paths: List[str]
+) -> int:
+    """
+    ARQ task that materializes replayed outputs of a seeded version for download.
+
+    Outputs are written to their manifest storage_path, after which presigned
+    download URLs work for them like for any stored output.
+
+    Args:
+        version_id: Dataset version
+        storage_paths: Output paths from the version manifest
+
+    Returns:
+        Number of outputs written
     """
-    # This task will:
-    # 1. Load the dataset version
-    # 2. Format annotations according to export_format
-    # 3. Create zip file with images and annotations
-    # 4. Upload to S3
-    # 5. Return download URL
+    version = await asyncio.to_thread(dataset_versions.load_version, version_id)
+    if version is None:
+        raise Exception(f"Dataset version {version_id} not found")
+    if version["status"] != "COMPLETED":
+        raise Exception(f"Dataset version {version_id} is {version['status']}, not COMPLETED")
 
-    raise NotImplementedError("Database schema not yet initialized")
+    prefix = f"{version['workspace_id']}/{version['project_id']}/versions/{version_id}"
+    return await asyncio.to_thread(
+        materialize_replay_outputs,
+        get_storage_service(),
+        f"{prefix}/manifest.json",
+        version["config"],
+        str(version["workspace_id"]),
+        storage_paths,
+    )
@@ -0,0 +1,254 @@
+"""
+Vectorized batch kernels for AugmentationPipeline.augment_batch.
+
+Each kernel applies one albumentations transform to a stacked uint8 batch of
+shape (B, H, W, C) with per-sample random parameters, matching the
+per-image albumentations result for the same parameters. Parameters, lookup
+tables and box geometry are computed for the whole batch in single array
+operations; pixels are then rewritten in place, sample by sample, by OpenCV.
+"""
+import albumentations as A
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+VECTORIZED_TRANSFORMS = (
+    A.HorizontalFlip,
+    A.VerticalFlip,
+    A.RandomBrightnessContrast,
+    A.HueSaturationValue,
+)
+
+_LUT_BASE = np.arange(256, dtype=np.float32)
+
+
+@dataclass
+class BoxSet:
+    """
+    Flat bounding boxes for a batch.
+
+    Boxes of every sample live in one (M, 4) COCO array so geometric kernels
+    transform all of them with a single array operation. owner holds the
+    sample index of each box and is kept sorted.
+    """
+
+    boxes: np.ndarray
+    labels: np.ndarray
+    owner: np.ndarray
+
+    @classmethod
+    def from_samples(
+        cls, bboxes: Sequence[Sequence[Sequence[float]]], labels: Sequence[Sequence[Any]]
+    ) -> "BoxSet":
+        counts = [len(b) for b in bboxes]
+        total = sum(counts)
+        boxes = np.zeros((total, 4), dtype=np.float64)
+        if total:
+            boxes[:] = [box[:4] for sample in bboxes for box in sample]
+        flat_labels = np.empty(total, dtype=object)
+        flat_labels[:] = [label for sample in labels for label in sample]
+        owner = np.repeat(np.arange(len(counts)), counts)
+        return cls(boxes, flat_labels, owner)
+
+    def sample(self, index: int) -> Tuple[List[List[float]], List[Any]]:
+        start, end = np.searchsorted(self.owner, [index, index + 1])
+        return self.boxes[start:end].tolist(), self.labels[start:end].tolist()
+
+
+def sample_mask(transform: A.BasicTransform, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Per-sample Bernoulli draw of whether a transform fires."""
+    if transform.always_apply:
+        return np.ones(size, dtype=bool)
+    return rng.random(size) < transform.p
+
+
+def horizontal_flip(batch: np.ndarray, box_set: BoxSet, mask: np.ndarray) -> None:
+    """Flip selected samples left-right in place."""
+    for index in np.flatnonzero(mask):
+        cv2.flip(batch[index], 1, dst=batch[index])
+    flipped = mask[box_set.owner]
+    width = batch.shape[2]
+    box_set.boxes[flipped, 0] = width - box_set.boxes[flipped, 0] - box_set.boxes[flipped, 2]
+
+
+def vertical_flip(batch: np.ndarray, box_set: BoxSet, mask: np.ndarray) -> None:
+    """Flip selected samples upside-down in place."""
+    for index in np.flatnonzero(mask):
+        cv2.flip(batch[index], 0, dst=batch[index])
+    flipped = mask[box_set.owner]
+    height = batch.shape[1]
+    box_set.boxes[flipped, 1] = height - box_set.boxes[flipped, 1] - box_set.boxes[flipped, 3]
+
+
+def brightness_contrast_luts(
+    alpha: np.ndarray, beta: np.ndarray, means: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Build RandomBrightnessContrast lookup tables for a whole batch at once.
+
+    Args:
+        alpha: (B,) contrast factors
+        beta: (B,) brightness offsets
+        means: (B,) image means when beta is not scaled by the max value
+
+    Returns:
+        (B, 256) uint8 lookup tables
+    """
+    luts = _LUT_BASE[None, :] * alpha[:, None].astype(np.float32)
+    if means is None:
+        luts += (beta * 255).astype(np.float32)[:, None]
+    else:
+        luts += (alpha * beta * means).astype(np.float32)[:, None]
+    return np.clip(luts, 0, 255).astype(np.uint8)
+
+
+def hsv_luts(hue_shift: np.ndarray, sat_shift: np.ndarray, val_shift: np.ndarray) -> np.ndarray:
+    """
+    Build HueSaturationValue lookup tables for a whole batch at once.
+
+    Returns:
+        (B, 1, 256, 3) uint8 tables, one 3-channel cv2.LUT table per sample
+    """
+    base = np.arange(256, dtype=np.int16)[None, :]
+    luts = np.stack(
+        [
+            np.mod(base + hue_shift[:, None], 180),
+            np.clip(base + sat_shift[:, None], 0, 255),
+            np.clip(base + val_shift[:, None], 0, 255),
+        ],
+        axis=-1,
+    ).astype(np.uint8)
+    return luts[:, None]
+
+
+def brightness_contrast(
+    batch: np.ndarray,
+    indices: np.ndarray,
+    alpha: np.ndarray,
+    beta: np.ndarray,
+    beta_by_max: bool = True,
+) -> None:
+    """
+    Vectorized RandomBrightnessContrast for uint8 images, in place.
+
+    Args:
+        batch: (B, H, W, C) uint8 batch
+        indices: Samples to adjust
+        alpha: Contrast factor per selected sample
+        beta: Brightness offset per selected sample
+        beta_by_max: Scale beta by 255 (albumentations default) or by image mean
+    """
+    means = None
+    if not beta_by_max:
+        means = np.array([batch[index].mean() for index in indices])
+    luts = brightness_contrast_luts(alpha, beta, means)
+    for lut, index in zip(luts, indices):
+        cv2.LUT(batch[index], lut, dst=batch[index])
+
+
+def shift_hsv(
+    batch: np.ndarray,
+    indices: np.ndarray,
+    hue_shift: np.ndarray,
+    sat_shift: np.ndarray,
+    val_shift: np.ndarray,
+) -> None:
+    """
+    Vectorized HueSaturationValue for 3-channel uint8 images, in place.
+
+    One HSV scratch buffer is reused for every sample.
+    """
+    luts = hsv_luts(hue_shift, sat_shift, val_shift)
+    scratch = np.empty(batch.shape[1:], dtype=np.uint8)
+    for lut, index in zip(luts, indices):
+        cv2.cvtColor(batch[index], cv2.COLOR_RGB2HSV, dst=scratch)
+        cv2.LUT(scratch, lut, dst=scratch)
+        cv2.cvtColor(scratch, cv2.COLOR_HSV2RGB, dst=batch[index])
+
+
+def apply_vectorized(
+    transform: A.BasicTransform,
+    batch: np.ndarray,
+    box_set: BoxSet,
+    rng: np.random.Generator,
+) -> None:
+    """Apply one vectorizable transform to the whole batch in place."""
+    mask = sample_mask(transform, len(batch), rng)
+    selected = int(mask.sum())
+    if not selected:
+        return
+
+    if isinstance(transform, A.HorizontalFlip):
+        horizontal_flip(batch, box_set, mask)
+    elif isinstance(transform, A.VerticalFlip):
+        vertical_flip(batch, box_set, mask)
+    elif isinstance(transform, A.RandomBrightnessContrast):
+        alpha = 1.0 + rng.uniform(*transform.contrast_limit, size=selected)
+        beta = rng.uniform(*transform.brightness_limit, size=selected)
+        brightness_contrast(
+            batch, np.flatnonzero(mask), alpha, beta, transform.brightness_by_max
+        )
+    elif isinstance(transform, A.HueSaturationValue):
+        shifts = [
+            rng.uniform(*limit, size=selected)
+            for limit in (
+                transform.hue_shift_limit,
+                transform.sat_shift_limit,
+                transform.val_shift_limit,
+            )
+        ]
+        shift_hsv(batch, np.flatnonzero(mask), *shifts)
+    else:
+        raise Exception(f"No batch kernel for {type(transform).__name__}")
+
+
+def plan_stages(
+    transforms: List[A.BasicTransform], bbox_params: A.BboxParams
+) -> List[Tuple[str, Any]]:
+    """
+    Group a transform list into ordered batch stages.
+
+    Vectorizable transforms become ("batch", transform) stages. Runs of other
+    transforms are wrapped in one ("per_image", A.Compose) stage so they keep
+    the albumentations bbox handling.
+    """
+    stages: List[Tuple[str, Any]] = []
+    fallback: List[A.BasicTransform] = []
+    for transform in transforms:
+        if isinstance(transform, VECTORIZED_TRANSFORMS):
+            if fallback:
+                stages.append(("per_image", A.Compose(fallback, bbox_params=bbox_params)))
+                fallback = []
+            stages.append(("batch", transform))
+        else:
+            fallback.append(transform)
+    if fallback:
+        stages.append(("per_image", A.Compose(fallback, bbox_params=bbox_params)))
+    return stages
+
+
+def apply_per_image(
+    compose: A.Compose, images: Any, box_set: BoxSet
+) -> Tuple[Any, BoxSet]:
+    """
+    Run a Compose on each sample and rebuild the flat box set.
+
+    Results are written back into the stacked batch when every output keeps
+    its shape; otherwise (e.g. RandomCrop) a list of images is returned.
+    """
+    outputs: List[Dict[str, Any]] = []
+    for index in range(len(images)):
+        bboxes, labels = box_set.sample(index)
+        outputs.append(compose(image=images[index], bboxes=bboxes, class_labels=labels))
+
+    new_boxes = BoxSet.from_samples(
+        [o["bboxes"] for o in outputs], [o["class_labels"] for o in outputs]
+    )
+    if isinstance(images, np.ndarray) and all(
+        o["image"].shape == images.shape[1:] for o in outputs
+    ):
+        for index, output in enumerate(outputs):
+            images[index] = output["image"]
+        return images, new_boxes
+    return [o["image"] for o in outputs], new_boxes
@@ -0,0 +1,148 @@
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def equalize_lut(channel: np.ndarray, extra_zeros: int = 0) -> np.ndarray:
+    """
+    Lookup table of cv2.equalizeHist for a uint8 channel.
+
+    Reproduces OpenCV's arithmetic exactly, so cv2.LUT(channel, lut) equals
+    cv2.equalizeHist(channel). extra_zeros adds pixels of value 0 that are
+    not in channel (padding that is never materialised) to the histogram.
+    """
+    if channel.size < 2**24:
+        # float32 counts are exact below 2^24; np.bincount would cast the
+        # whole channel to int64 first
+        hist = cv2.calcHist([channel], [0], None, [256], [0, 256])[:, 0].astype(np.int64)
+    else:
+        hist = np.bincount(channel.ravel(), minlength=256)
+    hist[0] += extra_zeros
+    first = int(np.flatnonzero(hist)[0])
+    total = int(hist.sum())
+    lut = np.zeros(256, np.uint8)
+    if hist[first] == total:
+        lut[first] = first
+        return lut
+    scale = np.float32(255) / np.float32(total - hist[first])
+    sums = np.cumsum(hist[first + 1:]).astype(np.float32)
+    lut[first + 1:] = np.clip(np.rint(sums * scale), 0, 255)
+    return lut
+
+
+class PreprocessPlan:
+    """
+    Compiled form of a preprocessing config, run once per image.
+
+    Geometry is resolved per image size, the output is allocated once with
+    its padding, and every step writes into it or into scratch buffers kept
+    between images: the resize lands directly inside the padded output,
+    grayscale is equalized as one gray channel instead of a BGR->LAB round
+    trip, and colour equalization touches only the L channel of a reused LAB
+    buffer. Histogram equalization counts the black padding exactly as the
+    step-by-step pipeline did.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        resize = config.get("resize")
+        self.mode = resize.get("mode", "fit") if resize else None
+        self.size = (resize["width"], resize["height"]) if resize else None
+        self.grayscale = bool(config.get("grayscale"))
+        self.auto_contrast = bool(config.get("auto_contrast"))
+        self._scratch: Dict[str, np.ndarray] = {}
+
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Scratch array reused while images keep the same shape."""
+        buffer = self._scratch.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, np.uint8)
+            self._scratch[name] = buffer
+        return buffer
+
+    def geometry(self, width: int, height: int) -> Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int]]:
+        """
+        Output size, resized size and offset of the resized image.
+
+        Returns:
+            ((output_w, output_h), (resized_w, resized_h), (left, top))
+        """
+        if self.size is None:
+            return (width, height), (width, height), (0, 0)
+        target_w, target_h = self.size
+        if self.mode == "stretch":
+            return (target_w, target_h), (target_w, target_h), (0, 0)
+        scale = min(target_w / width, target_h / height)
+        new_w, new_h = int(width * scale), int(height * scale)
+        if self.mode == "pad":
+            return (target_w, target_h), (new_w, new_h), ((target_w - new_w) // 2, (target_h - new_h) // 2)
+        return (new_w, new_h), (new_w, new_h), (0, 0)
+
+    def matrix(self, width: int, height: int) -> np.ndarray:
+        """
+        3x3 affine matrix mapping source pixel coordinates to output pixels.
+
+        Args:
+            width: Source width at full resolution
+            height: Source height at full resolution
+        """
+        _, (new_w, new_h), (left, top) = self.geometry(width, height)
+        return np.array(
+            [[new_w / width, 0, left], [0, new_h / height, top], [0, 0, 1]], dtype=np.float64
+        )
+
+    def run(self, image: np.ndarray, source_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Preprocess one BGR image.
+
+        Args:
+            image: Source image (not modified)
+            source_size: (width, height) of the source at full resolution
+                when image was decoded at reduced resolution; the output
+                geometry is always derived from the full-resolution size so
+                it agrees with matrix()
+
+        Returns:
+            A newly allocated output image, or the input itself when the
+            config has no resize, grayscale or auto_contrast step
+        """
+        if self.size is None and not (self.grayscale or self.auto_contrast):
+            return image
+
+        height, width = image.shape[:2]
+        if source_size is not None and self.size is not None:
+            width, height = source_size
+        (out_w, out_h), (new_w, new_h), (left, top) = self.geometry(width, height)
+        output = np.empty((out_h, out_w) + image.shape[2:], np.uint8)
+        if (out_w, out_h) != (new_w, new_h):
+            output[:top] = 0
+            output[top + new_h:] = 0
+            output[top:top + new_h, :left] = 0
+            output[top:top + new_h, left + new_w:] = 0
+        region = output[top:top + new_h, left:left + new_w]
+
+        if not (self.grayscale or self.auto_contrast):
+            cv2.resize(image, (new_w, new_h), dst=region)
+            return output
+
+        resized = image
+        if self.size is not None:
+            resized = self._buffer("resized", (new_h, new_w) + image.shape[2:])
+            cv2.resize(image, (new_w, new_h), dst=resized)
+        padding = out_w * out_h - new_w * new_h
+
+        if self.grayscale:
+            gray = self._buffer("gray", (new_h, new_w))
+            cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY, dst=gray)
+            if self.auto_contrast:
+                cv2.LUT(gray, equalize_lut(gray, padding), dst=gray)
+            cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=region)
+        else:
+            lab = self._buffer("lab", (new_h, new_w, 3))
+            lightness = self._buffer("lightness", (new_h, new_w))
+            cv2.cvtColor(resized, cv2.COLOR_BGR2LAB, dst=lab)
+            cv2.extractChannel(lab, 0, dst=lightness)
+            cv2.LUT(lightness, equalize_lut(lightness, padding), dst=lightness)
+            cv2.insertChannel(lightness, lab, 0)
+            cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=region)
+        return output
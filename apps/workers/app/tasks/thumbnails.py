@@ -0,0 +1,109 @@
+import asyncio
+import posixpath
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from ..core.config import get_settings
+from ..services import image_records
+from ..services.executor import ShardedExecutor, shard_items
+from ..services.image_pyramid import build_pyramid, pyramid_levels, pyramid_path
+from ..services.orientation import orient_image, read_orientation
+from ..services.phash import dhash
+from ..services.storage import get_storage_service
+
+_CONTENT_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+def process_pyramid_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the pyramids of one shard of uploaded images (runs in a pool worker).
+
+    Each original is downloaded and decoded once; its EXIF orientation is
+    applied to the pixels, so every level is stored upright and carries no
+    EXIF data. The upright image is also perceptually hashed, for
+    near-duplicate detection.
+
+    Args:
+        shard: Dict with images (id, storage_path), sizes, format and quality
+
+    Returns:
+        Dict with results (id, width, height, orientation, phash per image) and
+        errors (id, detail per image that could not be processed)
+    """
+    storage = get_storage_service()
+    results, errors = [], []
+    for record in shard["images"]:
+        try:
+            data = storage.get_object_bytes(record["storage_path"])
+            image = cv2.imdecode(
+                np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+            )
+            if image is None:
+                raise Exception(f"Could not decode image {record['storage_path']}")
+            orientation = read_orientation(data)
+            image = orient_image(image, orientation)
+
+            levels = build_pyramid(image, shard["sizes"], shard["format"], shard["quality"])
+            for level, body in levels.items():
+                key = pyramid_path(record["storage_path"], level, shard["format"])
+                storage.put_object_bytes(key, body, _CONTENT_TYPES[posixpath.splitext(key)[1][1:]])
+        except Exception as e:
+            errors.append({"id": record["id"], "detail": str(e)})
+            continue
+
+        height, width = image.shape[:2]
+        results.append({
+            "id": record["id"],
+            "width": width,
+            "height": height,
+            "orientation": orientation,
+            "phash": dhash(image),
+        })
+    return {"results": results, "errors": errors}
+
+
+async def generate_pyramids_task(ctx: Dict[str, Any], image_ids: List[str]) -> int:
+    """
+    ARQ task building thumbnail pyramids for newly uploaded images.
+
+    Enqueued by the API once upload completion has created the image rows.
+    Writes each level to pyramid_path() next to the original and records
+    the decoded width/height, EXIF orientation, perceptual hash and level
+    names on the row.
+
+    Args:
+        image_ids: Images to process
+
+    Returns:
+        Number of images processed
+    """
+    settings = get_settings()
+    executor: ShardedExecutor = ctx["executor"]
+    levels = pyramid_levels(settings.pyramid_sizes)
+
+    records = await asyncio.to_thread(image_records.load_images, image_ids)
+    shards = (
+        {
+            "images": images,
+            "sizes": settings.pyramid_sizes,
+            "format": settings.pyramid_format,
+            "quality": settings.pyramid_quality,
+        }
+        for images in shard_items(records, settings.pyramid_shard_size)
+    )
+
+    processed = 0
+    errors = []
+    async for result in executor.map_shards(process_pyramid_shard, shards):
+        await asyncio.to_thread(image_records.record_image_pyramids, result["results"], levels)
+        processed += len(result["results"])
+        errors.extend(result["errors"])
+
+    if errors:
+        raise Exception(
+            f"Pyramid generation failed for {len(errors)} image(s), "
+            f"first {errors[0]['id']}: {errors[0]['detail']}"
+        )
+    return processed
@@ -0,0 +1,55 @@
+"""
+Per-image vs batched augmentation throughput on 640x640 images.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_augment_batch --images 64 --batch 16
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.tasks.augmentation import AugmentationPipeline
+
+CONFIG = {
+    "flip_horizontal": True,
+    "flip_vertical": True,
+    "brightness_contrast": {"brightness_limit": 0.2, "contrast_limit": 0.2},
+    "hue_saturation": {"hue_shift": 20, "sat_shift": 30, "val_shift": 20},
+    "multiplier": 3,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--size", type=int, default=640)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, size=(args.images, args.size, args.size, 3), dtype=np.uint8)
+    bboxes = [[[50.0, 60.0, 120.0, 80.0], [300.0, 200.0, 40.0, 90.0]]] * args.images
+    labels = [["car", "person"]] * args.images
+    pipeline = AugmentationPipeline(CONFIG)
+
+    start = time.perf_counter()
+    for image, boxes, classes in zip(images, bboxes, labels):
+        pipeline.augment_image(image, boxes, classes)
+    per_image = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for offset in range(0, args.images, args.batch):
+        end = offset + args.batch
+        pipeline.augment_batch(images[offset:end], bboxes[offset:end], labels[offset:end])
+    batched = time.perf_counter() - start
+
+    outputs = args.images * pipeline.multiplier
+    print(f"{args.images} images x{pipeline.multiplier}, {args.size}x{args.size}")
+    print(f"augment_image: {per_image:6.2f}s {outputs / per_image:8.1f} outputs/s")
+    print(f"augment_batch: {batched:6.2f}s {outputs / batched:8.1f} outputs/s")
+    print(f"speed-up: {per_image / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-box Python rescale+clip vs batched affine transforms for preprocessing boxes.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_box_geometry --images 10000 --boxes 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.tasks.annotation_geometry import transform_bboxes
+from app.tasks.augmentation import PreprocessingPipeline
+
+RESIZE = {"width": 640, "height": 640, "mode": "pad"}
+
+
+def per_box(bboxes, width, height):
+    """The previous _rescale_bboxes + _clip_bboxes path"""
+    scale = min(RESIZE["width"] / width, RESIZE["height"] / height)
+    new_w, new_h = int(width * scale), int(height * scale)
+    sx, sy = new_w / width, new_h / height
+    ox, oy = (RESIZE["width"] - new_w) // 2, (RESIZE["height"] - new_h) // 2
+    rescaled = [[x * sx + ox, y * sy + oy, w * sx, h * sy] for x, y, w, h in bboxes]
+    clipped = []
+    for x, y, w, h in rescaled:
+        x0, y0 = max(0.0, x), max(0.0, y)
+        x1, y1 = min(640.0, x + w), min(640.0, y + h)
+        if x1 - x0 >= 1 and y1 - y0 >= 1:
+            clipped.append([x0, y0, x1 - x0, y1 - y0])
+    return clipped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=10000)
+    parser.add_argument("--boxes", type=int, default=100)
+    parser.add_argument("--chunk", type=int, default=16, help="Images per batched call")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    boxes = rng.uniform(0, 1000, size=(args.images, args.boxes, 4))
+    as_lists = boxes.tolist()
+    pipeline = PreprocessingPipeline({"resize": RESIZE})
+
+    start = time.perf_counter()
+    for image_boxes in as_lists:
+        per_box(image_boxes, 4000, 3000)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for image_boxes in boxes:
+        matrix = pipeline.annotation_matrix((4000, 3000))
+        transform_bboxes(image_boxes, matrix, 640, 640)
+    new = time.perf_counter() - start
+
+    start = time.perf_counter()
+    owner = np.repeat(np.arange(args.chunk), args.boxes)
+    for first in range(0, args.images, args.chunk):
+        chunk = boxes[first:first + args.chunk]
+        matrices = np.stack([pipeline.annotation_matrix((4000, 3000)) for _ in chunk])
+        sizes = np.full(len(chunk), 640)
+        rows = owner[:len(chunk) * args.boxes]
+        transform_bboxes(chunk.reshape(-1, 4), matrices[rows], sizes[rows], sizes[rows])
+    batched = time.perf_counter() - start
+
+    total = args.images * args.boxes
+    print(f"per-box Python   {old:6.2f} s  {old / total * 1e9:7.1f} ns/box")
+    print(f"affine per image {new:6.2f} s  {new / total * 1e9:7.1f} ns/box  ({old / new:.1f}x)")
+    print(f"affine per chunk {batched:6.2f} s  {batched / total * 1e9:7.1f} ns/box  ({old / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
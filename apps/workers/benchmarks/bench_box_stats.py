@@ -0,0 +1,78 @@
+"""
+Per-box Python binning vs the vectorized box statistics engine, and shard merging.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_box_stats --images 100000 --boxes 20 --classes 50
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.services.box_stats import ASPECT_BINS, ASPECT_RANGE, GRID, SIZE_BINS, BoxStats
+
+
+def per_box(sizes, box_image, class_ids, bboxes, classes):
+    """Dict-of-lists accumulation, one box at a time"""
+    centers = [[[0] * GRID for _ in range(GRID)] for _ in range(classes)]
+    size_hist = [[0] * SIZE_BINS for _ in range(classes)]
+    aspect_hist = [[0] * ASPECT_BINS for _ in range(classes)]
+    for image, c, (x, y, w, h) in zip(box_image, class_ids, bboxes):
+        width, height = sizes[image]
+        cx = min(max((x + w / 2) / width, 0.0), 1.0)
+        cy = min(max((y + h / 2) / height, 0.0), 1.0)
+        centers[c][min(int(cy * GRID), GRID - 1)][min(int(cx * GRID), GRID - 1)] += 1
+        size_hist[c][min(int(math.sqrt(w * h / (width * height)) * SIZE_BINS), SIZE_BINS - 1)] += 1
+        ratio = min(max(math.log2(w / h), -ASPECT_RANGE), ASPECT_RANGE)
+        aspect_hist[c][min(int((ratio + ASPECT_RANGE) / (2 * ASPECT_RANGE) * ASPECT_BINS), ASPECT_BINS - 1)] += 1
+    return centers, size_hist, aspect_hist
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=100000)
+    parser.add_argument("--boxes", type=int, default=20, help="Boxes per image")
+    parser.add_argument("--classes", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    total = args.images * args.boxes
+    sizes = rng.integers(320, 4000, size=(args.images, 2)).astype(np.float64)
+    box_image = np.repeat(np.arange(args.images), args.boxes)
+    wh = rng.uniform(0.01, 0.5, size=(total, 2)) * sizes[box_image]
+    xy = rng.uniform(0, 0.5, size=(total, 2)) * sizes[box_image]
+    bboxes = np.column_stack([xy, wh])
+    class_ids = rng.integers(0, args.classes, size=total)
+    names = [f"class{c}" for c in range(args.classes)]
+
+    start = time.perf_counter()
+    per_box(sizes.tolist(), box_image.tolist(), class_ids.tolist(), bboxes.tolist(), args.classes)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    whole = BoxStats.from_columns(sizes, box_image, class_ids, bboxes, names)
+    new = time.perf_counter() - start
+
+    bounds = np.linspace(0, args.images, args.shards + 1).astype(int)
+    cuts = np.searchsorted(box_image, bounds)
+    parts = [
+        BoxStats.from_columns(
+            sizes[lo:hi], box_image[a:b] - lo, class_ids[a:b], bboxes[a:b], names
+        )
+        for lo, hi, a, b in zip(bounds[:-1], bounds[1:], cuts[:-1], cuts[1:])
+    ]
+    start = time.perf_counter()
+    merged = BoxStats.merge_all(parts)
+    merge = time.perf_counter() - start
+    assert np.array_equal(merged.centers, whole.centers)
+
+    print(f"{total} boxes, {args.classes} classes")
+    print(f"per-box Python {old:7.2f} s  {old / total * 1e9:7.1f} ns/box")
+    print(f"vectorized     {new:7.2f} s  {new / total * 1e9:7.1f} ns/box  ({old / new:.1f}x)")
+    print(f"merge {args.shards} partials {merge * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
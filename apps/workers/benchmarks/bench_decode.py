@@ -0,0 +1,76 @@
+"""
+Decode + preprocess time per image: full decode vs buffered reduced-resolution decode.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_decode --images 10
+"""
+import argparse
+import io
+import time
+
+import cv2
+import numpy as np
+
+from app.services.image_decode import ObjectBuffer, decode_image, reduction_factor
+from app.tasks.augmentation import PreprocessingPipeline
+
+CONFIG = {"resize": {"width": 640, "height": 640, "mode": "pad"}}
+RESOLUTIONS = [(1280, 960), (3000, 2000), (4000, 3000), (6000, 4000)]
+
+
+class InMemoryStorage:
+    """Serves one encoded image through the StorageService streaming API"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def get_object_bytes(self, storage_path: str) -> bytes:
+        return io.BytesIO(self.data).read()
+
+    def open_object_stream(self, storage_path: str):
+        return io.BytesIO(self.data), len(self.data)
+
+
+def camera_like_jpeg(width: int, height: int) -> bytes:
+    """Smooth gradients plus sensor noise, encoded like a camera JPEG"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.dstack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255])
+    image += rng.normal(0, 6, image.shape).astype(np.float32)
+    return cv2.imencode(".jpg", np.clip(image, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=10)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    pipeline = PreprocessingPipeline(CONFIG)
+    buffer = ObjectBuffer()
+    print(f"{'source':>10s} {'factor':>6s} {'full decode':>12s} {'reduced':>9s} {'speed-up':>8s}")
+    for width, height in RESOLUTIONS:
+        storage = InMemoryStorage(camera_like_jpeg(width, height))
+        factor = reduction_factor((width, height), CONFIG["resize"])
+
+        start = time.perf_counter()
+        for _ in range(args.images):
+            data = storage.get_object_bytes("image.jpg")
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            pipeline.preprocess_image(image)
+        full = (time.perf_counter() - start) / args.images
+
+        start = time.perf_counter()
+        for _ in range(args.images):
+            data = buffer.read(storage, "image.jpg")
+            pipeline.preprocess_image(decode_image(data, factor))
+        reduced = (time.perf_counter() - start) / args.images
+
+        print(
+            f"{width:>5d}x{height:<4d} {factor:>6d} {full * 1e3:>9.1f} ms "
+            f"{reduced * 1e3:>6.1f} ms {full / reduced:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of the sharded process-pool engine on a synthetic dataset.
+
+Runs the real preprocessing and augmentation pipelines on random images
+(no S3 or database I/O) with 1, 4 and 16 worker processes.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_executor --images 2000 --size 1280x960
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.services.executor import ShardedExecutor, shard_items
+from app.tasks.augmentation import get_pipelines
+
+CONFIG = {
+    "preprocessing": {"resize": {"mode": "pad", "width": 640, "height": 640}},
+    "augmentation": {
+        "flip_horizontal": True,
+        "rotate": {"limit": 15},
+        "brightness_contrast": {"brightness_limit": 0.2, "contrast_limit": 0.2},
+        "multiplier": 3,
+    },
+}
+
+
+def run_synthetic_shard(shard: Tuple[int, int, int, int]) -> int:
+    """Generate shard images in-process and push them through the pipelines."""
+    seed, count, height, width = shard
+    preprocessing, augmentation = get_pipelines(CONFIG["preprocessing"], CONFIG["augmentation"])
+    rng = np.random.default_rng(seed)
+    outputs = 0
+    for _ in range(count):
+        image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        processed = preprocessing.preprocess_image(image)
+        outputs += len(augmentation.augment_image(processed, [[50, 50, 100, 100]], ["object"]))
+    return outputs
+
+
+async def measure(processes: int, shards: List[Tuple[int, int, int, int]]) -> Dict[str, Any]:
+    executor = ShardedExecutor(max_workers=processes)
+    # Warm the pool so process start-up is excluded, as in a long-lived worker
+    async for _ in executor.map_shards(run_synthetic_shard, [(0, 1, 64, 64)] * processes):
+        pass
+
+    start = time.perf_counter()
+    outputs = 0
+    async for result in executor.map_shards(run_synthetic_shard, shards):
+        outputs += result
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+    return {"processes": processes, "seconds": elapsed, "outputs": outputs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--shard-size", type=int, default=64)
+    parser.add_argument("--size", default="1280x960", help="Source image WIDTHxHEIGHT")
+    parser.add_argument("--processes", default="1,4,16")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    counts = [len(s) for s in shard_items(range(args.images), args.shard_size)]
+    shards = [(seed, count, height, width) for seed, count in enumerate(counts)]
+
+    print(f"{args.images} images of {width}x{height}, shard size {args.shard_size}")
+    baseline = None
+    for processes in (int(p) for p in args.processes.split(",")):
+        result = asyncio.run(measure(processes, shards))
+        rate = args.images / result["seconds"]
+        baseline = baseline or rate
+        print(
+            f"{processes:>3} processes: {result['seconds']:7.2f}s "
+            f"{rate:8.1f} images/s ({rate / baseline:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Columnar vs per-annotation dict conversion of synthetic boxes to YOLO and VOC.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_formats --boxes 5000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.formats.columnar import AnnotationTable, clip_xyxy, normalize_cxcywh, xywh_to_xyxy
+from app.formats.yolo import encode_label_rows
+
+
+def synthetic_table(boxes: int, images: int) -> AnnotationTable:
+    rng = np.random.default_rng(0)
+    widths = rng.integers(320, 1920, size=images).astype(np.float64)
+    heights = rng.integers(240, 1080, size=images).astype(np.float64)
+    box_image = np.sort(rng.integers(0, images, size=boxes))
+    xy = rng.uniform(0, 1, size=(boxes, 2)) * np.stack([widths, heights], axis=1)[box_image]
+    wh = rng.uniform(5, 200, size=(boxes, 2))
+    return AnnotationTable(
+        image_ids=np.arange(images, dtype=np.int64),
+        source_ids=[str(i) for i in range(images)],
+        file_names=[f"{i}.jpg" for i in range(images)],
+        splits=["train"] * images,
+        widths=widths,
+        heights=heights,
+        box_image=box_image,
+        class_ids=rng.integers(0, 80, size=boxes),
+        bboxes=np.hstack([xy, wh]),
+    )
+
+
+def per_dict(records, widths, heights):
+    """Baseline: per-annotation Python dict conversion."""
+    yolo, voc = [], []
+    for record in records:
+        x, y, w, h = record["bbox"]
+        width, height = widths[record["image"]], heights[record["image"]]
+        x0, y0 = min(max(x, 0), width), min(max(y, 0), height)
+        x1, y1 = min(max(x + w, 0), width), min(max(y + h, 0), height)
+        yolo.append(
+            "%d %.6f %.6f %.6f %.6f\n"
+            % (record["class_id"], (x0 + x1) / 2 / width, (y0 + y1) / 2 / height,
+               (x1 - x0) / width, (y1 - y0) / height)
+        )
+        voc.append((round(x0), round(y0), round(x1), round(y1)))
+    return yolo, voc
+
+
+def columnar(table: AnnotationTable):
+    """Vectorized: clipping and conversion as whole-array operations."""
+    clipped = table.clipped()
+    normalized = normalize_cxcywh(clipped.bboxes, clipped.box_widths, clipped.box_heights)
+    yolo = encode_label_rows(clipped.class_ids, normalized)
+    voc = np.rint(clip_xyxy(xywh_to_xyxy(table.bboxes), table.box_widths, table.box_heights))
+    return yolo, voc.astype(np.int64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--boxes", type=int, default=5_000_000)
+    parser.add_argument("--images", type=int, default=200_000)
+    args = parser.parse_args()
+
+    table = synthetic_table(args.boxes, args.images)
+    records = [
+        {"image": image, "class_id": class_id, "bbox": bbox}
+        for image, class_id, bbox in zip(
+            table.box_image.tolist(), table.class_ids.tolist(), table.bboxes.tolist()
+        )
+    ]
+    widths, heights = table.widths.tolist(), table.heights.tolist()
+
+    start = time.perf_counter()
+    per_dict(records, widths, heights)
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columnar(table)
+    vectorized = time.perf_counter() - start
+
+    print(f"{args.boxes} boxes over {args.images} images")
+    print(f"per-dict: {baseline:6.2f}s {args.boxes / baseline / 1e6:6.2f}M boxes/s")
+    print(f"columnar: {vectorized:6.2f}s {args.boxes / vectorized / 1e6:6.2f}M boxes/s")
+    print(f"speed-up: {baseline / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
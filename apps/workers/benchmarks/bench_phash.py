@@ -0,0 +1,62 @@
+"""
+Near-duplicate lookup and clustering over perceptual hashes: HammingIndex vs pairwise.
+
+Random 64-bit hashes stand in for a project's images, with --duplicates of
+them planted within a few bits of another image. Pairwise clustering is
+extrapolated from one vectorized row of comparisons against all images.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_phash --images 1000000 --max-distance 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.phash import HammingIndex, duplicate_clusters, hamming
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=1000000)
+    parser.add_argument("--duplicates", type=int, default=10000)
+    parser.add_argument("--max-distance", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(-(2**63), 2**63 - 1, size=args.images, dtype=np.int64).view(np.uint64)
+    copies = rng.choice(args.images, size=args.duplicates, replace=False)
+    flips = np.zeros(args.duplicates, np.uint64)
+    for _ in range(args.max_distance):
+        flips |= np.uint64(1) << rng.integers(0, 64, size=args.duplicates).astype(np.uint64)
+    hashes[copies] = hashes[rng.choice(args.images, size=args.duplicates)] ^ flips
+
+    start = time.perf_counter()
+    index = HammingIndex(hashes)
+    build = time.perf_counter() - start
+
+    latencies = []
+    for value in hashes[rng.choice(args.images, size=args.queries)].view(np.int64):
+        start = time.perf_counter()
+        index.query(int(value), args.max_distance)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+
+    start = time.perf_counter()
+    clusters = duplicate_clusters(hashes, args.max_distance)
+    cluster = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hamming(hashes, np.repeat(hashes[:1], args.images))
+    pairwise = (time.perf_counter() - start) * args.images / 2
+
+    print(f"{args.images} hashes, max distance {args.max_distance}")
+    print(f"index build        {build:8.2f} s")
+    print(f"query              p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    print(f"clusters           {cluster:8.2f} s  ({int((clusters != np.arange(args.images)).sum())} duplicates)")
+    print(f"pairwise (approx.) {pairwise:8.0f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Step-by-step vs fused preprocessing: time and peak allocation per image.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_preprocess --images 50
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.tasks.preprocess_plan import PreprocessPlan
+
+CONFIGS = {
+    "pad": {"resize": {"width": 640, "height": 640, "mode": "pad"}},
+    "pad+gray+contrast": {
+        "resize": {"width": 640, "height": 640, "mode": "pad"}, "grayscale": True, "auto_contrast": True,
+    },
+    "pad+contrast": {"resize": {"width": 640, "height": 640, "mode": "pad"}, "auto_contrast": True},
+    "stretch+gray": {"resize": {"width": 640, "height": 640, "mode": "stretch"}, "grayscale": True},
+}
+
+
+def step_by_step(image, config):
+    """The previous implementation: one full-image pass and allocation per step"""
+    resize = config["resize"]
+    width, height = resize["width"], resize["height"]
+    if resize["mode"] == "stretch":
+        image = cv2.resize(image, (width, height))
+    else:
+        h, w = image.shape[:2]
+        scale = min(width / w, height / h)
+        new_w, new_h = int(w * scale), int(h * scale)
+        image = cv2.resize(image, (new_w, new_h))
+        top, left = (height - new_h) // 2, (width - new_w) // 2
+        image = cv2.copyMakeBorder(
+            image, top, height - new_h - top, left, width - new_w - left, cv2.BORDER_CONSTANT, value=(0, 0, 0)
+        )
+    if config.get("grayscale"):
+        image = cv2.cvtColor(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+    if config.get("auto_contrast"):
+        l, a, b = cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2LAB))
+        image = cv2.cvtColor(cv2.merge([cv2.equalizeHist(l), a, b]), cv2.COLOR_LAB2BGR)
+    return image
+
+
+def measure(run, images):
+    run(images[0])  # Warm up scratch buffers
+    start = time.perf_counter()
+    for image in images:
+        run(image)
+    elapsed = (time.perf_counter() - start) / len(images)
+    tracemalloc.start()
+    run(images[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8) for _ in range(args.images)]
+    output_mb = 640 * 640 * 3 / 2**20
+    print(f"{'config':18s} {'step-by-step':>22s} {'fused':>22s}   (one 640x640 output = {output_mb:.2f} MB)")
+    for name, config in CONFIGS.items():
+        plan = PreprocessPlan(config)
+        old_time, old_peak = measure(lambda image: step_by_step(image, config), images)
+        new_time, new_peak = measure(plan.run, images)
+        print(
+            f"{name:18s} {old_time * 1e3:7.2f} ms {old_peak / 2**20:6.2f} MB peak "
+            f"{new_time * 1e3:7.2f} ms {new_peak / 2**20:6.2f} MB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Active-learning selection over a memory-mapped feature matrix at several sizes.
+
+Synthetic clustered features are written to a FeatureStore in a temporary
+directory, a tenth of them marked labeled, then both strategies select
+--count images. Peak traced memory is reported next to the matrix size to
+show that selection reads the memory map in chunks instead of loading it.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_sampler --images 100000 1000000 --dim 704
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+from app.services.feature_store import FeatureStore
+from app.services.sampler import select_images
+from app.services.version_index import image_id_bytes
+
+
+def build_store(root: str, images: int, dim: int, rng: np.random.Generator) -> FeatureStore:
+    store = FeatureStore(root, str(uuid.uuid4()), "synthetic", dim)
+    centers = rng.normal(0, 1, (50, dim)).astype(np.float32)
+    for first in range(0, images, 50000):
+        rows = min(50000, images - first)
+        vectors = centers[rng.integers(0, len(centers), rows)] + rng.normal(0, 0.3, (rows, dim)).astype(np.float32)
+        store.append(image_id_bytes(str(uuid.UUID(int=first + i)) for i in range(rows)), vectors)
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dim", type=int, default=704)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--chunk-rows", type=int, default=16384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'images':>9} {'matrix MB':>10} {'strategy':>9} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        for images in args.images:
+            store = build_store(root, images, args.dim, rng)
+            labeled = rng.random(images) < 0.1
+            candidates = np.ones(images, dtype=bool)
+            matrix = images * args.dim * 4 / 1e6
+            for strategy in ("kmeans", "kcenter"):
+                tracemalloc.start()
+                start = time.perf_counter()
+                select_images(
+                    store.vectors(), labeled, candidates, args.count, strategy, args.clusters, args.chunk_rows
+                )
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+                print(f"{images:>9} {matrix:>10.0f} {strategy:>9} {elapsed:>8.1f} {peak:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
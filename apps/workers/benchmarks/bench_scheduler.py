@@ -0,0 +1,141 @@
+"""
+Small-job tail latency under a heavy workspace, FIFO versus fair scheduling.
+
+Discrete-event simulation (no Redis). At t=0 one heavy workspace submits a
+--heavy-export image export, --heavy-versions big versions and a burst of
+--heavy-small thumbnail jobs; meanwhile --tenants other workspaces submit
+small jobs at random. "fifo" is the old single ARQ queue with max_jobs=10;
+"fair" splits the same slots into short and long lanes dispatched by the
+scheduler's FairShare policy with per-workspace caps.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_scheduler --tenants 20 --duration 3600
+"""
+import argparse
+import heapq
+from collections import defaultdict, deque
+
+import numpy as np
+
+from app.services.scheduler import LONG_LANE, SHORT_LANE, FairShare
+
+
+def job_seconds(images, args):
+    return args.overhead + images / args.images_per_second
+
+
+def workload(args):
+    """(arrival, workspace, images, is_export) for every job, by arrival."""
+    rng = np.random.default_rng(0)
+    jobs = [(0.0, "heavy", args.heavy_export, True)]
+    jobs += [(0.0, "heavy", args.heavy_version_images, False)] * args.heavy_versions
+    jobs += [(0.0, "heavy", int(n), False) for n in rng.integers(50, 2000, args.heavy_small)]
+    for tenant in range(args.tenants):
+        t = rng.exponential(args.interval)
+        while t < args.duration:
+            jobs.append((float(t), f"tenant-{tenant}", int(rng.integers(50, 2000)), False))
+            t += rng.exponential(args.interval)
+    return sorted(jobs, key=lambda job: job[0])
+
+
+def simulate(jobs, args, lanes, lane_of, caps):
+    """
+    Run jobs through per-lane slots and return each job's completion time.
+
+    Args:
+        lanes: Slots per lane
+        lane_of: Job -> lane
+        caps: Per-workspace cap per lane (None = FIFO over all workspaces)
+    """
+    free = dict(lanes)
+    shares = {lane: FairShare(caps[lane]) if caps else None for lane in lanes}
+    queues = {lane: defaultdict(deque) if caps else deque() for lane in lanes}
+    events = [(arrival, 0, n) for n, (arrival, *_rest) in enumerate(jobs)]
+    heapq.heapify(events)
+    finished = {}
+
+    def start(lane, now):
+        while free[lane]:
+            share = shares[lane]
+            if share is None:
+                if not queues[lane]:
+                    return
+                n = queues[lane].popleft()
+            else:
+                tenant = share.pick([t for t, q in queues[lane].items() if q])
+                if tenant is None:
+                    return
+                n = queues[lane][tenant].popleft()
+                share.start(tenant, jobs[n][2])
+            free[lane] -= 1
+            heapq.heappush(events, (now + job_seconds(jobs[n][2], args), 1, n))
+
+    while events:
+        now, kind, n = heapq.heappop(events)
+        _, tenant, _, _ = jobs[n]
+        lane = lane_of(jobs[n])
+        if kind == 0:
+            if caps:
+                queues[lane][tenant].append(n)
+            else:
+                queues[lane].append(n)
+        else:
+            finished[n] = now
+            free[lane] += 1
+            if shares[lane] is not None:
+                shares[lane].stop(tenant)
+        start(lane, now)
+    return finished
+
+
+def report(name, jobs, finished):
+    small = [finished[n] - job[0] for n, job in enumerate(jobs) if job[1] != "heavy"]
+    heavy = max(finished[n] for n, job in enumerate(jobs) if job[1] == "heavy")
+    p50, p95, p99 = np.percentile(small, [50, 95, 99])
+    print(
+        f"{name:5s}  small jobs p50 {p50:8.1f} s  p95 {p95:8.1f} s  p99 {p99:8.1f} s  "
+        f"max {max(small):8.1f} s   heavy workspace done {heavy:8.0f} s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=3600.0)
+    parser.add_argument("--interval", type=float, default=120.0, help="Mean seconds between a tenant's jobs")
+    parser.add_argument("--heavy-export", type=int, default=1_000_000)
+    parser.add_argument("--heavy-versions", type=int, default=30)
+    parser.add_argument("--heavy-version-images", type=int, default=50_000)
+    parser.add_argument("--heavy-small", type=int, default=500)
+    parser.add_argument("--slots", type=int, default=10, help="FIFO max_jobs")
+    parser.add_argument("--short-slots", type=int, default=7)
+    parser.add_argument("--long-slots", type=int, default=3)
+    parser.add_argument("--short-cap", type=int, default=4)
+    parser.add_argument("--long-cap", type=int, default=1)
+    parser.add_argument("--short-max-images", type=int, default=20000)
+    parser.add_argument("--images-per-second", type=float, default=500.0)
+    parser.add_argument("--overhead", type=float, default=2.0, help="Fixed seconds per job")
+    args = parser.parse_args()
+
+    jobs = workload(args)
+    print(f"{len(jobs)} jobs, {sum(job[1] != 'heavy' for job in jobs)} from light workspaces")
+
+    fifo = simulate(jobs, args, {SHORT_LANE: args.slots}, lambda job: SHORT_LANE, None)
+    report("fifo", jobs, fifo)
+
+    def lane_of(job):
+        _, _, images, is_export = job
+        return LONG_LANE if is_export or images > args.short_max_images else SHORT_LANE
+
+    fair = simulate(
+        jobs,
+        args,
+        {SHORT_LANE: args.short_slots, LONG_LANE: args.long_slots},
+        lane_of,
+        {SHORT_LANE: args.short_cap, LONG_LANE: args.long_cap},
+    )
+    report("fair", jobs, fair)
+
+
+if __name__ == "__main__":
+    main()
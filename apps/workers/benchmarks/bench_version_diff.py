@@ -0,0 +1,72 @@
+"""
+Cost of diffing a project against its parent version's index.
+
+Builds a parent index for --images source images, then streams the project
+with --added new and --changed re-annotated images through IndexDiff in
+the database page size used by generate_version_task, and merges the parts.
+Only the added and changed images are left for the process pool.
+
+Usage (from apps/workers, with .env configured):
+    python -m benchmarks.bench_version_diff --images 300000 --added 2000 --changed 500
+"""
+import argparse
+import time
+import uuid
+
+import numpy as np
+
+from app.services.executor import shard_items
+from app.services.version_index import IndexDiff, build_index, merge_parts
+
+
+def record(image_id, revision=0):
+    return {
+        "id": image_id,
+        "storage_path": f"ws/p/{image_id}.jpg",
+        "width": 1280,
+        "height": 960,
+        "orientation": 1,
+        "annotation_revision": revision,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=300000)
+    parser.add_argument("--added", type=int, default=2000)
+    parser.add_argument("--changed", type=int, default=500)
+    parser.add_argument("--shard-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ids = sorted(str(uuid.UUID(int=int(v))) for v in rng.integers(0, 2**63, args.images + args.added))
+    added = set(rng.choice(len(ids), args.added, replace=False).tolist())
+    existing = [image_id for i, image_id in enumerate(ids) if i not in added]
+
+    parent_parts = []
+    for part, records in enumerate(shard_items(existing, args.shard_size)):
+        parent_parts.append(build_index([record(i) for i in records], part, [3] * len(records)))
+    parent = np.sort(np.concatenate(parent_parts), order="image_id")
+    manifest = {"parts": [f"v1/part-{p:06d}.jsonl" for p in range(len(parent_parts))]}
+
+    changed = set(rng.choice(len(ids), args.changed, replace=False).tolist()) - added
+    current = [record(image_id, 1 if i in changed else 0) for i, image_id in enumerate(ids)]
+
+    start = time.perf_counter()
+    diff = IndexDiff(parent)
+    todo = [r for page in shard_items(current, 1000) for r in diff.changed(page)]
+    new_parts = {
+        f"v2/part-{shard:06d}.jsonl": build_index(records, shard, [3] * len(records))
+        for shard, records in enumerate(shard_items(todo, args.shard_size))
+    }
+    parts, excluded, index = merge_parts(diff, manifest, new_parts)
+    elapsed = time.perf_counter() - start
+
+    print(f"project images   {len(ids):8d}")
+    print(f"to process       {len(todo):8d}  (reused {diff.reused_images})")
+    print(f"manifest parts   {len(parts):8d}  ({len(excluded)} with exclusions)")
+    print(f"diff + merge     {elapsed:8.2f} s  {elapsed / len(ids) * 1e6:.2f} us/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Active-learning sampling tests: feature store, extractors and selection
+"""
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import dataset_versions
+from app.services.feature_store import FeatureStore
+from app.services.features import get_extractor
+from app.services.sampler import select_images
+from app.services.version_index import image_id_bytes
+from app.tasks import active_learning
+
+IDS = sorted(str(uuid.UUID(int=i << 64)) for i in range(1, 7))
+
+
+def blobs(sizes, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 10, (len(sizes), dim))
+    vectors = np.concatenate([center + rng.normal(0, 1, (n, dim)) for center, n in zip(centers, sizes)])
+    return vectors.astype(np.float32), np.repeat(np.arange(len(sizes)), sizes)
+
+
+def test_feature_store_appends_rows_to_a_memory_map(tmp_path):
+    store = FeatureStore(str(tmp_path), "p", "color_hog", 3)
+    store.append(image_id_bytes(IDS[:2]), np.array([[1, 2, 3], [4, 5, 6]]))
+    # A crash between the two writes leaves vectors without ids
+    with open(store.path / "vectors.f32", "ab") as file:
+        file.write(np.ones(3, np.float32).tobytes())
+
+    reopened = FeatureStore(str(tmp_path), "p", "color_hog", 3)
+    reopened.append(image_id_bytes(IDS[2:3]), np.array([[7, 8, 9]]))
+
+    assert len(reopened) == 3
+    assert reopened.ids().tolist() == image_id_bytes(IDS[:3]).tolist()
+    assert isinstance(reopened.vectors(), np.memmap)
+    assert reopened.vectors()[:, 0].tolist() == [1, 4, 7]
+
+
+def test_color_hog_features():
+    extractor = get_extractor("color_hog")
+    rng = np.random.default_rng(0)
+    features = extractor.extract_batch([rng.integers(0, 255, (120, 160, 3), dtype=np.uint8) for _ in range(2)])
+    assert features.shape == (2, extractor.dim) and features.dtype == np.float32
+    with pytest.raises(Exception, match="Unsupported feature extractor"):
+        get_extractor("clip")
+
+
+def test_kmeans_samples_underrepresented_clusters_first():
+    vectors, truth = blobs([1000, 1000, 1000, 50])
+    labeled = truth == 0
+    labeled[1000:1100] = True  # cluster 1 is partly labeled too
+    candidates = np.ones(len(vectors), dtype=bool)
+
+    picked, clusters = select_images(vectors, labeled, candidates, 7, "kmeans", clusters=4)
+
+    assert not labeled[picked].any()
+    # Clusters 2 and 3 have nothing labeled, so they alternate until they catch up with cluster 1
+    assert truth[picked].tolist()[:6] in ([2, 3] * 3, [3, 2] * 3)
+    assert len(set(clusters.tolist())) == 2
+
+
+def test_kcenter_picks_far_from_labeled_and_skips_non_candidates():
+    vectors, truth = blobs([500, 500, 500])
+    labeled = truth == 0
+    candidates = truth != 2  # e.g. deleted images
+
+    picked, clusters = select_images(vectors, labeled, candidates, 3, "kcenter", chunk_rows=128)
+    whole, _ = select_images(vectors, labeled, candidates, 3, "kcenter", chunk_rows=4096)
+
+    assert truth[picked].tolist() == [1, 1, 1]
+    assert picked.tolist() == whole.tolist() and clusters.tolist() == [-1] * 3
+
+
+def test_feature_shards_skip_stored_images(monkeypatch):
+    monkeypatch.setattr(
+        dataset_versions,
+        "iter_project_images",
+        lambda project_id: iter([{"id": i, "storage_path": f"{i}.jpg"} for i in IDS]),
+    )
+    live = []
+    shards = list(active_learning._feature_shards("p", np.sort(image_id_bytes(IDS[1:3])), live, {"level": "256"}, 2))
+
+    assert [[image["id"] for image in shard["images"]] for shard in shards] == [[IDS[0], IDS[3]], [IDS[4], IDS[5]]]
+    assert shards[0]["level"] == "256"
+    assert np.concatenate(live).tolist() == image_id_bytes(IDS).tolist()
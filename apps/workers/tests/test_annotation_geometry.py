@@ -0,0 +1,109 @@
+"""
+Annotation-aware preprocessing tests: geometry must follow the pixels
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.image_decode import decode_image, reduction_factor
+from app.services.orientation import orient_image
+from app.tasks.annotation_geometry import transform_bboxes, transform_keypoints, transform_polygons
+from app.tasks.augmentation import PreprocessingPipeline
+
+RESIZES = [
+    None,
+    {"width": 320, "height": 320, "mode": "stretch"},
+    {"width": 320, "height": 320, "mode": "fit"},
+    {"width": 320, "height": 320, "mode": "pad"},
+]
+
+
+def marked_image(width, height, box):
+    image = np.zeros((height, width, 3), np.uint8)
+    x, y, w, h = box
+    image[y:y + h, x:x + w] = 255
+    return image
+
+
+def bright_extent(image):
+    ys, xs = np.nonzero(image.max(axis=2) > 127)
+    return [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+
+
+@pytest.mark.parametrize("resize", RESIZES)
+@pytest.mark.parametrize("orientation, auto_orient", [(1, False), (6, True), (6, False), (3, False), (8, True)])
+def test_boxes_line_up_with_pixels(resize, orientation, auto_orient):
+    """Test that transformed boxes cover the same pixels as the transformed image"""
+    config = {"auto_orient": auto_orient, **({"resize": resize} if resize else {})}
+    pipeline = PreprocessingPipeline(config)
+    displayed = marked_image(1200, 800, (300, 200, 400, 240))
+    inverse = {1: 1, 3: 3, 6: 8, 8: 6}[orientation]
+    stored = orient_image(displayed, inverse)
+
+    image, matrix, boxes, keep = pipeline.preprocess(
+        stored, np.array([[300.0, 200.0, 400.0, 240.0]]), orientation, (1200, 800)
+    )
+
+    x0, y0, x1, y1 = bright_extent(image)
+    assert keep.tolist() == [True]
+    assert np.allclose(boxes[0], [x0, y0, x1 - x0, y1 - y0], atol=1.01)
+
+
+def test_reduced_decode_keeps_full_resolution_geometry():
+    """Test that a 1/4 decode produces the same output shape and box as a full decode"""
+    pipeline = PreprocessingPipeline({"resize": {"width": 320, "height": 320, "mode": "pad"}})
+    data = cv2.imencode(".png", marked_image(2002, 1201, (500, 300, 800, 400)))[1].tobytes()
+    factor = reduction_factor((2002, 1201), pipeline.config["resize"])
+
+    full = pipeline.preprocess_image(decode_image(data), 1, (2002, 1201))
+    reduced = pipeline.preprocess_image(decode_image(data, factor), 1, (2002, 1201))
+    _, _, boxes, _ = pipeline.preprocess(decode_image(data, factor), np.array([[500.0, 300, 800, 400]]), 1, (2002, 1201))
+
+    assert factor == 4
+    assert reduced.shape == full.shape == (320, 320, 3)
+    x0, y0, x1, y1 = bright_extent(reduced)
+    assert np.allclose(boxes[0], [x0, y0, x1 - x0, y1 - y0], atol=1.01)
+
+
+def test_boxes_are_clipped_and_dropped():
+    """Test clipping to the output and dropping boxes that fall outside"""
+    matrix = np.diag([0.5, 0.5, 1.0])
+    boxes, keep = transform_bboxes(np.array([[-10.0, 10, 40, 20], [300, 300, 10, 10]]), matrix, 100, 100)
+
+    assert keep.tolist() == [True, False]
+    assert boxes.tolist() == [[0.0, 5.0, 15.0, 10.0]]
+
+
+def test_per_box_matrices_match_per_image_transforms():
+    """Test that one batched call over several images matches per-image calls"""
+    pipeline = PreprocessingPipeline({"resize": {"width": 320, "height": 320, "mode": "fit"}})
+    sizes = [((640, 480), 1), ((480, 640), 6), ((1000, 200), 3)]
+    bboxes = np.random.default_rng(0).uniform(0, 200, size=(3, 5, 4))
+    matrices = [pipeline.annotation_matrix(size, orientation) for size, orientation in sizes]
+    outputs = [pipeline.input_size(size, orientation) for size, orientation in sizes]
+    owner = np.repeat(np.arange(3), 5)
+
+    batched, keep = transform_bboxes(
+        bboxes.reshape(-1, 4),
+        np.stack(matrices)[owner],
+        np.array([pipeline.plan.geometry(*o)[0][0] for o in outputs])[owner],
+        np.array([pipeline.plan.geometry(*o)[0][1] for o in outputs])[owner],
+    )
+    expected = [
+        transform_bboxes(boxes, matrix, *pipeline.plan.geometry(*o)[0])
+        for boxes, matrix, o in zip(bboxes, matrices, outputs)
+    ]
+
+    assert np.allclose(batched, np.concatenate([boxes for boxes, _ in expected]))
+    assert keep.tolist() == np.concatenate([mask for _, mask in expected]).tolist()
+
+
+def test_polygons_and_keypoints_share_the_matrix():
+    """Test that polygons and keypoints use the same affine as boxes"""
+    matrix = PreprocessingPipeline({"resize": {"width": 100, "height": 100, "mode": "pad"}}).annotation_matrix((200, 100))
+    polygons = transform_polygons([np.array([[0.0, 0], [200, 0], [200, 100]]), np.array([[100.0, 50]])], matrix, 100, 100)
+    keypoints = transform_keypoints(np.array([[100.0, 50, 1], [100, 150, 1]]), matrix, 100, 100)
+
+    assert [polygon.tolist() for polygon in polygons] == [[[0, 25], [100, 25], [100, 75]], [[50, 50]]]
+    assert keypoints.tolist() == [[50, 50, 1], [50, 100, 1]]
+    assert transform_keypoints(np.array([[100.0, 250, 1]]), matrix, 100, 100)[0, 2] == 0
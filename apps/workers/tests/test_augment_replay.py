@@ -0,0 +1,164 @@
+"""
+Seeded augmentation and replay manifest tests
+"""
+import io
+import json
+import random
+import socket
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import cv2
+import numpy as np
+import pytest
+from moto.server import ThreadedMotoServer
+
+from app.services import preprocess_cache
+from app.services.preprocess_cache import PreprocessCache
+from app.services.zip_export import export_version_archive
+from app.tasks import augment_replay, augmentation
+from app.tasks.augment_replay import ReplayOutputCache
+from app.tasks.augmentation import (
+    AugmentationPipeline,
+    VersionShard,
+    materialize_replay_outputs,
+    process_version_shard,
+    render_replay_entry,
+)
+
+AUGMENTATION = {
+    "flip_horizontal": True,
+    "rotate": {"limit": 15},
+    "shear": {"limit": 10},
+    "noise": True,
+    "multiplier": 4,
+    "seed": 7,
+}
+IMAGE_ID = "5b0c8a52-3f7e-4d4a-9a55-0d5f3a9c2e11"
+CONFIG = {"preprocessing": {"resize": {"width": 96, "height": 96, "mode": "stretch"}}, "augmentation": AUGMENTATION}
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    from app.services.storage import StorageService
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    service = StorageService()
+    service.s3_client = boto3.client(
+        "s3",
+        endpoint_url=f"http://127.0.0.1:{port}",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+    )
+    service.s3_client.create_bucket(Bucket=service.bucket_name)
+    monkeypatch.setattr(augmentation, "get_storage_service", lambda: service)
+    monkeypatch.setattr(preprocess_cache, "_preprocess_cache", PreprocessCache(str(tmp_path), 1 << 30))
+    monkeypatch.setattr(augment_replay, "_replay_cache", ReplayOutputCache(1 << 20))
+    yield service
+    server.stop()
+
+
+def seed_source(storage, path):
+    pixels = np.random.default_rng(1).integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+    storage.put_object_bytes(path, cv2.imencode(".png", pixels)[1].tobytes(), "image/png")
+
+
+def generate(storage):
+    seed_source(storage, "ws/p/source.png")
+    record = {
+        "id": IMAGE_ID, "storage_path": "ws/p/source.png", "width": 160, "height": 120,
+        "orientation": 1, "split": "train",
+        "annotations": [{"class_name": "cell", "bbox": [20.0, 30.0, 40.0, 50.0]}],
+    }
+    result = process_version_shard(VersionShard(0, "ws", "ws/p/versions/v1", CONFIG, [record]))
+    part = "ws/p/versions/v1/manifest/part-000000.jsonl"
+    storage.put_object_bytes(
+        "ws/p/versions/v1/manifest.json", json.dumps({"parts": [part]}).encode(), "application/json"
+    )
+    entries = [json.loads(line) for line in storage.get_object_bytes(part).splitlines()]
+    return result, entries
+
+
+def test_seeded_augmentation_is_reproducible():
+    """Test that a seed fixes the output and leaves the global generators alone"""
+    pipeline = AugmentationPipeline(AUGMENTATION)
+    image = np.random.default_rng(0).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    random.seed(3)
+    expected_next = random.random()
+    random.seed(3)
+
+    first = pipeline.augment_seeded(image, [[5.0, 5.0, 20.0, 20.0]], ["cell"], [11, 12])
+    second = pipeline.augment_seeded(image, [], [], [11, 12])
+
+    assert random.random() == expected_next
+    assert all(np.array_equal(a["image"], b["image"]) for a, b in zip(first, second))
+    assert not np.array_equal(first[0]["image"], first[1]["image"])
+    assert json.loads(json.dumps(first[0]["replay"])) == first[0]["replay"]
+
+
+def test_seeded_version_stores_replay_records_only(storage):
+    """Test that seeded train variants are recorded in the manifest, not uploaded"""
+    result, entries = generate(storage)
+    stored = storage.s3_client.list_objects_v2(Bucket=storage.bucket_name, Prefix="ws/p/versions/v1/train/")
+
+    assert result["outputs"] == len(entries) == AUGMENTATION["multiplier"]
+    assert stored["KeyCount"] == 0
+    assert len({entry["replay"]["seed"] for entry in entries}) == len(entries)
+    assert all(entry["width"] == entry["height"] == 96 for entry in entries)
+
+
+def test_replayed_outputs_are_byte_identical(storage, monkeypatch):
+    """Test that renders, downloads and exports all produce the same bytes"""
+    _, entries = generate(storage)
+    first = [render_replay_entry(entry, CONFIG, "ws", storage) for entry in entries]
+    monkeypatch.setattr(augment_replay, "_replay_cache", ReplayOutputCache(1 << 20))
+    second = [render_replay_entry(entry, CONFIG, "ws", storage) for entry in entries]
+
+    written = materialize_replay_outputs(
+        storage, "ws/p/versions/v1/manifest.json", CONFIG, "ws", [entries[0]["storage_path"]]
+    )
+    export_version_archive(
+        storage, "ws/p/versions/v1/manifest.json", "ws/p/versions/v1/export.zip",
+        part_size=5 * 1024 * 1024,
+        render=lambda entry: render_replay_entry(entry, CONFIG, "ws", storage),
+    )
+    archive = zipfile.ZipFile(io.BytesIO(storage.get_object_bytes("ws/p/versions/v1/export.zip")))
+
+    assert first == second
+    assert written == 1
+    assert storage.get_object_bytes(entries[0]["storage_path"]) == first[0]
+    assert archive.read(f"train/images/{IMAGE_ID}_0.jpg") == first[0]
+
+
+def test_concurrent_renders_do_not_share_random_state(storage, monkeypatch):
+    """Test that renders on several threads (to_thread in the ARQ process) stay byte-identical"""
+    _, entries = generate(storage)
+    monkeypatch.setattr(augment_replay, "_replay_cache", ReplayOutputCache(0))
+    expected = [render_replay_entry(entry, CONFIG, "ws", storage) for entry in entries]
+    pipeline = AugmentationPipeline(AUGMENTATION)
+    image = np.random.default_rng(0).integers(0, 256, size=(256, 256, 3), dtype=np.uint8)
+    seeds = list(range(40))
+    images = [result["image"] for result in pipeline.augment_seeded(image, [], [], seeds)]
+
+    with ThreadPoolExecutor(8) as pool:
+        renders = [pool.submit(render_replay_entry, entry, CONFIG, "ws", storage) for entry in entries * 4]
+        augments = [pool.submit(pipeline.augment_seeded, image, [], [], seeds) for _ in range(8)]
+        assert [render.result() for render in renders] == expected * 4
+        for augment in augments:
+            assert all(np.array_equal(a["image"], b) for a, b in zip(augment.result(), images))
+
+
+def test_replay_rejects_changed_source(storage, monkeypatch):
+    """Test that a re-uploaded source image cannot be replayed silently"""
+    _, entries = generate(storage)
+    monkeypatch.setattr(augment_replay, "_replay_cache", ReplayOutputCache(1 << 20))
+    storage.put_object_bytes("ws/p/source.png", b"different", "image/png")
+
+    with pytest.raises(Exception, match="changed since the version was generated"):
+        render_replay_entry(entries[0], CONFIG, "ws", storage)
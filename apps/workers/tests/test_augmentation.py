@@ -2,7 +2,14 @@
 Augmentation pipeline tests
 """
 import numpy as np
-from app.tasks.augmentation import AugmentationPipeline, PreprocessingPipeline
+from app.tasks.augmentation import (
+    AugmentationPipeline,
+    PreprocessingPipeline,
+    _write_variants,
+    assign_split,
+    config_fingerprint,
+    get_pipelines,
+)
 
 
 def test_augmentation_pipeline_init():
@@ -22,3 +29,41 @@ def test_preprocessing_pipeline_init():
     }
     pipeline = PreprocessingPipeline(config)
     assert pipeline.config == config
+
+
+def test_config_fingerprint_ignores_key_order():
+    """Test that equivalent configs share a fingerprint"""
+    a = {"resize": {"width": 640, "height": 640}, "grayscale": True}
+    b = {"grayscale": True, "resize": {"height": 640, "width": 640}}
+    assert config_fingerprint(a) == config_fingerprint(b)
+
+
+def test_get_pipelines_built_once_per_config():
+    """Test that pipelines are reused within a process"""
+    first = get_pipelines({"grayscale": True}, {"multiplier": 2})
+    second = get_pipelines({"grayscale": True}, {"multiplier": 2})
+    assert first[0] is second[0] and first[1] is second[1]
+
+
+def test_assign_split_is_deterministic():
+    """Test that split assignment is stable and follows the weights"""
+    split_config = {"train": 70, "valid": 20, "test": 10}
+    splits = [assign_split(f"image-{i}", split_config) for i in range(2000)]
+    assert splits == [assign_split(f"image-{i}", split_config) for i in range(2000)]
+    assert 0.65 < splits.count("train") / len(splits) < 0.75
+    assert assign_split("image-1", {}) == "train"
+
+
+def test_identical_variants_are_all_written():
+    """Test that variants where no transform fired still yield one output each"""
+    stored = {}
+
+    class Storage:
+        def put_object_bytes(self, path, data, content_type):
+            stored[path] = data
+
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    variants = [{"image": image, "bboxes": [], "class_labels": []} for _ in range(3)]
+    record = {"id": "image-1", "split": "train"}
+    lines = _write_variants(record, variants, "ws/p/versions/v1", Storage())
+    assert len(lines) == len(stored) == 3
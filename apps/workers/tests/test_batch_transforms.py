@@ -0,0 +1,66 @@
+"""
+Vectorized batch augmentation tests
+"""
+import albumentations as A
+import albumentations.augmentations.functional as F
+import numpy as np
+
+from app.tasks.augmentation import AugmentationPipeline
+from app.tasks.batch_transforms import BoxSet, brightness_contrast, horizontal_flip, shift_hsv
+
+rng = np.random.default_rng(0)
+IMAGES = rng.integers(0, 256, size=(4, 32, 48, 3), dtype=np.uint8)
+
+
+def test_brightness_contrast_matches_albumentations():
+    """Test that the batch LUT kernel matches the per-image albumentations result"""
+    alpha = np.array([0.8, 1.0, 1.2, 1.15])
+    beta = np.array([-0.1, 0.2, 0.0, 0.05])
+    result = IMAGES.copy()
+    brightness_contrast(result, np.arange(4), alpha, beta)
+    for i, image in enumerate(IMAGES):
+        expected = F.brightness_contrast_adjust(image, alpha[i], beta[i], beta_by_max=True)
+        np.testing.assert_array_equal(result[i], expected)
+
+
+def test_shift_hsv_matches_albumentations():
+    """Test that the batch HSV kernel matches the per-image albumentations result"""
+    hue = np.array([-12.5, 3.0, 19.9, 7.0])
+    sat = np.array([10.0, -25.0, 4.4, 30.0])
+    val = np.array([-5.0, 15.5, -20.0, 1.0])
+    result = IMAGES.copy()
+    shift_hsv(result, np.arange(4), hue, sat, val)
+    for i, image in enumerate(IMAGES):
+        expected = F.shift_hsv(image, hue[i], sat[i], val[i])
+        np.testing.assert_array_equal(result[i], expected)
+
+
+def test_horizontal_flip_moves_boxes_of_flipped_samples_only():
+    """Test that flips transform boxes of the selected samples"""
+    batch = IMAGES.copy()
+    box_set = BoxSet.from_samples([[[1, 2, 10, 5]], [[1, 2, 10, 5]]], [["a"], ["b"]])
+    horizontal_flip(batch[:2], box_set, np.array([True, False]))
+
+    np.testing.assert_array_equal(batch[0], IMAGES[0][:, ::-1])
+    np.testing.assert_array_equal(batch[1], IMAGES[1])
+    assert box_set.sample(0) == ([[37.0, 2.0, 10.0, 5.0]], ["a"])
+    assert box_set.sample(1) == ([[1.0, 2.0, 10.0, 5.0]], ["b"])
+
+
+def test_augment_batch_returns_n_times_multiplier():
+    """Test batch output count, order and per-image fallback for rotation"""
+    pipeline = AugmentationPipeline({
+        "flip_horizontal": True,
+        "rotate": {"limit": 10},
+        "hue_saturation": {},
+        "multiplier": 3,
+    })
+    bboxes = [[[4, 4, 10, 10]] for _ in IMAGES]
+    labels = [[f"class-{i}"] for i in range(len(IMAGES))]
+
+    results = pipeline.augment_batch(IMAGES, bboxes, labels)
+
+    assert len(results) == len(IMAGES) * 3
+    assert [r["class_labels"] for r in results[3:6]] == [["class-1"]] * 3
+    assert all(r["image"].shape == IMAGES[0].shape for r in results)
+    assert isinstance(pipeline.transforms[1], A.Rotate)
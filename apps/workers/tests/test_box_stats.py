@@ -0,0 +1,113 @@
+"""
+Box geometry statistics tests: binning, merging of partials and buckets
+"""
+import uuid
+
+import numpy as np
+
+from app.services import dataset_versions
+from app.services.box_stats import GRID, BoxStats, stats_partitions
+from app.services.version_index import build_index
+from app.tasks.analytics import _build_stats_shards
+
+
+def random_columns(rng, images, boxes, classes):
+    sizes = rng.integers(100, 2000, size=(images, 2)).astype(np.float64)
+    box_image = np.sort(rng.integers(0, images, size=boxes))
+    wh = rng.uniform(0.01, 0.5, size=(boxes, 2)) * sizes[box_image]
+    xy = rng.uniform(0, 0.5, size=(boxes, 2)) * sizes[box_image]
+    names = [f"class{c}" for c in range(classes)]
+    return sizes, box_image, rng.integers(0, classes, size=boxes), np.column_stack([xy, wh]), names
+
+
+def test_from_columns_bins_boxes():
+    sizes = np.array([[200.0, 100.0], [100.0, 100.0], [0.0, 0.0]])
+    # A centered 100x50 box, a top-left 10x40 box, a box without area and a
+    # box on an image without a size
+    bboxes = np.array([[50, 25, 100, 50], [0, 0, 10, 40], [5, 5, 0, 10], [1, 1, 5, 5]], dtype=np.float64)
+    stats = BoxStats.from_columns(sizes, np.array([0, 0, 1, 2]), np.array([0, 1, 1, 0]), bboxes, ["car", "person"])
+
+    assert (stats.images, stats.empty_images, stats.invalid_boxes) == (3, 2, 2)
+    assert stats.boxes.tolist() == [1, 1]
+    assert stats.images_with.tolist() == [1, 1]
+    assert stats.centers[0, GRID // 2, GRID // 2] == 1
+    assert stats.centers[1, 2 * GRID // 10, GRID // 40] == 1
+    np.testing.assert_allclose(stats.sums[0], [0.5, 0.5, 0.25])
+
+    summary = stats.summary()
+    assert summary["boxes"] == 2
+    assert abs(sum(map(sum, summary["heatmap"])) - 1.0) < 1e-9
+    assert [c["class_name"] for c in summary["classes"]] == ["car", "person"]
+    assert summary["classes"][0]["std_width"] == 0.0
+
+
+def test_shard_partials_merge_to_whole():
+    rng = np.random.default_rng(0)
+    sizes, box_image, class_ids, bboxes, names = random_columns(rng, 200, 5000, 5)
+    whole = BoxStats.from_columns(sizes, box_image, class_ids, bboxes, names)
+
+    # Shards see their own class numbering, as load_bbox_columns() builds it
+    parts = []
+    for lo, hi in [(0, 70), (70, 150), (150, 200)]:
+        rows = (box_image >= lo) & (box_image < hi)
+        present, inverse = np.unique(class_ids[rows], return_inverse=True)
+        numbering = rng.permutation(len(present))
+        local_names = [None] * len(present)
+        for c, position in zip(present, numbering):
+            local_names[position] = names[c]
+        parts.append(
+            BoxStats.from_columns(sizes[lo:hi], box_image[rows] - lo, numbering[inverse], bboxes[rows], local_names)
+        )
+    merged = BoxStats.merge_all(reversed(parts))
+    merged = BoxStats.from_bytes(merged.to_bytes())
+
+    order = [merged.class_names.index(name) for name in names]
+    assert merged.images == whole.images and merged.empty_images == whole.empty_images
+    for name in ("boxes", "images_with", "centers", "sizes", "aspects"):
+        assert np.array_equal(getattr(merged, name)[order], getattr(whole, name)), name
+    np.testing.assert_allclose(merged.squares[order], whole.squares)
+    assert [(c["class_name"], c["boxes"], c["images"]) for c in merged.summary()["classes"]] == [
+        (c["class_name"], c["boxes"], c["images"]) for c in whole.summary()["classes"]
+    ]
+
+
+def test_partitions_change_only_with_their_images():
+    records = [
+        {"id": str(uuid.UUID(int=(i * 37 % 256) << 120 | i)), "storage_path": f"{i}.jpg",
+         "width": 64, "height": 48, "annotation_revision": 0}
+        for i in range(40)
+    ]
+    before = {bucket: fp for bucket, fp, _ in stats_partitions(build_index(records, 0, [1] * 40))}
+    records[5]["annotation_revision"] = 1
+    after = {bucket: fp for bucket, fp, _ in stats_partitions(build_index(records, 0, [1] * 40))}
+
+    assert len(before) == 40
+    assert [b for b in before if before[b] != after[b]] == [5 * 37 % 256]
+
+
+def test_changed_images_are_skipped_not_fatal(monkeypatch):
+    records = [
+        {"id": str(uuid.UUID(int=(i % 2) << 127 | i)), "storage_path": f"{i}.jpg",
+         "width": 64, "height": 48, "annotation_revision": 0}
+        for i in range(6)
+    ]
+    partitions = [(bucket, f"{bucket}.npz", rows) for bucket, _, rows in stats_partitions(build_index(records, 0, [1] * 6))]
+    live = {record["id"]: dict(record) for record in records}
+    live[records[1]["id"]]["annotation_revision"] = 1  # re-annotated since generation
+    del live[records[3]["id"]]  # deleted
+    monkeypatch.setattr(dataset_versions, "load_image_records", lambda ids: {i: live[i] for i in ids if i in live})
+    loaded = []
+
+    def load_bbox_columns(image_ids, class_index):
+        loaded.extend(image_ids)
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros((0, 4))
+
+    monkeypatch.setattr(dataset_versions, "load_bbox_columns", load_bbox_columns)
+    skipped = []
+    shards = list(_build_stats_shards(partitions, skipped))
+
+    assert sorted(skipped) == sorted([records[1]["id"], records[3]["id"]])
+    assert sorted(loaded) == sorted(set(live) - {records[1]["id"]})
+    # Only the unchanged bucket's partial is stored for reuse
+    assert [shard.storage_path is None for shard in shards] == [False, True]
+    assert sum(len(shard.image_sizes) for shard in shards) == 4
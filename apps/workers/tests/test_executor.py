@@ -0,0 +1,32 @@
+"""
+Sharded process-pool engine tests
+"""
+import asyncio
+
+from app.services.executor import ShardedExecutor, shard_items
+
+
+def square_sum(shard):
+    return sum(value * value for value in shard)
+
+
+def test_shard_items_splits_lazily():
+    """Test that shards have the requested size with a short tail"""
+    shards = list(shard_items(iter(range(10)), 4))
+    assert shards == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_map_shards_yields_every_result():
+    """Test that every shard runs in the pool and is yielded once"""
+    executor = ShardedExecutor(max_workers=2)
+
+    async def run():
+        return [r async for r in executor.map_shards(square_sum, shard_items(range(100), 7))]
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert len(results) == 15
+    assert sum(results) == sum(value * value for value in range(100))
@@ -0,0 +1,176 @@
+"""
+Tests for the columnar annotation table and export formats
+"""
+import json
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+import yaml
+
+from app.formats import FORMATS, AnnotationFormat, AnnotationTable, get_format, register_format
+from app.formats.columnar import normalize_cxcywh, xywh_to_xyxy, xyxy_to_xywh
+from app.formats.yolo import encode_label_rows
+
+ENTRIES = [
+    {
+        "source_image_id": "a",
+        "split": "train",
+        "storage_path": "ws/p/versions/v/train/a_0.jpg",
+        "width": 100,
+        "height": 50,
+        "annotations": [
+            {"class_name": "cat", "bbox": [10.0, 5.0, 20.0, 10.0]},
+            {"class_name": "dog", "bbox": [90.0, 40.0, 20.0, 20.0]},
+        ],
+    },
+    {
+        "source_image_id": "b",
+        "split": "valid",
+        "storage_path": "ws/p/versions/v/valid/b_0.jpg",
+        "width": 200,
+        "height": 100,
+        "annotations": [],
+    },
+    {
+        "source_image_id": "c",
+        "split": "train",
+        "storage_path": "ws/p/versions/v/train/c_0.jpg",
+        "width": 40,
+        "height": 40,
+        "annotations": [{"class_name": "dog", "bbox": [-5.0, 0.0, 10.0, 40.0]}],
+    },
+]
+
+
+def make_table():
+    class_index = {}
+    return AnnotationTable.from_manifest_entries(ENTRIES, class_index, first_image_id=1), class_index
+
+
+def collect(files):
+    return {name: b"".join(chunks).decode() for name, chunks in files}
+
+
+def test_table_columns():
+    """Test that manifest entries become flat per-image and per-box columns"""
+    table, class_index = make_table()
+
+    assert class_index == {"cat": 0, "dog": 1}
+    assert table.image_ids.tolist() == [1, 2, 3]
+    assert table.box_image.tolist() == [0, 0, 2]
+    assert table.class_ids.tolist() == [0, 1, 1]
+    assert table.box_offsets().tolist() == [0, 2, 2, 3]
+    assert table.file_names == ["a_0.jpg", "b_0.jpg", "c_0.jpg"]
+
+
+def test_box_conversions():
+    """Test that corner and normalized conversions are exact inverses"""
+    boxes = np.random.default_rng(0).uniform(0, 50, size=(1000, 4))
+    np.testing.assert_allclose(xyxy_to_xywh(xywh_to_xyxy(boxes)), boxes)
+
+    normalized = normalize_cxcywh(
+        np.array([[10.0, 5.0, 20.0, 10.0]]), np.array([100.0]), np.array([50.0])
+    )
+    np.testing.assert_allclose(normalized, [[0.2, 0.2, 0.2, 0.2]])
+
+
+def test_clipped_and_subset():
+    """Test that clipping trims boxes to the image and subsets reindex boxes"""
+    table, _ = make_table()
+    clipped = table.clipped()
+    np.testing.assert_allclose(clipped.bboxes[1], [90.0, 40.0, 10.0, 10.0])
+    np.testing.assert_allclose(clipped.bboxes[2], [0.0, 0.0, 5.0, 40.0])
+
+    train = table.subset(np.array([True, False, True]))
+    assert train.image_ids.tolist() == [1, 3]
+    assert train.box_image.tolist() == [0, 0, 1]
+
+
+def test_yolo_labels():
+    """Test YOLO label files and data.yaml"""
+    table, class_index = make_table()
+    yolo = get_format("yolo")
+    files = collect(yolo.image_files(table, list(class_index)))
+
+    assert files["train/labels/a_0.txt"].splitlines() == [
+        "0 0.200000 0.200000 0.200000 0.200000",
+        "1 0.950000 0.900000 0.100000 0.200000",
+    ]
+    assert files["valid/labels/b_0.txt"] == ""
+    assert yolo.image_path("train", "a_0.jpg") == "train/images/a_0.jpg"
+    data_yaml = collect(yolo.dataset_files(["train", "valid", "test"], ["cat", "dog"]))["data.yaml"]
+    data = yaml.safe_load(data_yaml)
+    assert data["train"] == "train/images" and data["test"] == "test/images"
+    assert data["val"] == "valid/images" and "valid" not in data
+    assert data["nc"] == 2 and data["names"] == {0: "cat", 1: "dog"}
+
+
+def test_yolo_data_yaml_quotes_class_names():
+    """Test that class names with quotes, backslashes and YAML syntax survive a YAML parser"""
+    names = ["cat", "it's a \"dog\"", "C:\\path", "key: value # not a comment", "yes", "café", "- item"]
+    data_yaml = collect(get_format("yolo").dataset_files(["train"], names))["data.yaml"]
+
+    document = yaml.safe_load(data_yaml)
+    assert document["nc"] == len(names)
+    assert document["names"] == dict(enumerate(names))
+
+
+def test_voc_xml():
+    """Test VOC annotation files use clipped integer corners"""
+    table, class_index = make_table()
+    files = collect(get_format("voc").image_files(table, list(class_index)))
+
+    root = ET.fromstring(files["train/a_0.xml"])
+    assert root.findtext("size/width") == "100"
+    objects = root.findall("object")
+    assert [o.findtext("name") for o in objects] == ["cat", "dog"]
+    assert [int(objects[1].findtext(f"bndbox/{k}")) for k in ("xmin", "ymin", "xmax", "ymax")] == [
+        90, 40, 100, 50,
+    ]
+    assert ET.fromstring(files["valid/b_0.xml"]).findall("object") == []
+
+
+def test_coco_document():
+    """Test that the streamed COCO document is valid JSON with 1-based ids"""
+    table, class_index = make_table()
+    coco = get_format("coco")
+    train = table.subset(np.array([True, False, True]))
+    files = collect(coco.split_files("train", lambda: iter([train]), list(class_index)))
+    document = json.loads(files["train/_annotations.coco.json"])
+
+    assert [image["id"] for image in document["images"]] == [1, 3]
+    assert [a["id"] for a in document["annotations"]] == [1, 2, 3]
+    assert [a["category_id"] for a in document["annotations"]] == [1, 2, 2]
+    assert document["annotations"][2]["bbox"] == [0.0, 0.0, 5.0, 40.0]
+    assert document["categories"][1] == {"id": 2, "name": "dog", "supercategory": "none"}
+    assert coco.image_path("train", "a_0.jpg") == "train/a_0.jpg"
+
+
+def test_registry():
+    """Test that formats plug in by name and unknown names fail"""
+
+    @register_format
+    class CsvFormat(AnnotationFormat):
+        name = "test-csv"
+
+    try:
+        assert isinstance(get_format("test-csv"), CsvFormat)
+    finally:
+        FORMATS.pop("test-csv")
+    with pytest.raises(Exception, match="Unsupported export format"):
+        get_format("missing")
+
+
+def test_encode_label_rows_matches_printf():
+    """Test that array-encoded YOLO rows equal %-formatted rows"""
+    rng = np.random.default_rng(0)
+    class_ids = rng.integers(0, 120, size=500)
+    normalized = rng.random((500, 4))
+    encoded, offsets = encode_label_rows(class_ids, normalized)
+
+    expected = "".join(
+        "%d %.6f %.6f %.6f %.6f\n" % (c, *row) for c, row in zip(class_ids, normalized.tolist())
+    )
+    assert encoded.decode() == expected
+    assert encoded[offsets[7]:offsets[8]].decode() == expected.splitlines(keepends=True)[7]
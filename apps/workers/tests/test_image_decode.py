@@ -0,0 +1,63 @@
+"""
+Reduced-resolution decode and download buffer tests
+"""
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.image_decode import ObjectBuffer, decode_image, reduction_factor
+
+
+class InMemoryStorage:
+    """Serves objects from a dict through the StorageService streaming API"""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def open_object_stream(self, storage_path):
+        data = self.objects[storage_path]
+        return io.BytesIO(data), len(data)
+
+
+@pytest.mark.parametrize(
+    "size, resize, factor",
+    [
+        ((6000, 4000), {"width": 640, "height": 640, "mode": "fit"}, 8),
+        ((6000, 4000), {"width": 640, "height": 640, "mode": "stretch"}, 4),
+        ((2000, 1500), {"width": 640, "height": 640, "mode": "pad"}, 2),
+        ((1000, 800), {"width": 640, "height": 640}, 1),
+        ((6000, 4000), None, 1),
+    ],
+)
+def test_reduction_factor_keeps_target_resolution(size, resize, factor):
+    """Test that the decode never drops below the resized resolution"""
+    assert reduction_factor(size, resize) == factor
+
+
+def test_reduced_decode_matches_full_decode():
+    """Test that a 1/4 JPEG decode is close to a full decode resized by 4"""
+    y, x = np.mgrid[0:1200, 0:1600]
+    image = np.dstack([x % 256, y % 256, (x + y) % 256]).astype(np.uint8)
+    data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+
+    reduced = decode_image(memoryview(data), 4)
+    full = cv2.resize(decode_image(data), (400, 300), interpolation=cv2.INTER_AREA)
+
+    assert reduced.shape == (300, 400, 3)
+    assert np.abs(reduced.astype(int) - full).mean() < 3
+    assert decode_image(b"not an image") is None
+
+
+def test_object_buffer_is_reused():
+    """Test that reads land in one buffer, grown only for larger objects"""
+    storage = InMemoryStorage({"small": b"a" * 10, "large": b"b" * 1000})
+    buffer = ObjectBuffer(initial_size=100)
+
+    first = buffer.read(storage, "small")
+    assert bytes(first) == b"a" * 10
+    backing = first.obj
+    assert buffer.read(storage, "small").obj is backing
+    assert bytes(buffer.read(storage, "large")) == b"b" * 1000
+    assert buffer.read(storage, "small").obj is not backing
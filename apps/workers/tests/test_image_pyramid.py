@@ -0,0 +1,141 @@
+"""
+Image pyramid and EXIF orientation tests
+"""
+import io
+import socket
+
+import boto3
+import cv2
+import numpy as np
+import pytest
+from moto.server import ThreadedMotoServer
+from PIL import Image, ImageOps
+
+from app.formats.columnar import transform_xyxy
+from app.services.image_pyramid import FULL_LEVEL, build_pyramid, pyramid_levels, pyramid_path
+from app.services.orientation import (
+    orient_image,
+    orientation_matrix,
+    oriented_shape,
+    read_orientation,
+)
+from app.tasks import thumbnails
+from app.tasks.augmentation import PreprocessingPipeline
+
+
+def encoded_with_orientation(pixels, orientation):
+    image = Image.fromarray(pixels)
+    exif = image.getexif()
+    exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("orientation", range(1, 9))
+def test_orientation_matches_pillow(orientation):
+    """Test that orient_image reproduces Pillow's exif_transpose"""
+    pixels = np.random.default_rng(orientation).integers(0, 256, size=(5, 8, 3), dtype=np.uint8)
+    data = encoded_with_orientation(pixels, orientation)
+    stored = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED | cv2.IMREAD_IGNORE_ORIENTATION)
+    expected = np.asarray(ImageOps.exif_transpose(Image.open(io.BytesIO(data))))
+
+    assert read_orientation(data) == orientation
+    # cv2 decodes BGR, Pillow RGB
+    assert np.array_equal(orient_image(stored, orientation), expected[..., ::-1])
+    assert oriented_shape(stored.shape, orientation) == expected.shape[:2]
+
+
+@pytest.mark.parametrize("orientation", range(1, 9))
+def test_orientation_matrix_moves_boxes_with_pixels(orientation):
+    """Test that a box around a marked region follows it through orientation"""
+    stored = np.zeros((40, 60), np.uint8)
+    stored[5:15, 10:30] = 255
+    displayed = orient_image(stored, orientation)
+    ys, xs = np.nonzero(displayed)
+
+    box = transform_xyxy(np.array([[10.0, 5.0, 30.0, 15.0]]), orientation_matrix(orientation, 60, 40))
+
+    assert box.tolist() == [[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]]
+    displayed_box = np.array([[xs.min(), ys.min(), xs.max() + 1 - xs.min(), ys.max() + 1 - ys.min()]], float)
+    unoriented = PreprocessingPipeline({}).preprocess(stored, displayed_box, orientation)[2]
+    assert unoriented.tolist() == [[10.0, 5.0, 20.0, 10.0]]
+
+
+def test_read_orientation_defaults_to_upright():
+    """Test that images without EXIF, or undecodable bytes, read as orientation 1"""
+    ok, encoded = cv2.imencode(".jpg", np.zeros((4, 4, 3), np.uint8))
+    assert read_orientation(encoded.tobytes()) == 1
+    assert read_orientation(b"not an image") == 1
+
+
+def test_build_pyramid_levels():
+    """Test level sizes, formats and that small images are never upscaled"""
+    image = np.random.default_rng(0).integers(0, 256, size=(1500, 3000, 3), dtype=np.uint8)
+    levels = build_pyramid(image, [256, 1024, 4096], "webp", 80)
+
+    decoded = {level: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) for level, data in levels.items()}
+    assert set(levels) == set(pyramid_levels([256, 1024, 4096]))
+    assert decoded["256"].shape == (128, 256, 3)
+    assert decoded["1024"].shape == (512, 1024, 3)
+    assert decoded["4096"].shape == (1500, 3000, 3)
+    assert decoded[FULL_LEVEL].shape == (1500, 3000, 3)
+    assert levels["256"][8:12] == b"WEBP"
+    assert levels[FULL_LEVEL][:2] == b"\xff\xd8"
+
+
+def test_pyramid_path_is_a_sibling_of_the_original():
+    """Test that level keys stay under the project's storage prefix"""
+    assert pyramid_path("t/p/cat.jpg", "256") == "t/p/_pyramid/cat.jpg/256.webp"
+    assert pyramid_path("t/p/cat.jpg", FULL_LEVEL) == "t/p/_pyramid/cat.jpg/full.jpg"
+    assert pyramid_levels([1024, 256]) == ["256", "1024", FULL_LEVEL]
+
+
+def test_process_pyramid_shard_writes_upright_levels(monkeypatch):
+    """Test that a shard writes every level and reports displayed sizes"""
+    from app.services.storage import StorageService
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    try:
+        storage = StorageService()
+        storage.s3_client = boto3.client(
+            "s3",
+            endpoint_url=f"http://127.0.0.1:{port}",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+            region_name="us-east-1",
+        )
+        storage.bucket_name = "test-bucket"
+        storage.s3_client.create_bucket(Bucket="test-bucket")
+        monkeypatch.setattr(thumbnails, "get_storage_service", lambda: storage)
+
+        pixels = np.zeros((300, 600, 3), np.uint8)
+        storage.put_object_bytes("t/p/rotated.png", encoded_with_orientation(pixels, 6), "image/png")
+        storage.put_object_bytes("t/p/broken.jpg", b"not an image", "image/jpeg")
+
+        result = thumbnails.process_pyramid_shard({
+            "images": [
+                {"id": "a", "storage_path": "t/p/rotated.png"},
+                {"id": "b", "storage_path": "t/p/broken.jpg"},
+            ],
+            "sizes": [256],
+            "format": "webp",
+            "quality": 80,
+        })
+        thumbnail = storage.s3_client.head_object(Bucket="test-bucket", Key="t/p/_pyramid/rotated.png/256.webp")
+        level = cv2.imdecode(
+            np.frombuffer(storage.get_object_bytes("t/p/_pyramid/rotated.png/256.webp"), np.uint8),
+            cv2.IMREAD_COLOR,
+        )
+    finally:
+        server.stop()
+
+    # A flat image has no gradients, so its dHash is 0
+    assert result["results"] == [{"id": "a", "width": 300, "height": 600, "orientation": 6, "phash": 0}]
+    assert [error["id"] for error in result["errors"]] == ["b"]
+    assert thumbnail["ContentType"] == "image/webp"
+    assert level.shape == (256, 128, 3)
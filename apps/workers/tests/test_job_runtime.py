@@ -0,0 +1,133 @@
+"""
+Job runtime tests: progress, cancellation, checkpoints and resume
+"""
+import asyncio
+import json
+import time
+import uuid
+
+import numpy as np
+import pytest
+from arq import Retry
+from fakeredis import aioredis
+
+from app.services import dataset_versions
+from app.services.executor import ShardedExecutor, shard_items
+from app.services.job_runtime import JobCancelled, JobOutOfTries, JobRuntime, job_state_key
+from app.services.version_index import build_index, shard_fingerprint
+from app.tasks.augmentation import _build_version_shards, _completed_shards
+
+
+def slow_len(shard):
+    time.sleep(0.05)
+    return len(shard)
+
+
+def records(count):
+    return [
+        {"id": str(uuid.UUID(int=i + 1)), "storage_path": f"ws/p/{i}.jpg", "width": 8, "height": 8}
+        for i in range(count)
+    ]
+
+
+def test_progress_is_published_and_cancel_observed():
+    """Test that report() stores and publishes progress and sees cancel requests"""
+    async def run():
+        redis = aioredis.FakeRedis()
+        runtime = JobRuntime(redis, "version:v1")
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(job_state_key("version:v1", "events"))
+        await pubsub.get_message(timeout=1)
+
+        await runtime.report("processing", 10, 100)
+        event = await pubsub.get_message(timeout=1)
+        stored = json.loads(await redis.get(job_state_key("version:v1", "progress")))
+        cancelled_before = runtime.stopping
+
+        await redis.set(job_state_key("version:v1", "cancel"), b"1")
+        await runtime.report("processing", 20, 100)
+        return json.loads(event["data"]), stored, cancelled_before, runtime
+
+    event, stored, cancelled_before, runtime = asyncio.run(run())
+
+    assert event == stored
+    assert (stored["status"], stored["processed"], stored["total"]) == ("running", 10, 100)
+    assert not cancelled_before and runtime.stopping
+    with pytest.raises(JobCancelled):
+        runtime.raise_if_stopping()
+
+
+def test_time_budget_requeues_the_job():
+    """Test that an exhausted time budget raises arq.Retry"""
+    runtime = JobRuntime(aioredis.FakeRedis(), "version:v1", time_budget=0)
+    assert runtime.stopping
+    with pytest.raises(Retry):
+        runtime.raise_if_stopping()
+
+
+def test_time_budget_fails_the_last_try():
+    """Test that the last allowed try fails instead of re-queueing a job ARQ would drop"""
+    runtime = JobRuntime(aioredis.FakeRedis(), "version:v1", time_budget=0, job_try=3, max_tries=3)
+    with pytest.raises(JobOutOfTries):
+        runtime.raise_if_stopping()
+
+
+def test_checkpoint_survives_failure_only():
+    """Test that a failed job keeps its checkpoint and a completed one drops it"""
+    async def run():
+        redis = aioredis.FakeRedis()
+        runtime = JobRuntime(redis, "version:v1")
+        await runtime.save_checkpoint({"parent": "", "shard:0": "{}"})
+        await runtime.finish("failed", 1, 2)
+        after_failure = await JobRuntime(redis, "version:v1").load_checkpoint()
+        await runtime.finish("completed", 2, 2)
+        return after_failure, await runtime.load_checkpoint()
+
+    after_failure, after_success = asyncio.run(run())
+    assert after_failure == {"parent": b"", "shard:0": b"{}"}
+    assert after_success == {}
+
+
+def test_map_shards_drains_in_flight_work_on_stop():
+    """Test that stop() prevents new submissions but in-flight shards finish"""
+    executor = ShardedExecutor(max_workers=1)
+
+    async def run():
+        results = []
+        async for result in executor.map_shards(
+            slow_len, shard_items(range(100), 10), max_inflight=2, stop=lambda: len(results) >= 1
+        ):
+            results.append(result)
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert results == [10, 10]
+
+
+def test_resume_skips_checkpointed_shards(monkeypatch):
+    """Test that shards completed by an earlier try are restored, not rebuilt"""
+    monkeypatch.setattr(
+        dataset_versions, "load_bbox_annotations", lambda ids: {image_id: [] for image_id in ids}
+    )
+    images = records(10)
+    first = images[:4]
+    checkpoint = {
+        "shard:0": json.dumps({"fingerprint": shard_fingerprint(first), "images": 4}).encode(),
+        "index:0": build_index(first, 0, [1] * 4).tobytes(),
+        # Shard 1 changed since the checkpoint (an image was re-annotated)
+        "shard:1": json.dumps({"fingerprint": "stale", "images": 4}).encode(),
+        "index:1": build_index(images[4:8], 1, [1] * 4).tobytes(),
+    }
+    restored = {}
+    shards = list(_build_version_shards(
+        "ws", images, "ws/p/versions/v2", {}, 4, _completed_shards(checkpoint), restored
+    ))
+
+    assert [shard.shard_id for shard in shards] == [1, 2]
+    assert list(restored) == [0]
+    assert np.array_equal(restored[0]["index"], build_index(first, 0, [1] * 4))
+    assert shards[0].fingerprint == shard_fingerprint(images[4:8])
@@ -0,0 +1,80 @@
+"""
+Perceptual hash and near-duplicate index tests
+"""
+import uuid
+
+import cv2
+import numpy as np
+
+from app.services import dataset_versions
+from app.services.phash import HammingIndex, dhash, duplicate_clusters, hamming
+from app.tasks import augmentation
+
+
+def scene(seed):
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (640, 480), interpolation=cv2.INTER_CUBIC)
+
+
+def test_dhash_survives_reencoding_and_resizing():
+    image = scene(0)
+    _, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    copy = cv2.resize(cv2.imdecode(jpeg, cv2.IMREAD_COLOR), (320, 240), interpolation=cv2.INTER_AREA)
+    original, copied, other = (np.array([dhash(i)]) for i in (image, copy, scene(1)))
+
+    assert hamming(original, copied)[0] <= 3
+    assert hamming(original, other)[0] > 10
+
+
+def test_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(-(2**63), 2**63 - 1, size=2000, dtype=np.int64)
+    # Plant near-duplicates at 1..6 bits from earlier hashes
+    for i in range(300):
+        flips = rng.choice(64, size=1 + i % 6, replace=False)
+        hashes[1000 + i] = (hashes[i].view(np.uint64) ^ np.uint64(sum(1 << int(b) for b in flips))).view(np.int64)
+    index = HammingIndex(hashes)
+    i, j = np.triu_indices(len(hashes), 1)
+    distances = hamming(hashes[i], hashes[j])
+
+    for max_distance in (3, 5):
+        close = distances <= max_distance
+        found_i, found_j = index.pairs(max_distance, batch=500)
+        assert set(zip(found_i.tolist(), found_j.tolist())) == set(zip(i[close].tolist(), j[close].tolist()))
+
+    positions, found = index.query(int(hashes[4]), 5)
+    expected = np.flatnonzero(hamming(hashes, np.repeat(hashes[4], len(hashes))) <= 5)
+    assert positions[0] == 4 and found[0] == 0
+    assert sorted(positions.tolist()) == expected.tolist() and 1004 in expected
+
+
+def test_clusters_are_transitive_and_named_by_first_member():
+    a = np.uint64(0x0123456789ABCDEF)
+    hashes = np.array([a ^ np.uint64(0xF << 40), a, a ^ np.uint64(0b111), a ^ np.uint64(0b111000), a], dtype=np.uint64)
+    # 2 and 3 are 6 bits apart but both within 3 of 1; 0 is 4 bits from 1
+    assert duplicate_clusters(hashes, 3).tolist() == [0, 1, 1, 1, 1]
+
+
+def test_duplicates_share_a_split_or_are_dropped(monkeypatch):
+    ids = sorted(str(uuid.UUID(int=i << 100)) for i in range(1, 5))
+    first = 0x0123456789ABCDEF
+    hashes = np.array([first, first ^ (2**64 - 1), first ^ 1, 0x5555555555555555], dtype=np.uint64).view(np.int64)
+    monkeypatch.setattr(
+        dataset_versions,
+        "load_image_hashes",
+        lambda project_id: (np.array([uuid.UUID(i).bytes for i in ids], dtype="S16"), hashes),
+    )
+    monkeypatch.setattr(
+        dataset_versions,
+        "iter_project_images",
+        lambda project_id: iter([{"id": i, "storage_path": i, "width": 1, "height": 1} for i in ids]),
+    )
+
+    duplicates = augmentation.find_duplicates("p", 3)
+    assert duplicates == {ids[2]: ids[0]}
+
+    kept = list(augmentation._version_images("p", duplicates, drop_duplicates=False))
+    assert [r.get("duplicate_of") for r in kept] == [None, None, ids[0], None]
+    assert [r["id"] for r in augmentation._version_images("p", duplicates, drop_duplicates=True)] == [
+        ids[0], ids[1], ids[3]
+    ]
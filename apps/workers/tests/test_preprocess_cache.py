@@ -0,0 +1,92 @@
+"""
+Preprocessed image cache tests
+"""
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from app.services.preprocess_cache import PreprocessCache, cache_key
+
+IMAGE = np.arange(64 * 64 * 3, dtype=np.uint8).reshape(64, 64, 3)
+ENTRY_SIZE = IMAGE.nbytes + 128
+
+
+def fill_cache(cache_dir, prefix):
+    """Pool-process stand-in writing 30 entries to a shared cache directory"""
+    cache = PreprocessCache(cache_dir, max_bytes=ENTRY_SIZE * 10)
+    for i in range(30):
+        cache.put(cache_key(f"{prefix}-{i}", "cfg"), "ws", IMAGE)
+
+
+class InMemoryStorage:
+    """Object store stand-in exposing the StorageService calls used by the cache"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def find_object_bytes(self, storage_path):
+        return self.objects.get(storage_path)
+
+    def put_object_bytes(self, storage_path, body, content_type):
+        self.objects[storage_path] = body
+
+
+def test_cache_key_depends_on_source_and_config():
+    """Test that either a new source or a new config changes the key"""
+    assert cache_key("etag-a", "cfg-1") == cache_key("etag-a", "cfg-1")
+    assert cache_key("etag-a", "cfg-1") != cache_key("etag-b", "cfg-1")
+    assert cache_key("etag-a", "cfg-1") != cache_key("etag-a", "cfg-2")
+
+
+def test_local_tier_round_trip(tmp_path):
+    """Test that a stored image is returned unchanged from disk"""
+    cache = PreprocessCache(str(tmp_path), max_bytes=10**7)
+    assert cache.get("a" * 64, "ws") is None
+    cache.put("a" * 64, "ws", IMAGE)
+    np.testing.assert_array_equal(cache.get("a" * 64, "ws"), IMAGE)
+    assert cache.stats == {"local_hits": 1, "shared_hits": 0, "misses": 1}
+
+
+def test_local_tier_evicts_least_recently_used(tmp_path):
+    """Test that the size cap evicts the entry that was used longest ago"""
+    cache = PreprocessCache(str(tmp_path), max_bytes=int(ENTRY_SIZE * 2.5))
+    keys = [c * 64 for c in "abc"]
+
+    cache.put(keys[0], "ws", IMAGE)
+    cache.put(keys[1], "ws", IMAGE)
+    old = time.time() - 100
+    os.utime(cache._path(keys[1]), (old, old))
+    cache.get(keys[0], "ws")  # refreshes keys[0]
+    cache.put(keys[2], "ws", IMAGE)
+
+    assert cache.get(keys[1], "ws") is None
+    assert cache.get(keys[0], "ws") is not None
+    assert cache.get(keys[2], "ws") is not None
+
+
+def test_size_cap_holds_across_processes(tmp_path):
+    """Test that processes sharing the directory keep it under one cap, not one each"""
+    context = multiprocessing.get_context("spawn")
+    children = [context.Process(target=fill_cache, args=(str(tmp_path), str(n))) for n in range(4)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+        assert child.exitcode == 0
+
+    files = [path for path in tmp_path.rglob("*.npy")]
+    assert 0 < sum(path.stat().st_size for path in files) <= ENTRY_SIZE * 10
+
+
+def test_shared_tier_fills_local_tier(tmp_path):
+    """Test that an entry written by one worker is found by another"""
+    storage = InMemoryStorage()
+    PreprocessCache(str(tmp_path / "one"), 10**7, storage).put("d" * 64, "ws", IMAGE)
+
+    other = PreprocessCache(str(tmp_path / "two"), 10**7, storage)
+    np.testing.assert_array_equal(other.get("d" * 64, "ws"), IMAGE)
+    np.testing.assert_array_equal(other.get("d" * 64, "ws"), IMAGE)
+    assert other.stats == {"local_hits": 1, "shared_hits": 1, "misses": 0}
+    assert list(storage.objects) == [f"ws/cache/preprocessed/{'d' * 64}.png"]
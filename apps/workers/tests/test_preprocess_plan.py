@@ -0,0 +1,77 @@
+"""
+Fused preprocessing plan tests against the step-by-step OpenCV pipeline
+"""
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+from app.tasks.preprocess_plan import PreprocessPlan, equalize_lut
+
+
+def reference(image, config):
+    """The original one-pass-per-step implementation"""
+    if resize := config.get("resize"):
+        width, height, mode = resize["width"], resize["height"], resize.get("mode", "fit")
+        h, w = image.shape[:2]
+        if mode == "stretch":
+            image = cv2.resize(image, (width, height))
+        else:
+            scale = min(width / w, height / h)
+            new_w, new_h = int(w * scale), int(h * scale)
+            image = cv2.resize(image, (new_w, new_h))
+            if mode == "pad":
+                top, left = (height - new_h) // 2, (width - new_w) // 2
+                image = cv2.copyMakeBorder(
+                    image, top, height - new_h - top, left, width - new_w - left,
+                    cv2.BORDER_CONSTANT, value=(0, 0, 0),
+                )
+    if config.get("grayscale"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if config.get("auto_contrast"):
+            gray = cv2.equalizeHist(gray)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    if config.get("auto_contrast"):
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+        l, a, b = cv2.split(lab)
+        image = cv2.cvtColor(cv2.merge([cv2.equalizeHist(l), a, b]), cv2.COLOR_LAB2BGR)
+    return image
+
+
+CONFIGS = [
+    {"resize": {"width": 320, "height": 320, "mode": mode}, **extra}
+    for mode in ("stretch", "fit", "pad")
+    for extra in ({}, {"grayscale": True}, {"auto_contrast": True}, {"grayscale": True, "auto_contrast": True})
+] + [{"grayscale": True}, {"auto_contrast": True}, {}]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_plan_matches_reference(config):
+    """Test that fused output is pixel-identical to the per-step pipeline"""
+    plan = PreprocessPlan(config)
+    rng = np.random.default_rng(0)
+    for shape in ((480, 640, 3), (480, 640, 3), (700, 300, 3)):
+        image = rng.integers(0, 200, size=shape, dtype=np.uint8)
+        assert np.array_equal(plan.run(image), reference(image, config))
+
+
+def test_equalize_lut_matches_opencv():
+    """Test the LUT against cv2.equalizeHist, including constant images"""
+    rng = np.random.default_rng(1)
+    for channel in (rng.integers(30, 220, size=(97, 131), dtype=np.uint8), np.full((5, 5), 7, np.uint8)):
+        assert np.array_equal(cv2.LUT(channel, equalize_lut(channel)), cv2.equalizeHist(channel))
+
+
+def test_plan_allocates_only_the_output():
+    """Test that a warmed-up plan allocates about one output image per call"""
+    plan = PreprocessPlan({"resize": {"width": 640, "height": 640, "mode": "pad"}, "auto_contrast": True})
+    image = np.random.default_rng(2).integers(0, 256, size=(960, 1280, 3), dtype=np.uint8)
+    plan.run(image)
+
+    tracemalloc.start()
+    plan.run(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert peak < 640 * 640 * 3 * 1.1
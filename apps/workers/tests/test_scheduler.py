@@ -0,0 +1,76 @@
+"""
+Fair scheduler tests: fair-share policy and dispatch onto ARQ lane queues
+"""
+import asyncio
+import uuid
+
+from arq.constants import job_key_prefix
+from arq.jobs import deserialize_job, serialize_job
+from fakeredis import aioredis
+
+from app.services.scheduler import (
+    SHORT_LANE,
+    FairShare,
+    dispatch,
+    lane_queue,
+    register_worker,
+    sched_key,
+)
+
+
+async def submit(redis, workspace, cost):
+    """Submit a job the way the API's enqueue_job does"""
+    job_id = uuid.uuid4().hex
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(sched_key(SHORT_LANE, "jobs"), job_id, serialize_job("generate_pyramids_task", ([workspace],), {}, None, 0))
+        pipe.hset(sched_key(SHORT_LANE, "cost"), job_id, cost)
+        pipe.rpush(sched_key(SHORT_LANE, f"pending:{workspace}"), job_id)
+        pipe.sadd(sched_key(SHORT_LANE, "active"), workspace)
+        await pipe.execute()
+    return job_id
+
+
+def test_fair_share_alternates_by_work():
+    """Test that workspaces take turns by cost and respect the cap"""
+    share = FairShare(tenant_cap=2)
+    order = []
+    for _ in range(4):
+        tenant = share.pick(["heavy", "light"])
+        share.start(tenant, 100 if tenant == "heavy" else 10)
+        order.append(tenant)
+        share.stop(tenant)
+    assert order == ["heavy", "light", "light", "light"]
+
+    share.start("light", 1)
+    share.start("light", 1)
+    assert share.pick(["light"]) is None
+
+
+def test_dispatch_fills_free_slots_fairly():
+    """Test that dispatch shares slots by work and refills freed slots"""
+    async def run():
+        redis = aioredis.FakeRedis()
+        await register_worker(redis, SHORT_LANE, "worker-1", 3)
+        heavy = [await submit(redis, "heavy", 500) for _ in range(5)]
+        light = [await submit(redis, "light", 50) for _ in range(2)]
+
+        first = await dispatch(redis, SHORT_LANE, cap=2)
+        queued = [job_id.decode() for job_id in await redis.zrange(lane_queue(SHORT_LANE), 0, -1)]
+        payload = deserialize_job(await redis.get(job_key_prefix + first[0]))
+        nothing_free = await dispatch(redis, SHORT_LANE, cap=2)
+
+        # ARQ deletes the job key when a job finishes
+        await redis.delete(job_key_prefix + first[0])
+        second = await dispatch(redis, SHORT_LANE, cap=2)
+        pending = await redis.lrange(sched_key(SHORT_LANE, "pending:heavy"), 0, -1)
+        return heavy, light, first, queued, payload, nothing_free, second, pending
+
+    heavy, light, first, queued, payload, nothing_free, second, pending = asyncio.run(run())
+
+    # Light jobs cost a tenth of heavy ones, so both run before heavy's second
+    assert first == [heavy[0], light[0], light[1]]
+    assert queued == first
+    assert payload.function == "generate_pyramids_task"
+    assert nothing_free == []
+    assert second == [heavy[1]]
+    assert [job_id.decode() for job_id in pending] == heavy[2:]
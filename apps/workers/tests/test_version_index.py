@@ -0,0 +1,124 @@
+"""
+Incremental version generation tests: index diffing and shared manifests
+"""
+import json
+import socket
+import uuid
+
+import boto3
+import numpy as np
+from moto.server import ThreadedMotoServer
+
+from app.services.version_index import (
+    INDEX_DTYPE,
+    IndexDiff,
+    build_index,
+    input_key,
+    load_index,
+    merge_parts,
+    save_index,
+)
+from app.services.zip_export import iter_manifest_entries
+
+IDS = sorted(str(uuid.UUID(int=i << 64)) for i in range(1, 7))
+
+
+def image(i, revision=0):
+    return {"id": IDS[i], "storage_path": f"ws/p/{i}.jpg", "width": 64, "height": 48, "annotation_revision": revision}
+
+
+def parent_version():
+    """Two parts: images 0-2 and 3-4, two outputs each"""
+    index = np.concatenate([
+        build_index([image(0), image(1), image(2)], 0, [2, 2, 2]),
+        build_index([image(3), image(4)], 1, [2, 2]),
+    ])
+    manifest = {"parts": ["v1/part-0.jsonl", "v1/part-1.jsonl"], "excluded": {}}
+    return np.sort(index, order="image_id"), manifest
+
+
+def test_input_key_tracks_annotations_and_geometry():
+    """Test that the key changes with annotations and orientation only"""
+    assert input_key(image(0)) == input_key({**image(0), "filename": "other.jpg"})
+    assert input_key(image(0)) != input_key(image(0, revision=1))
+    assert input_key(image(0)) != input_key({**image(0), "orientation": 6})
+
+
+def test_diff_processes_only_changes():
+    """Test that unchanged images are inherited and the rest regenerated"""
+    index, manifest = parent_version()
+    diff = IndexDiff(index)
+
+    # Image 1 re-annotated, image 4 deleted, image 5 added
+    current = [image(0), image(1, revision=3), image(2), image(3), image(5)]
+    changed = diff.changed(current[:2]) + diff.changed(current[2:])
+    new_index = build_index(changed, 0, [1, 1])
+    parts, excluded, merged = merge_parts(diff, manifest, {"v2/part-0.jsonl": new_index})
+
+    assert [record["id"] for record in changed] == [IDS[1], IDS[5]]
+    assert diff.reused_images == 3
+    assert parts == ["v1/part-0.jsonl", "v1/part-1.jsonl", "v2/part-0.jsonl"]
+    assert excluded == {"v1/part-0.jsonl": [IDS[1]], "v1/part-1.jsonl": [IDS[4]]}
+    assert len(merged) == 5 and merged["outputs"].sum() == 8
+    assert sorted(merged["part"].tolist()) == [0, 0, 1, 2, 2]
+
+
+def test_fully_superseded_parts_are_dropped():
+    """Test that a parent part with no live images is not inherited"""
+    index, manifest = parent_version()
+    diff = IndexDiff(index)
+    diff.changed([image(0), image(1), image(2)])
+    parts, excluded, merged = merge_parts(diff, manifest, {})
+
+    assert parts == ["v1/part-0.jsonl"]
+    assert excluded == {}
+    assert merged["part"].tolist() == [0, 0, 0]
+
+
+def test_no_parent_processes_everything():
+    """Test that a first version regenerates every image"""
+    diff = IndexDiff(np.zeros(0, dtype=INDEX_DTYPE))
+    assert diff.changed([image(0), image(1)]) == [image(0), image(1)]
+    parts, excluded, merged = merge_parts(diff, None, {"v1/part-0.jsonl": build_index([image(0)], 0, [1])})
+    assert parts == ["v1/part-0.jsonl"] and excluded == {} and len(merged) == 1
+
+
+def test_shared_parts_round_trip_through_storage():
+    """Test that a child manifest reads inherited parts minus excluded entries"""
+    from app.services.storage import StorageService
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    try:
+        storage = StorageService()
+        storage.s3_client = boto3.client(
+            "s3",
+            endpoint_url=f"http://127.0.0.1:{port}",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+            region_name="us-east-1",
+        )
+        storage.s3_client.create_bucket(Bucket=storage.bucket_name)
+
+        def entry(i, variant):
+            return json.dumps({"source_image_id": IDS[i], "storage_path": f"{i}_{variant}.jpg"})
+
+        storage.put_object_bytes("v1/part-0.jsonl", "\n".join(entry(i, 0) for i in range(3)).encode(), "application/x-ndjson")
+        storage.put_object_bytes("v2/part-0.jsonl", entry(1, 1).encode(), "application/x-ndjson")
+        storage.put_object_bytes("v2/manifest.json", json.dumps({
+            "parts": ["v1/part-0.jsonl", "v2/part-0.jsonl"],
+            "excluded": {"v1/part-0.jsonl": [IDS[1]]},
+        }).encode(), "application/json")
+
+        index, _ = parent_version()
+        save_index(storage, "v1/index.npy", index[::-1])
+        entries = list(iter_manifest_entries(storage, "v2/manifest.json"))
+        loaded = load_index(storage, "v1/index.npy")
+    finally:
+        server.stop()
+
+    assert [e["storage_path"] for e in entries] == ["0_0.jpg", "2_0.jpg", "1_1.jpg"]
+    assert np.array_equal(loaded, index)
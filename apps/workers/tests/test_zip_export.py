@@ -0,0 +1,190 @@
+"""
+Streaming zip export tests against a local moto S3 server
+"""
+import io
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import cv2
+import numpy as np
+import pytest
+from moto.server import ThreadedMotoServer
+
+BUCKET = "test-bucket"
+PART_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+    )
+    client.create_bucket(Bucket=BUCKET)
+    yield endpoint, client
+    server.stop()
+
+
+@pytest.fixture
+def storage(s3_endpoint, monkeypatch):
+    from app.services.storage import StorageService
+
+    endpoint, _ = s3_endpoint
+    monkeypatch.setenv("S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setenv("S3_REGION", "us-east-1")
+    service = StorageService()
+    service.s3_client = boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+    )
+    return service
+
+
+def seed_version(client, prefix, count):
+    """Upload count small JPEGs and a version manifest pointing at them"""
+    noise = np.random.default_rng(0).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", noise, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    body = encoded.tobytes()
+    entries = [
+        {
+            "source_image_id": f"img-{i}",
+            "split": "train" if i % 5 else "valid",
+            "storage_path": f"{prefix}/{'train' if i % 5 else 'valid'}/img-{i}_0.jpg",
+            "width": 32,
+            "height": 32,
+            "annotations": [{"class_name": "cell", "bbox": [1.0, 2.0, 3.0, 4.0]}],
+        }
+        for i in range(count)
+    ]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(
+            lambda e: client.put_object(Bucket=BUCKET, Key=e["storage_path"], Body=body),
+            entries,
+        ))
+
+    parts = []
+    for start in range(0, count, 1000):
+        part = f"{prefix}/manifest/part-{start // 1000:06d}.jsonl"
+        lines = "".join(json.dumps(e) + "\n" for e in entries[start:start + 1000])
+        client.put_object(Bucket=BUCKET, Key=part, Body=lines.encode())
+        parts.append(part)
+    client.put_object(
+        Bucket=BUCKET, Key=f"{prefix}/manifest.json", Body=json.dumps({"parts": parts}).encode()
+    )
+    return body
+
+
+def current_rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run_export_in_child(prefix, queue):
+    """Export in a fresh process and report its peak RSS growth in bytes"""
+    from app.services.storage import StorageService
+    from app.services.zip_export import export_version_archive
+
+    storage = StorageService()
+    baseline = current_rss()
+    peak = baseline
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.005):
+            peak = max(peak, current_rss())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    count = export_version_archive(
+        storage, f"{prefix}/manifest.json", f"{prefix}/export.zip", part_size=PART_SIZE
+    )
+    done.set()
+    sampler.join()
+    queue.put((count, peak - baseline))
+
+
+def test_export_archive_round_trip(storage, s3_endpoint):
+    """Test that the streamed archive is a valid zip with stored images"""
+    _, client = s3_endpoint
+    from app.services.zip_export import export_version_archive
+
+    body = seed_version(client, "ws/proj/versions/small", 12)
+    count = export_version_archive(
+        storage, "ws/proj/versions/small/manifest.json", "ws/proj/versions/small/export.zip",
+        part_size=PART_SIZE,
+    )
+    data = client.get_object(Bucket=BUCKET, Key="ws/proj/versions/small/export.zip")["Body"].read()
+    archive = zipfile.ZipFile(io.BytesIO(data))
+
+    assert count == 12
+    assert archive.testzip() is None
+    assert archive.read("train/images/img-1_0.jpg") == body
+    assert archive.getinfo("train/images/img-1_0.jpg").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("valid/manifest.jsonl").compress_type == zipfile.ZIP_DEFLATED
+    valid = [json.loads(line) for line in archive.read("valid/manifest.jsonl").splitlines()]
+    assert [r["file_name"] for r in valid] == ["images/img-0_0.jpg", "images/img-5_0.jpg", "images/img-10_0.jpg"]
+
+
+def test_export_archive_coco(storage, s3_endpoint):
+    """Test that a COCO export places images beside one annotation file per split"""
+    _, client = s3_endpoint
+    from app.services.zip_export import export_version_archive
+
+    seed_version(client, "ws/proj/versions/coco", 12)
+    export_version_archive(
+        storage, "ws/proj/versions/coco/manifest.json", "ws/proj/versions/coco/coco.zip",
+        "coco", part_size=PART_SIZE,
+    )
+    data = client.get_object(Bucket=BUCKET, Key="ws/proj/versions/coco/coco.zip")["Body"].read()
+    archive = zipfile.ZipFile(io.BytesIO(data))
+
+    assert "train/img-1_0.jpg" in archive.namelist()
+    document = json.loads(archive.read("valid/_annotations.coco.json"))
+    assert [image["file_name"] for image in document["images"]] == [
+        "img-0_0.jpg", "img-5_0.jpg", "img-10_0.jpg",
+    ]
+    assert len(document["annotations"]) == 3
+    assert document["categories"] == [{"id": 1, "name": "cell", "supercategory": "none"}]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="Needs Linux /proc")
+def test_export_peak_memory_is_constant(s3_endpoint, monkeypatch):
+    """Test that peak RSS of a 10k-image export does not grow with the dataset"""
+    endpoint, client = s3_endpoint
+    monkeypatch.setenv("S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setenv("S3_REGION", "us-east-1")
+    context = multiprocessing.get_context("spawn")
+
+    growth = {}
+    for count in (3000, 10000):
+        prefix = f"ws/proj/versions/rss-{count}"
+        seed_version(client, prefix, count)
+        queue = context.Queue()
+        child = context.Process(target=run_export_in_child, args=(prefix, queue))
+        child.start()
+        exported, growth[count] = queue.get(timeout=600)
+        child.join()
+        assert exported == count
+
+    # Part buffers dominate: (2 in flight + 1 filling) x 5 MiB, plus allocator slack
+    assert growth[10000] < 64 * 1024 * 1024
+    assert growth[10000] - growth[3000] < 16 * 1024 * 1024
@@ -0,0 +1,6 @@
+-- Progress tracking for dataset version generation
+-- The worker increments processed_images as each shard of images finishes
+
+ALTER TABLE public.dataset_versions
+    ADD COLUMN total_images INTEGER,
+    ADD COLUMN processed_images INTEGER NOT NULL DEFAULT 0;
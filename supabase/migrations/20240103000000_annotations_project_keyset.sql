@@ -0,0 +1,7 @@
+-- Composite index for keyset pagination of a project's annotations
+-- Bulk reads page with WHERE project_id = $1 AND id > $2 ORDER BY id LIMIT $3,
+-- which this index answers without an OFFSET scan or a sort.
+-- It also covers every lookup the single-column project_id index served.
+
+CREATE INDEX idx_annotations_project_id_id ON public.annotations(project_id, id);
+DROP INDEX public.idx_annotations_project_id;
@@ -0,0 +1,7 @@
+-- Thumbnail pyramids and EXIF orientation of uploaded images
+-- The worker's pyramid task fills these in after upload completion; width and
+-- height are then overwritten with the decoded, displayed (upright) size
+
+ALTER TABLE public.images
+    ADD COLUMN orientation SMALLINT NOT NULL DEFAULT 1 CHECK (orientation BETWEEN 1 AND 8),
+    ADD COLUMN pyramid_levels TEXT[];
@@ -0,0 +1,60 @@
+-- Per-image annotation revision for incremental dataset version generation
+-- Every statement that inserts, updates or deletes annotations bumps the
+-- revision of each affected image once. The worker keys an image's version
+-- outputs on its revision, so a new version regenerates only images whose
+-- annotations changed since the parent version.
+-- The functions run as their owner: images has no UPDATE policy, so under
+-- the caller's RLS context the bump would silently update no rows.
+
+ALTER TABLE public.images
+    ADD COLUMN annotation_revision BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_annotation_revision_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.images
+    SET annotation_revision = annotation_revision + 1
+    WHERE id IN (SELECT DISTINCT image_id FROM new_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION bump_annotation_revision_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.images
+    SET annotation_revision = annotation_revision + 1
+    WHERE id IN (
+        SELECT image_id FROM new_rows
+        UNION
+        SELECT image_id FROM old_rows
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION bump_annotation_revision_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.images
+    SET annotation_revision = annotation_revision + 1
+    WHERE id IN (SELECT DISTINCT image_id FROM old_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Transition tables require one trigger per event
+CREATE TRIGGER annotations_bump_revision_insert
+    AFTER INSERT ON public.annotations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_annotation_revision_inserted();
+
+CREATE TRIGGER annotations_bump_revision_update
+    AFTER UPDATE ON public.annotations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_annotation_revision_updated();
+
+CREATE TRIGGER annotations_bump_revision_delete
+    AFTER DELETE ON public.annotations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_annotation_revision_deleted();
@@ -0,0 +1,8 @@
+-- Cancellable dataset version generation
+-- The worker sets CANCELLED when a cancellation requested through the API
+-- stops a generate_version_task job.
+
+ALTER TABLE public.dataset_versions
+    DROP CONSTRAINT dataset_versions_status_check,
+    ADD CONSTRAINT dataset_versions_status_check
+        CHECK (status IN ('QUEUED', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED'));
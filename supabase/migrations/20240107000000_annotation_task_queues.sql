@@ -0,0 +1,45 @@
+-- Labeler and reviewer queues on annotation_tasks
+-- Labelers claim pending tasks (their own, then the project's unassigned
+-- pool) and reviewers claim submitted ones with FOR UPDATE SKIP LOCKED, so
+-- concurrent claims never wait on each other or receive the same task.
+-- The partial indexes cover only the queue states, which stay small while
+-- the table accumulates finished tasks.
+
+-- Labeler queue: a project's pending tasks per assignee (NULL = shared pool), oldest first
+CREATE INDEX idx_annotation_tasks_pending
+    ON public.annotation_tasks (project_id, assignee_id, created_at)
+    WHERE status = 'PENDING';
+
+-- Reviewer queue: submitted tasks per reviewer (NULL = unclaimed), in submission order
+CREATE INDEX idx_annotation_tasks_submitted
+    ON public.annotation_tasks (project_id, reviewer_id, updated_at)
+    WHERE status = 'SUBMITTED';
+
+-- Open task of an image, looked up by bulk assignment
+CREATE INDEX idx_annotation_tasks_open_image
+    ON public.annotation_tasks (image_id)
+    WHERE status IN ('PENDING', 'IN_PROGRESS', 'SUBMITTED');
+
+-- Claiming (SELECT ... FOR UPDATE, UPDATE) and assignment (INSERT) run
+-- under the caller's RLS context; project roles are checked by the API
+CREATE POLICY "Project members can create annotation tasks"
+    ON public.annotation_tasks FOR INSERT
+    WITH CHECK (
+        EXISTS (
+            SELECT 1 FROM public.projects
+            JOIN public.workspace_members ON workspace_members.workspace_id = projects.workspace_id
+            WHERE projects.id = annotation_tasks.project_id
+            AND workspace_members.user_id = auth.user_id()
+        )
+    );
+
+CREATE POLICY "Project members can update annotation tasks"
+    ON public.annotation_tasks FOR UPDATE
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.projects
+            JOIN public.workspace_members ON workspace_members.workspace_id = projects.workspace_id
+            WHERE projects.id = annotation_tasks.project_id
+            AND workspace_members.user_id = auth.user_id()
+        )
+    );
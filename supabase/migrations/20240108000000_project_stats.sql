@@ -0,0 +1,313 @@
+-- Incrementally maintained analytics counters
+-- Dashboards read these small per-project tables instead of grouping
+-- annotations and annotation_tasks on every load. Statement-level triggers
+-- fold each write statement into one upsert per affected counter, with
+-- rows in key order so concurrent writers lock counters in the same order.
+-- Counters that reach zero are kept (reads skip them) and deletes only ever
+-- decrement existing counters, so cascading project or user deletes never
+-- recreate rows for a parent that is going away.
+--
+-- project_stats_drift(project) compares the counters with a full recompute
+-- and rebuild_project_stats(project) replaces them with one.
+-- The trigger functions run as their owner, since callers only have
+-- SELECT on the counters.
+
+-- Class balance: live annotations per class
+CREATE TABLE public.project_class_stats (
+    project_id UUID NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+    class_name TEXT NOT NULL,
+    annotations BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, class_name)
+);
+
+-- Annotator throughput: live annotations per annotator and UTC day of creation
+CREATE TABLE public.project_annotator_stats (
+    project_id UUID NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+    annotator_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    annotations BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, annotator_id, day)
+);
+
+-- Task status counts per assignee; the nil UUID stands for unassigned tasks
+CREATE TABLE public.project_task_stats (
+    project_id UUID NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+    assignee_id UUID NOT NULL,
+    status TEXT NOT NULL,
+    tasks BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, assignee_id, status)
+);
+
+ALTER TABLE public.project_class_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.project_annotator_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.project_task_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view class stats in their projects"
+    ON public.project_class_stats FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.projects
+            JOIN public.workspace_members ON workspace_members.workspace_id = projects.workspace_id
+            WHERE projects.id = project_class_stats.project_id
+            AND workspace_members.user_id = auth.user_id()
+        )
+    );
+
+CREATE POLICY "Users can view annotator stats in their projects"
+    ON public.project_annotator_stats FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.projects
+            JOIN public.workspace_members ON workspace_members.workspace_id = projects.workspace_id
+            WHERE projects.id = project_annotator_stats.project_id
+            AND workspace_members.user_id = auth.user_id()
+        )
+    );
+
+CREATE POLICY "Users can view task stats in their projects"
+    ON public.project_task_stats FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.projects
+            JOIN public.workspace_members ON workspace_members.workspace_id = projects.workspace_id
+            WHERE projects.id = project_task_stats.project_id
+            AND workspace_members.user_id = auth.user_id()
+        )
+    );
+
+-- Annotations
+
+CREATE OR REPLACE FUNCTION annotation_stats_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.project_class_stats AS s (project_id, class_name, annotations)
+    SELECT project_id, class_name, count(*)
+    FROM new_rows
+    GROUP BY project_id, class_name
+    ORDER BY project_id, class_name
+    ON CONFLICT (project_id, class_name)
+    DO UPDATE SET annotations = s.annotations + EXCLUDED.annotations;
+
+    INSERT INTO public.project_annotator_stats AS s (project_id, annotator_id, day, annotations)
+    SELECT project_id, annotator_id, (created_at AT TIME ZONE 'UTC')::date, count(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (project_id, annotator_id, day)
+    DO UPDATE SET annotations = s.annotations + EXCLUDED.annotations;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION annotation_stats_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Most updates edit geometry only; their +1/-1 pairs cancel out
+    INSERT INTO public.project_class_stats AS s (project_id, class_name, annotations)
+    SELECT project_id, class_name, sum(delta)
+    FROM (
+        SELECT project_id, class_name, 1 AS delta FROM new_rows
+        UNION ALL
+        SELECT project_id, class_name, -1 FROM old_rows
+    ) AS changes
+    GROUP BY project_id, class_name
+    HAVING sum(delta) <> 0
+    ORDER BY project_id, class_name
+    ON CONFLICT (project_id, class_name)
+    DO UPDATE SET annotations = s.annotations + EXCLUDED.annotations;
+
+    INSERT INTO public.project_annotator_stats AS s (project_id, annotator_id, day, annotations)
+    SELECT project_id, annotator_id, day, sum(delta)
+    FROM (
+        SELECT project_id, annotator_id, (created_at AT TIME ZONE 'UTC')::date AS day, 1 AS delta FROM new_rows
+        UNION ALL
+        SELECT project_id, annotator_id, (created_at AT TIME ZONE 'UTC')::date, -1 FROM old_rows
+    ) AS changes
+    GROUP BY project_id, annotator_id, day
+    HAVING sum(delta) <> 0
+    ORDER BY project_id, annotator_id, day
+    ON CONFLICT (project_id, annotator_id, day)
+    DO UPDATE SET annotations = s.annotations + EXCLUDED.annotations;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION annotation_stats_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.project_class_stats AS s
+    SET annotations = s.annotations - d.n
+    FROM (
+        SELECT project_id, class_name, count(*) AS n
+        FROM old_rows
+        GROUP BY project_id, class_name
+        ORDER BY project_id, class_name
+    ) AS d
+    WHERE s.project_id = d.project_id AND s.class_name = d.class_name;
+
+    UPDATE public.project_annotator_stats AS s
+    SET annotations = s.annotations - d.n
+    FROM (
+        SELECT project_id, annotator_id, (created_at AT TIME ZONE 'UTC')::date AS day, count(*) AS n
+        FROM old_rows
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+    ) AS d
+    WHERE s.project_id = d.project_id AND s.annotator_id = d.annotator_id AND s.day = d.day;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER annotations_stats_insert
+    AFTER INSERT ON public.annotations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION annotation_stats_inserted();
+
+CREATE TRIGGER annotations_stats_update
+    AFTER UPDATE ON public.annotations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION annotation_stats_updated();
+
+CREATE TRIGGER annotations_stats_delete
+    AFTER DELETE ON public.annotations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION annotation_stats_deleted();
+
+-- Annotation tasks
+
+CREATE OR REPLACE FUNCTION annotation_task_stats_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.project_task_stats AS s (project_id, assignee_id, status, tasks)
+    SELECT project_id, COALESCE(assignee_id, '00000000-0000-0000-0000-000000000000'), status, count(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (project_id, assignee_id, status)
+    DO UPDATE SET tasks = s.tasks + EXCLUDED.tasks;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION annotation_task_stats_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.project_task_stats AS s (project_id, assignee_id, status, tasks)
+    SELECT project_id, assignee_id, status, sum(delta)
+    FROM (
+        SELECT project_id, COALESCE(assignee_id, '00000000-0000-0000-0000-000000000000') AS assignee_id,
+               status, 1 AS delta
+        FROM new_rows
+        UNION ALL
+        SELECT project_id, COALESCE(assignee_id, '00000000-0000-0000-0000-000000000000'), status, -1
+        FROM old_rows
+    ) AS changes
+    GROUP BY project_id, assignee_id, status
+    HAVING sum(delta) <> 0
+    ORDER BY project_id, assignee_id, status
+    ON CONFLICT (project_id, assignee_id, status)
+    DO UPDATE SET tasks = s.tasks + EXCLUDED.tasks;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION annotation_task_stats_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.project_task_stats AS s
+    SET tasks = s.tasks - d.n
+    FROM (
+        SELECT project_id, COALESCE(assignee_id, '00000000-0000-0000-0000-000000000000') AS assignee_id,
+               status, count(*) AS n
+        FROM old_rows
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+    ) AS d
+    WHERE s.project_id = d.project_id AND s.assignee_id = d.assignee_id AND s.status = d.status;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER annotation_tasks_stats_insert
+    AFTER INSERT ON public.annotation_tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION annotation_task_stats_inserted();
+
+CREATE TRIGGER annotation_tasks_stats_update
+    AFTER UPDATE ON public.annotation_tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION annotation_task_stats_updated();
+
+CREATE TRIGGER annotation_tasks_stats_delete
+    AFTER DELETE ON public.annotation_tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION annotation_task_stats_deleted();
+
+-- Reconciliation
+
+-- Counters that differ from a full recompute of one project (empty when consistent)
+CREATE OR REPLACE FUNCTION project_stats_drift(p_project_id UUID)
+RETURNS TABLE (stat TEXT, key TEXT, stored BIGINT, actual BIGINT) AS $$
+    WITH class_actual AS (
+        SELECT class_name AS key, count(*) AS n
+        FROM public.annotations WHERE project_id = p_project_id
+        GROUP BY 1
+    ), class_stored AS (
+        SELECT class_name AS key, annotations AS n
+        FROM public.project_class_stats WHERE project_id = p_project_id AND annotations <> 0
+    ), annotator_actual AS (
+        SELECT annotator_id || '/' || (created_at AT TIME ZONE 'UTC')::date AS key, count(*) AS n
+        FROM public.annotations WHERE project_id = p_project_id
+        GROUP BY 1
+    ), annotator_stored AS (
+        SELECT annotator_id || '/' || day AS key, annotations AS n
+        FROM public.project_annotator_stats WHERE project_id = p_project_id AND annotations <> 0
+    ), task_actual AS (
+        SELECT COALESCE(assignee_id, '00000000-0000-0000-0000-000000000000') || '/' || status AS key, count(*) AS n
+        FROM public.annotation_tasks WHERE project_id = p_project_id
+        GROUP BY 1
+    ), task_stored AS (
+        SELECT assignee_id || '/' || status AS key, tasks AS n
+        FROM public.project_task_stats WHERE project_id = p_project_id AND tasks <> 0
+    )
+    SELECT 'class', key, COALESCE(s.n, 0), COALESCE(a.n, 0)
+    FROM class_actual a FULL JOIN class_stored s USING (key)
+    WHERE COALESCE(s.n, 0) <> COALESCE(a.n, 0)
+    UNION ALL
+    SELECT 'annotator', key, COALESCE(s.n, 0), COALESCE(a.n, 0)
+    FROM annotator_actual a FULL JOIN annotator_stored s USING (key)
+    WHERE COALESCE(s.n, 0) <> COALESCE(a.n, 0)
+    UNION ALL
+    SELECT 'task', key, COALESCE(s.n, 0), COALESCE(a.n, 0)
+    FROM task_actual a FULL JOIN task_stored s USING (key)
+    WHERE COALESCE(s.n, 0) <> COALESCE(a.n, 0);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Replace one project's counters with a full recompute
+CREATE OR REPLACE FUNCTION rebuild_project_stats(p_project_id UUID)
+RETURNS VOID AS $$
+    DELETE FROM public.project_class_stats WHERE project_id = p_project_id;
+    INSERT INTO public.project_class_stats (project_id, class_name, annotations)
+    SELECT project_id, class_name, count(*)
+    FROM public.annotations WHERE project_id = p_project_id
+    GROUP BY 1, 2;
+
+    DELETE FROM public.project_annotator_stats WHERE project_id = p_project_id;
+    INSERT INTO public.project_annotator_stats (project_id, annotator_id, day, annotations)
+    SELECT project_id, annotator_id, (created_at AT TIME ZONE 'UTC')::date, count(*)
+    FROM public.annotations WHERE project_id = p_project_id
+    GROUP BY 1, 2, 3;
+
+    DELETE FROM public.project_task_stats WHERE project_id = p_project_id;
+    INSERT INTO public.project_task_stats (project_id, assignee_id, status, tasks)
+    SELECT project_id, COALESCE(assignee_id, '00000000-0000-0000-0000-000000000000'), status, count(*)
+    FROM public.annotation_tasks WHERE project_id = p_project_id
+    GROUP BY 1, 2, 3;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+-- Full recomputes are for the workers' connecting role, not API users
+REVOKE EXECUTE ON FUNCTION project_stats_drift(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION rebuild_project_stats(UUID) FROM PUBLIC, anon, authenticated;
+
+-- Backfill existing projects
+SELECT rebuild_project_stats(id) FROM public.projects;
@@ -0,0 +1,27 @@
+-- Perceptual hashes of uploaded images, for near-duplicate search
+-- The worker's pyramid task stores a 64-bit dHash of the upright image (as a
+-- signed BIGINT) next to its decoded size. Images uploaded before this
+-- migration get a hash when their pyramids are generated again.
+--
+-- Near-duplicate lookups use multi-index hashing: two hashes within Hamming
+-- distance d agree to within d / 4 bits on at least one of their four 16-bit
+-- chunks (exactly, for d < 4). Each chunk is indexed per project, so a
+-- lookup is a handful of index probes followed by an exact bit_count check.
+
+ALTER TABLE public.images ADD COLUMN phash BIGINT;
+
+CREATE INDEX idx_images_phash_chunk0
+    ON public.images (project_id, ((phash >> 48) & 65535))
+    WHERE phash IS NOT NULL;
+
+CREATE INDEX idx_images_phash_chunk1
+    ON public.images (project_id, ((phash >> 32) & 65535))
+    WHERE phash IS NOT NULL;
+
+CREATE INDEX idx_images_phash_chunk2
+    ON public.images (project_id, ((phash >> 16) & 65535))
+    WHERE phash IS NOT NULL;
+
+CREATE INDEX idx_images_phash_chunk3
+    ON public.images (project_id, (phash & 65535))
+    WHERE phash IS NOT NULL;
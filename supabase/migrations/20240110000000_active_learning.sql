@@ -0,0 +1,29 @@
+-- Active-learning queue: unlabeled images ranked for labeling
+-- The worker's active_learning_task replaces a project's rows on every run
+-- (rank 1 = label first). The API serves the next images in rank order,
+-- skipping any that were annotated or put in an open task since.
+
+CREATE TABLE public.active_learning_queue (
+    project_id UUID NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+    image_id UUID NOT NULL REFERENCES public.images(id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    cluster INTEGER,  -- k-means cluster of the image (NULL for k-center)
+    strategy TEXT NOT NULL CHECK (strategy IN ('kmeans', 'kcenter')),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (project_id, image_id)
+);
+
+CREATE INDEX idx_active_learning_queue_rank ON public.active_learning_queue (project_id, rank);
+
+ALTER TABLE public.active_learning_queue ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view the active-learning queue in their projects"
+    ON public.active_learning_queue FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.projects
+            JOIN public.workspace_members ON workspace_members.workspace_id = projects.workspace_id
+            WHERE projects.id = active_learning_queue.project_id
+            AND workspace_members.user_id = auth.user_id()
+        )
+    );
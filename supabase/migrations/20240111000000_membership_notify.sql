@@ -0,0 +1,73 @@
+-- Role cache invalidation on membership changes
+-- The API caches project roles per process and in Redis
+-- (services/membership_cache.py). Statement-level triggers on both
+-- membership tables NOTIFY membership_changed with one JSON payload per
+-- affected user and project or workspace:
+--     {"user_id": ..., "project_id": ...}
+--     {"user_id": ..., "workspace_id": ...}
+-- Notifications are delivered when the transaction commits, and identical
+-- payloads within one transaction are delivered once. Every API process
+-- LISTENs on the channel and drops the matching cache entries. Inserts
+-- notify too, since a user's lack of access is cached as well.
+
+CREATE OR REPLACE FUNCTION project_members_notify()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('membership_changed', json_build_object('user_id', user_id, 'project_id', project_id)::text)
+        FROM (SELECT DISTINCT user_id, project_id FROM old_rows) AS changed;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('membership_changed', json_build_object('user_id', user_id, 'project_id', project_id)::text)
+        FROM (SELECT DISTINCT user_id, project_id FROM new_rows) AS changed;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION workspace_members_notify()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('membership_changed', json_build_object('user_id', user_id, 'workspace_id', workspace_id)::text)
+        FROM (SELECT DISTINCT user_id, workspace_id FROM old_rows) AS changed;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('membership_changed', json_build_object('user_id', user_id, 'workspace_id', workspace_id)::text)
+        FROM (SELECT DISTINCT user_id, workspace_id FROM new_rows) AS changed;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow a single event per trigger
+
+CREATE TRIGGER project_members_notify_insert
+    AFTER INSERT ON public.project_members
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION project_members_notify();
+
+CREATE TRIGGER project_members_notify_update
+    AFTER UPDATE ON public.project_members
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION project_members_notify();
+
+CREATE TRIGGER project_members_notify_delete
+    AFTER DELETE ON public.project_members
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION project_members_notify();
+
+CREATE TRIGGER workspace_members_notify_insert
+    AFTER INSERT ON public.workspace_members
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION workspace_members_notify();
+
+CREATE TRIGGER workspace_members_notify_update
+    AFTER UPDATE ON public.workspace_members
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION workspace_members_notify();
+
+CREATE TRIGGER workspace_members_notify_delete
+    AFTER DELETE ON public.workspace_members
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION workspace_members_notify();
@@ -0,0 +1,19 @@
+-- Ownership lookup for bulk annotation upserts
+-- The bulk API upserts with INSERT ... ON CONFLICT (id) DO UPDATE, which
+-- aborts the whole statement if a conflicting row fails the UPDATE policy
+-- (annotator_id = auth.user_id()). Rows the caller cannot see are hidden by
+-- RLS, so the API resolves ids with this function instead, and reports the
+-- ones it may not update as item errors. Only ownership is disclosed for
+-- other users' annotations, plus the image of the caller's own ones.
+
+CREATE OR REPLACE FUNCTION annotation_owners(p_ids UUID[])
+RETURNS TABLE (id UUID, owned BOOLEAN, image_id UUID) AS $$
+    SELECT a.id,
+           a.annotator_id = auth.user_id(),
+           CASE WHEN a.annotator_id = auth.user_id() THEN a.image_id END
+    FROM public.annotations a
+    WHERE a.id = ANY(p_ids);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION annotation_owners(UUID[]) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION annotation_owners(UUID[]) TO authenticated;
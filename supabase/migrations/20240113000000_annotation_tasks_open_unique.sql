@@ -0,0 +1,30 @@
+-- At most one open task per image
+-- Bulk assignment inserted a task for each image without an open one after
+-- a NOT EXISTS check, which two concurrent requests could both pass. The
+-- open-task index becomes UNIQUE and assignment inserts with ON CONFLICT
+-- DO NOTHING, so the second request waits for the first and skips the
+-- image.
+--
+-- Duplicates created before this migration are resolved by deleting
+-- surplus PENDING tasks, keeping a task already in progress or submitted
+-- if there is one, else the oldest. Images with several tasks in progress
+-- or submitted hold work that cannot be discarded; the index creation
+-- fails on them and they must be resolved by hand first.
+
+DELETE FROM public.annotation_tasks AS t
+USING (
+    SELECT id,
+           row_number() OVER (
+               PARTITION BY image_id
+               ORDER BY status = 'PENDING', created_at, id
+           ) AS position
+    FROM public.annotation_tasks
+    WHERE status IN ('PENDING', 'IN_PROGRESS', 'SUBMITTED')
+) AS ranked
+WHERE t.id = ranked.id AND ranked.position > 1 AND t.status = 'PENDING';
+
+DROP INDEX public.idx_annotation_tasks_open_image;
+
+CREATE UNIQUE INDEX idx_annotation_tasks_open_image
+    ON public.annotation_tasks (image_id)
+    WHERE status IN ('PENDING', 'IN_PROGRESS', 'SUBMITTED');